@@ -0,0 +1,181 @@
+from motor_lexico import tokenizar_linea, COMENTARIO, COMENTARIO_ABIERTO, CADENA_ABIERTA
+from tabla_tokens import compactar_linea, expandir_linea
+from instrumentacion import etapa, contar
+
+# Documento con caché de tokens por línea para el análisis incremental.
+# Cada línea se lexea con el estado en que la deja la anterior (None o una
+# cadena/comentario abierto), de modo que una edición solo vuelve a lexear
+# las líneas modificadas y las que cambian de estado por una construcción
+# multilínea. Los tokens de cada línea se guardan como un registro compacto
+# (tabla_tokens.compactar_linea) y su texto se recorta de la línea al leerlos.
+
+TIPOS_ABIERTOS = frozenset((COMENTARIO_ABIERTO, CADENA_ABIERTA))
+
+
+def componer_cambios(primero, segundo):
+    # Un solo (inicio, fin_viejo, fin_nuevo) para dos cambios seguidos: el
+    # segundo viene en líneas del texto que dejó el primero y el resultado
+    # va del texto de antes del primero al de después del segundo
+    inicio1, viejo1, nuevo1 = primero
+    inicio2, viejo2, nuevo2 = segundo
+    fin = max(nuevo1, viejo2)
+    return min(inicio1, inicio2), fin - (nuevo1 - viejo1), fin + (nuevo2 - viejo2)
+
+
+class DocumentoIncremental:
+    def __init__(self, limite_cache=100000, cache=None):
+        self.lineas = []
+        self.entradas = []
+        self.salidas = []
+        self.registros = []
+        # (contenido de la línea, estado de entrada) -> (registro, estado de salida);
+        # el diccionario indexa por el hash del contenido. Puede compartirse
+        # entre documentos para aprovechar una caché ya caliente.
+        self.cache = {} if cache is None else cache
+        self.limite_cache = limite_cache
+        self.lineas_lexeadas = 0
+
+    def _lexear(self, linea, estado):
+        clave = (linea, estado)
+        resultado = self.cache.get(clave)
+        if resultado is None:
+            if len(self.cache) >= self.limite_cache:
+                self.cache.clear()
+            tokens, salida = tokenizar_linea(linea, estado)
+            resultado = (compactar_linea(tokens), salida)
+            self.cache[clave] = resultado
+            self.lineas_lexeadas += 1
+        return resultado
+
+    @etapa('lexico', 'léxico')
+    def actualizar(self, code, progreso=None):
+        # Sincroniza el documento con el texto y devuelve (inicio, fin_viejo,
+        # fin_nuevo): las líneas [inicio, fin_viejo) anteriores fueron
+        # reemplazadas por las líneas [inicio, fin_nuevo) actuales.
+        # progreso(línea, total) se llama cada 1024 líneas lexeadas.
+        nuevas = code.split('\n')
+        viejas = self.lineas
+        total_viejas = len(viejas)
+        total_nuevas = len(nuevas)
+        limite = min(total_viejas, total_nuevas)
+        inicio = 0
+        while inicio < limite and viejas[inicio] == nuevas[inicio]:
+            inicio += 1
+        comun = 0
+        while (comun < limite - inicio
+               and viejas[total_viejas - 1 - comun] == nuevas[total_nuevas - 1 - comun]):
+            comun += 1
+        return self._relexear(nuevas, inicio, total_viejas - comun, total_nuevas - comun, progreso)
+
+    @etapa('lexico', 'léxico')
+    def reemplazar(self, inicio, fin, lineas):
+        # Como actualizar, cuando ya se sabe qué cambió (el resaltador sigue
+        # las ediciones del widget): las líneas [inicio, fin) pasan a ser
+        # lineas y el resto del texto no se mira.
+        nuevas = self.lineas[:inicio] + lineas + self.lineas[fin:]
+        return self._relexear(nuevas, inicio, fin, inicio + len(lineas))
+
+    def _relexear(self, nuevas, inicio, fin_viejo, fin_nuevo, progreso=None):
+        total_nuevas = len(nuevas)
+        # Si la primera línea sucia continúa una cadena o comentario, se
+        # vuelve a la línea que lo abre para que su token se rearme completo
+        while inicio > 0 and self.salidas[inicio - 1] is not None:
+            inicio -= 1
+
+        estado = self.salidas[inicio - 1] if inicio else None
+        lexeadas = self.lineas_lexeadas
+        entradas = []
+        salidas = []
+        registros = []
+        i = inicio
+        while True:
+            if i >= fin_nuevo:
+                # Las líneas sin cambios siguen siendo válidas solo si llegan
+                # con el mismo estado; si no, se propagan como sucias.
+                if i >= total_nuevas or self.entradas[fin_viejo] == estado:
+                    break
+                fin_nuevo += 1
+                fin_viejo += 1
+            if progreso is not None and not i & 1023:
+                progreso(i, total_nuevas)
+            registro, salida = self._lexear(nuevas[i], estado)
+            entradas.append(estado)
+            salidas.append(salida)
+            registros.append(registro)
+            estado = salida
+            i += 1
+
+        self.lineas = nuevas
+        self.entradas[inicio:fin_viejo] = entradas
+        self.salidas[inicio:fin_viejo] = salidas
+        self.registros[inicio:fin_viejo] = registros
+        contar('lineas', len(registros))
+        # Cada línea que no estaba en caché es un recorrido de la expresión maestra
+        contar('evaluaciones_regex', self.lineas_lexeadas - lexeadas)
+        return inicio, fin_viejo, fin_nuevo
+
+    def _primer_token(self, indice):
+        registro = self.registros[indice]
+        if not registro:
+            return None
+        return expandir_linea(registro, self.lineas[indice])[0]
+
+    def tokens_linea(self, indice):
+        # Tokens que empiezan en la línea, como (tipo, texto, columna); el
+        # fragmento que continúa una construcción anterior no se incluye y
+        # una construcción que sigue en las líneas siguientes se devuelve unida.
+        toks = expandir_linea(self.registros[indice], self.lineas[indice])
+        if self.entradas[indice] is not None:
+            toks = toks[1:]
+        if not toks or self.salidas[indice] is None:
+            return toks
+        tipo, texto, col = toks[-1]
+        partes = [texto]
+        siguiente = indice + 1
+        while siguiente < len(self.registros):
+            tipo, fragmento, _ = self._primer_token(siguiente)
+            partes.append(fragmento)
+            if tipo not in TIPOS_ABIERTOS:
+                break
+            siguiente += 1
+        return toks[:-1] + [(tipo, '\n'.join(partes), col)]
+
+    def tokens_visibles(self, indice):
+        # Los que muestran la tabla y el árbol: todo menos los comentarios
+        return [token for token in self.tokens_linea(indice) if token[0] != COMENTARIO]
+
+    def iterar_tokens(self, incluir_comentarios=True, desde=0, hasta=None):
+        # Mismo flujo que motor_lexico.tokenizar sobre el texto completo,
+        # armado desde los registros: las construcciones multilínea se unen.
+        # Con desde/hasta recorre solo esas líneas (la primera no debería
+        # continuar una construcción abierta); los números de línea siguen
+        # siendo los del documento y los desplazamientos se cuentan desde
+        # la línea desde.
+        desplazamiento = 0
+        pendiente = None
+        lineas = zip(self.lineas[desde:hasta], self.entradas[desde:hasta], self.registros[desde:hasta])
+        for num, (linea, entrada, registro) in enumerate(lineas, desde + 1):
+            toks = expandir_linea(registro, linea)
+            if entrada is not None and pendiente is not None:
+                tipo, fragmento, _ = toks[0]
+                pendiente[0] = tipo
+                pendiente[1].append(fragmento)
+                resto = toks[1:]
+                if tipo not in TIPOS_ABIERTOS:
+                    tipo_p, partes, linea_p, col_p, desp_p = pendiente
+                    pendiente = None
+                    if tipo_p != COMENTARIO or incluir_comentarios:
+                        yield (tipo_p, '\n'.join(partes), linea_p, col_p, desp_p)
+            else:
+                resto = toks
+            if resto:
+                ultimo = len(resto) - 1 if self.salidas[num - 1] is not None else -1
+                for j, (tipo, texto, col) in enumerate(resto):
+                    if j == ultimo:
+                        pendiente = [tipo, [texto], num, col, desplazamiento + col]
+                    elif tipo != COMENTARIO or incluir_comentarios:
+                        yield (tipo, texto, num, col, desplazamiento + col)
+            desplazamiento += len(linea) + 1
+        if pendiente is not None:
+            tipo_p, partes, linea_p, col_p, desp_p = pendiente
+            yield (tipo_p, '\n'.join(partes), linea_p, col_p, desp_p)
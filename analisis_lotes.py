@@ -0,0 +1,234 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+
+from motor_lexico import tokenizar
+from tabla_tokens import TablaTokens
+from analizador_sintactico import detectar_errores, unir_errores, AVISO_LIMITE
+from analizador_semantico import detectar_errores_semanticos
+from arbol_sintactico import Parser, recolector_en_pausa
+from flujo_lexico import analizar_archivo_flujo
+from analisis_paralelo import analizar_paralelo, partes_archivo
+from cache_analisis import CacheAnalisis
+
+# Modo por lotes sin interfaz gráfica: recorre directorios, reparte los
+# archivos .rs entre varios procesos y emite las mismas columnas que la tabla
+# de resultados (Línea, Token, Tipo, Descripción) como NDJSON o CSV.
+#
+#   python analisis_lotes.py src/ otro.rs --formato csv --salida resultados.csv
+#
+# Código de salida: 0 sin errores, 1 si algún archivo tiene errores (los avisos
+# de límite del análisis no cuentan).
+#
+# Los archivos de UMBRAL_FLUJO bytes o más (o todos, con --flujo) se analizan
+# en flujo en el proceso principal (flujo_lexico): sus filas se escriben a
+# medida que se reconocen los tokens, sin cargar el archivo ni la tabla.
+#
+# Los archivos de UMBRAL_PARALELO bytes o más (o todos, con --paralelo) se
+# reparten entre los procesos a su vez, en fragmentos que empiezan en
+# elementos de nivel superior (analisis_paralelo); se analizan en su lugar
+# en el orden de salida, después de los archivos que ya están en la cola.
+#
+# Los resultados se guardan en la caché en disco (cache_analisis) y un
+# archivo sin cambios se escribe directamente desde ella; --sin-cache la
+# desactiva y --cache elige otra carpeta.
+
+COLUMNAS = ('Archivo', 'Línea', 'Token', 'Tipo', 'Descripción')
+
+UMBRAL_FLUJO = 64 << 20
+UMBRAL_PARALELO = 4 << 20
+
+# Cómo se analiza cada archivo
+EN_PROCESO = 'proceso'
+EN_FLUJO = 'flujo'
+EN_PARALELO = 'paralelo'
+
+
+def buscar_archivos(rutas, extension='.rs'):
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            for carpeta, subcarpetas, archivos in os.walk(ruta):
+                subcarpetas.sort()
+                for nombre in sorted(archivos):
+                    if nombre.endswith(extension):
+                        yield os.path.join(carpeta, nombre)
+        else:
+            yield ruta
+
+
+def analizar_codigo(code, incluir_tokens=True, cache=None, ejecutor=None, partes=1):
+    # Devuelve (tabla de tokens o None, errores); la tabla es columnar y se
+    # envía entre procesos como unos pocos arrays en lugar de una tupla por
+    # token. Con ejecutor, el archivo se reparte en partes fragmentos
+    guardado = cache.leer_tabla(code) if cache is not None else None
+    if guardado is not None:
+        tabla, errores = guardado
+    elif ejecutor is not None:
+        tabla, errores = analizar_paralelo(code, ejecutor, partes)
+        if cache is not None:
+            cache.guardar_tabla(code, tabla, errores)
+    else:
+        tabla = TablaTokens.desde_tokens(code, tokenizar(code, incluir_comentarios=False))
+        parser = Parser(tabla)
+        # Proceso de lotes: el recolector de ciclos no corre mientras el
+        # parser crea nodos (el árbol no tiene ciclos)
+        with recolector_en_pausa():
+            semanticos = detectar_errores_semanticos(code, tokens=tabla, elementos=parser.elementos())
+        errores = unir_errores(detectar_errores(tabla), parser.errores) + semanticos
+        if cache is not None:
+            cache.guardar_tabla(code, tabla, errores)
+    return (tabla if incluir_tokens else None), errores
+
+
+def analizar_archivo(ruta, incluir_tokens=True, cache=None, ejecutor=None, partes=1):
+    try:
+        with open(ruta, 'r', encoding='utf-8', errors='replace') as archivo:
+            code = archivo.read()
+    except OSError as e:
+        return ruta, None, [(0, "Error de lectura", str(e))]
+    tabla, errores = analizar_codigo(code, incluir_tokens, cache, ejecutor, partes)
+    return ruta, tabla, errores
+
+
+def analizar_en_flujo(ruta, escritor, incluir_tokens=True):
+    # Devuelve los errores; las filas de los tokens ya quedaron escritas
+    al_fila = (lambda fila: escritor.escribir(ruta, (fila,))) if incluir_tokens else None
+    try:
+        return analizar_archivo_flujo(ruta, al_fila=al_fila)
+    except OSError as e:
+        return [(0, "Error de lectura", str(e))]
+
+
+def _modo(ruta, umbral_flujo, umbral_paralelo, procesos):
+    # Devuelve (modo, partes)
+    try:
+        tamano = os.path.getsize(ruta)
+    except OSError:
+        return EN_PROCESO, 1
+    if tamano >= umbral_flujo:
+        return EN_FLUJO, 1
+    partes = partes_archivo(tamano, procesos) if procesos > 1 and tamano >= umbral_paralelo else 1
+    return (EN_PARALELO if partes > 1 else EN_PROCESO), partes
+
+
+def filas_resultado(tabla, errores):
+    # Filas (Línea, Token, Tipo, Descripción): primero los tokens, luego los errores
+    filas_error = ((linea, "", tipo, descripcion) for linea, tipo, descripcion in errores)
+    if tabla is None:
+        return filas_error
+    return chain(tabla.filas(), filas_error)
+
+
+def _analizar_trabajo(trabajo):
+    return analizar_archivo(*trabajo)
+
+
+class EscritorNDJSON:
+    def __init__(self, salida):
+        self.salida = salida
+
+    def escribir(self, ruta, filas):
+        for fila in filas:
+            self.salida.write(json.dumps(dict(zip(COLUMNAS, (ruta,) + fila)), ensure_ascii=False))
+            self.salida.write('\n')
+
+
+class EscritorCSV:
+    def __init__(self, salida):
+        self.escritor = csv.writer(salida)
+        self.escritor.writerow(COLUMNAS)
+
+    def escribir(self, ruta, filas):
+        self.escritor.writerows((ruta,) + fila for fila in filas)
+
+
+ESCRITORES = {'ndjson': EscritorNDJSON, 'csv': EscritorCSV}
+
+
+def tamano_bloque(total, procesos):
+    # Bloques suficientemente grandes para amortizar el envío entre procesos
+    # y suficientemente pequeños para repartir bien los archivos lentos
+    return max(1, min(64, total // (procesos * 8)))
+
+
+def analizar_lotes(rutas, escritor, procesos=None, extension='.rs', incluir_tokens=True,
+                   umbral_flujo=UMBRAL_FLUJO, cache=None, umbral_paralelo=UMBRAL_PARALELO):
+    # Devuelve (archivos analizados, archivos con errores)
+    procesos = procesos or os.cpu_count() or 1
+    archivos = [(ruta,) + _modo(ruta, umbral_flujo, umbral_paralelo, procesos)
+                for ruta in buscar_archivos(rutas, extension)]
+    trabajos = [(ruta, incluir_tokens, cache) for ruta, modo, _ in archivos if modo == EN_PROCESO]
+    analizados = 0
+    con_errores = 0
+    ejecutor = None
+    if procesos > 1 and (len(trabajos) > 1 or any(modo == EN_PARALELO for _, modo, _ in archivos)):
+        ejecutor = ProcessPoolExecutor(max_workers=procesos)
+    if ejecutor is None or len(trabajos) <= 1:
+        resultados = map(_analizar_trabajo, trabajos)
+    else:
+        resultados = ejecutor.map(_analizar_trabajo, trabajos,
+                                  chunksize=tamano_bloque(len(trabajos), procesos))
+    try:
+        # map conserva el orden de entrada y entrega cada resultado en cuanto
+        # está listo, así la salida se escribe mientras se analiza; los
+        # archivos en flujo y los repartidos se intercalan en su lugar
+        for ruta, modo, partes in archivos:
+            if modo == EN_FLUJO:
+                errores = analizar_en_flujo(ruta, escritor, incluir_tokens)
+                escritor.escribir(ruta, filas_resultado(None, errores))
+            elif modo == EN_PARALELO:
+                _, tabla, errores = analizar_archivo(ruta, incluir_tokens, cache, ejecutor, partes)
+                escritor.escribir(ruta, filas_resultado(tabla, errores))
+            else:
+                _, tabla, errores = next(resultados)
+                escritor.escribir(ruta, filas_resultado(tabla, errores))
+            analizados += 1
+            if any(tipo != AVISO_LIMITE for _, tipo, _ in errores):
+                con_errores += 1
+    finally:
+        if ejecutor is not None:
+            ejecutor.shutdown(cancel_futures=True)
+    return analizados, con_errores
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Análisis léxico, sintáctico y semántico de archivos Rust por lotes")
+    parser.add_argument('rutas', nargs='+', help="Archivos o directorios a analizar")
+    parser.add_argument('--formato', choices=sorted(ESCRITORES), default='ndjson')
+    parser.add_argument('--salida', help="Archivo de salida (por defecto, la salida estándar)")
+    parser.add_argument('--procesos', type=int, default=None, help="Procesos trabajadores (por defecto, uno por núcleo)")
+    parser.add_argument('--extension', default='.rs')
+    parser.add_argument('--solo-errores', action='store_true', help="Emitir solo las filas de error")
+    parser.add_argument('--cache', help="Carpeta de la caché de resultados (por defecto, ANALIZADOR_CACHE o ~/.cache)")
+    parser.add_argument('--sin-cache', action='store_true', help="No leer ni guardar resultados en la caché")
+    parser.add_argument('--flujo', action='store_true',
+                        help=f"Analizar todos los archivos en flujo (por defecto, los de {UMBRAL_FLUJO >> 20} MiB o más)")
+    parser.add_argument('--paralelo', action='store_true',
+                        help=f"Repartir cada archivo entre los procesos (por defecto, los de {UMBRAL_PARALELO >> 20} MiB o más)")
+    args = parser.parse_args(argv)
+
+    if args.sin_cache:
+        cache = None
+    elif args.cache:
+        cache = CacheAnalisis(args.cache)
+    else:
+        cache = CacheAnalisis.desde_entorno()
+    salida = open(args.salida, 'w', encoding='utf-8', newline='') if args.salida else sys.stdout
+    try:
+        escritor = ESCRITORES[args.formato](salida)
+        analizados, con_errores = analizar_lotes(
+            args.rutas, escritor, args.procesos, args.extension, not args.solo_errores,
+            0 if args.flujo else UMBRAL_FLUJO, cache, 0 if args.paralelo else UMBRAL_PARALELO)
+    finally:
+        if args.salida:
+            salida.close()
+    print(f"{analizados} archivo(s) analizado(s), {con_errores} con errores", file=sys.stderr)
+    return 1 if con_errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+import re
+from multiprocessing import resource_tracker, shared_memory
+
+from motor_lexico import RUST_KEYWORDS
+from tabla_tokens import TablaTokens
+from analisis_incremental import DocumentoIncremental
+from arbol_sintactico import recolector_en_pausa
+from analisis_segmentado import analizar_tramo, combinar
+from instrumentacion import etapa, contar
+
+# Análisis de un solo archivo grande repartido entre procesos. El archivo se
+# parte en fragmentos en líneas que parecen empezar un elemento de nivel
+# superior (fn, struct, impl...), halladas con un recorrido rápido que solo
+# cuenta llaves saltando cadenas, caracteres y comentarios. El texto se
+# copia una vez, codificado en UTF-8, a un bloque de memoria compartida y
+# cada proceso lee de ahí su fragmento: solo viajan los límites.
+#
+# Cada fragmento se verifica con analizar_tramo, como un segmento de
+# analisis_segmentado, y devuelve sus tokens, sus errores y si termina en
+# reposo (verificadores en su estado inicial y ninguna construcción léxica
+# abierta). El recorrido de llaves solo propone los cortes: un fragmento que
+# no termina en reposo (una llave sin cerrar, una cadena o un comentario que
+# cruza el corte) se vuelve a verificar junto con los siguientes, ampliando
+# al doble, hasta llegar en reposo; en cada ronda las ampliaciones de todos
+# los fragmentos pendientes se reparten juntas. combinar() resuelve después
+# el ámbito global entre fragmentos, así que tokens y errores son los mismos
+# que los de la pasada completa y en el mismo orden.
+
+# Bytes mínimos por fragmento: por debajo el envío y el arranque pesan más
+# que el análisis (64 KB son unas 3000 líneas y más de 100 ms de análisis)
+TAMANO_PARTE = 64 << 10
+# Fragmentos por proceso, para repartir bien los que tardan más
+PARTES_POR_PROCESO = 4
+
+# Lo que puede esconder llaves (cadenas, caracteres, comentarios) y los
+# inicios de línea candidatos; las llaves entre una coincidencia y la
+# siguiente se cuentan con bytes.count. La anticipación del principio
+# descarta de una vez las posiciones que no pueden empezar ninguna
+_ESCANEO = re.compile(rb'''
+    (?=[/"'br\n]) (?:
+    //[^\n]*
+  | /\*(?:[^*]|\*(?!/))*\*/
+  | (?<![\w])b?r(?P<almohadillas>\#*)".*?"(?P=almohadillas)
+  | (?<![\w])b?"(?:[^"\\]|\\.)*"
+  | '(?:[^'\\\n]|\\.[^'\n]*)'
+  | (?P<linea>\n)(?=[A-Za-z_\#])
+    )
+''', re.VERBOSE | re.DOTALL)
+
+_ELSE = re.compile(rb'else\b')
+
+
+def partes_archivo(tamano, procesos):
+    # Cantidad de fragmentos para un archivo de tamano bytes
+    if procesos <= 1:
+        return 1
+    return max(1, min(procesos * PARTES_POR_PROCESO, tamano // TAMANO_PARTE))
+
+
+@etapa('fronteras', 'fronteras')
+def fronteras(datos, partes):
+    # Desplazamientos en bytes de los inicios de fragmento (el primero es 0):
+    # líneas sin sangría, fuera de llaves, que empiezan con una palabra o un
+    # atributo, a intervalos de al menos len(datos) / partes bytes. Los
+    # comentarios de bloque anidados y los literales raros pueden engañar al
+    # recorrido; el análisis lo corrige
+    cortes = [0]
+    if partes <= 1:
+        return cortes
+    intervalo = len(datos) // partes
+    siguiente = intervalo
+    profundidad = 0
+    contar_llaves = datos.count
+    posicion = 0
+    for m in _ESCANEO.finditer(datos):
+        inicio = m.start()
+        if inicio > posicion:
+            profundidad = max(profundidad + contar_llaves(b'{', posicion, inicio)
+                              - contar_llaves(b'}', posicion, inicio), 0)
+        posicion = m.end()
+        if m.lastgroup == 'linea' and not profundidad and posicion >= siguiente:
+            if not _ELSE.match(datos, posicion):
+                cortes.append(posicion)
+                if len(cortes) == partes:
+                    break
+                siguiente = posicion + intervalo
+    return cortes
+
+
+def analizar_fragmento(texto, linea_base=0, desplazamiento_base=0, palabras_clave=RUST_KEYWORDS):
+    # (tabla de tokens, ResultadoSegmento, en_reposo) del fragmento; la tabla
+    # ya lleva las líneas y desplazamientos del documento, sin el texto
+    documento = DocumentoIncremental()
+    documento.actualizar(texto)
+    tokens = []
+    resultado, _, reposo = analizar_tramo(documento, 0, len(documento.lineas), palabras_clave, tokens)
+    tabla = TablaTokens.desde_tokens('', tokens, linea_base, desplazamiento_base)
+    return tabla, resultado, reposo and documento.salidas[-1] is None
+
+
+def _abrir_bloque(nombre):
+    # El bloque es del proceso principal, que lo borra al terminar. Un
+    # proceso que solo lo abre no debe quedar registrado en el
+    # resource_tracker: al salir lo borraría (o avisaría de una fuga)
+    try:
+        return shared_memory.SharedMemory(name=nombre, track=False)
+    except TypeError:
+        # Antes de Python 3.13 se registra siempre
+        memoria = shared_memory.SharedMemory(name=nombre)
+        resource_tracker.unregister(memoria._name, 'shared_memory')
+        return memoria
+
+
+def _analizar_trabajo(trabajo):
+    # Se ejecuta en los procesos: copia su fragmento del bloque compartido
+    nombre, inicio, fin, linea_base, desplazamiento_base, palabras_clave = trabajo
+    memoria = _abrir_bloque(nombre)
+    try:
+        texto = bytes(memoria.buf[inicio:fin]).decode('utf-8', errors='surrogatepass')
+    finally:
+        memoria.close()
+    # Los procesos solo analizan: el recolector de ciclos puede esperar
+    with recolector_en_pausa():
+        return analizar_fragmento(texto, linea_base, desplazamiento_base, palabras_clave)
+
+
+@etapa('paralelo', 'análisis en paralelo')
+def analizar_paralelo(code, ejecutor=None, partes=1, palabras_clave=RUST_KEYWORDS):
+    # (TablaTokens, errores) como analisis_lotes.analizar_codigo. Sin
+    # ejecutor (o con una sola parte) los fragmentos se analizan aquí
+    datos = code.encode('utf-8', errors='surrogatepass')
+    inicios = fronteras(datos, partes)
+    # Línea y desplazamiento en caracteres de cada inicio
+    lineas = [0]
+    desplazamientos = [0]
+    ascii_ = code.isascii()
+    for anterior, inicio in zip(inicios, inicios[1:]):
+        lineas.append(lineas[-1] + datos.count(b'\n', anterior, inicio))
+        desplazamientos.append(inicio if ascii_ else
+                               desplazamientos[-1] + len(datos[anterior:inicio].decode('utf-8', errors='surrogatepass')))
+    finales = [inicio - 1 for inicio in inicios[1:]] + [len(datos)]
+    contar('fragmentos', len(inicios))
+
+    memoria = None
+    if ejecutor is not None and len(inicios) > 1:
+        memoria = shared_memory.SharedMemory(create=True, size=max(len(datos), 1))
+        memoria.buf[:len(datos)] = datos
+
+    def trabajo(i, j):
+        # Fragmentos [i, j) como uno solo
+        return (memoria.name if memoria is not None else None, inicios[i], finales[j - 1],
+                lineas[i], desplazamientos[i], palabras_clave)
+
+    def analizar(trabajos):
+        if memoria is not None:
+            return ejecutor.map(_analizar_trabajo, trabajos)
+        return (analizar_fragmento(datos[inicio:fin].decode('utf-8', errors='surrogatepass'),
+                                   linea, desplazamiento, claves)
+                for _, inicio, fin, linea, desplazamiento, claves in trabajos)
+
+    try:
+        n = len(inicios)
+        # Para cada fragmento i: (fin j del tramo [i, j) verificado, próxima
+        # ampliación, (tabla, resultado, en_reposo))
+        tramos = [(i + 1, 1, analisis) for i, analisis in
+                  enumerate(analizar([trabajo(i, i + 1) for i in range(n)]))]
+        while True:
+            # Los tramos de la cadena desde el primero que no terminan en
+            # reposo se amplían todos en una misma tanda
+            pendientes = []
+            i = 0
+            while i < n:
+                j, ampliar, (_, _, reposo) = tramos[i]
+                if not reposo and j < n:
+                    pendientes.append((i, min(j + ampliar, n), ampliar * 2))
+                i = j
+            if not pendientes:
+                break
+            contar('fragmentos_repetidos', len(pendientes))
+            analisis = analizar([trabajo(i, j) for i, j, _ in pendientes])
+            for (i, j, ampliar), nuevo in zip(pendientes, analisis):
+                tramos[i] = (j, ampliar, nuevo)
+        tabla = TablaTokens(code)
+        aceptados = []
+        i = 0
+        while i < n:
+            j, _, (parcial, resultado, _) = tramos[i]
+            tabla.extender(parcial)
+            aceptados.append((lineas[i], resultado))
+            i = j
+    finally:
+        if memoria is not None:
+            memoria.close()
+            # Si los procesos comparten el resource_tracker de este, su
+            # unregister borró también el registro del bloque; se repone
+            # (registrar dos veces no cambia nada) para que unlink lo quite
+            resource_tracker.register(memoria._name, 'shared_memory')
+            memoria.unlink()
+    errores, semanticos = combinar([linea for linea, _ in aceptados], [resultado for _, resultado in aceptados])
+    return tabla, errores + semanticos
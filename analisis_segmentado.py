@@ -0,0 +1,297 @@
+import re
+from bisect import bisect_right
+
+from motor_lexico import RUST_KEYWORDS, IDENTIFICADOR, PALABRA_CLAVE
+from analizador_sintactico import detectar_errores, unir_errores, REFERENCIA_LINEA
+from analizador_semantico import (
+    VerificadorSemantico, VerificadorArbol, ERROR_SEMANTICO, EXPRESION, _MENSAJES_USO,
+    mensaje_redeclaracion, unir_aridad, errores_llamadas,
+)
+from arbol_sintactico import Parser
+from analisis_incremental import DocumentoIncremental
+from instrumentacion import etapa, contar
+
+# Análisis por segmentos: el documento se corta en las líneas donde empieza
+# un elemento de nivel superior y cada segmento se verifica por separado, de
+# modo que una edición solo vuelve a verificar el segmento que toca.
+#
+# Un corte solo es válido si los verificadores llegan a él en su estado
+# inicial: el sintáctico con la pila vacía y sin sentencia en curso
+# (detectar_errores lo anota en limpias), el parser al empezar un elemento de
+# nivel superior (Parser.inicios) y el semántico en el ámbito global, sin
+# papel pendiente. Eso se comprueba en cada pasada, no se supone: un código
+# con llaves sin cerrar queda en un único segmento hasta donde se recupera.
+# Lo único que cruza los cortes es el ámbito global; cada segmento devuelve
+# sus declaraciones globales, los nombres que no pudo resolver y sus
+# funciones y llamadas de nivel superior, y combinar() los resuelve entre
+# todos los segmentos como lo haría la pasada completa (los elementos son
+# visibles en todo el archivo, las ligaduras globales solo después de
+# declararse).
+#
+# Con cortes válidos, los errores combinados son los mismos que los de
+# detectar_errores (unidos a los del parser con unir_errores) y
+# detectar_errores_semanticos sobre el texto completo.
+
+# Una línea que empieza con else continúa el if anterior
+_ELSE = re.compile(r'else\b')
+
+
+class VerificadorSegmento(VerificadorSemantico):
+    # Verificador semántico de un segmento: las declaraciones del ámbito
+    # global se registran en lugar de comprobarse, y los nombres sin resolver
+    # que llegan al ámbito global se devuelven sin reportar.
+    def __init__(self, palabras_clave=RUST_KEYWORDS):
+        super().__init__(palabras_clave)
+        self.declaraciones = []
+
+    def _declarar_elemento(self, nombre, clase, linea, columna, ambito):
+        if ambito is not self.ambitos[0]:
+            super()._declarar_elemento(nombre, clase, linea, columna, ambito)
+            return
+        self.declaraciones.append((nombre, clase, linea, columna))
+        ambito.elementos[nombre] = clase
+        ambito.nombres.add(nombre)
+
+    def en_reposo(self):
+        # Estado inicial salvo por el contenido del ámbito global; el token
+        # retenido todavía no se procesó
+        global_ = self.ambitos[0]
+        return (len(self.ambitos) == 1 and self.papel == EXPRESION and self.preparado is None
+                and self.atributo is None and not global_.profundidad
+                and not global_.al_cerrar and not global_.inicio_brazo)
+
+    def terminar(self):
+        # Devuelve si el segmento termina en reposo; los errores y el ámbito
+        # global quedan en el verificador
+        if self.retenido is not None:
+            self._token(self.retenido, None)
+            self.retenido = None
+        reposo = self.en_reposo()
+        while len(self.ambitos) > 1:
+            self._cerrar_ambito()
+        return reposo
+
+
+class ResultadoSegmento:
+    # Las líneas son las del documento cuando el segmento empezaba en el
+    # índice base; si una edición anterior lo desplaza se corrigen al combinar
+    __slots__ = ('base', 'errores', 'del_parser', 'semanticos', 'declaraciones', 'pendientes', 'ligaduras',
+                 'comodin', 'funciones', 'llamadas')
+
+    def __init__(self, errores, del_parser, verificador, estructura, base):
+        self.base = base
+        self.errores = errores
+        # Los del parser se unen a los sintácticos recién en combinar: el
+        # error que los repite puede estar en el segmento anterior
+        self.del_parser = del_parser
+        self.semanticos = verificador.errores
+        self.declaraciones = verificador.declaraciones
+        global_ = verificador.ambitos[0]
+        self.pendientes = global_.pendientes
+        # Nombres globales que no son elementos (ligaduras fuera de funciones)
+        self.ligaduras = global_.nombres.difference(global_.elementos) or None
+        self.comodin = global_.comodin
+        self.funciones = estructura.funciones
+        self.llamadas = estructura.llamadas
+
+
+@etapa('segmentos', 'segmentos')
+def analizar_tramo(documento, desde, hasta, palabras_clave=RUST_KEYWORDS, lista=None):
+    # Una pasada sobre las líneas [desde, hasta) como un solo segmento.
+    # Devuelve (resultado, cortes, en_reposo): cortes son los índices de
+    # línea dentro del tramo donde ambos verificadores están en su estado
+    # inicial, y en_reposo indica si también lo están al final. Si se pasa
+    # lista, los tokens del tramo quedan en ella.
+    semantico = VerificadorSegmento(palabras_clave)
+    estructura = VerificadorArbol()
+    procesar = semantico.procesar
+    primera = desde + 1
+    candidatas = []
+
+    def tokens():
+        cantidad = 0
+        for token in documento.iterar_tokens(False, desde, hasta):
+            procesar(token)
+            tipo, texto, linea, columna, _ = token
+            # Solo líneas que empiezan con una palabra o un atributo: el
+            # primer token de un segmento no ve al anterior
+            if (not columna and linea != primera
+                    and (tipo == IDENTIFICADOR or tipo == PALABRA_CLAVE or texto == '#')
+                    and texto != 'else'
+                    and semantico.en_reposo()):
+                candidatas.append(linea)
+            cantidad += 1
+            yield token
+        contar('tokens', cantidad)
+
+    # El parser recorre la lista que deja la pasada sintáctica
+    if lista is None:
+        lista = []
+    lista.extend(tokens())
+    limpias = []
+    errores = detectar_errores(lista, limpias)
+    parser = Parser(lista)
+    for nodo in parser.elementos():
+        estructura.elemento(nodo)
+    semantico.errores.extend(estructura.errores)
+    reposo = (semantico.terminar() and bool(limpias) and limpias[-1] is None
+              and not parser.incompleto)
+    limpias = set(limpias).intersection(parser.inicios)
+    cortes = [linea - 1 for linea in candidatas if linea in limpias]
+    return ResultadoSegmento(errores, parser.errores, semantico, estructura, desde), cortes, reposo
+
+
+def _desplazar_errores(errores, delta):
+    def corregir(m):
+        return f"en la línea {int(m.group(1)) + delta}"
+    return [(linea + delta, tipo, REFERENCIA_LINEA.sub(corregir, descripcion) if 'en la línea' in descripcion else descripcion)
+            for linea, tipo, descripcion in errores]
+
+
+def combinar(inicios, resultados):
+    # Errores sintácticos y semánticos del documento a partir de los
+    # segmentos que empiezan en los índices de línea inicios
+    errores = []
+    del_parser = []
+    semanticos = []
+    elementos = {}
+    funciones = {}
+    comodin = False
+    for inicio, resultado in zip(inicios, resultados):
+        delta = inicio - resultado.base
+        if delta:
+            errores.extend(_desplazar_errores(resultado.errores, delta))
+            del_parser.extend(_desplazar_errores(resultado.del_parser, delta))
+            semanticos.extend((linea + delta, columna, descripcion)
+                              for linea, columna, descripcion in resultado.semanticos)
+        else:
+            errores.extend(resultado.errores)
+            del_parser.extend(resultado.del_parser)
+            semanticos.extend(resultado.semanticos)
+        for nombre, clase, linea, columna in resultado.declaraciones:
+            if clase is not None and elementos.get(nombre) == clase:
+                semanticos.append((linea + delta, columna, mensaje_redeclaracion(clase, nombre)))
+            elementos[nombre] = clase
+        for nombre, aridad in resultado.funciones.items():
+            unir_aridad(funciones, nombre, aridad)
+        comodin = comodin or resultado.comodin
+    for inicio, resultado in zip(inicios, resultados):
+        if resultado.llamadas:
+            delta = inicio - resultado.base
+            semanticos.extend((linea + delta, columna, descripcion) for linea, columna, descripcion
+                              in errores_llamadas(resultado.llamadas, funciones))
+    if not comodin:
+        # Los elementos valen en todo el archivo; las demás ligaduras
+        # globales, desde los segmentos anteriores
+        ligaduras = set()
+        for inicio, resultado in zip(inicios, resultados):
+            delta = inicio - resultado.base
+            for linea, columna, nombre, clase in resultado.pendientes:
+                if nombre not in elementos and nombre not in ligaduras:
+                    semanticos.append((linea + delta, columna, _MENSAJES_USO[clase].format(nombre)))
+            if resultado.ligaduras:
+                ligaduras.update(resultado.ligaduras)
+    semanticos.sort(key=lambda error: (error[0], error[1]))
+    return unir_errores(errores, del_parser), [(linea, ERROR_SEMANTICO, descripcion) for linea, _, descripcion in semanticos]
+
+
+def _parece_elemento(linea, entrada):
+    # Línea candidata a corte: empieza, sin sangría, con una palabra o un
+    # atributo y no continúa una construcción multilínea
+    return (entrada is None and (linea[:1].isidentifier() or linea[:1] == '#')
+            and not _ELSE.match(linea))
+
+
+class DocumentoSegmentado:
+    # Documento incremental con los resultados de verificación por segmento
+    def __init__(self, palabras_clave=RUST_KEYWORDS, cache=None):
+        self.palabras_clave = palabras_clave
+        self.documento = DocumentoIncremental(cache=cache)
+        self.inicios = []       # primera línea de cada segmento
+        self.resultados = []
+        self.segmentos_verificados = 0
+
+    def actualizar(self, code):
+        # Sincroniza con el texto y vuelve a verificar solo los segmentos
+        # tocados; devuelve (inicio, fin_viejo, fin_nuevo) como
+        # DocumentoIncremental.actualizar
+        return self.verificar_cambio(self.documento.actualizar(code))
+
+    def verificar_cambio(self, cambio):
+        # Vuelve a verificar los segmentos que toca un cambio ya aplicado al
+        # documento (con reemplazar, sin comparar el texto completo); varios
+        # cambios seguidos se juntan con componer_cambios
+        inicio, fin_viejo, fin_nuevo = cambio
+        if inicio == fin_viejo == fin_nuevo and self.inicios:
+            return cambio
+        total = len(self.documento.lineas)
+        if not self.inicios:
+            primero = siguiente = 0
+        else:
+            # Se incluye el segmento anterior a la edición: la primera línea
+            # de un segmento solo se acepta como corte si no cambió
+            primero = max(bisect_right(self.inicios, max(inicio - 1, 0)) - 1, 0)
+            siguiente = bisect_right(self.inicios, fin_viejo)
+        delta = fin_nuevo - fin_viejo
+        viejos_inicios = [linea + delta for linea in self.inicios[siguiente:]]
+        viejos_resultados = self.resultados[siguiente:]
+        inicios = self.inicios[:primero]
+        resultados = self.resultados[:primero]
+        desde = self.inicios[primero] if self.inicios else 0
+
+        # Se verifica desde el primer segmento tocado hasta llegar en reposo
+        # al inicio de un segmento viejo (desde ahí se reutilizan) o al final.
+        # Cada paso prueba primero hasta la próxima línea que parece empezar
+        # un elemento; si no llega en reposo, el tramo va hasta el próximo
+        # segmento viejo y, mientras no termine en reposo, se amplía al doble
+        # de segmentos. La pasada larga informa sus cortes válidos.
+        lineas = self.documento.lineas
+        entradas = self.documento.entradas
+        j = 0
+        ampliar = 1
+        while True:
+            hasta = viejos_inicios[j] if j < len(viejos_inicios) else total
+            corte = desde + 1
+            while corte < hasta and not _parece_elemento(lineas[corte], entradas[corte]):
+                corte += 1
+            if corte < hasta:
+                resultado, _, reposo = analizar_tramo(self.documento, desde, corte, self.palabras_clave)
+                self.segmentos_verificados += 1
+                if reposo:
+                    inicios.append(desde)
+                    resultados.append(resultado)
+                    desde = corte
+                    continue
+            resultado, cortes, reposo = analizar_tramo(self.documento, desde, hasta, self.palabras_clave)
+            self.segmentos_verificados += 1
+            if reposo or hasta == total:
+                self._agregar(inicios, resultados, desde, hasta, cortes, resultado)
+                if hasta < total:
+                    inicios.extend(viejos_inicios[j:])
+                    resultados.extend(viejos_resultados[j:])
+                break
+            if cortes:
+                self._agregar(inicios, resultados, desde, cortes[-1], cortes[:-1])
+                desde = cortes[-1]
+            j += ampliar
+            ampliar *= 2
+        self.inicios = inicios
+        self.resultados = resultados
+        return cambio
+
+    def _agregar(self, inicios, resultados, desde, hasta, cortes, resultado=None):
+        # Segmentos [desde, hasta) partidos en los cortes; sin cortes se usa
+        # el resultado de la pasada (si lo hay)
+        if not cortes and resultado is not None:
+            inicios.append(desde)
+            resultados.append(resultado)
+            return
+        limites = [desde] + cortes + [hasta]
+        for a, b in zip(limites, limites[1:]):
+            inicios.append(a)
+            resultados.append(analizar_tramo(self.documento, a, b, self.palabras_clave)[0])
+            self.segmentos_verificados += 1
+
+    def errores(self):
+        # (errores sintácticos, errores semánticos) del documento completo
+        return combinar(self.inicios, self.resultados)
@@ -1,10 +1,28 @@
 import tkinter as tk
 from tkinter import ttk
-import re
 # from graphviz import Digraph
-from tkinter import scrolledtext, messagebox
-from tkinter.font import Font
+from tkinter import scrolledtext, messagebox, filedialog, simpledialog
 import os
+import queue
+import time
+from array import array
+from bisect import bisect_right
+from itertools import accumulate, islice
+from motor_lexico import (
+    RUST_KEYWORDS, COMENTARIO, COMENTARIO_ABIERTO, CADENA, CADENA_ABIERTA, CARACTER,
+    TIEMPO_VIDA, MACRO, PALABRA_CLAVE, NUMERO, OPERADOR, tokenizar, describir,
+)
+from analizador_sintactico import detectar_errores, AVISO_LIMITE
+from analizador_semantico import detectar_errores_semanticos
+from analisis_incremental import DocumentoIncremental
+from analisis_segmentado import DocumentoSegmentado
+from tabla_tokens import expandir_linea
+from arbol_sintactico import NodoArbol, construir_arbol
+from trabajador_analisis import TrabajadorAnalisis
+from interprete import ErrorSintaxis
+from instrumentacion import Metricas, etapa, contar, perfil_desde_entorno
+from cache_analisis import CacheAnalisis
+from corpus_ejemplos import CorpusEjemplos, ARCHIVO_EJEMPLOS
 
 class ModernTheme:
     # Colores modernos con mejor contraste
@@ -19,6 +37,21 @@ class ModernTheme:
     TABLE_STRIPE_COLOR = "#F8F9FA"  # Color para filas alternadas
     BORDER_COLOR = "#E0E0E0"  # Color para bordes
 
+    # Resaltado del código por tipo de token (paleta tipo One Dark)
+    SYNTAX_COLORS = {
+        PALABRA_CLAVE: "#C678DD",
+        CADENA: "#98C379",
+        CADENA_ABIERTA: "#98C379",
+        CARACTER: "#98C379",
+        COMENTARIO: "#5C6370",
+        COMENTARIO_ABIERTO: "#5C6370",
+        NUMERO: "#D19A66",
+        MACRO: "#61AFEF",
+        TIEMPO_VIDA: "#E5C07B",
+        OPERADOR: "#56B6C2",
+    }
+    ITALIC_SYNTAX = (COMENTARIO, COMENTARIO_ABIERTO)
+
     # Fuentes más modernas
     TITLE_FONT = ("Segoe UI", 24, "bold")
     HEADER_FONT = ("Segoe UI Semibold", 14)
@@ -27,14 +60,457 @@ class ModernTheme:
     BUTTON_FONT = ("Segoe UI", 11, "bold")
 
 
-class NodoArbol:
-    def __init__(self, tipo, valor):
-        self.tipo = tipo
-        self.valor = valor
-        self.hijos = []
+class TablaVirtual:
+    # Tabla de resultados virtual: las filas no se guardan; se leen del
+    # documento (almacén compacto de tokens) a partir del conteo de filas de
+    # cada línea, y solo la ventana visible más un pequeño margen existe
+    # como ítems del Treeview.
+    SOBREBARRIDO = 4
+    TRAMO_PREFIJO = 4096
+
+    def __init__(self, tree, scrollbar, palabras_clave, alto_fila=25):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.palabras_clave = palabras_clave
+        self.alto_fila = alto_fila
+        self.documento = None
+        self.conteos = array('I')
+        self.errores = []
+        # Sumas prefijas de los conteos, válidas para las primeras
+        # len(_acumulado) líneas: un cambio las corta desde la línea que
+        # toca y _prefijo las extiende solo hasta la fila que se pide. En un
+        # array y no en una lista de enteros: con 100k líneas la lista sola
+        # ocupaba más que los registros.
+        self._acumulado = array('I')
+        self._total = 0
+        self.primera = 0
+        self.visibles = int(str(tree.cget('height')))
+        self.items = []
+        scrollbar.configure(command=self.yview)
+        tree.bind('<Configure>', self.on_configure)
+        tree.bind('<MouseWheel>', self.on_mousewheel)
+        tree.bind('<Button-4>', lambda event: self.desplazar(-3))
+        tree.bind('<Button-5>', lambda event: self.desplazar(3))
+        self._ajustar_items()
+
+    def __len__(self):
+        return self._total_tokens() + len(self.errores)
+
+    def _total_tokens(self):
+        return self._total
+
+    def _prefijo(self, fila):
+        # Extiende las sumas prefijas, de a TRAMO_PREFIJO líneas, hasta
+        # pasar la fila o llegar al final
+        acumulado = self._acumulado
+        validas = len(acumulado)
+        total_lineas = len(self.conteos)
+        suma = acumulado[-1] if validas else 0
+        while suma <= fila and validas < total_lineas:
+            fin = min(validas + self.TRAMO_PREFIJO, total_lineas)
+            acumulado.extend(islice(accumulate(self.conteos[validas:fin], initial=suma), 1, None))
+            validas = fin
+            suma = acumulado[-1]
+
+    def limpiar(self):
+        self.documento = None
+        self.conteos = array('I')
+        self.errores = []
+        self._acumulado = array('I')
+        self._total = 0
+        self.primera = 0
+        self.refrescar()
+
+    def agregar_lineas(self, documento, conteos):
+        # conteos: cantidad de filas de cada línea nueva del documento; las
+        # sumas prefijas de las anteriores siguen valiendo
+        self.documento = documento
+        self.conteos.extend(conteos)
+        self._total += sum(conteos)
+        self.refrescar()
+
+    def reemplazar_lineas(self, inicio, fin, conteos):
+        self._total += sum(conteos) - sum(self.conteos[inicio:fin])
+        self.conteos[inicio:fin] = array('I', conteos)
+        del self._acumulado[inicio:]
+        self.refrescar()
+
+    def establecer_errores(self, errores):
+        self.errores = errores
+        self.refrescar()
+
+    def filas(self, desde, cantidad):
+        # Genera (valores, etiqueta) de las filas [desde, desde + cantidad)
+        total_tokens = self._total_tokens()
+        if desde < total_tokens:
+            self._prefijo(desde)
+            indice = bisect_right(self._acumulado, desde)
+            pos = desde - (self._acumulado[indice - 1] if indice else 0)
+            while cantidad and indice < len(self.conteos):
+                line_num = indice + 1
+                tag = 'oddrow' if line_num % 2 == 0 else 'evenrow'
+                if self.conteos[indice]:
+                    for kind, token, _ in self.documento.tokens_visibles(indice)[pos:pos + cantidad]:
+                        tipo, descripcion = describir(kind, token, self.palabras_clave)
+                        yield (line_num, token, tipo, descripcion), tag
+                        cantidad -= 1
+                indice += 1
+                pos = 0
+            desde = total_tokens
+        for line_num, tipo, descripcion in self.errores[desde - total_tokens:desde - total_tokens + cantidad]:
+            yield (line_num, "", tipo, descripcion), 'error'
+
+    def _ajustar_items(self):
+        necesarios = self.visibles + self.SOBREBARRIDO
+        contar('inserciones_widget', max(0, necesarios - len(self.items)))
+        while len(self.items) < necesarios:
+            self.items.append(self.tree.insert('', tk.END))
+        if len(self.items) > necesarios:
+            self.tree.delete(*self.items[necesarios:])
+            del self.items[necesarios:]
+
+    @etapa('tabla', 'tabla')
+    def refrescar(self):
+        # Reutiliza los mismos ítems: solo cambian sus valores
+        total = len(self)
+        self.primera = max(0, min(self.primera, total - self.visibles))
+        mostradas = 0
+        for (valores, tag), item in zip(self.filas(self.primera, len(self.items)), self.items):
+            self.tree.item(item, values=valores, tags=(tag,))
+            self.tree.move(item, '', mostradas)
+            mostradas += 1
+        contar('inserciones_widget', mostradas)
+        if mostradas < len(self.items):
+            self.tree.detach(*self.items[mostradas:])
+        self.tree.yview_moveto(0)
+        if total:
+            self.scrollbar.set(self.primera / total, min(1.0, (self.primera + self.visibles) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def desplazar(self, filas):
+        self.primera += filas
+        self.refrescar()
+        return 'break'
+
+    def yview(self, accion, cantidad, unidad=None):
+        if accion == 'moveto':
+            self.primera = int(float(cantidad) * len(self))
+        elif unidad == 'pages':
+            self.primera += int(cantidad) * self.visibles
+        else:
+            self.primera += int(cantidad)
+        self.refrescar()
+
+    def on_mousewheel(self, event):
+        return self.desplazar(-3 if event.delta > 0 else 3)
+
+    def on_configure(self, event):
+        visibles = max(1, event.height // self.alto_fila - 1)
+        if visibles != self.visibles:
+            self.visibles = visibles
+            self._ajustar_items()
+            self.refrescar()
+
+
+class ArbolVirtual:
+    # Vista perezosa del árbol sintáctico: cada nodo con hijos se inserta con
+    # un hijo provisional y sus hijos reales se insertan al abrirlo
+    # (<<TreeviewOpen>>), de a una página; el último ítem de un nodo ancho
+    # carga la página siguiente al seleccionarlo. Solo se guarda estado para
+    # los ítems con hijos, de modo que la memoria crece con lo que se expande.
+    TAMANO_PAGINA = 1000
+    PROVISIONAL = "…"
+
+    def __init__(self, treeview, tamano_pagina=TAMANO_PAGINA):
+        self.treeview = treeview
+        self.tamano_pagina = tamano_pagina
+        self.nodos = {}       # ítem -> nodo con hijos
+        self.cargados = {}    # ítem -> ítems de los hijos ya insertados, en orden
+        self.item_mas = {}    # ítem -> su ítem "Mostrar los siguientes..."
+        self.padre_mas = {}   # ítem "Mostrar los siguientes..." -> ítem padre
+        treeview.bind('<<TreeviewOpen>>', self.on_open)
+        treeview.bind('<<TreeviewSelect>>', self.on_select)
+
+    def limpiar(self):
+        self.treeview.delete(*self.treeview.get_children())
+        self.nodos = {}
+        self.cargados = {}
+        self.item_mas = {}
+        self.padre_mas = {}
+
+    @etapa('arbol', 'árbol')
+    def mostrar(self, nodo):
+        self.limpiar()
+        item = self._insertar(nodo, "", 'end')
+        # La raíz se recuerda aunque esté vacía: las ediciones pueden darle hijos
+        self.nodos[item] = nodo
+        return item
+
+    @staticmethod
+    def _texto(nodo):
+        return f"{nodo.tipo}: {nodo.valor}" if nodo.valor else nodo.tipo
+
+    def _insertar(self, nodo, padre, posicion):
+        item = self.treeview.insert(padre, posicion, text=self._texto(nodo))
+        contar('inserciones_widget')
+        if nodo.tiene_hijos():
+            self.nodos[item] = nodo
+            self.treeview.insert(item, 'end', text=self.PROVISIONAL)
+            contar('inserciones_widget')
+        return item
+
+    def _eliminar(self, item):
+        self.nodos.pop(item, None)
+        self.cargados.pop(item, None)
+        mas = self.item_mas.pop(item, None)
+        if mas is not None:
+            del self.padre_mas[mas]
+        self.treeview.delete(item)
+
+    def on_open(self, event=None):
+        self.abrir(self.treeview.focus())
+
+    def on_select(self, event=None):
+        seleccion = self.treeview.selection()
+        if len(seleccion) == 1 and seleccion[0] in self.padre_mas:
+            padre = self.padre_mas[seleccion[0]]
+            primero = len(self.cargados[padre])
+            self._cargar_pagina(padre)
+            items = self.cargados[padre]
+            if primero < len(items):
+                self.treeview.selection_set(items[primero])
+                self.treeview.see(items[primero])
+
+    def abrir(self, item):
+        if item in self.cargados or item not in self.nodos:
+            return
+        self.treeview.delete(*self.treeview.get_children(item))
+        self.cargados[item] = []
+        self._cargar_pagina(item)
+
+    def _cargar_pagina(self, item):
+        items = self.cargados[item]
+        desde = len(items)
+        for hijo in self.nodos[item].hijos[desde:desde + self.tamano_pagina]:
+            # Antes del ítem "Mostrar los siguientes...", que queda al final
+            items.append(self._insertar(hijo, item, len(items)))
+        self._actualizar_mas(item)
+
+    def _actualizar_mas(self, item):
+        restantes = len(self.nodos[item].hijos) - len(self.cargados[item])
+        mas = self.item_mas.get(item)
+        if restantes <= 0:
+            if mas is not None:
+                del self.padre_mas[self.item_mas.pop(item)]
+                self.treeview.delete(mas)
+            return
+        texto = f"⋯ Mostrar los siguientes {min(restantes, self.tamano_pagina)} (quedan {restantes})"
+        if mas is None:
+            mas = self.treeview.insert(item, 'end', text=texto)
+            self.item_mas[item] = mas
+            self.padre_mas[mas] = item
+        else:
+            self.treeview.item(mas, text=texto)
+
+    def reemplazar_hijos(self, item, desde, hasta, nuevos):
+        # Los hijos [desde, hasta) del nodo ya fueron reemplazados por nuevos;
+        # se parchean solo los ítems insertados, que son siempre un prefijo
+        nodo = self.nodos.get(item)
+        items = self.cargados.get(item)
+        if items is None:
+            # Sin abrir: solo hay que mantener el hijo provisional al día
+            provisional = self.treeview.get_children(item)
+            if nodo.tiene_hijos() and not provisional:
+                self.treeview.insert(item, 'end', text=self.PROVISIONAL)
+            elif provisional and not nodo.tiene_hijos():
+                self.treeview.delete(*provisional)
+            return
+        cargados = len(items)
+        if desde < cargados:
+            fin = min(hasta, cargados)
+            for viejo in items[desde:fin]:
+                self._eliminar(viejo)
+            items[desde:fin] = [
+                self._insertar(hijo, item, desde + k) for k, hijo in enumerate(nuevos)
+            ]
+        self._actualizar_mas(item)
+
+
+class ResaltadoSintaxis:
+    # Resaltado del editor con etiquetas de Tk tomadas de los tokens del
+    # lexer. El resaltador lleva su propio documento incremental (con la
+    # caché de líneas compartida), así que una edición solo vuelve a lexear
+    # las líneas que cambian o cambian de estado. Se etiqueta solo la zona
+    # visible más un margen y solo las líneas que no están al día; las
+    # etiquetas se agregan con una llamada por tipo para todas las líneas.
+    #
+    # Las etiquetas viven en el texto del widget, de modo que se pierden si
+    # se borra y se vuelve a escribir un texto idéntico (deshacer, pegar
+    # encima) sin que el documento vea cambios. Por eso las inserciones y
+    # los borrados pasan por un intermediario del comando del widget (como
+    # el WidgetRedirector de IDLE) que marca sus líneas como pendientes y
+    # acumula el tramo editado; el resaltado solo pide al widget ese tramo.
+    # El intermediario es un procedimiento Tcl: las demás operaciones van
+    # directo al comando original y sus errores llegan tal cual a quien
+    # llamó (tk_textCopy sin selección, por ejemplo, los atrapa con catch).
+    RETARDO_MS = 80
+    MARGEN = 40
+
+    def __init__(self, text, cache=None):
+        self.text = text
+        self.documento = DocumentoIncremental(cache=cache)
+        # Una entrada por línea: 1 si sus etiquetas están al día
+        self.marcadas = bytearray()
+        # Líneas (inicio, fin_viejo, fin_nuevo) editadas desde el último
+        # resaltado, como las devuelve DocumentoIncremental.actualizar; con
+        # resincronizar se relee el texto entero
+        self.cambio = None
+        self.resincronizar = True
+        self._edicion = None
+        self.pendiente = None
+        self.etiquetas = {}
+        for tipo, color in ModernTheme.SYNTAX_COLORS.items():
+            etiqueta = 'sintaxis_' + tipo
+            opciones = {'foreground': color}
+            if tipo in ModernTheme.ITALIC_SYNTAX:
+                opciones['font'] = ModernTheme.CODE_FONT + ('italic',)
+            text.tag_configure(etiqueta, **opciones)
+            self.etiquetas[tipo] = etiqueta
+        # La selección se dibuja por encima del resaltado
+        text.tag_raise('sel')
+        self._original = text._w + '_orig'
+        text.tk.call('rename', text._w, self._original)
+        preparar = text.register(self._preparar_edicion)
+        confirmar = text.register(self._confirmar_edicion)
+        # Si el comando original falla, el error sale del procedimiento sin
+        # confirmar la edición
+        text.tk.call('proc', text._w, 'args', (
+            'if {[lindex $args 0] ni {insert delete replace}} {\n'
+            f'    return [{self._original} {{*}}$args]\n'
+            '}\n'
+            f'{preparar} {{*}}$args\n'
+            f'set resultado [{self._original} {{*}}$args]\n'
+            f'{confirmar}\n'
+            'return $resultado'))
+
+    def _llamar(self, *args):
+        return self.text.tk.call(self._original, *args)
+
+    def _linea(self, indice):
+        return int(str(self._llamar('index', indice)).split('.')[0])
+
+    def _preparar_edicion(self, operacion, *args):
+        # Antes de editar: (líneas del texto, primera línea tocada, última
+        # línea tocada, líneas que quedan en su lugar), o None si los
+        # índices no se pueden resolver
+        self._edicion = None
+        try:
+            total = self._linea('end-1c')
+            if operacion == 'insert':
+                primera = ultima = min(self._linea(args[0]), total)
+                textos = args[1::2]
+            else:
+                indices = list(args[:2] if operacion == 'replace' else args)
+                if operacion == 'delete' and len(indices) % 2:
+                    # Sin índice final se borra un carácter, quizá un salto
+                    indices.append(indices[-1] + '+1c')
+                lineas = [min(self._linea(indice), total) for indice in indices]
+                primera, ultima = min(lineas), max(lineas)
+                textos = args[2::2] if operacion == 'replace' else ()
+        except tk.TclError:
+            return
+        # Las líneas [primera, ultima] quedan en una sola más los saltos insertados
+        saltos = sum(str(texto).count('\n') for texto in textos)
+        self._edicion = (total, primera - 1, ultima, saltos + 1)
+
+    def _confirmar_edicion(self):
+        edicion, self._edicion = self._edicion, None
+        total = self._linea('end-1c')
+        if edicion is not None:
+            antes, inicio, fin, nuevas = edicion
+            if len(self.marcadas) == antes and total == antes - (fin - inicio) + nuevas:
+                self.marcadas[inicio:fin] = bytes(nuevas)
+                self._acumular(inicio, fin, nuevas)
+                return
+        # Desfasadas (el texto cambió sin pasar por aquí o la edición no
+        # dejó las líneas previstas): todo pendiente
+        self.marcadas = bytearray(total)
+        self.cambio = None
+        self.resincronizar = True
+
+    def _acumular(self, inicio, fin, nuevas):
+        # Une la edición (líneas actuales [inicio, fin) -> nuevas líneas) al
+        # tramo ya editado desde el último resaltado
+        diferencia = nuevas - (fin - inicio)
+        if self.cambio is None:
+            self.cambio = (inicio, fin, fin + diferencia)
+            return
+        desde, fin_viejo, fin_nuevo = self.cambio
+        hasta = max(fin_nuevo, fin)
+        self.cambio = (min(desde, inicio), hasta - (fin_nuevo - fin_viejo), hasta + diferencia)
+
+    def programar(self):
+        if self.pendiente is not None:
+            self.text.after_cancel(self.pendiente)
+        self.pendiente = self.text.after(self.RETARDO_MS, self.resaltar)
+
+    def on_scroll(self, primero, ultimo):
+        # yscrollcommand: mueve la barra y resalta lo que entra a la vista
+        self.text.vbar.set(primero, ultimo)
+        self.programar()
+
+    @etapa('resaltado', 'resaltado')
+    def resaltar(self):
+        self.pendiente = None
+        documento = self.documento
+        cambio, self.cambio = self.cambio, None
+        inicio = fin_nuevo = 0
+        if self.resincronizar:
+            self.resincronizar = False
+            inicio, _, fin_nuevo = documento.actualizar(str(self._llamar('get', '1.0', 'end-1c')))
+        elif cambio is not None:
+            # Solo el tramo editado; lo demás ya está en el documento
+            desde, fin_viejo, hasta = cambio
+            texto = str(self._llamar('get', f'{desde + 1}.0', f'{hasta}.end'))
+            inicio, _, fin_nuevo = documento.reemplazar(desde, fin_viejo, texto.split('\n'))
+        total = len(documento.lineas)
+        if len(self.marcadas) != total:
+            self.marcadas = bytearray(total)
+        else:
+            # Líneas relexeadas, incluidas las que cambiaron solo de estado
+            self.marcadas[inicio:fin_nuevo] = bytes(fin_nuevo - inicio)
+
+        primera = self._linea('@0,0')
+        ultima = self._linea(f'@0,{self.text.winfo_height()}')
+        desde = max(primera - self.MARGEN, 1)
+        hasta = min(ultima + self.MARGEN, total)
+
+        marcadas = self.marcadas
+        rangos = {etiqueta: [] for etiqueta in self.etiquetas.values()}
+        tramos = []
+        for numero in range(desde, hasta + 1):
+            if marcadas[numero - 1]:
+                continue
+            marcadas[numero - 1] = 1
+            if tramos and tramos[-1][1] == numero - 1:
+                tramos[-1][1] = numero
+            else:
+                tramos.append([numero, numero])
+            for tipo, texto, columna in expandir_linea(documento.registros[numero - 1], documento.lineas[numero - 1]):
+                etiqueta = self.etiquetas.get(tipo)
+                if etiqueta is not None:
+                    rangos[etiqueta].append(f'{numero}.{columna}')
+                    rangos[etiqueta].append(f'{numero}.{columna + len(texto)}')
+        if not tramos:
+            return
+        for etiqueta, indices in rangos.items():
+            for primera, ultima in tramos:
+                self._llamar('tag', 'remove', etiqueta, f'{primera}.0', f'{ultima + 1}.0')
+            if indices:
+                self._llamar('tag', 'add', etiqueta, *indices)
+        contar('lineas_resaltadas', sum(ultima - primera + 1 for primera, ultima in tramos))
 
-    def agregar_hijo(self, nodo_hijo):
-        self.hijos.append(nodo_hijo)
 
 class AnalizadorLexicoGUI:
     def __init__(self, root):
@@ -59,6 +535,7 @@ class AnalizadorLexicoGUI:
         self.tree_scroll = ttk.Scrollbar(self.tree_frame, orient=tk.VERTICAL, command=self.treeview.yview)
         self.treeview.configure(yscroll=self.tree_scroll.set)
         self.tree_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.arbol_vista = ArbolVirtual(self.treeview)
 
         
         # Configurar el estilo
@@ -67,6 +544,37 @@ class AnalizadorLexicoGUI:
         self.current_example = 0
         self.rust_examples = self.load_rust_examples()
         self.initialize_token_dictionaries()
+
+        # Estado del análisis incremental: caché de tokens por línea, filas de
+        # cada línea en la tabla y primera línea editada desde que se armó el
+        # árbol sintáctico
+        self.documento = DocumentoIncremental()
+        self.modo_incremental = False
+        self.arbol_sintactico = NodoArbol("Programa", "Arbol Sintáctico")
+        self.linea_editada = None
+        self.item_raiz = None
+        self.actualizacion_pendiente = None
+        self.errores_pendientes = None
+        # Diagnósticos por segmento del texto editado; se crea con el primer
+        # refresco y solo lo toca el hilo trabajador
+        self.segmentado = None
+
+        # Análisis en segundo plano
+        self.trabajador = TrabajadorAnalisis()
+        self.ejecucion = None
+        self.refresco = None
+        # Resultados ya analizados, en disco (None si ANALIZADOR_CACHE=0)
+        self.cache_disco = CacheAnalisis.desde_entorno()
+        # (código, Programa) compilado por print_analysis_results y la
+        # ejecución del programa en curso en el trabajador
+        self.programa = None
+        self.ejecucion_programa = None
+        # Métricas de la última ejecución; el perfil se puede pedir también
+        # con la variable de entorno ANALIZADOR_PERFIL
+        self.metricas = None
+        self.perfil_var = tk.BooleanVar(value=any(perfil_desde_entorno()))
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
         self.create_widgets()
         self.setup_grid_weights()
         
@@ -106,35 +614,18 @@ class AnalizadorLexicoGUI:
         self.root.grid_columnconfigure(0, weight=1)
 
     def load_rust_examples(self):
+        # Corpus indexado junto al módulo: los ejemplos se leen al mostrarlos
         try:
-            with open('rust_examples.txt', 'r') as file:
-                content = file.read()
-                examples = content.split('# Ejemplo')[1:]
-                cleaned_examples = []
-                for example in examples:
-                    example_lines = example.split('\n', 1)[1]
-                    cleaned_examples.append(example_lines.strip())
-                return cleaned_examples
+            ejemplos = CorpusEjemplos(ARCHIVO_EJEMPLOS)
         except FileNotFoundError:
             messagebox.showerror("Error", "No se encontró el archivo rust_examples.txt")
             return ["// No se encontraron ejemplos"]
+        if not len(ejemplos):
+            return ["// No se encontraron ejemplos"]
+        return ejemplos
 
     def initialize_token_dictionaries(self):
-        self.rust_keywords = {
-            'fn': 'Función',
-            'let': 'Declaración de variable',
-            'mut': 'Mutable',
-            'struct': 'Estructura',
-            'impl': 'Implementación',
-            'for': 'Bucle for',
-            'if': 'Condicional if',
-            'else': 'Condicional else',
-            'return': 'Retorno',
-            'self': 'Referencia al objeto actual',
-            'Vec': 'Vector',
-            'new': 'Crear nueva instancia',
-            'push': 'Agregar elemento'
-        }
+        self.rust_keywords = RUST_KEYWORDS
 
     def create_widgets(self):
         # Frame principal con padding y bordes redondeados
@@ -171,6 +662,28 @@ class AnalizadorLexicoGUI:
             borderwidth=0
         )
         self.code_text.grid(row=0, column=0, sticky="ew")
+        self.code_text.bind('<<Modified>>', self.on_code_modified)
+        self.resaltado = ResaltadoSintaxis(self.code_text, cache=self.documento.cache)
+        self.code_text.configure(yscrollcommand=self.resaltado.on_scroll)
+
+        # Salida de println! del programa, aparte del editor: no es código
+        # y ninguna pasada del análisis la lee
+        output_label = ttk.Label(code_frame, text="Salida del programa", font=ModernTheme.NORMAL_FONT)
+        output_label.grid(row=1, column=0, sticky="w", pady=(10, 5))
+        self.output_text = scrolledtext.ScrolledText(
+            code_frame,
+            width=80,
+            height=5,
+            font=ModernTheme.CODE_FONT,
+            bg=ModernTheme.CODE_BG_COLOR,
+            fg=ModernTheme.CODE_FG_COLOR,
+            pady=10,
+            padx=10,
+            relief="flat",
+            borderwidth=0,
+            state=tk.DISABLED
+        )
+        self.output_text.grid(row=2, column=0, sticky="ew")
 
         # Frame para botones con mejor espaciado
         button_frame = ttk.Frame(main_frame, style='Modern.TFrame')
@@ -201,6 +714,37 @@ class AnalizadorLexicoGUI:
         )
         next_button.grid(row=0, column=2, padx=15)
 
+        find_button = ttk.Button(
+            button_frame,
+            text="🔎 Buscar Ejemplo",
+            style='Modern.TButton',
+            command=self.find_example
+        )
+        find_button.grid(row=0, column=3, padx=15)
+
+        cancel_button = ttk.Button(
+            button_frame,
+            text="⏹️ Cancelar Análisis",
+            style='Modern.TButton',
+            command=self.cancel_analysis
+        )
+        cancel_button.grid(row=0, column=4, padx=15)
+
+        metrics_button = ttk.Button(
+            button_frame,
+            text="📊 Exportar Métricas",
+            style='Modern.TButton',
+            command=self.export_metrics
+        )
+        metrics_button.grid(row=0, column=5, padx=15)
+
+        profile_check = ttk.Checkbutton(
+            button_frame,
+            text="🔬 Perfilar",
+            variable=self.perfil_var
+        )
+        profile_check.grid(row=0, column=6, padx=15)
+
         # Frame para la tabla de resultados con mejor diseño
         results_frame = ttk.LabelFrame(
             main_frame,
@@ -240,9 +784,11 @@ class AnalizadorLexicoGUI:
         # Scrollbars modernos
          
         
-        y_scrollbar = ttk.Scrollbar(table_container, orient="vertical", command=self.tree.yview)
+        # El desplazamiento vertical lo controla la tabla virtual
+        y_scrollbar = ttk.Scrollbar(table_container, orient="vertical")
         x_scrollbar = ttk.Scrollbar(table_container, orient="horizontal", command=self.tree.xview)
-        self.tree.configure(yscrollcommand=y_scrollbar.set, xscrollcommand=x_scrollbar.set)
+        self.tree.configure(xscrollcommand=x_scrollbar.set)
+        self.tabla = TablaVirtual(self.tree, y_scrollbar, self.rust_keywords)
 
         # Organizar tabla y scrollbars
         self.tree.grid(row=0, column=0, sticky="nsew")
@@ -264,41 +810,75 @@ class AnalizadorLexicoGUI:
         self.load_example()
 
     def clear_analysis(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        self.cancel_analysis()
+        self.tabla.limpiar()
+        self.modo_incremental = False
+        self.linea_editada = None
+        self.item_raiz = None
+        for pendiente in (self.actualizacion_pendiente, self.errores_pendientes):
+            if pendiente is not None:
+                self.root.after_cancel(pendiente)
+        self.actualizacion_pendiente = None
+        self.errores_pendientes = None
+        self.trabajador.cancelar_refresco()
+        self.refresco = None
+        self.segmentado = None
+        self._escribir_salida("")
         self.status_var.set("Análisis limpiado")
         messagebox.showinfo("Limpieza", "Análisis limpiado exitosamente")
 
+    def cancel_analysis(self):
+        if self.trabajador.ejecutando_programa:
+            self.trabajador.cancelar_programa()
+            self.ejecucion_programa = None
+            self.status_var.set("⏹️ Ejecución cancelada")
+        if self.trabajador.activo:
+            self.trabajador.cancelar()
+            self.ejecucion = None
+            self.metricas.terminar()
+            self.status_var.set("⏹️ Análisis cancelado")
+
+    def on_close(self):
+        self.trabajador.cerrar()
+        self.root.destroy()
+
     def next_example(self):
-        self.current_example = (self.current_example + 1) % len(self.rust_examples)
+        self.show_example((self.current_example + 1) % len(self.rust_examples))
+
+    def show_example(self, indice):
+        self.cancel_analysis()
+        self.current_example = indice
         self.load_example()
         self.clear_analysis()
         self.status_var.set(f"Ejemplo {self.current_example + 1} cargado")
 
+    def find_example(self):
+        # Un número salta a ese ejemplo; otro texto busca en los títulos a
+        # partir del siguiente al actual
+        texto = simpledialog.askstring(
+            "Buscar ejemplo", "Número de ejemplo o parte del título:", parent=self.root)
+        if not texto or not texto.strip():
+            return
+        texto = texto.strip()
+        total = len(self.rust_examples)
+        if texto.isdigit():
+            indice = int(texto) - 1
+            if not 0 <= indice < total:
+                messagebox.showinfo("Buscar ejemplo", f"Hay {total} ejemplos")
+                return
+        else:
+            indice = None
+            if isinstance(self.rust_examples, CorpusEjemplos):
+                indice = self.rust_examples.buscar(texto, self.current_example + 1)
+            if indice is None:
+                messagebox.showinfo("Buscar ejemplo", f"Ningún título contiene «{texto}»")
+                return
+        self.show_example(indice)
+
     def load_example(self):
         self.code_text.delete(1.0, tk.END)
         self.code_text.insert(tk.END, self.rust_examples[self.current_example])
 
-    def tokenize_line(self, line):
-        # Expresión regular mejorada para capturar más tipos de tokens
-        token_pattern = r'\b\w+\b|[+\-*/=<>!&|^~%]+|[{}()\[\];,.]+'
-        tokens = re.findall(token_pattern, line)
-        return tokens
-
-    def analyze_token(self, token):
-        if token in self.rust_keywords:
-            return "Palabra clave", self.rust_keywords[token]
-        elif token.isdigit():
-            return "Número", "Valor numérico literal"
-        elif re.match(r'^[a-zA-Z_]\w*$', token):
-            return "Identificador", "Nombre de variable o función"
-        elif re.match(r'[+\-*/=<>!&|^~%]+', token):
-            return "Operador", "Operador aritmético o lógico"
-        elif re.match(r'[{}()\[\];,.]', token):
-            return "Delimitador", "Símbolo de agrupación o separación"
-        else:
-            return "Otro", "Símbolo del lenguaje"
-
     def on_hover(self, event):
         item = self.tree.identify_row(event.y)
         if item:
@@ -306,176 +886,306 @@ class AnalizadorLexicoGUI:
             self.tree.tk.call(self.tree, "tag", "add", "hover", item)
 
     
-    def detect_semantic_errors(self, code):
-        errors = []
-        lines = code.split('\n')
-        declared_variables = set()
-        for line_num, line in enumerate(lines, 1):
-            # Detectar declaración de variables
-            if match := re.search(r'\blet\b\s+mut\s+(\w+)', line):
-                variable_name = match.group(1)
-                if variable_name in declared_variables:
-                    errors.append((line_num, "Error semántico", f"Variable '{variable_name}' ya declarada"))
-                else:
-                    declared_variables.add(variable_name)
-            
-            # Detectar uso de variables no declaradas
-            tokens = self.tokenize_line(line)
-            for token in tokens:
-                if re.match(r'^[a-zA-Z_]\w*$', token) and token not in declared_variables and token not in self.rust_keywords and token != "main" and token != "i32" and token != "println":
-                    errors.append((line_num, "Error semántico", f"Variable '{token}' no declarada"))
-
-        return errors
+    def detect_semantic_errors(self, code, tokens=None, elementos=None):
+        # elementos: los de nivel superior del árbol sintáctico ya armado,
+        # para las verificaciones que necesitan el árbol
+        return detectar_errores_semanticos(code, self.rust_keywords, tokens, elementos)
                 
             
-    def detect_errors(self, code):
-        errors = []
-        lines = code.split('\n')
-        for line_num, line in enumerate(lines, 1):
-            # Ejemplo de condiciones para detectar errores
-            if re.search(r'\bfn\b\s+\w+\s*\(', line) and not re.search(r'\)', line):
-                errors.append((line_num, "Error de sintaxis", "Falta el paréntesis de cierre en la declaración de la función"))
-            elif re.search(r'\blet\b\s+\w+\s*=', line) and not re.search(r';\s*$', line.strip()):
-                errors.append((line_num, "Error de sintaxis", "Falta el punto y coma al final de la declaración de la variable"))
-            elif re.search(r'\bif\b\s*\(.*\)', line) and not re.search(r'\{', line):
-                errors.append((line_num, "Error de sintaxis", "Falta la llave de apertura en la declaración del condicional if"))
-            elif re.search(r'\belse\b', line) and not re.search(r'\{', line):
-                errors.append((line_num, "Error de sintaxis", "Falta la llave de apertura en la declaración del condicional else"))
-            elif re.search(r'\bfor\b\s+\w+\s+in\s+.*\{', line) and not re.search(r'\}', line):
-                errors.append((line_num, "Error de sintaxis", "Falta la llave de cierre en la declaración del bucle for"))
-            elif re.search(r'\bwhile\b\s*\(.*\)\s*\{', line) and not re.search(r'\}', line):
-                errors.append((line_num, "Error de sintaxis", "Falta la llave de cierre en la declaración del bucle while"))
-            elif re.search(r'\breturn\b\s+.*', line) and not re.search(r';\s*$', line.strip()):
-                errors.append((line_num, "Error de sintaxis", "Falta el punto y coma al final de la declaración de retorno"))
-            elif re.search(r'\bstruct\b\s+\w+\s*\{', line) and not re.search(r'\}', line):
-                errors.append((line_num, "Error de sintaxis", "Falta la llave de cierre en la declaración de la estructura"))
-            elif re.search(r'\bimpl\b\s+\w+\s*\{', line) and not re.search(r'\}', line):
-                errors.append((line_num, "Error de sintaxis", "Falta la llave de cierre en la implementación"))
-            elif re.search(r'\bmatch\b\s*\(.*\)', line) and not re.search(r'\{', line):
-                errors.append((line_num, "Error de sintaxis", "Falta la llave de apertura en la declaración de match"))
-            elif re.search(r'\bloop\b\s*\{', line) and not re.search(r'\}', line):
-                errors.append((line_num, "Error de sintaxis", "Falta la llave de cierre en la declaración de loop"))
-            elif re.search(r'\bmod\b\s+\w+\s*;', line) and not re.search(r';', line):
-                errors.append((line_num, "Error de sintaxis", "Falta el punto y coma al final de la declaración del módulo"))
-        # Check for unbalanced parentheses and braces
-        open_parentheses = 0
-        open_braces = 0
-        for line_num, line in enumerate(lines, 1):
-            open_parentheses += line.count('(') - line.count(')')
-            open_braces += line.count('{') - line.count('}')
-            if open_parentheses < 0:
-                errors.append((line_num, "Error de sintaxis", "Paréntesis de cierre sin paréntesis de apertura"))
-                open_parentheses = 0
-            if open_braces < 0:
-                errors.append((line_num, "Error de sintaxis", "Llave de cierre sin llave de apertura"))
-                open_braces = 0
-        if open_parentheses > 0:
-            errors.append((line_num, "Error de sintaxis", "Paréntesis de apertura sin paréntesis de cierre"))
-        if open_braces > 0:
-            errors.append((line_num, "Error de sintaxis", "Llave de apertura sin llave de cierre"))
-
-        # Check for missing semicolons
-        for line_num, line in enumerate(lines, 1):
-            if not re.search(r'\b(fn|struct|impl|if|else|for|while|loop|match)\b', line) and line.strip() and not line.strip().endswith(';') and not line.strip().endswith('{') and not line.strip().endswith('}'):
-                errors.append((line_num, "Error de sintaxis", "Falta el punto y coma al final de la línea"))
-
-        return errors
+    def detect_errors(self, code, tokens=None):
+        # Verificación de una sola pasada sobre el flujo de tokens
+        if tokens is None:
+            tokens = tokenizar(code, incluir_comentarios=False)
+        return detectar_errores(tokens)
 
     def analyze_code(self):
         self.clear_analysis()
         code = self.code_text.get(1.0, tk.END)
-        self.arbol_sintactico = NodoArbol("Programa", "Arbol Sintáctico")
-                
+        perfilar = self.perfil_var.get()
+        self.metricas = Metricas.desde_entorno(perfilar, perfilar).iniciar()
+        # Un texto ya analizado se muestra desde la caché en disco sin lexear
+        # ni verificar de nuevo
+        guardado = None
+        if self.cache_disco is not None:
+            guardado = self.cache_disco.leer_documento(code, self.documento.cache, self.rust_keywords)
+        if guardado is not None:
+            documento, conteos, errors, semantic_errors = guardado
+            contar('tokens', sum(conteos))
+            self.tabla.agregar_lineas(documento, conteos)
+            # La caché ya trae los errores que salen del árbol; el árbol mismo
+            # se arma recién cuando hay que mostrarlo
+            self._completar_analisis(documento, None, errors, semantic_errors)
+            return
+        # El trabajador usa su propio documento con la caché ya caliente y lo
+        # entrega al terminar; mientras tanto las filas llegan por lotes
+        self.ejecucion = self.trabajador.iniciar(
+            code, self.documento.cache, self._poblar_linea, self.detect_semantic_errors, self.metricas,
+            self.cache_disco)
+        self.status_var.set("⏳ Analizando...")
+        self.root.after(50, self._drenar_cola, self.ejecucion)
+
+    def _drenar_cola(self, ejecucion):
+        if ejecucion is not self.ejecucion:
+            return
+        limite = time.perf_counter() + 0.03
+        while time.perf_counter() < limite:
+            try:
+                mensaje = ejecucion.cola.get_nowait()
+            except queue.Empty:
+                break
+            tipo = mensaje[0]
+            if tipo == 'progreso':
+                self._mostrar_progreso(*mensaje[1:])
+            elif tipo == 'lineas':
+                _, documento, conteos, porcentaje, tokens, segundos = mensaje
+                self.tabla.agregar_lineas(documento, conteos)
+                self._mostrar_progreso(porcentaje, tokens, segundos)
+            elif tipo == 'fin':
+                _, documento, elementos, errors, semantic_errors, tokens, segundos = mensaje
+                self.ejecucion = None
+                self._completar_analisis(documento, elementos, errors, semantic_errors)
+                return
+            elif tipo == 'cancelado':
+                self.ejecucion = None
+                self.metricas.terminar()
+                self.status_var.set("⏹️ Análisis cancelado")
+                return
+            else:
+                self.ejecucion = None
+                self.metricas.terminar()
+                self.status_var.set("❌ Error durante el análisis")
+                messagebox.showerror("Error", f"❌ Error durante el análisis: {str(mensaje[1])}")
+                return
+        self.root.after(50, self._drenar_cola, ejecucion)
+
+    def _completar_analisis(self, documento, elementos, errors, semantic_errors):
+        self.metricas.marcar_fin()
+        self.documento = documento
+        self.arbol_sintactico = (NodoArbol("Programa", "Arbol Sintáctico", None, elementos)
+                                 if elementos is not None else None)
+        self.tabla.establecer_errores(errors + semantic_errors)
+        self._finalizar_analisis(errors, semantic_errors)
+        self.modo_incremental = True
+        self._mostrar_metricas()
+
+    def _mostrar_progreso(self, porcentaje, tokens, segundos):
+        velocidad = tokens / segundos if segundos > 0 else 0
+        self.status_var.set(f"⏳ Analizando... {porcentaje:.0f}% · {velocidad:,.0f} tokens/s")
+
+    def _finalizar_analisis(self, errors, semantic_errors):
         try:
-            for i, (line_num, line) in enumerate(enumerate(code.split('\n'), 1)):
-                if line.strip():
-                    tokens = self.tokenize_line(line)
-                    nodo_linea = NodoArbol("Línea", f"Línea {line_num}")
-                    self.arbol_sintactico.agregar_hijo(nodo_linea)
-                    for token in tokens:
-                        tipo, descripcion = self.analyze_token(token)
-                        nodo_token = NodoArbol(tipo, token)
-                        nodo_linea.agregar_hijo(nodo_token)
-                        tag = 'evenrow' if i % 2 == 0 else 'oddrow'
-                        self.tree.insert('', tk.END, values=(line_num, token, tipo, descripcion), tags=(tag,))
-                    
-            syntax_errors = self.detect_errors(code)
-            for error in syntax_errors:
-                line_num, tipo, descripcion = error
-                self.tree.insert('', tk.END, values=(line_num, "", tipo, descripcion), tags=('error',))
-            
-            semantic_errors = self.detect_semantic_errors(code)
-            errors = self.detect_errors(code)
-            for error in semantic_errors:
-                line_num, tipo, descripcion = error
-                self.tree.insert('', tk.END, values=(line_num, "", tipo, descripcion), tags=('error',))
-            for error in errors:
-                line_num, tipo, descripcion = error
-                self.tree.insert('', tk.END, values=(line_num, "", tipo, descripcion), tags=('error',))
-                    
-            if errors:
+            # Los avisos de límite no son errores del código, pero el árbol
+            # queda incompleto y el programa no se ejecuta
+            if any(tipo != AVISO_LIMITE for _, tipo, _ in errors):
                 self.status_var.set("⚠️ Análisis completado con errores")
-                error_messages = "\n".join([f"Línea {line_num}: {descripcion}" for line_num, _, descripcion in errors])
+                with etapa('mensajes', 'mensajes'):
+                    error_messages = "\n".join([f"Línea {line_num}: {descripcion}" for line_num, _, descripcion in errors])
                 messagebox.showwarning("Advertencia", f"El análisis léxico se ha completado con errores:\n{error_messages}")
             elif semantic_errors:
-                error_messages = "\n".join([f"Línea {line_num}: {descripcion}" for line_num, _, descripcion in semantic_errors])
+                with etapa('mensajes', 'mensajes'):
+                    error_messages = "\n".join([f"Línea {line_num}: {descripcion}" for line_num, _, descripcion in semantic_errors])
                 self.status_var.set("⚠️ Análisis completado con errores semánticos")
                 messagebox.showwarning("Advertencia", f"El análisis léxico se ha completado con errores semánticos:\n{error_messages}")
+            elif errors:
+                with etapa('mensajes', 'mensajes'):
+                    error_messages = "\n".join([f"Línea {line_num}: {descripcion}" for line_num, _, descripcion in errors])
+                self.status_var.set("⚠️ Análisis completado con avisos")
+                messagebox.showwarning("Advertencia", f"Parte del código supera los límites del análisis:\n{error_messages}")
             else:
                 self.status_var.set("✅ Análisis completado exitosamente")
                 messagebox.showinfo("Mensaje", "El análisis léxico se ha completado exitosamente")
                 self.mostrar_arbol_sintactico()
                 self.print_analysis_results()
-                
+
         except Exception as e:
             self.status_var.set("❌ Error durante el análisis")
             messagebox.showerror("Error", f"❌ Error durante el análisis: {str(e)}")
 
+    def _mostrar_metricas(self):
+        # Cierra la medición y agrega el resumen a la barra de estado
+        self.metricas.terminar()
+        self.status_var.set(f"{self.status_var.get()} · ⏱️ {self.metricas.resumen()}")
 
+    def export_metrics(self):
+        if self.metricas is None or self.metricas.segundos is None:
+            messagebox.showinfo("Métricas", "Todavía no hay métricas: analice el código primero")
+            return
+        ruta = filedialog.asksaveasfilename(
+            title="Exportar métricas",
+            defaultextension=".json",
+            filetypes=[("JSON", "*.json"), ("Todos los archivos", "*.*")]
+        )
+        if not ruta:
+            return
+        try:
+            self.metricas.exportar_json(ruta)
+        except OSError as e:
+            messagebox.showerror("Error", f"❌ No se pudieron exportar las métricas: {e}")
+            return
+        self.status_var.set(f"📊 Métricas exportadas a {os.path.basename(ruta)}")
 
+    def _poblar_linea(self, indice, documento=None):
+        # Cantidad de filas de la línea. También se llama desde el hilo
+        # trabajador.
+        if documento is None:
+            documento = self.documento
+        return len(documento.tokens_visibles(indice))
 
+    def _actualizar_arbol(self, elementos):
+        # Los elementos que terminan antes de la primera línea editada no
+        # cambiaron: se conservan con sus ítems (y lo que esté expandido) y
+        # solo se reemplazan los siguientes
+        if self.arbol_sintactico is None:
+            # Todavía sin armar (resultado de la caché), así que tampoco se mostró
+            self.linea_editada = None
+            self.arbol_sintactico = NodoArbol("Programa", "Arbol Sintáctico", None, elementos)
+            return
+        viejos = self.arbol_sintactico.hijos
+        comunes = 0
+        if self.linea_editada is not None:
+            limite = self.linea_editada + 1
+            while (comunes + 1 < len(viejos) and comunes + 1 < len(elementos)
+                   and viejos[comunes + 1].linea is not None and viejos[comunes + 1].linea <= limite
+                   and elementos[comunes].linea == viejos[comunes].linea
+                   and elementos[comunes].tipo == viejos[comunes].tipo):
+                comunes += 1
+        self.linea_editada = None
+        cantidad = len(viejos)
+        self.arbol_sintactico.hijos = viejos[:comunes] + elementos[comunes:]
+        if self.item_raiz is not None:
+            self.arbol_vista.reemplazar_hijos(self.item_raiz, comunes, cantidad, elementos[comunes:])
+
+    def on_code_modified(self, event=None):
+        # <<Modified>> solo se dispara cuando cambia la bandera; se reinicia
+        # para recibir la siguiente edición
+        if not self.code_text.edit_modified():
+            return
+        self.code_text.edit_modified(False)
+        self.resaltado.programar()
+        # Un análisis en curso ya no corresponde al texto editado
+        self.cancel_analysis()
+        if self.modo_incremental and self.actualizacion_pendiente is None:
+            self.actualizacion_pendiente = self.root.after_idle(self.reanalyze_incremental)
+
+    def reanalyze_incremental(self):
+        self.actualizacion_pendiente = None
+        if not self.modo_incremental:
+            return
+        code = self.code_text.get(1.0, tk.END)
+        inicio, fin_viejo, fin_nuevo = self.documento.actualizar(code)
+        if inicio == fin_viejo == fin_nuevo:
+            return
 
+        conteos = [self._poblar_linea(indice) for indice in range(inicio, fin_nuevo)]
+        self.tabla.reemplazar_lineas(inicio, fin_viejo, conteos)
+        if self.linea_editada is None or inicio < self.linea_editada:
+            self.linea_editada = inicio
+
+        # Los errores y el árbol se recalculan con retardo, fuera del hilo
+        # de la interfaz (refresh_errors)
+        if self.errores_pendientes is not None:
+            self.root.after_cancel(self.errores_pendientes)
+        self.errores_pendientes = self.root.after(400, self.refresh_errors)
+        self.status_var.set(f"✏️ Reanalizadas {fin_nuevo - inicio} línea(s)")
+
+    def refresh_errors(self):
+        # Los errores y el árbol se calculan en el hilo trabajador; el
+        # documento segmentado solo vuelve a verificar lo que tocó la edición
+        self.errores_pendientes = None
+        if not self.modo_incremental:
+            return
+        if self.segmentado is None:
+            self.segmentado = DocumentoSegmentado(self.rust_keywords, cache=self.documento.cache)
+        # El árbol solo se arma si se está mostrando; si no, al mostrarlo
+        self.refresco = self.trabajador.refrescar(
+            '\n'.join(self.documento.lineas), self.segmentado, self.item_raiz is not None)
+        self.root.after(50, self._drenar_refresco, self.refresco)
+
+    def _drenar_refresco(self, refresco):
+        if refresco is not self.refresco:
+            return
+        try:
+            mensaje = refresco.cola.get_nowait()
+        except queue.Empty:
+            self.root.after(50, self._drenar_refresco, refresco)
+            return
+        self.refresco = None
+        if mensaje[0] == 'cancelado':
+            return
+        if mensaje[0] == 'error':
+            self.status_var.set("❌ Error durante el análisis")
+            messagebox.showerror("Error", f"❌ Error durante el análisis: {str(mensaje[1])}")
+            return
+        _, errors, semantic_errors, elementos = mensaje
+        # Reemplaza las filas de error al final de la tabla
+        self.tabla.establecer_errores(errors + semantic_errors)
+        if elementos is not None:
+            self._actualizar_arbol(elementos)
+        else:
+            self.arbol_sintactico = None
+            self.linea_editada = None
+        if errors:
+            self.status_var.set("⚠️ Análisis completado con errores")
+        elif semantic_errors:
+            self.status_var.set("⚠️ Análisis completado con errores semánticos")
+        else:
+            self.status_var.set("✅ Análisis completado exitosamente")
 
     def print_analysis_results(self):
+        # El programa se ejecuta en el hilo trabajador y se puede cancelar;
+        # la salida vuelve por la cola (_drenar_programa)
         code = self.code_text.get(1.0, tk.END)
-        variables = {}
-        output = []
-
-        for line in code.split('\n'):
-            line = line.strip()
-            if line.startswith("let"):
-                parts = line.split()
-                var_name = parts[2].strip(':')
-                if "=" in line:
-                    value = eval(parts[-1].strip(';'), {}, variables)
-                    variables[var_name] = value
-                else:
-                    variables[var_name] = 0
-            elif "=" in line:
-                var_name, expr = line.split('=')
-                var_name = var_name.strip()
-                expr = expr.strip().strip(';')
-                variables[var_name] = eval(expr, {}, variables)
-            elif line.startswith("println!"):
-                var_name = line.split('(')[1].strip(');')
-                output.append(f"Valor de {var_name}: {variables.get(var_name, 'Variable no definida')}")
-
-        # Mostrar resultados en la interfaz
-        result_text = "\n".join(output)
-        self.code_text.insert(tk.END, f"\n\n// Resultados de println!\n{result_text}")
-
-        for result in output:
-            print(result)
+        # El programa compilado se reutiliza mientras el código no cambie
+        compilado = self.programa[1] if self.programa is not None and self.programa[0] == code else None
+        self.ejecucion_programa = self.trabajador.ejecutar_programa(code, compilado, self.metricas)
+        self.status_var.set("⏳ Ejecutando el programa...")
+        self.root.after(50, self._drenar_programa, self.ejecucion_programa, code)
 
-    def mostrar_arbol_sintactico(self):
-        self.treeview.delete(*self.treeview.get_children())
-        self._insertar_nodo_arbol(self.arbol_sintactico, "")
+    def _drenar_programa(self, ejecucion, code):
+        if ejecucion is not self.ejecucion_programa:
+            return
+        try:
+            mensaje = ejecucion.cola.get_nowait()
+        except queue.Empty:
+            self.root.after(50, self._drenar_programa, ejecucion, code)
+            return
+        self.ejecucion_programa = None
+        if mensaje[0] == 'cancelado':
+            return
+        if mensaje[0] == 'error':
+            self.status_var.set("❌ Error durante la ejecución")
+            messagebox.showerror("Error", f"❌ Error durante la ejecución: {str(mensaje[1])}")
+            return
+        _, programa, salida, error = mensaje
+        self.programa = (code, programa) if programa is not None else None
+        self.status_var.set("✅ Análisis completado exitosamente")
+        self._mostrar_salida_programa(salida, error)
 
-    def _insertar_nodo_arbol(self, nodo, parent):
-        item_id = self.treeview.insert(parent, 'end', text=f"{nodo.tipo}: {nodo.valor}")
-        for hijo in nodo.hijos:
-            self._insertar_nodo_arbol(hijo, item_id)
-    
+    def _mostrar_salida_programa(self, salida, error):
+        # Toda la salida va al panel de salida y se imprime de una vez
+        result_text = salida.rstrip('\n')
+        if isinstance(error, ErrorSintaxis):
+            # Todos los errores del parser, no solo el primero
+            result_text += ("\n" if result_text else "") + "\n".join(
+                f"Error en la línea {linea}: {descripcion}" for linea, _, descripcion in error.errores)
+        elif error is not None:
+            result_text += ("\n" if result_text else "") + f"Error en la línea {error.linea}: {error}"
+        self._escribir_salida(result_text)
+        if result_text:
+            print(result_text)
+
+    def _escribir_salida(self, texto):
+        self.output_text.configure(state=tk.NORMAL)
+        self.output_text.delete(1.0, tk.END)
+        self.output_text.insert(tk.END, texto)
+        self.output_text.configure(state=tk.DISABLED)
+
+    def mostrar_arbol_sintactico(self):
+        # Solo la raíz; el resto se inserta al expandir
+        if self.arbol_sintactico is None:
+            raiz, _ = construir_arbol(self.documento.iterar_tokens(incluir_comentarios=False))
+            self.arbol_sintactico = NodoArbol("Programa", "Arbol Sintáctico", None, raiz.hijos)
+        self.item_raiz = self.arbol_vista.mostrar(self.arbol_sintactico)
 
 
 
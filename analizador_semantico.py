@@ -0,0 +1,867 @@
+from motor_lexico import (
+    RUST_KEYWORDS, IDENTIFICADOR, PALABRA_CLAVE, OPERADOR, DELIMITADOR, tokenizar,
+)
+import arbol_sintactico as arbol
+from instrumentacion import etapa
+
+# Verificación semántica de una sola pasada sobre el flujo de tokens del
+# motor léxico (no vuelve a tokenizar). Lleva una pila de ámbitos, cada uno
+# con un conjunto de nombres: bloques, funciones (con sus parámetros y
+# genéricos), impl/trait, brazos de match y las ligaduras de for, if let y
+# while let. Cada identificador se interpreta según su papel: patrón (declara),
+# tipo o expresión (usa), nombre de elemento (declara) o campo y segmento de
+# ruta (se ignora).
+#
+# Los elementos (fn, struct, enum, const, use...) son visibles en todo su
+# ámbito, también antes de su declaración; por eso un nombre que no se
+# resuelve al usarlo queda pendiente y se vuelve a buscar entre los elementos
+# de cada ámbito al cerrarlo. Las variables de let solo existen a partir del
+# final de su sentencia; volver a declararlas (sombreado) es válido.
+#
+# Lo que necesita la forma de las expresiones (cantidad de argumentos de una
+# llamada, break o continue fuera de un bucle) se verifica sobre el árbol
+# sintáctico en VerificadorArbol, que recibe los elementos de nivel superior
+# a medida que el parser los termina. detectar_errores_semanticos recorre
+# primero los tokens y después los elementos; solo flujo_lexico hace las dos
+# cosas en una pasada, con el parser tirando del mismo generador de tokens.
+
+ERROR_SEMANTICO = "Error semántico"
+
+# Tipos, valores, rasgos, módulos y macros predefinidos
+INTEGRADOS = frozenset((
+    'i8', 'i16', 'i32', 'i64', 'i128', 'isize', 'u8', 'u16', 'u32', 'u64', 'u128', 'usize',
+    'f32', 'f64', 'bool', 'char', 'str', 'String', 'Vec', 'Option', 'Result', 'Box',
+    'Rc', 'Arc', 'Cell', 'RefCell', 'Mutex', 'RwLock', 'HashMap', 'HashSet', 'BTreeMap',
+    'BTreeSet', 'VecDeque', 'BinaryHeap', 'Self',
+    'Some', 'None', 'Ok', 'Err', 'true', 'false', 'drop',
+    'Clone', 'Copy', 'Debug', 'Default', 'Display', 'Eq', 'PartialEq', 'Ord', 'PartialOrd',
+    'Hash', 'Iterator', 'IntoIterator', 'DoubleEndedIterator', 'ExactSizeIterator',
+    'Extend', 'FromIterator', 'From', 'Into', 'TryFrom', 'TryInto', 'AsRef', 'AsMut',
+    'Drop', 'Fn', 'FnMut', 'FnOnce', 'Send', 'Sync', 'Sized', 'ToString', 'ToOwned',
+    'std', 'core', 'alloc',
+    'println', 'print', 'eprintln', 'eprint', 'format', 'vec', 'panic', 'assert',
+    'assert_eq', 'assert_ne', 'debug_assert', 'write', 'writeln', 'todo', 'unimplemented',
+    'unreachable', 'dbg', 'matches', 'concat', 'stringify', 'include_str', 'env', 'line', 'file',
+))
+
+# Palabras reservadas que el motor léxico entrega como identificadores
+RESERVADAS = frozenset((
+    'as', 'async', 'await', 'break', 'const', 'continue', 'crate', 'dyn', 'else', 'enum',
+    'extern', 'fn', 'for', 'if', 'impl', 'in', 'let', 'loop', 'match', 'mod', 'move', 'mut',
+    'pub', 'ref', 'return', 'self', 'Self', 'static', 'struct', 'super', 'trait', 'type',
+    'union', 'unsafe', 'use', 'where', 'while', 'macro_rules', '_',
+))
+
+ELEMENTOS = {
+    'fn': "Función", 'struct': "Tipo", 'enum': "Tipo", 'union': "Tipo", 'trait': "Tipo",
+    'type': "Tipo", 'mod': "Módulo", 'const': "Constante", 'static': "Constante",
+}
+
+# Clases de ámbito
+GLOBAL = 'global'
+BLOQUE = 'bloque'
+FUNCION = 'funcion'
+IMPL = 'impl'
+DATOS = 'datos'
+ENUM = 'enum'
+MATCH = 'match'
+BRAZO = 'brazo'
+
+# Papeles del verificador
+EXPRESION = 'expresion'
+PATRON = 'patron'
+TIPO = 'tipo'
+GENERICOS = 'genericos'
+NOMBRE = 'nombre'
+FIRMA = 'firma'
+ELEMENTO = 'elemento'
+CABECERA_IMPL = 'cabecera_impl'
+USO = 'uso'
+MACRO = 'macro'
+
+# Clases de patrón (qué introduce las ligaduras)
+LET = 'let'
+CONDICION = 'condicion'
+FOR = 'for'
+PARAMETRO = 'parametro'
+CLAUSURA = 'clausura'
+
+_MENSAJES_USO = {
+    'variable': "Variable '{}' no declarada",
+    'funcion': "Función '{}' no declarada",
+    'tipo': "Tipo '{}' no declarado",
+    'modulo': "Módulo '{}' no declarado",
+}
+
+
+def mensaje_redeclaracion(clase, nombre):
+    if clase in ("Función", "Constante"):
+        return f"{clase} '{nombre}' ya declarada"
+    return f"{clase} '{nombre}' ya declarado"
+
+
+def mensaje_argumentos(nombre, esperados, recibidos):
+    return (f"La función '{nombre}' espera {esperados} argumento{'' if esperados == 1 else 's'}"
+            f" y recibe {recibidos}")
+
+
+def unir_aridad(funciones, nombre, aridad):
+    # Funciones con el mismo nombre y distinta cantidad de parámetros (la
+    # redeclaración se informa aparte): sus llamadas no se comprueban
+    funciones[nombre] = aridad if funciones.get(nombre, aridad) == aridad else None
+
+
+class Ambito:
+    __slots__ = ('clase', 'nombres', 'elementos', 'pendientes', 'comodin',
+                 'profundidad', 'al_cerrar', 'inicio_brazo', 'cuerpo_brazo')
+
+    def __init__(self, clase):
+        self.clase = clase
+        self.nombres = set()
+        self.elementos = {}
+        self.pendientes = []
+        self.comodin = False
+        # Paréntesis y corchetes abiertos dentro del ámbito
+        self.profundidad = 0
+        # Ligaduras de let que se declaran al terminar la sentencia
+        self.al_cerrar = []
+        self.inicio_brazo = False
+        self.cuerpo_brazo = False
+
+
+class VerificadorSemantico:
+    # Recibe los tokens de uno en uno (procesar) y devuelve los errores al
+    # terminar; cada token se examina con el siguiente ya conocido.
+    def __init__(self, palabras_clave=RUST_KEYWORDS):
+        self.palabras_clave = palabras_clave
+        self.errores = []
+        self.ambitos = [Ambito(GLOBAL)]
+        # (ámbito, ámbito padre, profundidad): se abre con la próxima llave
+        # del padre a esa profundidad (cuerpo de fn, for, if let, impl, match)
+        self.preparado = None
+        self.papel = EXPRESION
+        self.patron = None
+        self.base_patron = 0
+        self.ligaduras = []
+        self.tipo_fin = ()
+        self.tipo_base = 0
+        self.tipo_angulos = 0
+        self.tipo_retorno = None
+        self.genericos_angulos = 0
+        self.genericos_retorno = None
+        self.elemento = None
+        self.parametros_vistos = False
+        self.segmento = None
+        self.grupo = 0
+        self.atributo = None
+        self.retenido = None
+        self.anterior = None
+        self.tipo_anterior = None
+
+    def procesar(self, token):
+        retenido = self.retenido
+        self.retenido = token
+        if retenido is not None:
+            self._token(retenido, token[1])
+
+    def terminar(self):
+        if self.retenido is not None:
+            self._token(self.retenido, None)
+            self.retenido = None
+        while len(self.ambitos) > 1:
+            self._cerrar_ambito()
+        global_ = self.ambitos[0]
+        if not global_.comodin:
+            for linea, columna, nombre, clase in global_.pendientes:
+                if nombre not in global_.elementos:
+                    self._error(linea, columna, _MENSAJES_USO[clase].format(nombre))
+        global_.pendientes = []
+        self.errores.sort(key=lambda error: (error[0], error[1]))
+        return [(linea, ERROR_SEMANTICO, descripcion) for linea, _, descripcion in self.errores]
+
+    # --- Tabla de símbolos -------------------------------------------------
+
+    def _error(self, linea, columna, descripcion):
+        self.errores.append((linea, columna, descripcion))
+
+    def _resuelto(self, nombre):
+        for ambito in reversed(self.ambitos):
+            if nombre in ambito.nombres:
+                return True
+        # Genéricos y parámetros de una firma antes de abrir su cuerpo
+        preparado = self.preparado
+        if preparado is not None and preparado[0].clase != BLOQUE and nombre in preparado[0].nombres:
+            return True
+        return nombre in INTEGRADOS or nombre in self.palabras_clave
+
+    def _usar(self, nombre, linea, columna, clase):
+        if not self._resuelto(nombre):
+            self.ambitos[-1].pendientes.append((linea, columna, nombre, clase))
+
+    def _declarar_elemento(self, nombre, clase, linea, columna, ambito):
+        if clase is not None and ambito.elementos.get(nombre) == clase:
+            self._error(linea, columna, mensaje_redeclaracion(clase, nombre))
+        ambito.elementos[nombre] = clase
+        ambito.nombres.add(nombre)
+
+    def _abrir(self, ambito):
+        self.ambitos.append(ambito)
+
+    def _cerrar_ambito(self):
+        ambito = self.ambitos.pop()
+        if not ambito.comodin:
+            elementos = ambito.elementos
+            self.ambitos[-1].pendientes.extend(
+                pendiente for pendiente in ambito.pendientes if pendiente[2] not in elementos)
+
+    def _cerrar_brazo(self):
+        self._cerrar_ambito()
+        self.ambitos[-1].inicio_brazo = True
+
+    # --- Despacho ------------------------------------------------------------
+
+    def _token(self, token, siguiente):
+        tipo, texto, linea, columna, _ = token
+        if self.atributo is not None:
+            # #[...] y #![...] no declaran ni usan nombres
+            if texto == '[':
+                self.atributo += 1
+            elif texto == ']':
+                self.atributo -= 1
+                if not self.atributo:
+                    self.atributo = None
+        elif texto == '#' and (siguiente == '[' or siguiente == '!'):
+            self.atributo = 0
+        else:
+            palabra = tipo == IDENTIFICADOR or tipo == PALABRA_CLAVE
+            # Un papel que termina devuelve False y el token se vuelve a
+            # despachar con el papel siguiente
+            while not self._PAPELES[self.papel](self, palabra, texto, linea, columna, siguiente):
+                pass
+        self.anterior = texto
+        self.tipo_anterior = tipo
+
+    def _posicion_operando(self):
+        # Un | donde se espera un operando abre los parámetros de una clausura
+        anterior = self.anterior
+        if anterior is None or anterior in ('move', 'return'):
+            return True
+        return (self.tipo_anterior == OPERADOR or self.tipo_anterior == DELIMITADOR) \
+            and anterior not in (')', ']', '}')
+
+    # --- Expresiones y sentencias -----------------------------------------
+
+    def _expresion(self, palabra, texto, linea, columna, siguiente):
+        ambito = self.ambitos[-1]
+        if ambito.inicio_brazo and ambito.clase == MATCH:
+            if texto == ',':
+                return True
+            if texto != '}':
+                ambito.inicio_brazo = False
+                self._abrir(Ambito(BRAZO))
+                self._iniciar_patron(BRAZO)
+                return False
+        if palabra:
+            return self._palabra(texto, linea, columna, siguiente, ambito)
+        if texto == '{':
+            self._llave(ambito)
+        elif texto == '}':
+            self._cerrar_llave()
+        elif texto == '(' or texto == '[':
+            ambito.profundidad += 1
+            if texto == '(' and ambito.clase == ENUM and ambito.profundidad == 1:
+                # Variante con campos sin nombre: solo tipos
+                self._iniciar_tipo((), EXPRESION)
+        elif texto == ')' or texto == ']':
+            if ambito.profundidad:
+                ambito.profundidad -= 1
+        elif ambito.profundidad:
+            if texto == '|' and self._posicion_operando():
+                self._iniciar_patron(CLAUSURA)
+        elif texto == ';':
+            self._fin_sentencia(ambito)
+        elif texto == ',':
+            if ambito.clase == BRAZO:
+                self._cerrar_brazo()
+            elif ambito.clase == ENUM:
+                ambito.inicio_brazo = True
+        elif texto == ':':
+            if ambito.clase == DATOS:
+                self._iniciar_tipo((',',), EXPRESION)
+        elif texto == '|' and self._posicion_operando():
+            self._iniciar_patron(CLAUSURA)
+        return True
+
+    def _palabra(self, texto, linea, columna, siguiente, ambito):
+        if texto == 'let':
+            self._iniciar_patron(CONDICION if self.anterior in ('if', 'while', '&&') else LET)
+        elif texto == 'fn':
+            self.papel = NOMBRE
+            self.elemento = texto
+        elif texto in ELEMENTOS:
+            # const fn / static como tiempo de vida no declaran nombre
+            if not (texto == 'const' and siguiente in ('fn', 'unsafe', 'async', 'extern')):
+                self.papel = NOMBRE
+                self.elemento = texto
+        elif texto == 'impl':
+            self.preparado = (Ambito(IMPL), ambito, ambito.profundidad)
+            self.papel = CABECERA_IMPL
+        elif texto == 'for':
+            self._iniciar_patron(FOR)
+        elif texto == 'match':
+            self.preparado = (Ambito(MATCH), ambito, ambito.profundidad)
+        elif texto == 'use':
+            self.papel = USO
+            self.segmento = None
+            self.grupo = 0
+        elif texto == 'macro_rules' and siguiente == '!':
+            self.papel = MACRO
+            self.elemento = None
+            self.grupo = 0
+        elif texto in RESERVADAS:
+            pass
+        elif ambito.inicio_brazo and ambito.clase == ENUM:
+            # Nombre de variante
+            ambito.inicio_brazo = False
+        elif self.anterior in ('.', '::', 'crate') or siguiente == ':' or siguiente == '!':
+            # Campo o método, segmento de ruta, campo de un literal de
+            # estructura o macro sin delimitador
+            pass
+        else:
+            if texto[0].isupper():
+                clase = 'tipo'
+            elif siguiente == '(':
+                clase = 'funcion'
+            elif siguiente == '::':
+                clase = 'modulo'
+            else:
+                clase = 'variable'
+            self._usar(texto, linea, columna, clase)
+        return True
+
+    def _llave(self, ambito):
+        preparado = self.preparado
+        if preparado is not None and preparado[1] is ambito and preparado[2] == ambito.profundidad:
+            self.preparado = None
+            nuevo = preparado[0]
+        else:
+            nuevo = Ambito(DATOS if ambito.clase == ENUM and not ambito.profundidad else BLOQUE)
+            nuevo.cuerpo_brazo = ambito.clase == BRAZO and self.anterior == '=>'
+        nuevo.inicio_brazo = nuevo.clase == MATCH or nuevo.clase == ENUM
+        self._abrir(nuevo)
+
+    def _cerrar_llave(self):
+        if self.ambitos[-1].clase == BRAZO:
+            # La llave cierra el match después del último brazo
+            self._cerrar_ambito()
+        if len(self.ambitos) == 1:
+            return
+        cuerpo_brazo = self.ambitos[-1].cuerpo_brazo
+        self._cerrar_ambito()
+        if cuerpo_brazo and self.ambitos[-1].clase == BRAZO:
+            self._cerrar_brazo()
+
+    def _fin_sentencia(self, ambito):
+        if ambito.al_cerrar:
+            ambito.nombres.update(ambito.al_cerrar)
+            ambito.al_cerrar = []
+        preparado = self.preparado
+        if preparado is not None and preparado[1] is ambito:
+            # fn sin cuerpo (trait), struct unitaria, mod externo...
+            self.preparado = None
+
+    # --- Patrones ----------------------------------------------------------
+
+    def _iniciar_patron(self, clase):
+        self.papel = PATRON
+        self.patron = clase
+        self.base_patron = self.ambitos[-1].profundidad
+        self.ligaduras = []
+
+    def _fin_patron(self):
+        clase = self.patron
+        ambito = self.ambitos[-1]
+        nombres = [nombre for nombre, _, _ in self.ligaduras]
+        if clase == PARAMETRO or clase == CLAUSURA:
+            vistos = set()
+            for nombre, linea, columna in self.ligaduras:
+                if nombre in vistos:
+                    self._error(linea, columna, f"Variable '{nombre}' ya declarada")
+                vistos.add(nombre)
+        if clase == LET:
+            ambito.al_cerrar.extend(nombres)
+        elif clase == CONDICION or clase == FOR:
+            nuevo = Ambito(BLOQUE)
+            nuevo.nombres.update(nombres)
+            self.preparado = (nuevo, ambito, ambito.profundidad)
+        elif clase == PARAMETRO:
+            if self.preparado is not None:
+                self.preparado[0].nombres.update(nombres)
+        else:
+            ambito.nombres.update(nombres)
+        self.ligaduras = []
+        self.papel = FIRMA if clase == PARAMETRO else EXPRESION
+
+    def _patron_(self, palabra, texto, linea, columna, siguiente):
+        ambito = self.ambitos[-1]
+        en_base = ambito.profundidad == self.base_patron
+        clase = self.patron
+        if palabra:
+            if texto == 'in' and clase == FOR and en_base:
+                self._fin_patron()
+            elif texto == 'if' and clase == BRAZO and en_base:
+                # La guarda ya ve las ligaduras del brazo
+                self._fin_patron()
+            elif texto in RESERVADAS:
+                pass
+            elif self.anterior == '::' or (siguiente == ':' and not en_base):
+                # Segmento de ruta o campo de un patrón de estructura
+                pass
+            elif siguiente in ('(', '{', '::') or texto[0].isupper():
+                # Variante, estructura, constante o ruta
+                self._usar(texto, linea, columna, 'tipo')
+            else:
+                self.ligaduras.append((texto, linea, columna))
+            return True
+        if texto == '(' or texto == '[' or texto == '{':
+            ambito.profundidad += 1
+        elif texto == ')' or texto == ']' or texto == '}':
+            if en_base:
+                # Cierra el grupo que contiene al patrón (los parámetros)
+                self._fin_patron()
+                return False
+            ambito.profundidad -= 1
+        elif en_base:
+            if texto == ':' and clase in (LET, CONDICION, PARAMETRO, CLAUSURA):
+                fin = {LET: ('=', ';'), CONDICION: ('=',), PARAMETRO: (',',), CLAUSURA: (',', '|')}[clase]
+                self._iniciar_tipo(fin, PATRON)
+            elif texto == '=' and (clase == LET or clase == CONDICION):
+                self._fin_patron()
+            elif texto == ';' and clase == LET:
+                self._fin_patron()
+                return False
+            elif texto == '=>' and clase == BRAZO:
+                self._fin_patron()
+            elif texto == '|' and clase == CLAUSURA:
+                self._fin_patron()
+        return True
+
+    # --- Tipos y genéricos ---------------------------------------------------
+
+    def _iniciar_tipo(self, fin, retorno):
+        # Termina con un token de fin a la profundidad de inicio o con el
+        # cierre del grupo que lo contiene; ese token lo procesa el retorno
+        self.papel = TIPO
+        self.tipo_fin = fin
+        self.tipo_base = self.ambitos[-1].profundidad
+        self.tipo_angulos = 0
+        self.tipo_retorno = retorno
+
+    def _tipo(self, palabra, texto, linea, columna, siguiente):
+        ambito = self.ambitos[-1]
+        if ambito.profundidad == self.tipo_base:
+            if (texto in self.tipo_fin and not self.tipo_angulos) or texto in (')', ']', '}'):
+                self.papel = self.tipo_retorno
+                return False
+        if texto == '(' or texto == '[':
+            ambito.profundidad += 1
+        elif texto == ')' or texto == ']':
+            ambito.profundidad -= 1
+        elif texto == '<':
+            self.tipo_angulos += 1
+        elif texto == '>' or texto == '>>':
+            self.tipo_angulos = max(0, self.tipo_angulos - len(texto))
+        elif (palabra and texto not in RESERVADAS and self.anterior != '::'
+                and siguiente != '=' and siguiente != ':'):
+            # Item = T es un tipo asociado y T: Rasgo una cota
+            self._usar(texto, linea, columna, 'tipo')
+        return True
+
+    def _iniciar_genericos(self, retorno):
+        self.papel = GENERICOS
+        self.genericos_angulos = 1
+        self.genericos_retorno = retorno
+
+    def _genericos(self, palabra, texto, linea, columna, siguiente):
+        if texto == '<':
+            self.genericos_angulos += 1
+        elif texto == '>' or texto == '>>':
+            self.genericos_angulos -= len(texto)
+            if self.genericos_angulos <= 0:
+                self.papel = self.genericos_retorno
+        elif palabra and texto not in RESERVADAS and self.anterior != '::' and siguiente != '=':
+            if self.genericos_angulos == 1 and self.anterior in ('<', ',', 'const'):
+                if self.preparado is not None:
+                    self.preparado[0].nombres.add(texto)
+            else:
+                self._usar(texto, linea, columna, 'tipo')
+        return True
+
+    # --- Elementos -----------------------------------------------------------
+
+    def _nombre(self, palabra, texto, linea, columna, siguiente):
+        if not palabra:
+            self.papel = EXPRESION
+            return False
+        if texto == 'mut':
+            return True
+        elemento = self.elemento
+        ambito = self.ambitos[-1]
+        # Los métodos se llaman con self. o Tipo::, no por su nombre suelto
+        if not (elemento == 'fn' and ambito.clase == IMPL):
+            self._declarar_elemento(texto, ELEMENTOS[elemento], linea, columna, ambito)
+        if elemento == 'fn':
+            self.preparado = (Ambito(FUNCION), ambito, ambito.profundidad)
+            self.parametros_vistos = False
+            self.papel = FIRMA
+            return True
+        if elemento in ('struct', 'union'):
+            self.preparado = (Ambito(DATOS), ambito, ambito.profundidad)
+        elif elemento == 'enum':
+            self.preparado = (Ambito(ENUM), ambito, ambito.profundidad)
+        elif elemento == 'trait':
+            self.preparado = (Ambito(IMPL), ambito, ambito.profundidad)
+        elif elemento == 'type':
+            self.preparado = (Ambito(DATOS), ambito, ambito.profundidad)
+        elif elemento == 'mod':
+            self.preparado = (Ambito(BLOQUE), ambito, ambito.profundidad)
+        self.papel = ELEMENTO
+        return True
+
+    def _firma(self, palabra, texto, linea, columna, siguiente):
+        ambito = self.ambitos[-1]
+        if texto == '<' and not self.parametros_vistos:
+            self._iniciar_genericos(FIRMA)
+        elif texto == '(' and not self.parametros_vistos:
+            self.parametros_vistos = True
+            ambito.profundidad += 1
+            self._iniciar_patron(PARAMETRO)
+        elif texto == ')':
+            if ambito.profundidad:
+                ambito.profundidad -= 1
+        elif texto == '->':
+            self._iniciar_tipo(('{', 'where', ';'), FIRMA)
+        elif texto == 'where':
+            self._iniciar_tipo(('{', ';'), FIRMA)
+        elif texto == '{' or texto == ';' or texto == '}':
+            self.papel = EXPRESION
+            return False
+        return True
+
+    def _elemento(self, palabra, texto, linea, columna, siguiente):
+        ambito = self.ambitos[-1]
+        if texto == '<' and self.tipo_anterior == IDENTIFICADOR:
+            self._iniciar_genericos(ELEMENTO)
+        elif texto == '(':
+            # Estructura con campos sin nombre
+            ambito.profundidad += 1
+            self._iniciar_tipo((), ELEMENTO)
+        elif texto == ')':
+            if ambito.profundidad:
+                ambito.profundidad -= 1
+        elif texto == ':':
+            self._iniciar_tipo(('{', 'where', '=', ';'), ELEMENTO)
+        elif texto == 'where':
+            self._iniciar_tipo(('{', ';'), ELEMENTO)
+        elif texto == '=':
+            if self.elemento == 'type':
+                self._iniciar_tipo((';',), ELEMENTO)
+            else:
+                self.papel = EXPRESION
+        elif texto == '{' or texto == ';' or texto == '}':
+            self.papel = EXPRESION
+            return False
+        return True
+
+    def _cabecera_impl(self, palabra, texto, linea, columna, siguiente):
+        # impl<T> Rasgo for Tipo<T> where ... {
+        if texto == '<' and self.anterior == 'impl':
+            self._iniciar_genericos(CABECERA_IMPL)
+            return True
+        self.elemento = 'impl'
+        self._iniciar_tipo(('{', 'where', ';'), ELEMENTO)
+        return False
+
+    def _uso(self, palabra, texto, linea, columna, siguiente):
+        # use a::b::{c, d as e, self, *};
+        ambito = self.ambitos[-1]
+        if texto == ';' and not self.grupo:
+            self.papel = EXPRESION
+        elif texto == '{':
+            self.grupo += 1
+        elif texto == '}':
+            self.grupo -= 1
+        elif texto == '*':
+            ambito.comodin = True
+        elif palabra:
+            if siguiente == '::':
+                self.segmento = texto
+            elif texto == 'self':
+                if self.segmento is not None:
+                    self._declarar_elemento(self.segmento, None, linea, columna, ambito)
+            elif siguiente != 'as' and texto not in RESERVADAS:
+                self._declarar_elemento(texto, None, linea, columna, ambito)
+        return True
+
+    def _macro(self, palabra, texto, linea, columna, siguiente):
+        # macro_rules! nombre { ... }: el cuerpo tiene su propia sintaxis
+        if texto in ('(', '[', '{'):
+            self.grupo += 1
+        elif texto in (')', ']', '}'):
+            self.grupo -= 1
+            if not self.grupo:
+                self.papel = EXPRESION
+        elif palabra and not self.grupo and self.elemento is None and texto != 'macro_rules':
+            self.elemento = 'macro'
+            self._declarar_elemento(texto, None, linea, columna, self.ambitos[-1])
+        return True
+
+    _PAPELES = {
+        EXPRESION: _expresion,
+        PATRON: _patron_,
+        TIPO: _tipo,
+        GENERICOS: _genericos,
+        NOMBRE: _nombre,
+        FIRMA: _firma,
+        ELEMENTO: _elemento,
+        CABECERA_IMPL: _cabecera_impl,
+        USO: _uso,
+        MACRO: _macro,
+    }
+
+
+# --- Verificaciones sobre el árbol --------------------------------------
+
+# Marcadores en la pila del recorrido
+_SALIR = 'salir'
+_FIN_BUCLE = 'fin_bucle'
+_FIN_FUNCION = 'fin_funcion'
+_LIGAR = 'ligar'
+_ABRIR = 'abrir'
+_ABRIR_BUCLE = 'abrir_bucle'
+_CONTAR = 'contar'
+
+# Nodos sin expresiones adentro
+_SIN_RECORRER = frozenset((
+    arbol.TIPO, arbol.TIPO_RETORNO, arbol.PATRON, arbol.LIGADURA, arbol.TOKENS, arbol.ESTRUCTURA,
+    arbol.ENUMERACION, arbol.USO, arbol.ALIAS, arbol.ATRIBUTO, arbol.DEFINICION_MACRO,
+))
+
+# Resultado de _resolver para un nombre que llega al nivel superior
+_GLOBAL = object()
+
+
+def _aridad(funcion):
+    return sum(1 for hijo in funcion.hijos if hijo.tipo == arbol.PARAMETRO)
+
+
+def _funciones_de(nodos):
+    funciones = {}
+    for nodo in nodos:
+        if nodo.tipo == arbol.FUNCION:
+            unir_aridad(funciones, nodo.valor, _aridad(nodo))
+    return funciones
+
+
+def _ligaduras(patron, nombres):
+    pila = [patron]
+    while pila:
+        nodo = pila.pop()
+        if nodo.tipo == arbol.LIGADURA:
+            nombres.add(nodo.valor)
+        elif nodo.tipo != arbol.PATRON:
+            continue
+        pila.extend(nodo.hijos)
+    return nombres
+
+
+def _resolver(ambitos, nombre):
+    # Cantidad de parámetros de la función que nombra una llamada, None si no
+    # se comprueba (una variable la sombrea o no se encuentra dentro de un
+    # módulo) o _GLOBAL si queda para las funciones de nivel superior. Desde
+    # una función anidada no se ven las variables de la que la contiene, pero
+    # sí las funciones de sus bloques
+    locales = True
+    for nombres, funciones, clase in reversed(ambitos):
+        if locales and nombre in nombres:
+            return None
+        if nombre in funciones:
+            return funciones[nombre]
+        if clase == arbol.MODULO:
+            return None
+        if clase == arbol.FUNCION:
+            locales = False
+    return _GLOBAL
+
+
+class VerificadorArbol:
+    # Recibe los elementos de nivel superior de a uno, a medida que el parser
+    # los termina. Las llamadas a funciones de un bloque se comprueban al
+    # encontrarlas; las que llegan al nivel superior quedan en llamadas y se
+    # comprueban en terminar(), cuando ya se conocen todas las funciones del
+    # archivo (los errores de un segmento se completan así en combinar).
+    # Un módulo entregado por partes (Parser.elementos(abrir_modulos=True))
+    # guarda sus funciones y llamadas aparte hasta su marca de cierre, como
+    # el ámbito MODULO del recorrido: lo que no está en el módulo no se
+    # comprueba
+    def __init__(self):
+        self.errores = []
+        self.funciones = {}     # nombre -> cantidad de parámetros (o None)
+        self.llamadas = []      # (línea, nombre, argumentos)
+        self._modulos = []      # (funciones, llamadas) de los módulos de afuera
+
+    def elemento(self, nodo):
+        tipo = nodo.tipo
+        if tipo == arbol.INICIO_MODULO:
+            self._modulos.append((self.funciones, self.llamadas))
+            self.funciones = {}
+            self.llamadas = []
+            return
+        if tipo == arbol.FIN_MODULO:
+            self.errores.extend(errores_llamadas(self.llamadas, self.funciones))
+            self.funciones, self.llamadas = self._modulos.pop()
+            return
+        if tipo == arbol.FUNCION:
+            unir_aridad(self.funciones, nodo.valor, _aridad(nodo))
+        self._recorrer(nodo)
+
+    def terminar(self):
+        self.errores.extend(errores_llamadas(self.llamadas, self.funciones))
+        self.llamadas = []
+        return self.errores
+
+    def _recorrer(self, raiz):
+        # Recorrido en profundidad con pila explícita (el árbol puede ser más
+        # hondo que el límite de recursión). ambitos: [nombres ligados,
+        # funciones del bloque, clase]; bucles: bucles abiertos en cada
+        # función o clausura
+        errores = self.errores
+        ambitos = []
+        bucles = [0]
+        pila = [raiz]
+        while pila:
+            nodo = pila.pop()
+            if type(nodo) is tuple:
+                accion = nodo[0]
+                if accion is _SALIR:
+                    ambitos.pop()
+                elif accion is _FIN_BUCLE:
+                    bucles[-1] -= 1
+                elif accion is _FIN_FUNCION:
+                    bucles.pop()
+                elif accion is _LIGAR:
+                    if ambitos:
+                        _ligaduras(nodo[1], ambitos[-1][0])
+                elif accion is _CONTAR:
+                    bucles[-1] += 1
+                else:
+                    ambitos.append([_ligaduras(nodo[1], set()), {}, arbol.BLOQUE])
+                    if accion is _ABRIR_BUCLE:
+                        bucles[-1] += 1
+                continue
+            tipo = nodo.tipo
+            hijos = nodo.hijos
+            if tipo == arbol.LLAMADA:
+                llamado = hijos[0]
+                if llamado.tipo == arbol.VARIABLE and all(hijo.tipo != arbol.ERROR for hijo in hijos):
+                    argumentos = len(hijos) - 1
+                    esperados = _resolver(ambitos, llamado.valor)
+                    if esperados is _GLOBAL:
+                        self.llamadas.append((nodo.linea, llamado.valor, argumentos))
+                    elif esperados is not None and esperados != argumentos:
+                        errores.append((nodo.linea, -1, mensaje_argumentos(llamado.valor, esperados, argumentos)))
+                pila.extend(reversed(hijos[1:]))
+            elif tipo == arbol.BLOQUE:
+                ambitos.append([set(), _funciones_de(hijos), arbol.BLOQUE])
+                pila.append((_SALIR,))
+                if nodo.valor and nodo.valor[0] == "'":
+                    # Bloque con etiqueta: admite break
+                    bucles[-1] += 1
+                    pila.append((_FIN_BUCLE,))
+                pila.extend(reversed(hijos))
+            elif tipo == arbol.DECLARACION:
+                # El patrón liga después del valor y del bloque de let-else
+                pila.append((_LIGAR, hijos[0]))
+                valores = hijos[1:]
+                if valores and valores[0].tipo == arbol.TIPO:
+                    valores = valores[1:]
+                pila.extend(reversed(valores))
+            elif tipo == arbol.FUNCION or tipo == arbol.CLAUSURA:
+                nombres = set()
+                for hijo in hijos:
+                    if hijo.tipo == arbol.PARAMETRO:
+                        _ligaduras(hijo.hijos[0], nombres)
+                # Las funciones anidadas no ven las variables de la que las
+                # contiene; las clausuras sí
+                ambitos.append([nombres, {}, arbol.FUNCION if tipo == arbol.FUNCION else arbol.BLOQUE])
+                bucles.append(0)
+                pila.append((_FIN_FUNCION,))
+                pila.append((_SALIR,))
+                if hijos and hijos[-1].tipo not in (arbol.PARAMETRO, arbol.RECEPTOR, arbol.TIPO_RETORNO):
+                    pila.append(hijos[-1])
+            elif tipo == arbol.SI:
+                # Las ligaduras de if let valen solo en la primera rama
+                if len(hijos) > 2:
+                    pila.append(hijos[2])
+                ambitos.append([set(), {}, arbol.BLOQUE])
+                pila.append((_SALIR,))
+                pila.extend(reversed(hijos[:2]))
+            elif tipo == arbol.CONDICION_LET:
+                pila.append((_LIGAR, hijos[0]))
+                pila.append(hijos[1])
+            elif tipo == arbol.MIENTRAS:
+                ambitos.append([set(), {}, arbol.BLOQUE])
+                pila.extend(((_SALIR,), (_FIN_BUCLE,), hijos[1], (_CONTAR,), hijos[0]))
+            elif tipo == arbol.BUCLE:
+                bucles[-1] += 1
+                pila.append((_FIN_BUCLE,))
+                pila.append(hijos[0])
+            elif tipo == arbol.PARA:
+                pila.extend(((_SALIR,), (_FIN_BUCLE,), hijos[2], (_ABRIR_BUCLE, hijos[0]), hijos[1]))
+            elif tipo == arbol.BRAZO:
+                pila.append((_SALIR,))
+                pila.extend(reversed(hijos[1:]))
+                pila.append((_ABRIR, hijos[0]))
+            elif tipo == arbol.BREAK or tipo == arbol.CONTINUE:
+                if not bucles[-1]:
+                    errores.append((nodo.linea, -1, f"'{'break' if tipo == arbol.BREAK else 'continue'}' fuera de un bucle"))
+                pila.extend(hijos)
+            elif tipo == arbol.MODULO:
+                ambitos.append([set(), _funciones_de(hijos), arbol.MODULO])
+                pila.append((_SALIR,))
+                pila.extend(reversed(hijos))
+            elif hijos and tipo not in _SIN_RECORRER:
+                pila.extend(reversed(hijos))
+
+
+def errores_llamadas(llamadas, funciones):
+    # Llamadas de nivel superior con una cantidad de argumentos distinta de
+    # la de la función que nombran
+    errores = []
+    for linea, nombre, argumentos in llamadas:
+        esperados = funciones.get(nombre)
+        if esperados is not None and esperados != argumentos:
+            errores.append((linea, -1, mensaje_argumentos(nombre, esperados, argumentos)))
+    return errores
+
+
+@etapa('semantico', 'semántica')
+def detectar_errores_semanticos(code, palabras_clave=RUST_KEYWORDS, tokens=None, elementos=None):
+    # tokens: el flujo ya reconocido por el motor léxico (sin comentarios);
+    # solo si falta se tokeniza el código. Las verificaciones del árbol
+    # (cantidad de argumentos, break y continue fuera de un bucle) corren
+    # solo si se pasan elementos: los de nivel superior de un árbol ya armado
+    # o el generador Parser.elementos(), cuyos nodos se descartan al
+    # verificarlos. Esta función nunca arma el árbol por su cuenta
+    if tokens is None:
+        tokens = tokenizar(code, incluir_comentarios=False)
+    verificador = VerificadorSemantico(palabras_clave)
+    procesar = verificador.procesar
+    for token in tokens:
+        procesar(token)
+    if elementos is not None:
+        estructura = VerificadorArbol()
+        for nodo in elementos:
+            estructura.elemento(nodo)
+        verificador.errores.extend(estructura.terminar())
+    return verificador.terminar()
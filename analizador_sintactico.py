@@ -0,0 +1,307 @@
+import re
+from collections import deque
+
+from motor_lexico import (
+    IDENTIFICADOR, PALABRA_CLAVE, MACRO, NUMERO, CADENA, CARACTER,
+    TIEMPO_VIDA, DELIMITADOR, COMENTARIO, COMENTARIO_ABIERTO, CADENA_ABIERTA,
+)
+from instrumentacion import etapa
+
+# Verificador sintáctico de una sola pasada sobre el flujo de tokens del
+# motor léxico: una pila real de ( ) { } [ ] con la posición de apertura y la
+# terminación de sentencias decidida a partir de los tokens. El costo es
+# lineal en el número de tokens y no crece con la cantidad de reglas.
+
+ERROR_SINTAXIS = "Error de sintaxis"
+# Aviso de una construcción que supera un límite del análisis (anidamiento):
+# no es un error del código
+AVISO_LIMITE = "Límite del análisis"
+
+PARES = {')': '(', ']': '[', '}': '{'}
+
+NOMBRES_APERTURA = {
+    '(': ("Paréntesis de apertura sin paréntesis de cierre", "abierto"),
+    '[': ("Corchete de apertura sin corchete de cierre", "abierto"),
+    '{': ("Llave de apertura sin llave de cierre", "abierta"),
+}
+NOMBRES_CIERRE = {
+    ')': "Paréntesis de cierre sin paréntesis de apertura",
+    ']': "Corchete de cierre sin corchete de apertura",
+    '}': "Llave de cierre sin llave de apertura",
+}
+
+# Contexto de cada llave: 'bloque' contiene sentencias, 'datos' contiene
+# campos o brazos (struct, enum, match, use) y 'expresion' es cualquier
+# llave abierta a mitad de una expresión (literales, clausuras...).
+BLOQUE = 'bloque'
+DATOS = 'datos'
+EXPRESION = 'expresion'
+
+CABECERAS = {
+    'fn': BLOQUE, 'impl': BLOQUE, 'trait': BLOQUE, 'mod': BLOQUE,
+    'unsafe': BLOQUE, 'if': BLOQUE, 'else': BLOQUE, 'for': BLOQUE,
+    'while': BLOQUE, 'loop': BLOQUE, 'match': DATOS, 'struct': DATOS,
+    'enum': DATOS, 'union': DATOS, 'use': DATOS,
+}
+
+# Cabecera de una macro invocada como elemento, con su cuerpo entre llaves
+# (macro_rules! m { ... }, thread_local! { ... }): no lleva ';'. No es el
+# texto de ningún token
+CABECERA_MACRO = '!{'
+CABECERAS[CABECERA_MACRO] = EXPRESION
+
+# Cabeceras de control que siempre necesitan su llave de apertura
+FALTA_LLAVE = {
+    'if': "Falta la llave de apertura en la declaración del condicional if",
+    'else': "Falta la llave de apertura en la declaración del condicional else",
+    'for': "Falta la llave de apertura en la declaración del bucle for",
+    'while': "Falta la llave de apertura en la declaración del bucle while",
+    'loop': "Falta la llave de apertura en la declaración de loop",
+    'match': "Falta la llave de apertura en la declaración de match",
+}
+
+FALTA_PUNTO_Y_COMA = {
+    'let': "Falta el punto y coma al final de la declaración de la variable",
+    'return': "Falta el punto y coma al final de la declaración de retorno",
+}
+FALTA_PUNTO_Y_COMA_LINEA = "Falta el punto y coma al final de la línea"
+
+# Tokens que pueden cerrar una expresión y tokens que pueden iniciar una
+# sentencia; si aparecen en líneas consecutivas falta un punto y coma.
+TIPOS_FINALES = frozenset((IDENTIFICADOR, NUMERO, CADENA, CARACTER))
+TEXTOS_FINALES = frozenset((')', ']', '}', '?', 'self'))
+TIPOS_INICIALES = frozenset((IDENTIFICADOR, PALABRA_CLAVE, MACRO, TIEMPO_VIDA))
+NO_INICIALES = frozenset(('else', 'as', 'in', 'where', 'mut'))
+
+# Referencia a otra línea dentro de un mensaje ("abierta en la línea N")
+REFERENCIA_LINEA = re.compile(r'en la línea (\d+)')
+# Lo que esperaba el parser en "Se esperaba X y se encontró Y"
+ESPERADO = re.compile(r"Se esperaba (.*?)(?: y se encontró |$)")
+
+# Causa común de los mensajes del verificador y del parser, por fragmento
+# del mensaje en minúsculas; un mensaje sin causa conocida es su propia causa
+CAUSAS = (
+    ('punto y coma', ';'),
+    ('cadena', '"'),
+    ('llave de cierre sin', '}'),
+    ('llave de cierre', '{'),
+    ('paréntesis de cierre sin', ')'),
+    ('paréntesis de cierre', '('),
+    ('corchete de cierre sin', ']'),
+    ('corchete de cierre', '['),
+)
+CAUSAS_ESPERADO = (("';'", ';'), ("'}'", '{'), ("')'", '('), ("']'", '['))
+
+
+@etapa('sintactico', 'sintaxis')
+def detectar_errores(tokens, limpias=None):
+    # Recibe tuplas (tipo, texto, línea, columna, desplazamiento) y devuelve
+    # una lista de (línea, "Error de sintaxis", descripción) sin duplicados.
+    # Con limpias (una lista) se anotan las líneas cuyo primer token, en la
+    # columna 0, llega fuera de toda agrupación y sentencia, y None al final
+    # si el flujo termina así: desde esos puntos el análisis no depende de
+    # lo anterior (analisis_segmentado).
+    verificador = verificador_sintactico(limpias)
+    next(verificador)
+    # deque(maxlen=0) agota el map sin un bucle de Python
+    deque(map(verificador.send, tokens), 0)
+    return terminar_verificador(verificador)
+
+
+def terminar_verificador(verificador):
+    # Cierra el flujo de un verificador_sintactico y devuelve sus errores
+    try:
+        verificador.send(None)
+    except StopIteration as fin:
+        return fin.value
+    raise RuntimeError("El verificador sintáctico no terminó")
+
+
+def verificador_sintactico(limpias=None):
+    # La pasada de detectar_errores como corrutina: recibe los tokens de a
+    # uno con send() y None al final del flujo (terminar_verificador). Así
+    # el verificador se alimenta del mismo generador que recorre el parser,
+    # sin guardar los tokens (flujo_lexico)
+    errores = []
+    vistos = set()
+
+    def reportar(linea, descripcion):
+        clave = (linea, descripcion)
+        if clave not in vistos:
+            vistos.add(clave)
+            errores.append((linea, ERROR_SINTAXIS, descripcion))
+
+    pila = []
+    # Estado de la sentencia en curso del bloque actual
+    inicio = None
+    cabecera = None
+    hay_igual = False
+    en_bloque = True
+    nivel_sentencia = True
+    ultima_linea = 0
+    ultimo_final = False
+    # La sentencia empezó con una macro y todavía no abrió ( ni [
+    macro_sin_grupo = False
+
+    while True:
+        token = yield
+        if token is None:
+            break
+        tipo, texto, linea, columna, _ = token
+        if tipo == COMENTARIO:
+            continue
+        if not columna and limpias is not None and not pila and inicio is None:
+            limpias.append(linea)
+        if tipo == DELIMITADOR:
+            if texto == '{':
+                if not nivel_sentencia:
+                    contexto = EXPRESION
+                elif inicio is None:
+                    contexto = BLOQUE if en_bloque else EXPRESION
+                elif cabecera is None and macro_sin_grupo:
+                    cabecera = CABECERA_MACRO
+                    contexto = EXPRESION
+                elif cabecera is not None:
+                    contexto = CABECERAS[cabecera]
+                else:
+                    contexto = EXPRESION
+                pila.append(('{', linea, columna, contexto, (inicio, cabecera, hay_igual, en_bloque, macro_sin_grupo)))
+                inicio = None
+                cabecera = None
+                hay_igual = False
+                macro_sin_grupo = False
+                en_bloque = contexto == BLOQUE
+                nivel_sentencia = True
+                ultima_linea = linea
+                ultimo_final = False
+                continue
+            if texto == '(' or texto == '[':
+                if nivel_sentencia and inicio is None:
+                    inicio = texto
+                macro_sin_grupo = False
+                pila.append((texto, linea, columna, None, None))
+                nivel_sentencia = False
+                ultima_linea = linea
+                ultimo_final = False
+                continue
+            if texto in PARES:
+                abre = PARES[texto]
+                if pila and pila[-1][0] != abre and len(pila) > 1 and pila[-2][0] == abre:
+                    # La apertura del tope quedó sin cerrar: se descarta
+                    marco = pila.pop()
+                    mensaje, genero = NOMBRES_APERTURA[marco[0]]
+                    reportar(marco[1], f"{mensaje} ({genero} en la línea {marco[1]}, columna {marco[2] + 1})")
+                    if marco[0] == '{':
+                        inicio, cabecera, hay_igual, en_bloque, macro_sin_grupo = marco[4]
+                if not pila or pila[-1][0] != abre:
+                    reportar(linea, NOMBRES_CIERRE[texto])
+                    continue
+                marco = pila.pop()
+                if texto == '}':
+                    if en_bloque and inicio is not None:
+                        if inicio == 'let':
+                            reportar(ultima_linea, FALTA_PUNTO_Y_COMA['let'])
+                        elif cabecera in FALTA_LLAVE:
+                            reportar(ultima_linea, FALTA_LLAVE[cabecera])
+                    inicio, cabecera, hay_igual, en_bloque, macro_sin_grupo = marco[4]
+                    if cabecera is not None:
+                        # Fin del cuerpo de fn, if, struct, impl... El '='
+                        # de if let y while let es de la cabecera; solo el
+                        # valor de un let (cabecera None) sigue hasta su ';'
+                        inicio = None
+                        cabecera = None
+                        hay_igual = False
+                nivel_sentencia = not pila or pila[-1][0] == '{'
+                if texto == ']' and nivel_sentencia and inicio == '#':
+                    # Fin de un atributo #[...]
+                    inicio = None
+                    ultimo_final = False
+                else:
+                    ultimo_final = True
+                ultima_linea = linea
+                continue
+            if texto == ';' and nivel_sentencia:
+                if en_bloque and cabecera in FALTA_LLAVE:
+                    # La cabecera de control terminó sin abrir su bloque
+                    reportar(linea, FALTA_LLAVE[cabecera])
+                inicio = None
+                cabecera = None
+                hay_igual = False
+                ultima_linea = linea
+                ultimo_final = False
+                continue
+        elif tipo == CADENA_ABIERTA:
+            reportar(linea, "Falta la comilla de cierre de la cadena")
+        elif tipo == COMENTARIO_ABIERTO:
+            reportar(linea, "Falta el cierre del comentario de bloque")
+            continue
+
+        if nivel_sentencia:
+            if (en_bloque and inicio is not None and cabecera is None
+                    and ultimo_final and linea > ultima_linea
+                    and tipo in TIPOS_INICIALES and texto not in NO_INICIALES):
+                reportar(ultima_linea, FALTA_PUNTO_Y_COMA.get(inicio, FALTA_PUNTO_Y_COMA_LINEA))
+                inicio = None
+                hay_igual = False
+            if inicio is None:
+                inicio = texto
+                macro_sin_grupo = tipo == MACRO or texto == 'macro_rules'
+            if texto == '=':
+                hay_igual = True
+            elif cabecera is None and not hay_igual and texto in CABECERAS:
+                cabecera = texto
+        ultima_linea = linea
+        ultimo_final = tipo in TIPOS_FINALES or texto in TEXTOS_FINALES
+
+    if limpias is not None and not pila and inicio is None:
+        limpias.append(None)
+    if en_bloque and nivel_sentencia and inicio is not None:
+        if inicio == 'let':
+            reportar(ultima_linea, FALTA_PUNTO_Y_COMA['let'])
+        elif cabecera in FALTA_LLAVE:
+            reportar(ultima_linea, FALTA_LLAVE[cabecera])
+    for abre, linea, columna, _, _ in pila:
+        mensaje, genero = NOMBRES_APERTURA[abre]
+        reportar(linea, f"{mensaje} ({genero} en la línea {linea}, columna {columna + 1})")
+    errores.sort(key=lambda error: error[0])
+    return errores
+
+
+def causa_error(error):
+    # (línea, causa) de un error: dos mensajes con la misma clave informan
+    # lo mismo. Un bloque sin cerrar cuenta en la línea donde se abrió
+    linea, _, descripcion = error
+    referencia = REFERENCIA_LINEA.search(descripcion)
+    if referencia is not None:
+        linea = int(referencia.group(1))
+    esperado = ESPERADO.match(descripcion)
+    if esperado is not None:
+        for fragmento, causa in CAUSAS_ESPERADO:
+            if fragmento in esperado.group(1):
+                return linea, causa
+        return linea, descripcion
+    minusculas = descripcion.lower()
+    for fragmento, causa in CAUSAS:
+        if fragmento in minusculas:
+            return linea, causa
+    return linea, descripcion
+
+
+def unir_errores(errores, del_parser):
+    # Errores de detectar_errores junto con los del parser (Parser.errores)
+    # que no repiten uno ya informado, ordenados por línea. Un error del
+    # parser se da por repetido solo si otro ya informado tiene la misma
+    # línea y la misma causa (causa_error): los dos redactan distinto la
+    # falta de un ';' o una llave sin cerrar
+    if not del_parser:
+        return errores
+    vistos = set(map(causa_error, errores))
+    unidos = list(errores)
+    for error in del_parser:
+        clave = causa_error(error)
+        if clave in vistos:
+            continue
+        vistos.add(clave)
+        unidos.append(error)
+    unidos.sort(key=lambda error: error[0])
+    return unidos
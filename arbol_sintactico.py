@@ -0,0 +1,1749 @@
+import gc
+import sys
+from contextlib import contextmanager
+
+from motor_lexico import (
+    IDENTIFICADOR, PALABRA_CLAVE, MACRO, NUMERO, CADENA, CADENA_ABIERTA, CARACTER, TIEMPO_VIDA,
+)
+from analizador_sintactico import ERROR_SINTAXIS, AVISO_LIMITE
+from instrumentacion import etapa
+
+# Árbol sintáctico del subconjunto de Rust de los ejemplos y el parser que lo
+# construye: descenso recursivo para elementos y sentencias y precedencia de
+# operadores (Pratt) para las expresiones. Lee los tokens de un iterador con
+# un solo token de anticipación y nunca retrocede, así que el costo es lineal
+# en la cantidad de tokens y puede alimentarse del mismo flujo que los
+# verificadores.
+#
+# Los errores se recuperan en modo pánico: se anota el error, se descartan
+# tokens hasta un punto de sincronización (un ';' o una '}' del nivel actual,
+# el comienzo de una sentencia en otra línea, o la ',' o el cierre de una
+# lista) y el análisis sigue, con un nodo Error en el lugar de lo descartado.
+# Así una pasada informa varios errores. Los tipos y los patrones se guardan
+# como texto (los patrones con sus ligaduras como hijos); el resto de las
+# construcciones tiene su propio nodo.
+
+# Tipos de nodo
+PROGRAMA = "Programa"
+FUNCION = "Función"
+PARAMETRO = "Parámetro"
+RECEPTOR = "Receptor"
+TIPO = "Tipo"
+TIPO_RETORNO = "Tipo de retorno"
+ESTRUCTURA = "Estructura"
+CAMPO = "Campo"
+ENUMERACION = "Enumeración"
+VARIANTE = "Variante"
+IMPLEMENTACION = "Implementación"
+RASGO = "Rasgo"
+MODULO = "Módulo"
+USO = "Uso"
+CONSTANTE = "Constante"
+ALIAS = "Alias de tipo"
+ATRIBUTO = "Atributo"
+DEFINICION_MACRO = "Definición de macro"
+BLOQUE = "Bloque"
+DECLARACION = "Declaración"
+CONDICION_LET = "Condición let"
+SI = "Condicional if"
+MIENTRAS = "Bucle while"
+BUCLE = "Bucle loop"
+PARA = "Bucle for"
+MATCH = "Match"
+BRAZO = "Brazo"
+GUARDA = "Guarda"
+RETORNO = "Retorno"
+BREAK = "Break"
+CONTINUE = "Continue"
+ASIGNACION = "Asignación"
+BINARIA = "Operación binaria"
+UNARIA = "Operación unaria"
+CONVERSION = "Conversión"
+RANGO = "Rango"
+LLAMADA = "Llamada"
+METODO = "Llamada a método"
+ACCESO = "Acceso a campo"
+INDICE = "Índice"
+PROPAGACION = "Propagación de error"
+TUPLA = "Tupla"
+ARREGLO = "Arreglo"
+REPETICION = "Arreglo repetido"
+LITERAL_ESTRUCTURA = "Literal de estructura"
+BASE = "Base"
+CLAUSURA = "Clausura"
+INVOCACION_MACRO = "Macro"
+ARGUMENTO = "Argumento"
+TOKENS = "Tokens"
+LITERAL_NUMERO = "Número"
+LITERAL_CADENA = "Cadena"
+LITERAL_CARACTER = "Carácter"
+LITERAL_BOOLEANO = "Booleano"
+VARIABLE = "Variable"
+RUTA = "Ruta"
+LIGADURA = "Ligadura"
+PATRON = "Patrón"
+VACIO = "Vacío"
+ERROR = "Error"
+# Marcas de Parser.elementos(abrir_modulos=True) alrededor de los elementos
+# de un módulo entregado por partes
+INICIO_MODULO = "Inicio de módulo"
+FIN_MODULO = "Fin de módulo"
+
+# Expresiones que terminan en un bloque: como sentencia no necesitan ';'
+TIPOS_BLOQUE = frozenset((BLOQUE, SI, MIENTRAS, BUCLE, PARA, MATCH))
+
+# Precedencia de los operadores binarios; la asignación asocia a la derecha
+# y los rangos no se encadenan
+PRECEDENCIA = {
+    '=': 1, '+=': 1, '-=': 1, '*=': 1, '/=': 1, '%=': 1,
+    '&=': 1, '|=': 1, '^=': 1, '<<=': 1, '>>=': 1,
+    '..': 2, '..=': 2,
+    '||': 3,
+    '&&': 4,
+    '==': 5, '!=': 5, '<': 5, '>': 5, '<=': 5, '>=': 5,
+    '|': 6,
+    '^': 7,
+    '&': 8,
+    '<<': 9, '>>': 9,
+    '+': 10, '-': 10,
+    '*': 11, '/': 11, '%': 11,
+    'as': 12,
+}
+_ASIGNACION = 1
+_RANGO = 2
+_ESCRUTINIO = 5     # valor de un 'let' en una condición: sin && ni ||
+_UNARIA = 13
+COMPARACIONES = frozenset(('==', '!=', '<', '>', '<=', '>='))
+
+# Macros cuyos argumentos son expresiones; las demás guardan sus tokens
+MACROS_EXPRESION = frozenset((
+    'println', 'print', 'eprintln', 'eprint', 'format', 'panic', 'assert', 'assert_eq',
+    'assert_ne', 'debug_assert', 'debug_assert_eq', 'debug_assert_ne', 'vec', 'dbg',
+    'write', 'writeln', 'todo', 'unimplemented', 'unreachable',
+))
+# Macros de impresión que aceptan un valor suelto en lugar del formato
+MACROS_IMPRESION = frozenset(('println!', 'print!'))
+
+# El anidamiento de expresiones, tipos y patrones se limita según el límite
+# de recursión de Python: cada nivel usa hasta MARCOS_POR_NIVEL marcos de la
+# pila (un literal de estructura o una macro usan unos 6, lo más caro) y
+# MARGEN_PILA queda para quien llama al parser. Pasado el límite se anota un
+# aviso (AVISO_LIMITE): el código puede ser válido, solo no se analiza
+MARCOS_POR_NIVEL = 7
+MARGEN_PILA = 150
+
+
+def limite_anidamiento():
+    return max(1, (sys.getrecursionlimit() - MARGEN_PILA) // MARCOS_POR_NIVEL)
+
+_PALABRAS = frozenset((IDENTIFICADOR, PALABRA_CLAVE))
+_LITERALES = {NUMERO: LITERAL_NUMERO, CADENA: LITERAL_CADENA, CARACTER: LITERAL_CARACTER}
+_CIERRES = {'(': ')', '[': ']', '{': '}'}
+_APERTURAS = frozenset(_CIERRES)
+_CIERRES_TEXTO = frozenset(_CIERRES.values())
+_CIERRES_ANGULO = frozenset(('>', '>>', '>=', '>>='))
+_OPERADORES_INICIALES = frozenset(('(', '[', '-', '!', '*', '&', '&&', '|', '||', '..', '..=', '<', '::'))
+# Palabras que no pueden empezar una expresión
+_NO_EXPRESION = frozenset((
+    'else', 'as', 'in', 'where', 'mut', 'fn', 'struct', 'enum', 'impl', 'trait', 'mod',
+    'use', 'pub', 'let', 'type', 'extern', 'const', 'static',
+))
+# Elementos que siempre empiezan con la misma palabra
+_ELEMENTOS_FIJOS = frozenset(('fn', 'struct', 'enum', 'impl', 'trait', 'mod', 'use', 'type', 'pub', 'extern'))
+_TRAS_CALIFICADOR = frozenset(('fn', 'impl', 'trait', 'extern', 'unsafe', 'async', 'const'))
+# Palabras que empiezan una sentencia; en otra línea sirven para sincronizar
+_INICIOS_SENTENCIA = frozenset((
+    'let', 'if', 'match', 'while', 'loop', 'for', 'return', 'break', 'continue',
+    'fn', 'struct', 'enum', 'impl', 'trait', 'mod', 'use', 'pub', 'const', 'static', 'type',
+))
+_INICIOS_BLOQUE = frozenset(('if', 'match', 'while', 'loop', 'for', '{'))
+
+_FIN = (None, None, 0, -1, -1)
+
+
+class NodoArbol:
+    # Sin __dict__ por instancia; las hojas comparten una tupla vacía y solo
+    # reciben una lista al agregar su primer hijo. linea es la del primer
+    # token de la construcción (None en nodos que no vienen del código).
+    __slots__ = ('tipo', 'valor', 'linea', 'hijos')
+
+    def __init__(self, tipo, valor=None, linea=None, hijos=()):
+        self.tipo = tipo
+        self.valor = valor
+        self.linea = linea
+        self.hijos = hijos
+
+    def agregar_hijo(self, nodo_hijo):
+        if self.hijos:
+            self.hijos.append(nodo_hijo)
+        else:
+            self.hijos = [nodo_hijo]
+
+    def tiene_hijos(self):
+        return bool(self.hijos)
+
+
+class _Panico(Exception):
+    # Error ya anotado; se atrapa en el punto de sincronización más cercano
+    pass
+
+
+def _es_ligadura(nombre):
+    # Un nombre suelto en un patrón liga una variable salvo que sea '_' o
+    # parezca una constante o una variante (empieza en mayúscula)
+    return nombre != '_' and not nombre[0].isupper()
+
+
+def _juntar(tokens):
+    # Texto de una secuencia de tokens con los espacios de una sola línea:
+    # se separan los tokens que no estaban pegados en el código
+    partes = []
+    fin = None
+    for _, texto, linea, columna, _ in tokens:
+        if partes and (linea, columna) != fin:
+            partes.append(' ')
+        partes.append(texto)
+        fin = (linea, columna + len(texto))
+    return ''.join(partes)
+
+
+class Parser:
+    # Parser de una secuencia de tokens (sin espacios ni comentarios), como
+    # los da tokenizar(code, incluir_comentarios=False). elementos() genera
+    # los elementos y sentencias de nivel superior a medida que los termina;
+    # los errores quedan en errores como (línea, tipo, descripción).
+    def __init__(self, tokens):
+        self._flujo = iter(tokens)
+        self.actual = next(self._flujo, _FIN)
+        self.proximo = next(self._flujo, _FIN)
+        self.anterior = _FIN
+        self.linea_anterior = self.actual[2]
+        self.consumidos = 0
+        self.errores = []
+        # Líneas donde empieza un elemento de nivel superior en la columna 0
+        self.inicios = []
+        # Si algún error se encontró con el final de los tokens: con más
+        # código detrás el resultado podría ser otro
+        self.incompleto = False
+        self.profundidad = 0
+        self.limite = limite_anidamiento()
+        # En condiciones y escrutinios una '{' abre el bloque, no un literal
+        # de estructura
+        self.sin_estructura = False
+        self._ultimo_error = -1
+        self._grabando = 0
+        self._grabados = []
+        # Con elementos(abrir_modulos=True): línea de la '{' de cada módulo
+        # que se está entregando por partes
+        self._abrir_modulos = False
+        self._modulos = []
+
+    # --- Tokens ----------------------------------------------------------
+
+    def _avanzar(self):
+        token = self.actual
+        if self._grabando:
+            self._grabados.append(token)
+        self.anterior = token
+        self.linea_anterior = token[2]
+        if token[0] == CADENA and '\n' in token[1]:
+            self.linea_anterior += token[1].count('\n')
+        self.actual = self.proximo
+        self.proximo = next(self._flujo, _FIN)
+        self.consumidos += 1
+        return token
+
+    def _esperar(self, texto):
+        if self.actual[1] != texto:
+            raise self._esperado(f"'{texto}'")
+        return self._avanzar()
+
+    def _palabra(self, que="un nombre"):
+        tipo, texto = self.actual[0], self.actual[1]
+        if tipo == IDENTIFICADOR or tipo == PALABRA_CLAVE:
+            self._avanzar()
+            return texto
+        raise self._esperado(que)
+
+    def _cierra_angulo(self):
+        return self.actual[1] in _CIERRES_ANGULO
+
+    def _cerrar_angulo(self):
+        # Consume un '>' que cierra genéricos; '>>', '>=' y '>>=' se parten
+        tipo, texto, linea, columna, desp = self.actual
+        if texto == '>':
+            self._avanzar()
+        elif texto in _CIERRES_ANGULO:
+            if self._grabando:
+                self._grabados.append((tipo, '>', linea, columna, desp))
+            self.anterior = (tipo, '>', linea, columna, desp)
+            self.linea_anterior = linea
+            self.consumidos += 1
+            self.actual = (tipo, texto[1:], linea, columna + 1, desp + 1)
+        else:
+            raise self._esperado("'>'")
+
+    def _grabar(self):
+        # Empieza a guardar los tokens consumidos para el texto de un tipo o
+        # un patrón; devuelve la marca para _texto_grabado
+        self._grabando += 1
+        return len(self._grabados)
+
+    def _texto_grabado(self, inicio):
+        texto = _juntar(self._grabados[inicio:])
+        self._grabando -= 1
+        if not self._grabando:
+            self._grabados.clear()
+        return texto
+
+    def _entrar(self):
+        self.profundidad += 1
+        if self.profundidad > self.limite:
+            raise self._limite(self.actual[2] or self.linea_anterior)
+
+    # --- Errores ---------------------------------------------------------
+
+    def _error(self, descripcion, linea=None, forzar=False, tipo=ERROR_SINTAXIS):
+        # Anota el error y devuelve la excepción para cortar la construcción;
+        # un solo error por posición, salvo forzar
+        if forzar or self.consumidos != self._ultimo_error:
+            self._ultimo_error = self.consumidos
+            self.errores.append((linea or self.linea_anterior, tipo, descripcion))
+        if self.actual[1] is None:
+            self.incompleto = True
+        return _Panico()
+
+    def _limite(self, linea):
+        return self._error(f"Anidamiento mayor que el límite del análisis ({self.limite} niveles)",
+                           linea, tipo=AVISO_LIMITE)
+
+    def _esperado(self, que):
+        # El token encontrado se nombra salvo que empiece una línea en la
+        # columna 0: puede ser el primero del próximo segmento
+        # (analisis_segmentado) y el error tiene que ser el mismo que al
+        # final del código
+        texto, linea, columna = self.actual[1], self.actual[2], self.actual[3]
+        if texto is None or (not columna and linea != self.linea_anterior):
+            return self._error(f"Se esperaba {que}")
+        return self._error(f"Se esperaba {que} y se encontró '{texto}'", linea)
+
+    def _fin_sentencia(self):
+        # Si falta el ';' y lo que sigue está en otra línea se da por puesto;
+        # en la misma línea se descarta hasta sincronizar
+        if self.actual[1] == ';':
+            self._avanzar()
+        elif self.actual[1] is not None and self.actual[2] == self.linea_anterior:
+            raise self._esperado("';'")
+        else:
+            self._error("Falta el punto y coma al final de la sentencia")
+
+    def _estado(self):
+        return self.profundidad, self.sin_estructura, self._grabando
+
+    def _recuperar(self, estado, errores, hijos):
+        # Vuelve al estado del punto de sincronización y deja un nodo Error
+        # con el error anotado
+        self.profundidad, self.sin_estructura, self._grabando = estado
+        if not self._grabando:
+            self._grabados.clear()
+        if len(self.errores) > errores:
+            linea, _, descripcion = self.errores[-1]
+            hijos.append(NodoArbol(ERROR, descripcion, linea))
+
+    def _sincronizar(self):
+        # Descarta tokens hasta un ';' del nivel actual (se consume), una '}'
+        # que lo cierra o, en otra línea, algo que empieza una sentencia
+        profundidad = 0
+        while True:
+            tipo, texto, linea, columna, _ = self.actual
+            if texto is None:
+                return
+            if not profundidad:
+                if texto == '}':
+                    return
+                if linea != self.linea_anterior and (
+                        texto in _INICIOS_SENTENCIA or tipo == MACRO
+                        or (not columna and (tipo in _PALABRAS or texto == '#'))):
+                    return
+            self._avanzar()
+            if texto in _APERTURAS:
+                profundidad += 1
+            elif texto in _CIERRES_TEXTO:
+                if profundidad:
+                    profundidad -= 1
+            elif texto == ';' and not profundidad:
+                return
+
+    def _sincronizar_grupo(self, cierre):
+        # Descarta tokens hasta la ',' o el cierre de la lista, sin
+        # consumirlos; dentro de paréntesis y corchetes también se detiene
+        # en lo que termina una sentencia
+        profundidad = 0
+        while True:
+            tipo, texto, linea, columna, _ = self.actual
+            if texto is None:
+                return
+            if not profundidad:
+                if texto == ',' or texto == cierre:
+                    return
+                if cierre != '}' and (texto == '}' or texto == ';'):
+                    return
+                if not columna and linea != self.linea_anterior and (tipo in _PALABRAS or texto == '#'):
+                    return
+            self._avanzar()
+            if texto in _APERTURAS:
+                profundidad += 1
+            elif texto in _CIERRES_TEXTO and profundidad:
+                profundidad -= 1
+
+    def _lista(self, cierre, elemento):
+        # Elementos separados por comas hasta cierre (sin consumirlo); un
+        # error en un elemento se recupera en la próxima coma
+        hijos = []
+        while self.actual[1] != cierre:
+            if self.actual[1] is None:
+                raise self._esperado(f"'{cierre}'")
+            estado = self._estado()
+            errores = len(self.errores)
+            try:
+                hijos.append(elemento())
+            except _Panico:
+                self._recuperar(estado, errores, hijos)
+                self._sincronizar_grupo(cierre)
+            if self.actual[1] == ',':
+                self._avanzar()
+            elif self.actual[1] != cierre:
+                raise self._esperado(f"',' o '{cierre}'")
+        return hijos
+
+    # --- Nivel superior --------------------------------------------------
+
+    def elementos(self, abrir_modulos=False):
+        # Con abrir_modulos, un módulo con cuerpo no llega como un solo nodo:
+        # se generan una marca INICIO_MODULO, sus elementos de a uno (con la
+        # misma recuperación que _secuencia) y una marca FIN_MODULO. Así un
+        # archivo envuelto en mod nombre { ... } no se arma entero
+        self._abrir_modulos = abrir_modulos
+        modulos = self._modulos
+        while True:
+            texto, linea, columna = self.actual[1], self.actual[2], self.actual[3]
+            if modulos:
+                if texto == '}' or texto is None:
+                    apertura = modulos.pop()
+                    if texto is None:
+                        self._error(f"Falta la llave de cierre del bloque abierto en la línea {apertura}",
+                                    forzar=True)
+                    else:
+                        self._avanzar()
+                    self.profundidad -= 1
+                    yield NodoArbol(FIN_MODULO, None, linea)
+                    continue
+            else:
+                if texto is None:
+                    return
+                if not columna:
+                    self.inicios.append(linea)
+                # Cada elemento empieza como si fuera el primero del código
+                self.linea_anterior = linea
+                if texto == '}':
+                    self._error("Llave de cierre sin llave de apertura", linea)
+                    self._avanzar()
+                    continue
+            consumidos = self.consumidos
+            estado = self._estado()
+            errores = len(self.errores)
+            nodos = []
+            try:
+                nodo = self._elemento() if modulos else self._sentencia(True)
+                if nodo is not None:
+                    nodos.append(nodo)
+            except (_Panico, RecursionError) as error:
+                if isinstance(error, RecursionError):
+                    self._limite(linea)
+                self._recuperar(estado, errores, nodos)
+                self._sincronizar()
+                if self.consumidos == consumidos and self.actual[1] not in ('}', None):
+                    self._avanzar()
+            yield from nodos
+
+    # --- Elementos -------------------------------------------------------
+
+    def _inicia_elemento(self):
+        texto = self.actual[1]
+        if texto in _ELEMENTOS_FIJOS:
+            return True
+        siguiente = self.proximo[1]
+        if texto == 'const':
+            return siguiente != '{'
+        if texto == 'static':
+            return siguiente not in ('|', '||', 'move')
+        if texto == 'unsafe' or texto == 'async':
+            return siguiente in _TRAS_CALIFICADOR
+        if texto == 'union':
+            return self.proximo[0] == IDENTIFICADOR
+        return texto == 'macro_rules' and siguiente == '!'
+
+    def _elemento(self):
+        linea = self.actual[2]
+        if self.actual[1] == '#':
+            return self._atributo()
+        if self.actual[1] == 'pub':
+            self._visibilidad()
+        while True:
+            texto, siguiente = self.actual[1], self.proximo[1]
+            if texto in ('unsafe', 'async', 'default') and siguiente in _TRAS_CALIFICADOR:
+                self._avanzar()
+            elif texto == 'const' and siguiente in ('fn', 'unsafe', 'async', 'extern'):
+                self._avanzar()
+            elif texto == 'extern' and (siguiente == 'fn' or self.proximo[0] == CADENA):
+                self._avanzar()
+                if self.actual[0] == CADENA:
+                    self._avanzar()
+                if self.actual[1] == '{':
+                    return self._bloque_elementos(MODULO, 'extern', linea)
+            else:
+                break
+        metodo = self._ELEMENTOS.get(self.actual[1])
+        if metodo is not None:
+            return metodo(self, linea)
+        if self.actual[0] == MACRO or (self.actual[1] == 'macro_rules' and self.proximo[1] == '!'):
+            return self._macro_elemento(linea)
+        raise self._esperado("un elemento")
+
+    def _atributo(self):
+        linea = self.actual[2]
+        inicio = self._grabar()
+        self._avanzar()
+        if self.actual[1] == '!':
+            self._avanzar()
+        if self.actual[1] != '[':
+            raise self._esperado("'['")
+        self._arbol_tokens()
+        return NodoArbol(ATRIBUTO, self._texto_grabado(inicio), linea)
+
+    def _atributos(self):
+        # Atributos dentro de listas (campos, parámetros, brazos): se omiten
+        while self.actual[1] == '#':
+            self._atributo()
+
+    def _visibilidad(self):
+        self._avanzar()
+        if self.actual[1] == '(':
+            self._arbol_tokens()
+
+    def _arbol_tokens(self):
+        # Consume un grupo balanceado desde el delimitador de apertura actual
+        if self.actual[1] not in _APERTURAS:
+            raise self._esperado("'(', '[' o '{'")
+        profundidad = 0
+        while True:
+            texto = self.actual[1]
+            if texto is None:
+                raise self._esperado(f"'{_CIERRES.get(self.anterior[1], ')')}'")
+            self._avanzar()
+            if texto in _APERTURAS:
+                profundidad += 1
+            elif texto in _CIERRES_TEXTO:
+                profundidad -= 1
+                if not profundidad:
+                    return
+
+    def _funcion(self, linea):
+        self._avanzar()
+        nombre = self._palabra("el nombre de la función")
+        if self.actual[1] == '<':
+            self._parametros_genericos()
+        self._esperar('(')
+        hijos = self._lista(')', self._parametro)
+        self._avanzar()
+        if self.actual[1] == '->':
+            self._avanzar()
+            hijos.append(self._tipo(TIPO_RETORNO))
+        if self.actual[1] == 'where':
+            self._where()
+        if self.actual[1] == ';':
+            self._avanzar()
+        else:
+            hijos.append(self.bloque())
+        return NodoArbol(FUNCION, nombre, linea, hijos)
+
+    def _parametro(self):
+        self._atributos()
+        linea = self.actual[2]
+        inicio = self._grabar()
+        referencia = self.actual[1] in ('&', '&&')
+        if referencia:
+            self._avanzar()
+            if self.actual[0] == TIEMPO_VIDA:
+                self._avanzar()
+            if self.actual[1] == 'mut':
+                self._avanzar()
+        elif self.actual[1] == 'mut' and self.proximo[1] == 'self':
+            self._avanzar()
+        if self.actual[1] == 'self':
+            self._avanzar()
+            if self.actual[1] == ':':
+                self._avanzar()
+                self._tipo_interno()
+            return NodoArbol(RECEPTOR, self._texto_grabado(inicio), linea)
+        if referencia:
+            ligaduras = []
+            self._patron_interno(ligaduras)
+            patron = NodoArbol(PATRON, self._texto_grabado(inicio), linea, ligaduras)
+        else:
+            self._texto_grabado(inicio)
+            patron = self._patron(False)
+        self._esperar(':')
+        return NodoArbol(PARAMETRO, patron.valor, linea, [patron, self._tipo()])
+
+    def _parametros_genericos(self):
+        self._avanzar()
+        while not self._cierra_angulo():
+            self._atributos()
+            if self.actual[0] == TIEMPO_VIDA:
+                self._avanzar()
+                if self.actual[1] == ':':
+                    self._avanzar()
+                    while self.actual[0] == TIEMPO_VIDA or self.actual[1] == '+':
+                        self._avanzar()
+            elif self.actual[1] == 'const':
+                self._avanzar()
+                self._palabra()
+                self._esperar(':')
+                self._tipo_interno()
+                if self.actual[1] == '=':
+                    self._avanzar()
+                    self.expresion(_UNARIA)
+            else:
+                self._palabra("un parámetro genérico")
+                if self.actual[1] == ':':
+                    self._avanzar()
+                    self._cotas()
+                if self.actual[1] == '=':
+                    self._avanzar()
+                    self._tipo_interno()
+            if self.actual[1] != ',':
+                break
+            self._avanzar()
+        self._cerrar_angulo()
+
+    def _cotas(self):
+        # Cotas de rasgos y tiempos de vida separadas por '+'
+        while True:
+            texto = self.actual[1]
+            if texto in (',', '{', ';', '=', None) or self._cierra_angulo():
+                return
+            if self.actual[0] == TIEMPO_VIDA:
+                self._avanzar()
+            elif texto == '(':
+                self._avanzar()
+                self._cotas()
+                self._esperar(')')
+            else:
+                if texto == '?':
+                    self._avanzar()
+                if self.actual[1] == 'for':
+                    self._avanzar()
+                    self._parametros_genericos()
+                self._ruta_tipo()
+            if self.actual[1] != '+':
+                return
+            self._avanzar()
+
+    def _where(self):
+        self._avanzar()
+        while self.actual[1] not in ('{', ';', '=', None):
+            if self.actual[0] == TIEMPO_VIDA:
+                self._avanzar()
+                self._esperar(':')
+                while self.actual[0] == TIEMPO_VIDA or self.actual[1] == '+':
+                    self._avanzar()
+            else:
+                if self.actual[1] == 'for':
+                    self._avanzar()
+                    self._parametros_genericos()
+                self._tipo_interno()
+                self._esperar(':')
+                self._cotas()
+            if self.actual[1] != ',':
+                return
+            self._avanzar()
+
+    def _estructura(self, linea):
+        self._avanzar()
+        nombre = self._palabra("el nombre de la estructura")
+        if self.actual[1] == '<':
+            self._parametros_genericos()
+        if self.actual[1] == 'where':
+            self._where()
+        texto = self.actual[1]
+        hijos = ()
+        if texto == ';':
+            self._avanzar()
+        elif texto == '{':
+            self._avanzar()
+            hijos = self._lista('}', self._campo)
+            self._avanzar()
+        elif texto == '(':
+            self._avanzar()
+            hijos = self._lista(')', self._campo_tupla)
+            self._avanzar()
+            if self.actual[1] == 'where':
+                self._where()
+            self._esperar(';')
+        else:
+            raise self._esperado("'{', '(' o ';'")
+        return NodoArbol(ESTRUCTURA, nombre, linea, hijos)
+
+    def _campo(self):
+        self._atributos()
+        linea = self.actual[2]
+        if self.actual[1] == 'pub':
+            self._visibilidad()
+        nombre = self._palabra("el nombre del campo")
+        self._esperar(':')
+        return NodoArbol(CAMPO, nombre, linea, [self._tipo()])
+
+    def _campo_tupla(self):
+        self._atributos()
+        if self.actual[1] == 'pub':
+            self._visibilidad()
+        return self._tipo()
+
+    def _enumeracion(self, linea):
+        self._avanzar()
+        nombre = self._palabra("el nombre de la enumeración")
+        if self.actual[1] == '<':
+            self._parametros_genericos()
+        if self.actual[1] == 'where':
+            self._where()
+        self._esperar('{')
+        hijos = self._lista('}', self._variante)
+        self._avanzar()
+        return NodoArbol(ENUMERACION, nombre, linea, hijos)
+
+    def _variante(self):
+        self._atributos()
+        linea = self.actual[2]
+        nombre = self._palabra("el nombre de la variante")
+        hijos = []
+        if self.actual[1] == '{':
+            self._avanzar()
+            hijos = self._lista('}', self._campo)
+            self._avanzar()
+        elif self.actual[1] == '(':
+            self._avanzar()
+            hijos = self._lista(')', self._campo_tupla)
+            self._avanzar()
+        if self.actual[1] == '=':
+            self._avanzar()
+            hijos.append(self.expresion())
+        return NodoArbol(VARIANTE, nombre, linea, hijos)
+
+    def _implementacion(self, linea):
+        self._avanzar()
+        if self.actual[1] == '<':
+            self._parametros_genericos()
+        if self.actual[1] == '!':
+            self._avanzar()
+        valor = self._tipo().valor
+        if self.actual[1] == 'for':
+            self._avanzar()
+            valor = f"{valor} for {self._tipo().valor}"
+        if self.actual[1] == 'where':
+            self._where()
+        return self._bloque_elementos(IMPLEMENTACION, valor, linea)
+
+    def _rasgo(self, linea):
+        self._avanzar()
+        nombre = self._palabra("el nombre del rasgo")
+        if self.actual[1] == '<':
+            self._parametros_genericos()
+        if self.actual[1] == ':':
+            self._avanzar()
+            self._cotas()
+        if self.actual[1] == 'where':
+            self._where()
+        return self._bloque_elementos(RASGO, nombre, linea)
+
+    def _modulo(self, linea):
+        self._avanzar()
+        nombre = self._palabra("el nombre del módulo")
+        if self.actual[1] == ';':
+            self._avanzar()
+            return NodoArbol(MODULO, nombre, linea)
+        if self._abrir_modulos and self.profundidad == len(self._modulos):
+            # Módulo de nivel superior (o dentro de otro entregado por
+            # partes): sus elementos los genera elementos()
+            self._entrar()
+            self._modulos.append(self._esperar('{')[2])
+            return NodoArbol(INICIO_MODULO, nombre, linea)
+        return self._bloque_elementos(MODULO, nombre, linea)
+
+    def _extern(self, linea):
+        self._avanzar()
+        if self.actual[1] == '{':
+            return self._bloque_elementos(MODULO, 'extern', linea)
+        self._esperar('crate')
+        nombre = self._palabra("el nombre del crate")
+        if self.actual[1] == 'as':
+            self._avanzar()
+            self._palabra()
+        self._esperar(';')
+        return NodoArbol(USO, f"extern crate {nombre}", linea)
+
+    def _uso(self, linea):
+        self._avanzar()
+        inicio = self._grabar()
+        self._arbol_uso()
+        texto = self._texto_grabado(inicio)
+        self._esperar(';')
+        return NodoArbol(USO, texto, linea)
+
+    def _arbol_uso(self):
+        if self.actual[1] == '::':
+            self._avanzar()
+        while True:
+            texto = self.actual[1]
+            if texto == '*':
+                self._avanzar()
+                return
+            if texto == '{':
+                self._avanzar()
+                while self.actual[1] != '}':
+                    self._arbol_uso()
+                    if self.actual[1] != ',':
+                        break
+                    self._avanzar()
+                self._esperar('}')
+                return
+            self._palabra("una ruta")
+            if self.actual[1] != '::':
+                break
+            self._avanzar()
+        if self.actual[1] == 'as':
+            self._avanzar()
+            self._palabra()
+
+    def _constante(self, linea):
+        self._avanzar()
+        if self.actual[1] == 'mut':
+            self._avanzar()
+        nombre = self._palabra("el nombre de la constante")
+        hijos = []
+        if self.actual[1] == ':':
+            self._avanzar()
+            hijos.append(self._tipo())
+        if self.actual[1] == '=':
+            self._avanzar()
+            hijos.append(self.expresion())
+        self._esperar(';')
+        return NodoArbol(CONSTANTE, nombre, linea, hijos)
+
+    def _alias(self, linea):
+        self._avanzar()
+        nombre = self._palabra("el nombre del tipo")
+        if self.actual[1] == '<':
+            self._parametros_genericos()
+        if self.actual[1] == ':':
+            self._avanzar()
+            self._cotas()
+        if self.actual[1] == 'where':
+            self._where()
+        hijos = ()
+        if self.actual[1] == '=':
+            self._avanzar()
+            hijos = [self._tipo()]
+        self._esperar(';')
+        return NodoArbol(ALIAS, nombre, linea, hijos)
+
+    def _macro_elemento(self, linea):
+        if self.actual[1] == 'macro_rules':
+            # El léxico solo marca como macro el nombre seguido de un
+            # delimitador
+            self._avanzar()
+            self._avanzar()
+            nombre = self._palabra("el nombre de la macro")
+            self._arbol_tokens()
+            if self.actual[1] == ';':
+                self._avanzar()
+            return NodoArbol(DEFINICION_MACRO, nombre, linea)
+        nodo = self._macro()
+        if self.anterior[1] != '}':
+            self._esperar(';')
+        return nodo
+
+    _ELEMENTOS = {
+        'fn': _funcion, 'struct': _estructura, 'union': _estructura, 'enum': _enumeracion,
+        'impl': _implementacion, 'trait': _rasgo, 'mod': _modulo, 'use': _uso,
+        'const': _constante, 'static': _constante, 'type': _alias, 'extern': _extern,
+    }
+
+    # --- Bloques y sentencias --------------------------------------------
+
+    def _secuencia(self, analizar, linea):
+        # Hijos hasta la '}' que cierra el bloque abierto en linea (se
+        # consume); cada error se recupera en la sentencia siguiente
+        hijos = []
+        while True:
+            texto = self.actual[1]
+            if texto == '}':
+                self._avanzar()
+                return hijos
+            if texto is None:
+                self._error(f"Falta la llave de cierre del bloque abierto en la línea {linea}", forzar=True)
+                return hijos
+            consumidos = self.consumidos
+            estado = self._estado()
+            errores = len(self.errores)
+            try:
+                nodo = analizar()
+                if nodo is not None:
+                    hijos.append(nodo)
+            except _Panico:
+                self._recuperar(estado, errores, hijos)
+                self._sincronizar()
+                if self.consumidos == consumidos and self.actual[1] not in ('}', None):
+                    self._avanzar()
+
+    def bloque(self, valor=None):
+        self._entrar()
+        linea = self._esperar('{')[2]
+        anterior = self.sin_estructura
+        self.sin_estructura = False
+        hijos = self._secuencia(self._sentencia, linea)
+        self.sin_estructura = anterior
+        self.profundidad -= 1
+        return NodoArbol(BLOQUE, valor, linea, hijos)
+
+    def _bloque_elementos(self, tipo, valor, linea):
+        self._entrar()
+        apertura = self._esperar('{')[2]
+        hijos = self._secuencia(self._elemento, apertura)
+        self.profundidad -= 1
+        return NodoArbol(tipo, valor, linea, hijos)
+
+    def _sentencia(self, nivel_superior=False):
+        tipo, texto = self.actual[0], self.actual[1]
+        if texto == ';':
+            self._avanzar()
+            return None
+        if texto == '#':
+            return self._atributo()
+        if self._inicia_elemento():
+            return self._elemento()
+        if texto == 'let':
+            return self._let()
+        if (texto in _INICIOS_BLOQUE or (texto == 'unsafe' and self.proximo[1] == '{')
+                or (tipo == TIEMPO_VIDA and self.proximo[1] == ':')):
+            # Una expresión que termina en bloque es una sentencia completa
+            # salvo que la siga un método o un '?'
+            nodo = self._primaria()
+            if self.actual[1] not in ('.', '?'):
+                if self.actual[1] == ';':
+                    self._avanzar()
+                return nodo
+            nodo = self._binarios(self._postfijos(nodo), 1)
+        else:
+            nodo = self.expresion()
+        texto = self.actual[1]
+        if texto == ';':
+            self._avanzar()
+        elif texto == '}' or texto is None:
+            # Expresión final del bloque
+            if nivel_superior:
+                self._fin_sentencia()
+        elif not (nodo.tipo == INVOCACION_MACRO and self.anterior[1] == '}'):
+            self._fin_sentencia()
+        return nodo
+
+    def _let(self):
+        linea = self._avanzar()[2]
+        patron = self._patron()
+        hijos = [patron]
+        if self.actual[1] == ':':
+            self._avanzar()
+            hijos.append(self._tipo())
+        if self.actual[1] == '=':
+            self._avanzar()
+            hijos.append(self.expresion())
+            if self.actual[1] == 'else':
+                self._avanzar()
+                hijos.append(self.bloque())
+        self._fin_sentencia()
+        return NodoArbol(DECLARACION, patron.valor, linea, hijos)
+
+    # --- Expresiones -----------------------------------------------------
+
+    def expresion(self, minima=_ASIGNACION):
+        self._entrar()
+        nodo = self._binarios(self._unaria(), minima)
+        self.profundidad -= 1
+        return nodo
+
+    def _inicia_expresion(self):
+        tipo, texto = self.actual[0], self.actual[1]
+        if texto is None:
+            return False
+        if tipo == IDENTIFICADOR or tipo == PALABRA_CLAVE:
+            return texto not in _NO_EXPRESION
+        if tipo in _LITERALES or tipo == MACRO or tipo == CADENA_ABIERTA:
+            return True
+        if tipo == TIEMPO_VIDA:
+            return self.proximo[1] == ':'
+        if texto == '{':
+            return not self.sin_estructura
+        return texto in _OPERADORES_INICIALES
+
+    def _binarios(self, izquierda, minima):
+        while True:
+            texto = self.actual[1]
+            precedencia = PRECEDENCIA.get(texto)
+            if precedencia is None or precedencia < minima:
+                return izquierda
+            linea = self._avanzar()[2]
+            if precedencia == 12:
+                izquierda = NodoArbol(CONVERSION, self._tipo().valor, linea, [izquierda])
+            elif precedencia == _RANGO:
+                if self._inicia_expresion():
+                    derecha = self.expresion(_RANGO + 1)
+                else:
+                    derecha = NodoArbol(VACIO, None, linea)
+                izquierda = NodoArbol(RANGO, texto, linea, [izquierda, derecha])
+            elif precedencia == _ASIGNACION:
+                izquierda = NodoArbol(ASIGNACION, texto, linea, [izquierda, self.expresion(_ASIGNACION)])
+            else:
+                izquierda = NodoArbol(BINARIA, texto, linea, [izquierda, self.expresion(precedencia + 1)])
+                if precedencia == 5 and self.actual[1] in COMPARACIONES:
+                    self._error("Los operadores de comparación no se pueden encadenar", self.actual[2])
+
+    def _unaria(self):
+        texto, linea = self.actual[1], self.actual[2]
+        if texto == '-' or texto == '!' or texto == '*':
+            self._avanzar()
+            return NodoArbol(UNARIA, texto, linea, [self.expresion(_UNARIA)])
+        if texto == '&' or texto == '&&':
+            self._avanzar()
+            operador = '&'
+            if self.actual[1] == 'mut':
+                self._avanzar()
+                operador = '&mut'
+            nodo = NodoArbol(UNARIA, operador, linea, [self.expresion(_UNARIA)])
+            if texto == '&&':
+                nodo = NodoArbol(UNARIA, '&', linea, [nodo])
+            return nodo
+        return self._postfijos(self._primaria())
+
+    def _postfijos(self, nodo):
+        while True:
+            texto = self.actual[1]
+            if texto == '.':
+                self._avanzar()
+                tipo, nombre, linea = self.actual[0], self.actual[1], self.actual[2]
+                if tipo == NUMERO:
+                    self._avanzar()
+                else:
+                    nombre = self._palabra("un campo o un método")
+                if self.actual[1] == '::':
+                    self._avanzar()
+                    nombre += '::' + self._texto_genericos()
+                if self.actual[1] == '(':
+                    self._avanzar()
+                    argumentos = self._argumentos(')')
+                    nodo = NodoArbol(METODO, nombre, linea, [nodo] + argumentos)
+                else:
+                    nodo = NodoArbol(ACCESO, nombre, linea, [nodo])
+            elif texto == '(':
+                self._avanzar()
+                nodo = NodoArbol(LLAMADA, None, nodo.linea, [nodo] + self._argumentos(')'))
+            elif texto == '[':
+                linea = self._avanzar()[2]
+                indice = self._argumentos(']')
+                if len(indice) != 1:
+                    raise self._error("Se esperaba un índice", linea)
+                nodo = NodoArbol(INDICE, None, nodo.linea, [nodo, indice[0]])
+            elif texto == '?':
+                self._avanzar()
+                nodo = NodoArbol(PROPAGACION, None, nodo.linea, [nodo])
+            else:
+                return nodo
+
+    def _argumentos(self, cierre):
+        # Expresiones separadas por comas hasta cierre (se consume)
+        anterior = self.sin_estructura
+        self.sin_estructura = False
+        argumentos = self._lista(cierre, self.expresion)
+        self._avanzar()
+        self.sin_estructura = anterior
+        return argumentos
+
+    def _primaria(self):
+        tipo, texto, linea = self.actual[0], self.actual[1], self.actual[2]
+        if tipo == IDENTIFICADOR or tipo == PALABRA_CLAVE:
+            metodo = self._PRIMARIAS.get(texto)
+            if metodo is not None:
+                nodo = metodo(self)
+                if nodo is not None:
+                    return nodo
+            elif texto not in _NO_EXPRESION:
+                if self.proximo[1] == '::':
+                    return self._ruta_o_estructura()
+                # Nombre suelto, el caso más común
+                self._avanzar()
+                if self.actual[1] == '{' and not self.sin_estructura:
+                    return self._literal_estructura(texto, linea)
+                return NodoArbol(VARIABLE, texto, linea)
+            raise self._esperado("una expresión")
+        literal = _LITERALES.get(tipo)
+        if literal is not None:
+            self._avanzar()
+            return NodoArbol(literal, texto, linea)
+        if tipo == CADENA_ABIERTA:
+            raise self._error("Cadena sin cerrar", linea)
+        if tipo == MACRO:
+            return self._macro()
+        if tipo == TIEMPO_VIDA and self.proximo[1] == ':':
+            self._avanzar()
+            self._avanzar()
+            return self._con_etiqueta(texto)
+        if texto == '(':
+            return self._parentesis()
+        if texto == '[':
+            return self._arreglo()
+        if texto == '{':
+            return self.bloque()
+        if texto == '|' or texto == '||':
+            return self._clausura()
+        if texto == '..' or texto == '..=':
+            self._avanzar()
+            fin = self.expresion(_RANGO + 1) if self._inicia_expresion() else NodoArbol(VACIO, None, linea)
+            return NodoArbol(RANGO, texto, linea, [NodoArbol(VACIO, None, linea), fin])
+        if texto == '<' or texto == '::':
+            return self._ruta_o_estructura()
+        raise self._esperado("una expresión")
+
+    def _ruta_o_estructura(self):
+        linea = self.actual[2]
+        ruta, simple = self._ruta_expresion()
+        if self.actual[1] == '{' and not self.sin_estructura:
+            return self._literal_estructura(ruta, linea)
+        return NodoArbol(VARIABLE if simple else RUTA, ruta, linea)
+
+    def _ruta_expresion(self):
+        # (texto de la ruta, si es un nombre suelto)
+        if self.actual[1] == '<':
+            inicio = self._grabar()
+            self._avanzar()
+            self._tipo_interno()
+            if self.actual[1] == 'as':
+                self._avanzar()
+                self._tipo_interno()
+            self._cerrar_angulo()
+            while self.actual[1] == '::':
+                self._avanzar()
+                if self.actual[1] == '<':
+                    self._argumentos_genericos()
+                else:
+                    self._palabra()
+            return self._texto_grabado(inicio), False
+        partes = []
+        if self.actual[1] == '::':
+            self._avanzar()
+            partes.append('')
+        partes.append(self._palabra("una expresión"))
+        simple = len(partes) == 1
+        while self.actual[1] == '::':
+            self._avanzar()
+            simple = False
+            if self.actual[1] == '<':
+                partes[-1] += '::' + self._texto_genericos()
+            else:
+                partes.append(self._palabra())
+        return '::'.join(partes), simple
+
+    def _literal_estructura(self, ruta, linea):
+        self._avanzar()
+        anterior = self.sin_estructura
+        self.sin_estructura = False
+        hijos = self._lista('}', self._campo_literal)
+        self._avanzar()
+        self.sin_estructura = anterior
+        return NodoArbol(LITERAL_ESTRUCTURA, ruta, linea, hijos)
+
+    def _campo_literal(self):
+        linea = self.actual[2]
+        if self.actual[1] == '..':
+            self._avanzar()
+            return NodoArbol(BASE, None, linea, [self.expresion()])
+        tipo, nombre = self.actual[0], self.actual[1]
+        if tipo == NUMERO:
+            self._avanzar()
+        else:
+            nombre = self._palabra("el nombre de un campo")
+        if self.actual[1] != ':':
+            return NodoArbol(CAMPO, nombre, linea, [NodoArbol(VARIABLE, nombre, linea)])
+        self._avanzar()
+        return NodoArbol(CAMPO, nombre, linea, [self.expresion()])
+
+    def _parentesis(self):
+        linea = self._avanzar()[2]
+        anterior = self.sin_estructura
+        self.sin_estructura = False
+        elementos = self._lista(')', self.expresion)
+        coma = self.anterior[1] == ','
+        self._avanzar()
+        self.sin_estructura = anterior
+        if len(elementos) == 1 and not coma:
+            return elementos[0]
+        return NodoArbol(TUPLA, None, linea, elementos)
+
+    def _arreglo(self):
+        linea = self._avanzar()[2]
+        anterior = self.sin_estructura
+        self.sin_estructura = False
+        if self.actual[1] == ']':
+            self._avanzar()
+            self.sin_estructura = anterior
+            return NodoArbol(ARREGLO, None, linea, [])
+        primero = self.expresion()
+        if self.actual[1] == ';':
+            self._avanzar()
+            nodo = NodoArbol(REPETICION, None, linea, [primero, self.expresion()])
+            self._esperar(']')
+        else:
+            elementos = [primero]
+            if self.actual[1] == ',':
+                self._avanzar()
+                elementos += self._lista(']', self.expresion)
+            self._esperar(']')
+            nodo = NodoArbol(ARREGLO, None, linea, elementos)
+        self.sin_estructura = anterior
+        return nodo
+
+    def _macro(self):
+        nombre, linea = self.actual[1], self.actual[2]
+        self._avanzar()
+        cierre = _CIERRES.get(self.actual[1])
+        if cierre is None:
+            raise self._esperado("'(', '[' o '{'")
+        if nombre[:-1] not in MACROS_EXPRESION:
+            inicio = self._grabar()
+            self._arbol_tokens()
+            return NodoArbol(INVOCACION_MACRO, nombre, linea, [NodoArbol(TOKENS, self._texto_grabado(inicio), linea)])
+        self._avanzar()
+        anterior = self.sin_estructura
+        self.sin_estructura = False
+        primero = [True]
+        # println!(x) imprime el valor con el texto de la expresión; el
+        # argumento guarda ese texto
+        suelto = nombre in MACROS_IMPRESION and self.actual[0] != CADENA
+
+        def argumento():
+            if not primero[0]:
+                return self.expresion()
+            primero[0] = False
+            if suelto:
+                inicio = self._grabar()
+                nodo = self.expresion()
+                return NodoArbol(ARGUMENTO, self._texto_grabado(inicio), nodo.linea, [nodo])
+            nodo = self.expresion()
+            if self.actual[1] == ';':
+                self._avanzar()
+                nodo = NodoArbol(REPETICION, None, nodo.linea, [nodo, self.expresion()])
+            return nodo
+
+        argumentos = self._lista(cierre, argumento)
+        self._avanzar()
+        self.sin_estructura = anterior
+        return NodoArbol(INVOCACION_MACRO, nombre, linea, argumentos)
+
+    def _clausura(self):
+        linea = self.actual[2]
+        valor = None
+        if self.actual[1] == 'move':
+            self._avanzar()
+            valor = 'move'
+        if self.actual[1] == '||':
+            self._avanzar()
+            hijos = []
+        else:
+            self._esperar('|')
+            hijos = self._lista('|', self._parametro_clausura)
+            self._avanzar()
+        if self.actual[1] == '->':
+            self._avanzar()
+            hijos.append(self._tipo(TIPO_RETORNO))
+            hijos.append(self.bloque())
+        else:
+            hijos.append(self.expresion())
+        return NodoArbol(CLAUSURA, valor, linea, hijos)
+
+    def _parametro_clausura(self):
+        linea = self.actual[2]
+        patron = self._patron(False)
+        hijos = [patron]
+        if self.actual[1] == ':':
+            self._avanzar()
+            hijos.append(self._tipo())
+        return NodoArbol(PARAMETRO, patron.valor, linea, hijos)
+
+    def _con_etiqueta(self, etiqueta):
+        texto = self.actual[1]
+        if texto == '{':
+            return self.bloque(etiqueta)
+        if texto == 'loop':
+            return self._bucle(etiqueta)
+        if texto == 'while':
+            return self._mientras(etiqueta)
+        if texto == 'for':
+            return self._para(etiqueta)
+        raise self._esperado("un bucle o un bloque")
+
+    def _condicion(self):
+        anterior = self.sin_estructura
+        self.sin_estructura = True
+        condicion = self.expresion()
+        self.sin_estructura = anterior
+        return condicion
+
+    def _si(self):
+        linea = self._avanzar()[2]
+        raiz = nodo = NodoArbol(SI, None, linea, [self._condicion(), self.bloque()])
+        while self.actual[1] == 'else':
+            self._avanzar()
+            if self.actual[1] != 'if':
+                nodo.hijos.append(self.bloque())
+                break
+            linea = self._avanzar()[2]
+            siguiente = NodoArbol(SI, None, linea, [self._condicion(), self.bloque()])
+            nodo.hijos.append(siguiente)
+            nodo = siguiente
+        return raiz
+
+    def _condicion_let(self):
+        # 'let' solo es una expresión en la condición de if y while
+        if not self.sin_estructura:
+            return None
+        linea = self._avanzar()[2]
+        patron = self._patron()
+        self._esperar('=')
+        return NodoArbol(CONDICION_LET, None, linea, [patron, self.expresion(_ESCRUTINIO)])
+
+    def _mientras(self, etiqueta=None):
+        linea = self._avanzar()[2]
+        condicion = self._condicion()
+        return NodoArbol(MIENTRAS, etiqueta, linea, [condicion, self.bloque()])
+
+    def _bucle(self, etiqueta=None):
+        linea = self._avanzar()[2]
+        return NodoArbol(BUCLE, etiqueta, linea, [self.bloque()])
+
+    def _para(self, etiqueta=None):
+        linea = self._avanzar()[2]
+        patron = self._patron()
+        self._esperar('in')
+        iterable = self._condicion()
+        return NodoArbol(PARA, etiqueta, linea, [patron, iterable, self.bloque()])
+
+    def _match(self):
+        linea = self._avanzar()[2]
+        nodo = NodoArbol(MATCH, None, linea, [self._condicion()])
+        self._esperar('{')
+        anterior = self.sin_estructura
+        self.sin_estructura = False
+        brazos = nodo.hijos
+        while self.actual[1] != '}':
+            if self.actual[1] is None:
+                raise self._esperado("'}'")
+            estado = self._estado()
+            errores = len(self.errores)
+            try:
+                brazos.append(self._brazo())
+            except _Panico:
+                self._recuperar(estado, errores, brazos)
+                self._sincronizar_grupo('}')
+                if self.actual[1] == ',':
+                    self._avanzar()
+                elif self.actual[1] != '}':
+                    raise self._esperado("',' o '}'")
+        self._avanzar()
+        self.sin_estructura = anterior
+        return nodo
+
+    def _brazo(self):
+        self._atributos()
+        linea = self.actual[2]
+        patron = self._patron()
+        hijos = [patron]
+        if self.actual[1] == 'if':
+            guarda = self._avanzar()[2]
+            hijos.append(NodoArbol(GUARDA, None, guarda, [self.expresion()]))
+        self._esperar('=>')
+        cuerpo = self.expresion()
+        hijos.append(cuerpo)
+        if self.actual[1] == ',':
+            self._avanzar()
+        elif self.actual[1] != '}' and not (cuerpo.tipo in TIPOS_BLOQUE and self.anterior[1] == '}'):
+            raise self._esperado("','")
+        return NodoArbol(BRAZO, patron.valor, linea, hijos)
+
+    def _retorno(self):
+        linea = self._avanzar()[2]
+        return NodoArbol(RETORNO, None, linea, [self.expresion()] if self._inicia_expresion() else ())
+
+    def _salto(self):
+        # break y continue, con etiqueta opcional; break puede llevar valor
+        tipo = BREAK if self.actual[1] == 'break' else CONTINUE
+        linea = self._avanzar()[2]
+        etiqueta = None
+        if self.actual[0] == TIEMPO_VIDA:
+            etiqueta = self._avanzar()[1]
+        hijos = ()
+        if tipo == BREAK and self._inicia_expresion():
+            hijos = [self.expresion()]
+        return NodoArbol(tipo, etiqueta, linea, hijos)
+
+    def _booleano(self):
+        token = self._avanzar()
+        return NodoArbol(LITERAL_BOOLEANO, token[1], token[2])
+
+    def _prefijo_bloque(self):
+        # unsafe { } y async [move] { }; si no sigue un bloque no es una
+        # expresión
+        linea = self.actual[2]
+        valor = self._avanzar()[1]
+        if self.actual[1] == 'move':
+            self._avanzar()
+        if self.actual[1] != '{':
+            if valor == 'async' and self.actual[1] in ('|', '||'):
+                return self._clausura()
+            raise self._esperado("'{'")
+        nodo = self.bloque(valor)
+        nodo.linea = linea
+        return nodo
+
+    _PRIMARIAS = {
+        'if': _si, 'match': _match, 'while': _mientras, 'loop': _bucle, 'for': _para,
+        'return': _retorno, 'break': _salto, 'continue': _salto, 'move': _clausura,
+        'unsafe': _prefijo_bloque, 'async': _prefijo_bloque, 'let': _condicion_let,
+        'true': _booleano, 'false': _booleano,
+    }
+
+    # --- Tipos -----------------------------------------------------------
+
+    def _tipo(self, clase=TIPO):
+        linea = self.actual[2]
+        inicio = self._grabar()
+        self._tipo_interno()
+        return NodoArbol(clase, self._texto_grabado(inicio), linea)
+
+    def _tipo_interno(self):
+        self._entrar()
+        tipo, texto = self.actual[0], self.actual[1]
+        if texto == '&' or texto == '&&':
+            self._avanzar()
+            if self.actual[0] == TIEMPO_VIDA:
+                self._avanzar()
+            if self.actual[1] == 'mut':
+                self._avanzar()
+            self._tipo_interno()
+        elif texto == '*':
+            self._avanzar()
+            if self.actual[1] in ('const', 'mut'):
+                self._avanzar()
+            self._tipo_interno()
+        elif texto == '(':
+            self._avanzar()
+            while self.actual[1] != ')':
+                self._tipo_interno()
+                if self.actual[1] != ',':
+                    break
+                self._avanzar()
+            self._esperar(')')
+        elif texto == '[':
+            self._avanzar()
+            self._tipo_interno()
+            if self.actual[1] == ';':
+                self._avanzar()
+                anterior = self.sin_estructura
+                self.sin_estructura = False
+                self.expresion()
+                self.sin_estructura = anterior
+            self._esperar(']')
+        elif texto == '!' or texto == '_':
+            self._avanzar()
+        elif texto == 'impl' or texto == 'dyn':
+            self._avanzar()
+            self._cotas()
+        elif texto in ('fn', 'unsafe', 'extern'):
+            if self.actual[1] == 'unsafe':
+                self._avanzar()
+            if self.actual[1] == 'extern':
+                self._avanzar()
+                if self.actual[0] == CADENA:
+                    self._avanzar()
+            self._esperar('fn')
+            self._parametros_tipo()
+        elif tipo == TIEMPO_VIDA:
+            self._avanzar()
+        elif texto == '<' or texto == '::' or tipo == IDENTIFICADOR or tipo == PALABRA_CLAVE:
+            if texto == 'for':
+                self._avanzar()
+                self._parametros_genericos()
+                self._tipo_interno()
+            else:
+                self._ruta_tipo()
+        else:
+            raise self._esperado("un tipo")
+        self.profundidad -= 1
+
+    def _parametros_tipo(self):
+        # (A, B) -> C de los tipos de funciones y de Fn(A, B) -> C
+        self._esperar('(')
+        while self.actual[1] != ')':
+            self._tipo_interno()
+            if self.actual[1] == ':':
+                self._avanzar()
+                self._tipo_interno()
+            if self.actual[1] != ',':
+                break
+            self._avanzar()
+        self._esperar(')')
+        if self.actual[1] == '->':
+            self._avanzar()
+            self._tipo_interno()
+
+    def _ruta_tipo(self):
+        if self.actual[1] == '<':
+            self._avanzar()
+            self._tipo_interno()
+            if self.actual[1] == 'as':
+                self._avanzar()
+                self._tipo_interno()
+            self._cerrar_angulo()
+            self._esperar('::')
+        elif self.actual[1] == '::':
+            self._avanzar()
+        while True:
+            self._palabra("un tipo")
+            texto = self.actual[1]
+            if texto == '<':
+                self._argumentos_genericos()
+            elif texto == '::' and self.proximo[1] == '<':
+                self._avanzar()
+                self._argumentos_genericos()
+            elif texto == '(':
+                self._parametros_tipo()
+            if self.actual[1] != '::':
+                return
+            self._avanzar()
+
+    def _argumentos_genericos(self):
+        self._avanzar()
+        while not self._cierra_angulo():
+            tipo, texto = self.actual[0], self.actual[1]
+            if tipo == TIEMPO_VIDA:
+                self._avanzar()
+            elif texto == '{':
+                self.bloque()
+            elif tipo in _LITERALES or texto in ('-', 'true', 'false'):
+                self.expresion(_UNARIA)
+            else:
+                self._tipo_interno()
+                if self.actual[1] == '=':
+                    self._avanzar()
+                    self._tipo_interno()
+                elif self.actual[1] == ':':
+                    self._avanzar()
+                    self._cotas()
+            if self.actual[1] != ',':
+                break
+            self._avanzar()
+        self._cerrar_angulo()
+
+    def _texto_genericos(self):
+        inicio = self._grabar()
+        if self.actual[1] != '<':
+            self._texto_grabado(inicio)
+            raise self._esperado("'<'")
+        self._argumentos_genericos()
+        return self._texto_grabado(inicio)
+
+    # --- Patrones --------------------------------------------------------
+
+    def _patron(self, alternativas=True):
+        # Ligadura si el patrón es un nombre suelto, el literal si es un
+        # literal; si no, un Patrón con su texto y sus ligaduras
+        self._entrar()
+        linea = self.actual[2]
+        inicio = self._grabar()
+        ligaduras = []
+        if alternativas and self.actual[1] == '|':
+            self._avanzar()
+        nodo = self._patron_uno(ligaduras)
+        while alternativas and self.actual[1] == '|':
+            self._avanzar()
+            nodo = None
+            self._patron_uno(ligaduras)
+        texto = self._texto_grabado(inicio)
+        self.profundidad -= 1
+        if nodo is not None:
+            return nodo
+        return NodoArbol(PATRON, texto, linea, ligaduras)
+
+    def _patron_interno(self, ligaduras):
+        # Patrón tras '&', 'box' o '@': sin alternativas, que solo van
+        # entre delimitadores
+        self._entrar()
+        self._patron_uno(ligaduras)
+        self.profundidad -= 1
+
+    def _patron_anidado(self, ligaduras):
+        self._entrar()
+        self._patron_uno(ligaduras)
+        while self.actual[1] == '|':
+            self._avanzar()
+            self._patron_uno(ligaduras)
+        self.profundidad -= 1
+
+    def _patrones(self, cierre, ligaduras):
+        while self.actual[1] != cierre:
+            self._patron_anidado(ligaduras)
+            if self.actual[1] != ',':
+                break
+            self._avanzar()
+        self._esperar(cierre)
+
+    def _patron_uno(self, ligaduras):
+        # Devuelve el nodo si el patrón es simple, None si es compuesto
+        tipo, texto, linea = self.actual[0], self.actual[1], self.actual[2]
+        if texto == '&' or texto == '&&':
+            self._avanzar()
+            if self.actual[1] == 'mut':
+                self._avanzar()
+            self._patron_interno(ligaduras)
+            return None
+        if texto == '(' or texto == '[':
+            self._avanzar()
+            self._patrones(_CIERRES[texto], ligaduras)
+            return None
+        if texto == '..' or texto == '..=':
+            self._avanzar()
+            if self.actual[1] == '-' or self.actual[0] in _LITERALES:
+                self._patron_literal()
+            return None
+        if texto == '-' or tipo in _LITERALES or texto == 'true' or texto == 'false':
+            nodo = self._patron_literal()
+            if self._rango_patron():
+                return None
+            return nodo
+        if texto == 'ref' or texto == 'mut' or texto == 'box':
+            while self.actual[1] in ('ref', 'mut', 'box'):
+                self._avanzar()
+            if texto == 'box':
+                self._patron_interno(ligaduras)
+                return None
+            nodo = NodoArbol(LIGADURA, self._palabra("un patrón"), linea)
+            ligaduras.append(nodo)
+            return self._subpatron(nodo, ligaduras)
+        if tipo == IDENTIFICADOR or tipo == PALABRA_CLAVE or texto == '::' or texto == '<':
+            ruta, simple = self._ruta_expresion()
+            siguiente = self.actual[1]
+            if siguiente == '(':
+                self._avanzar()
+                self._patrones(')', ligaduras)
+                return None
+            if siguiente == '{':
+                self._avanzar()
+                self._campos_patron(ligaduras)
+                return None
+            if simple and _es_ligadura(ruta):
+                nodo = NodoArbol(LIGADURA, ruta, linea)
+                ligaduras.append(nodo)
+                return self._subpatron(nodo, ligaduras)
+            if self._rango_patron():
+                return None
+            return NodoArbol(PATRON, ruta, linea)
+        raise self._esperado("un patrón")
+
+    def _subpatron(self, nodo, ligaduras):
+        # nombre @ patrón
+        if self.actual[1] != '@':
+            return nodo
+        self._avanzar()
+        self._patron_interno(ligaduras)
+        return None
+
+    def _rango_patron(self):
+        if self.actual[1] not in ('..=', '...', '..'):
+            return False
+        self._avanzar()
+        tipo, texto = self.actual[0], self.actual[1]
+        if texto == '-' or tipo in _LITERALES:
+            self._patron_literal()
+        elif tipo == IDENTIFICADOR or texto == '::':
+            self._ruta_expresion()
+        return True
+
+    def _patron_literal(self):
+        linea = self.actual[2]
+        signo = ''
+        if self.actual[1] == '-':
+            self._avanzar()
+            signo = '-'
+        tipo, texto = self.actual[0], self.actual[1]
+        if tipo in _LITERALES:
+            self._avanzar()
+            return NodoArbol(_LITERALES[tipo], signo + texto, linea)
+        if not signo and texto in ('true', 'false'):
+            self._avanzar()
+            return NodoArbol(LITERAL_BOOLEANO, texto, linea)
+        raise self._esperado("un literal")
+
+    def _campos_patron(self, ligaduras):
+        while self.actual[1] != '}':
+            self._atributos()
+            if self.actual[1] == '..':
+                self._avanzar()
+            else:
+                while self.actual[1] in ('ref', 'mut', 'box'):
+                    self._avanzar()
+                linea = self.actual[2]
+                if self.actual[0] == NUMERO:
+                    nombre = self._avanzar()[1]
+                else:
+                    nombre = self._palabra("el nombre de un campo")
+                if self.actual[1] == ':':
+                    self._avanzar()
+                    self._patron_anidado(ligaduras)
+                else:
+                    ligaduras.append(NodoArbol(LIGADURA, nombre, linea))
+            if self.actual[1] != ',':
+                break
+            self._avanzar()
+        self._esperar('}')
+
+
+@contextmanager
+def recolector_en_pausa():
+    # El árbol no tiene ciclos: mientras se crean sus nodos el recolector de
+    # ciclos solo recorrería una y otra vez un montón que no para de crecer
+    # (en archivos grandes triplica el tiempo del parser). La pausa vale para
+    # todo el proceso, así que solo la usan los análisis por lotes
+    # (analisis_lotes, los procesos de analisis_paralelo), nunca la interfaz,
+    # el servidor ni el análisis en flujo
+    activo = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if activo:
+            gc.enable()
+
+
+@etapa('parser', 'árbol sintáctico')
+def construir_arbol(tokens):
+    # (raíz Programa con los elementos de nivel superior, errores)
+    parser = Parser(tokens)
+    raiz = NodoArbol(PROGRAMA, None, None, list(parser.elementos()))
+    return raiz, parser.errores
@@ -0,0 +1,405 @@
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+from motor_lexico import RUST_KEYWORDS, tokenizar, describir
+from analizador_sintactico import detectar_errores
+from analizador_semantico import detectar_errores_semanticos, VerificadorArbol
+from analisis_incremental import DocumentoIncremental
+from arbol_sintactico import construir_arbol
+from analisis_paralelo import analizar_paralelo, partes_archivo
+from tabla_tokens import TablaTokens
+from corpus_sintetico import FORMAS, generar_corpus
+
+# Banco de pruebas del analizador sobre el corpus sintético. Mide cada etapa
+# por separado, con la entrada de la etapa ya preparada fuera del tiempo
+# medido, y emite JSON para comparar entre commits:
+#
+#   python benchmark.py --tamanos 1000,10000,50000 --salida actual.json
+#   python benchmark.py --tamanos 1000,10000,50000 --comparar anterior.json
+#
+# Cada etapa informa el mejor tiempo de las repeticiones, tokens/s y el pico
+# de memoria (tracemalloc, en una pasada aparte para no distorsionar el
+# tiempo). "escalado" es la pendiente log-log del tiempo frente al tamaño:
+# 1 es lineal, 2 cuadrático. Las etapas con una referencia _regex (la
+# cascada de expresiones que reemplazaron) se informan también como cuántas
+# veces más rápidas que ella son.
+#
+# Con --procesos se mide además el análisis de cada caso como un solo
+# archivo repartido entre esa cantidad de procesos (analisis_paralelo), con
+# la aceleración respecto de la primera cantidad de la lista:
+#
+#   python benchmark.py --tamanos 50000 --etapas lexico --procesos 1,2,4,8
+
+
+def detectar_errores_regex(code):
+    # Referencia: el detect_errors anterior, una cascada de expresiones por
+    # línea más dos recorridos completos; se conserva solo para comparar
+    errors = []
+    lines = code.split('\n')
+    for line_num, line in enumerate(lines, 1):
+        if re.search(r'\bfn\b\s+\w+\s*\(', line) and not re.search(r'\)', line):
+            errors.append((line_num, "Error de sintaxis", "Falta el paréntesis de cierre en la declaración de la función"))
+        elif re.search(r'\blet\b\s+\w+\s*=', line) and not re.search(r';\s*$', line.strip()):
+            errors.append((line_num, "Error de sintaxis", "Falta el punto y coma al final de la declaración de la variable"))
+        elif re.search(r'\bif\b\s*\(.*\)', line) and not re.search(r'\{', line):
+            errors.append((line_num, "Error de sintaxis", "Falta la llave de apertura en la declaración del condicional if"))
+        elif re.search(r'\belse\b', line) and not re.search(r'\{', line):
+            errors.append((line_num, "Error de sintaxis", "Falta la llave de apertura en la declaración del condicional else"))
+        elif re.search(r'\bfor\b\s+\w+\s+in\s+.*\{', line) and not re.search(r'\}', line):
+            errors.append((line_num, "Error de sintaxis", "Falta la llave de cierre en la declaración del bucle for"))
+        elif re.search(r'\bwhile\b\s*\(.*\)\s*\{', line) and not re.search(r'\}', line):
+            errors.append((line_num, "Error de sintaxis", "Falta la llave de cierre en la declaración del bucle while"))
+        elif re.search(r'\breturn\b\s+.*', line) and not re.search(r';\s*$', line.strip()):
+            errors.append((line_num, "Error de sintaxis", "Falta el punto y coma al final de la declaración de retorno"))
+        elif re.search(r'\bstruct\b\s+\w+\s*\{', line) and not re.search(r'\}', line):
+            errors.append((line_num, "Error de sintaxis", "Falta la llave de cierre en la declaración de la estructura"))
+        elif re.search(r'\bimpl\b\s+\w+\s*\{', line) and not re.search(r'\}', line):
+            errors.append((line_num, "Error de sintaxis", "Falta la llave de cierre en la implementación"))
+        elif re.search(r'\bmatch\b\s*\(.*\)', line) and not re.search(r'\{', line):
+            errors.append((line_num, "Error de sintaxis", "Falta la llave de apertura en la declaración de match"))
+        elif re.search(r'\bloop\b\s*\{', line) and not re.search(r'\}', line):
+            errors.append((line_num, "Error de sintaxis", "Falta la llave de cierre en la declaración de loop"))
+        elif re.search(r'\bmod\b\s+\w+\s*;', line) and not re.search(r';', line):
+            errors.append((line_num, "Error de sintaxis", "Falta el punto y coma al final de la declaración del módulo"))
+    open_parentheses = 0
+    open_braces = 0
+    for line_num, line in enumerate(lines, 1):
+        open_parentheses += line.count('(') - line.count(')')
+        open_braces += line.count('{') - line.count('}')
+        if open_parentheses < 0:
+            errors.append((line_num, "Error de sintaxis", "Paréntesis de cierre sin paréntesis de apertura"))
+            open_parentheses = 0
+        if open_braces < 0:
+            errors.append((line_num, "Error de sintaxis", "Llave de cierre sin llave de apertura"))
+            open_braces = 0
+    if open_parentheses > 0:
+        errors.append((line_num, "Error de sintaxis", "Paréntesis de apertura sin paréntesis de cierre"))
+    if open_braces > 0:
+        errors.append((line_num, "Error de sintaxis", "Llave de apertura sin llave de cierre"))
+    for line_num, line in enumerate(lines, 1):
+        if not re.search(r'\b(fn|struct|impl|if|else|for|while|loop|match)\b', line) and line.strip() and not line.strip().endswith(';') and not line.strip().endswith('{') and not line.strip().endswith('}'):
+            errors.append((line_num, "Error de sintaxis", "Falta el punto y coma al final de la línea"))
+    return errors
+
+
+def detectar_errores_semanticos_regex(code, palabras_clave=RUST_KEYWORDS):
+    # Referencia: el detect_semantic_errors anterior, que vuelve a tokenizar
+    # cada línea y solo conoce un conjunto plano de variables let mut
+    errors = []
+    lines = code.split('\n')
+    declared_variables = set()
+    for line_num, line in enumerate(lines, 1):
+        if match := re.search(r'\blet\b\s+mut\s+(\w+)', line):
+            variable_name = match.group(1)
+            if variable_name in declared_variables:
+                errors.append((line_num, "Error semántico", f"Variable '{variable_name}' ya declarada"))
+            else:
+                declared_variables.add(variable_name)
+        tokens = [texto for _, texto, _, _, _ in tokenizar(line, incluir_comentarios=False)]
+        for token in tokens:
+            if re.match(r'^[a-zA-Z_]\w*$', token) and token not in declared_variables and token not in palabras_clave and token != "main" and token != "i32" and token != "println":
+                errors.append((line_num, "Error semántico", f"Variable '{token}' no declarada"))
+    return errors
+
+
+# --- Etapas ---------------------------------------------------------------
+# Cada etapa recibe el caso preparado y devuelve algo que se descarta; lo que
+# necesita de etapas anteriores se calcula una vez en preparar_caso.
+
+def _etapa_lexico(caso):
+    # tokenizar + describir: tokens y su (Tipo, Descripción)
+    for tipo, texto, _, _, _ in tokenizar(caso['code'], incluir_comentarios=False):
+        describir(tipo, texto)
+
+
+def _etapa_lexico_incremental(caso):
+    # Primera pasada del documento incremental con la caché vacía
+    DocumentoIncremental().actualizar(caso['code'])
+
+
+def _etapa_detect_errors(caso):
+    return detectar_errores(caso['tokens'])
+
+
+def _etapa_detect_errors_regex(caso):
+    return detectar_errores_regex(caso['code'])
+
+
+def _etapa_detect_semantic_errors(caso):
+    return detectar_errores_semanticos(caso['code'], tokens=caso['tokens'])
+
+
+def _etapa_detect_semantic_errors_regex(caso):
+    return detectar_errores_semanticos_regex(caso['code'])
+
+
+def _etapa_verificar_arbol(caso):
+    # Verificaciones semánticas sobre el árbol ya armado (cantidad de
+    # argumentos, break y continue fuera de un bucle)
+    estructura = VerificadorArbol()
+    for nodo in caso['elementos']:
+        estructura.elemento(nodo)
+    return estructura.terminar()
+
+
+def _etapa_arbol(caso):
+    # Árbol sintáctico completo del parser
+    return construir_arbol(caso['tokens'])
+
+
+def _etapa_tabla(caso):
+    # Tabla columnar y decodificación de todas sus filas
+    tabla = TablaTokens.desde_tokens(caso['code'], caso['tokens'])
+    for _ in tabla.filas():
+        pass
+    return tabla
+
+
+ETAPAS = {
+    'lexico': _etapa_lexico,
+    'lexico_incremental': _etapa_lexico_incremental,
+    'detect_errors': _etapa_detect_errors,
+    'detect_errors_regex': _etapa_detect_errors_regex,
+    'detect_semantic_errors': _etapa_detect_semantic_errors,
+    'detect_semantic_errors_regex': _etapa_detect_semantic_errors_regex,
+    'verificar_arbol': _etapa_verificar_arbol,
+    'arbol': _etapa_arbol,
+    'tabla': _etapa_tabla,
+}
+
+
+def preparar_caso(forma, lineas, semilla=0):
+    code = generar_corpus(forma, lineas, semilla)
+    tokens = list(tokenizar(code, incluir_comentarios=False))
+    documento = DocumentoIncremental()
+    documento.actualizar(code)
+    raiz, _ = construir_arbol(tokens)
+    return {
+        'forma': forma,
+        'code': code,
+        'tokens': tokens,
+        'documento': documento,
+        'elementos': raiz.hijos,
+    }
+
+
+def medir_etapa(etapa, caso, repeticiones=3, memoria=True):
+    tiempos = []
+    for _ in range(repeticiones):
+        gc.collect()
+        inicio = time.perf_counter()
+        etapa(caso)
+        tiempos.append(time.perf_counter() - inicio)
+    resultado = {
+        'segundos': min(tiempos),
+        'segundos_mediana': sorted(tiempos)[len(tiempos) // 2],
+    }
+    resultado['tokens_por_segundo'] = len(caso['tokens']) / resultado['segundos'] if resultado['segundos'] else None
+    if memoria:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            etapa(caso)
+            resultado['pico_memoria_bytes'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return resultado
+
+
+def medir_paralelo(caso, procesos, repeticiones=3):
+    # Mejor tiempo de analizar_paralelo con cada cantidad de procesos; el
+    # arranque de los procesos queda fuera (una pasada de calentamiento)
+    tamano = len(caso['code'].encode('utf-8'))
+    medidas = {}
+    base = None
+    for cantidad in procesos:
+        ejecutor = ProcessPoolExecutor(max_workers=cantidad) if cantidad > 1 else None
+        partes = partes_archivo(tamano, cantidad)
+        try:
+            if ejecutor is not None:
+                analizar_paralelo(caso['code'], ejecutor, partes)
+            tiempos = []
+            for _ in range(repeticiones):
+                gc.collect()
+                inicio = time.perf_counter()
+                analizar_paralelo(caso['code'], ejecutor, partes)
+                tiempos.append(time.perf_counter() - inicio)
+        finally:
+            if ejecutor is not None:
+                ejecutor.shutdown()
+        segundos = min(tiempos)
+        if base is None:
+            base = segundos
+        medidas[str(cantidad)] = {
+            'segundos': segundos,
+            'partes': partes,
+            'aceleracion': base / segundos if segundos else None,
+        }
+    return medidas
+
+
+def pendiente_loglog(puntos):
+    # Pendiente por mínimos cuadrados de log(segundos) frente a log(tokens)
+    puntos = [(math.log(x), math.log(y)) for x, y in puntos if x > 0 and y > 0]
+    if len(puntos) < 2:
+        return None
+    media_x = sum(x for x, _ in puntos) / len(puntos)
+    media_y = sum(y for _, y in puntos) / len(puntos)
+    varianza = sum((x - media_x) ** 2 for x, _ in puntos)
+    if not varianza:
+        return None
+    return sum((x - media_x) * (y - media_y) for x, y in puntos) / varianza
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ejecutar_benchmark(formas, tamanos, etapas, repeticiones=3, semilla=0, memoria=True, progreso=None,
+                       procesos=()):
+    resultados = []
+    for forma in formas:
+        for lineas in tamanos:
+            caso = preparar_caso(forma, lineas, semilla)
+            medidas = {}
+            for nombre in etapas:
+                if progreso is not None:
+                    progreso(f"{forma} · {lineas} líneas · {nombre}")
+                medidas[nombre] = medir_etapa(ETAPAS[nombre], caso, repeticiones, memoria)
+            resultado = {
+                'forma': forma,
+                'lineas': lineas,
+                'bytes': len(caso['code'].encode('utf-8')),
+                'tokens': len(caso['tokens']),
+                'etapas': medidas,
+            }
+            if procesos:
+                if progreso is not None:
+                    progreso(f"{forma} · {lineas} líneas · paralelo")
+                resultado['paralelo'] = medir_paralelo(caso, procesos, repeticiones)
+            resultados.append(resultado)
+    escalado = {}
+    for forma in formas:
+        casos = [r for r in resultados if r['forma'] == forma]
+        escalado[forma] = {
+            nombre: pendiente_loglog([(r['tokens'], r['etapas'][nombre]['segundos']) for r in casos])
+            for nombre in etapas
+        }
+    return {
+        'meta': {
+            'commit': _commit_actual(),
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'semilla': semilla,
+            'repeticiones': repeticiones,
+            'nucleos': os.cpu_count(),
+        },
+        'resultados': resultados,
+        'escalado': escalado,
+    }
+
+
+def comparar(anterior, actual):
+    # Filas (forma, líneas, etapa, segundos antes, segundos ahora, cociente)
+    previos = {
+        (r['forma'], r['lineas'], nombre): medida['segundos']
+        for r in anterior['resultados'] for nombre, medida in r['etapas'].items()
+    }
+    filas = []
+    for r in actual['resultados']:
+        for nombre, medida in r['etapas'].items():
+            antes = previos.get((r['forma'], r['lineas'], nombre))
+            if antes:
+                filas.append((r['forma'], r['lineas'], nombre, antes, medida['segundos'], medida['segundos'] / antes))
+    return filas
+
+
+def frente_a_referencia(informe):
+    # Filas (forma, líneas, etapa, segundos, segundos de la referencia,
+    # aceleración) de las etapas medidas junto con su referencia _regex
+    filas = []
+    for r in informe['resultados']:
+        for nombre, medida in r['etapas'].items():
+            referencia = r['etapas'].get(nombre + '_regex')
+            if referencia is not None and medida['segundos']:
+                filas.append((r['forma'], r['lineas'], nombre, medida['segundos'], referencia['segundos'],
+                              referencia['segundos'] / medida['segundos']))
+    return filas
+
+
+def _lista(texto):
+    return [parte.strip() for parte in texto.split(',') if parte.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mide las etapas del analizador sobre código Rust sintético")
+    parser.add_argument('--formas', type=_lista, default=list(FORMAS), help="Formas del corpus, separadas por comas")
+    parser.add_argument('--tamanos', type=_lista, default=['1000', '5000', '20000'], help="Líneas por caso, separadas por comas")
+    parser.add_argument('--etapas', type=_lista, default=list(ETAPAS), help="Etapas a medir, separadas por comas")
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--sin-memoria', action='store_true', help="No medir el pico de memoria")
+    parser.add_argument('--salida', help="Archivo JSON de salida (por defecto, la salida estándar)")
+    parser.add_argument('--comparar', help="JSON de una ejecución anterior para comparar tiempos")
+    parser.add_argument('--procesos', type=_lista, default=[],
+                        help="Cantidades de procesos para medir el análisis repartido, separadas por comas")
+    args = parser.parse_args(argv)
+
+    for forma in args.formas:
+        if forma not in FORMAS:
+            parser.error(f"forma desconocida: {forma}")
+    for nombre in args.etapas:
+        if nombre not in ETAPAS:
+            parser.error(f"etapa desconocida: {nombre}")
+    tamanos = [int(tamano) for tamano in args.tamanos]
+    procesos = [int(cantidad) for cantidad in args.procesos]
+
+    informe = ejecutar_benchmark(
+        args.formas, tamanos, args.etapas, args.repeticiones, args.semilla,
+        memoria=not args.sin_memoria, progreso=lambda texto: print(texto, file=sys.stderr),
+        procesos=procesos)
+    texto = json.dumps(informe, ensure_ascii=False, indent=2)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as archivo:
+            archivo.write(texto + '\n')
+    else:
+        print(texto)
+
+    for forma, lineas, nombre, segundos, referencia, aceleracion in frente_a_referencia(informe):
+        marca = "  ⚠️" if aceleracion < 1 else ""
+        print(f"{forma:16} {lineas:>8} {nombre:24} {segundos:9.4f}s frente a {referencia:9.4f}s (regex)"
+              f"  ×{aceleracion:.2f}{marca}", file=sys.stderr)
+
+    for r in informe['resultados']:
+        for cantidad, medida in r.get('paralelo', {}).items():
+            print(f"{r['forma']:16} {r['lineas']:>8} {cantidad:>3} proceso(s) {medida['partes']:>3} parte(s)"
+                  f" {medida['segundos']:9.4f}s  ×{medida['aceleracion']:.2f}", file=sys.stderr)
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as archivo:
+            anterior = json.load(archivo)
+        for forma, lineas, nombre, antes, ahora, cociente in comparar(anterior, informe):
+            marca = "  ⚠️" if cociente > 1.1 else ""
+            print(f"{forma:16} {lineas:>8} {nombre:24} {antes:9.4f}s → {ahora:9.4f}s  ×{cociente:.2f}{marca}",
+                  file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
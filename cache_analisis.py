@@ -0,0 +1,310 @@
+import hashlib
+import json
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+
+from motor_lexico import RUST_KEYWORDS
+from tabla_tokens import TablaTokens
+from analisis_incremental import DocumentoIncremental
+from instrumentacion import etapa, contar
+
+# Caché en disco de resultados de análisis, direccionada por contenido: la
+# clave es un hash del texto fuente, de la versión de las reglas y de la
+# vista guardada, así que un archivo sin cambios se reconoce aunque se mueva
+# o se renombre. Cada entrada es un archivo binario comprimido con secciones
+# de arrays (los mismos que usan TablaTokens y DocumentoIncremental) que se
+# cargan sin volver a lexear ni a verificar.
+#
+# Vistas:
+#   'tabla'      TablaTokens sin comentarios y errores (modo por lotes)
+#   'documento'  registros por línea, estados de salida, filas visibles por
+#                línea y errores sintácticos y semánticos (interfaz)
+#
+# El tamaño total se limita desalojando las entradas usadas hace más tiempo
+# (la fecha de modificación se renueva en cada acierto). La carpeta se toma
+# de ANALIZADOR_CACHE; con ANALIZADOR_CACHE=0 la caché queda desactivada.
+
+# Subir al cambiar el léxico, las verificaciones o sus mensajes
+VERSION_REGLAS = 6
+
+VARIABLE_CACHE = 'ANALIZADOR_CACHE'
+LIMITE_BYTES = 512 << 20
+
+_MAGICO = b'ANCA'
+_VERSION_FORMATO = 1
+_ORDEN = b'<' if sys.byteorder == 'little' else b'>'
+_CABECERA = struct.Struct('<4sBcI')
+_LONGITUD = struct.Struct('<Q')
+
+VISTA_TABLA = 'tabla'
+VISTA_DOCUMENTO = 'documento'
+
+
+def carpeta_predeterminada():
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'analizador_rust')
+
+
+def clave_analisis(code, vista, palabras_clave=RUST_KEYWORDS):
+    resumen = hashlib.sha256()
+    resumen.update(f"{VERSION_REGLAS}\0{vista}\0{chr(1).join(sorted(palabras_clave))}\0".encode('utf-8'))
+    resumen.update(code.encode('utf-8', errors='surrogatepass'))
+    return resumen.hexdigest()
+
+
+class CacheAnalisis:
+    def __init__(self, carpeta=None, limite_bytes=LIMITE_BYTES):
+        self.carpeta = carpeta or carpeta_predeterminada()
+        self.limite_bytes = limite_bytes
+        # Estimación del tamaño total; se recalcula recorriendo la carpeta
+        # solo cuando supera el límite (varios procesos pueden escribir a la
+        # vez, así que el límite es aproximado)
+        self._total = None
+
+    @classmethod
+    def desde_entorno(cls, limite_bytes=LIMITE_BYTES):
+        # None si la caché está desactivada
+        carpeta = os.environ.get(VARIABLE_CACHE)
+        if carpeta is not None and carpeta.strip().lower() in ('', '0', 'no', 'off'):
+            return None
+        return cls(carpeta, limite_bytes)
+
+    def __getstate__(self):
+        # Se envía a los procesos del modo por lotes sin la estimación
+        return {'carpeta': self.carpeta, 'limite_bytes': self.limite_bytes, '_total': None}
+
+    def _ruta(self, clave):
+        return os.path.join(self.carpeta, clave + '.bin')
+
+    def leer(self, clave):
+        # Secciones de la entrada, o None si no está o no se puede leer
+        ruta = self._ruta(clave)
+        try:
+            with open(ruta, 'rb') as archivo:
+                datos = archivo.read()
+        except OSError:
+            contar('cache_fallos')
+            return None
+        try:
+            secciones = _desempaquetar(datos)
+        except (ValueError, struct.error, zlib.error):
+            # Entrada dañada o de otro formato: se descarta
+            self._borrar(ruta)
+            contar('cache_fallos')
+            return None
+        try:
+            os.utime(ruta)
+        except OSError:
+            pass
+        contar('cache_aciertos')
+        return secciones
+
+    def guardar(self, clave, secciones):
+        datos = _empaquetar(secciones)
+        try:
+            os.makedirs(self.carpeta, exist_ok=True)
+            descriptor, temporal = tempfile.mkstemp(dir=self.carpeta, suffix='.tmp')
+            try:
+                with os.fdopen(descriptor, 'wb') as archivo:
+                    archivo.write(datos)
+                os.replace(temporal, self._ruta(clave))
+            except BaseException:
+                self._borrar(temporal)
+                raise
+        except OSError:
+            return False
+        if self._total is None:
+            self._total = self._medir()[0]
+        else:
+            self._total += len(datos)
+        if self._total > self.limite_bytes:
+            self._desalojar()
+        return True
+
+    def _medir(self):
+        entradas = []
+        total = 0
+        try:
+            with os.scandir(self.carpeta) as iterador:
+                for entrada in iterador:
+                    if entrada.name.endswith('.bin'):
+                        try:
+                            estado = entrada.stat()
+                        except OSError:
+                            continue
+                        entradas.append((estado.st_mtime, estado.st_size, entrada.path))
+                        total += estado.st_size
+        except OSError:
+            pass
+        return total, entradas
+
+    def _desalojar(self):
+        # Borra las menos usadas hasta quedar en el 90% del límite
+        total, entradas = self._medir()
+        objetivo = self.limite_bytes * 9 // 10
+        if total > self.limite_bytes:
+            entradas.sort()
+            for _, tamano, ruta in entradas:
+                if total <= objetivo:
+                    break
+                if self._borrar(ruta):
+                    total -= tamano
+                    contar('cache_desalojos')
+        self._total = total
+
+    def vaciar(self):
+        for _, _, ruta in self._medir()[1]:
+            self._borrar(ruta)
+        self._total = 0
+
+    @staticmethod
+    def _borrar(ruta):
+        try:
+            os.remove(ruta)
+            return True
+        except OSError:
+            return False
+
+    # --- Vistas ----------------------------------------------------------
+
+    @etapa('cache', 'caché')
+    def leer_tabla(self, code, palabras_clave=RUST_KEYWORDS):
+        # (TablaTokens, errores) o None
+        secciones = self.leer(clave_analisis(code, VISTA_TABLA, palabras_clave))
+        if secciones is None:
+            return None
+        try:
+            return _tabla_desde(code, secciones[:5]), _errores_desde(secciones[5:8])
+        except (ValueError, IndexError):
+            return None
+
+    @etapa('cache', 'caché')
+    def guardar_tabla(self, code, tabla, errores, palabras_clave=RUST_KEYWORDS):
+        return self.guardar(clave_analisis(code, VISTA_TABLA, palabras_clave),
+                            _secciones_tabla(tabla) + _secciones_errores(errores))
+
+    @etapa('cache', 'caché')
+    def leer_documento(self, code, cache_lineas=None, palabras_clave=RUST_KEYWORDS):
+        # (DocumentoIncremental, filas por línea, errores sintácticos,
+        # errores semánticos) o None
+        secciones = self.leer(clave_analisis(code, VISTA_DOCUMENTO, palabras_clave))
+        if secciones is None:
+            return None
+        try:
+            documento = _documento_desde(code, secciones[:3], cache_lineas)
+            conteos = array('I')
+            conteos.frombytes(secciones[3])
+            if len(conteos) != len(documento.lineas):
+                return None
+            return (documento, conteos.tolist(),
+                    _errores_desde(secciones[4:7]), _errores_desde(secciones[7:10]))
+        except (ValueError, IndexError):
+            return None
+
+    @etapa('cache', 'caché')
+    def guardar_documento(self, code, documento, conteos, errores, semanticos, palabras_clave=RUST_KEYWORDS):
+        return self.guardar(
+            clave_analisis(code, VISTA_DOCUMENTO, palabras_clave),
+            _secciones_documento(documento) + [array('I', conteos).tobytes()]
+            + _secciones_errores(errores) + _secciones_errores(semanticos))
+
+
+# --- Formato -------------------------------------------------------------
+# Cabecera (mágico, versión, orden de bytes, cantidad de secciones) seguida
+# de cada sección con su longitud; todo comprimido salvo la cabecera.
+
+def _empaquetar(secciones):
+    cuerpo = b''.join(_LONGITUD.pack(len(seccion)) + seccion for seccion in secciones)
+    return _CABECERA.pack(_MAGICO, _VERSION_FORMATO, _ORDEN, len(secciones)) + zlib.compress(cuerpo, 1)
+
+
+def _desempaquetar(datos):
+    magico, version, orden, cantidad = _CABECERA.unpack_from(datos)
+    if magico != _MAGICO or version != _VERSION_FORMATO or orden != _ORDEN:
+        raise ValueError("Formato de caché desconocido")
+    cuerpo = memoryview(zlib.decompress(datos[_CABECERA.size:]))
+    secciones = []
+    pos = 0
+    for _ in range(cantidad):
+        (longitud,) = _LONGITUD.unpack_from(cuerpo, pos)
+        pos += _LONGITUD.size
+        if pos + longitud > len(cuerpo):
+            raise ValueError("Entrada de caché truncada")
+        secciones.append(bytes(cuerpo[pos:pos + longitud]))
+        pos += longitud
+    return secciones
+
+
+def _secciones_tabla(tabla):
+    return [tabla.tipos.tobytes(), tabla.lineas.tobytes(), tabla.columnas.tobytes(),
+            tabla.desplazamientos.tobytes(), tabla.longitudes.tobytes()]
+
+
+def _tabla_desde(code, secciones):
+    tabla = TablaTokens(code)
+    columnas = (tabla.tipos, tabla.lineas, tabla.columnas, tabla.desplazamientos, tabla.longitudes)
+    for columna, seccion in zip(columnas, secciones):
+        columna.frombytes(seccion)
+    if len({len(columna) for columna in columnas}) != 1:
+        raise ValueError("Columnas de distinto largo")
+    return tabla
+
+
+def _secciones_errores(errores):
+    # Líneas en un array y textos como índices a una tabla de cadenas
+    textos = {}
+    lineas = array('I')
+    indices = array('I')
+    for linea, tipo, descripcion in errores:
+        lineas.append(linea)
+        indices.append(textos.setdefault(tipo, len(textos)))
+        indices.append(textos.setdefault(descripcion, len(textos)))
+    return [lineas.tobytes(), indices.tobytes(), '\0'.join(textos).encode('utf-8')]
+
+
+def _errores_desde(secciones):
+    lineas = array('I')
+    lineas.frombytes(secciones[0])
+    indices = array('I')
+    indices.frombytes(secciones[1])
+    textos = secciones[2].decode('utf-8').split('\0')
+    return [(linea, textos[indices[2 * i]], textos[indices[2 * i + 1]]) for i, linea in enumerate(lineas)]
+
+
+def _secciones_documento(documento):
+    # Registros concatenados con sus largos y el estado de salida de cada
+    # línea como índice a una tabla de estados (la entrada de una línea es
+    # la salida de la anterior)
+    estados = {None: 0}
+    salidas = array('H', (estados.setdefault(salida, len(estados)) for salida in documento.salidas))
+    largos = array('I', map(len, documento.registros))
+    tabla_estados = json.dumps([list(estado) for estado in list(estados)[1:]]).encode('utf-8')
+    return [largos.tobytes() + salidas.tobytes(), b''.join(documento.registros), tabla_estados]
+
+
+def _documento_desde(code, secciones, cache_lineas):
+    documento = DocumentoIncremental(cache=cache_lineas)
+    lineas = code.split('\n')
+    n = len(lineas)
+    largos = array('I')
+    largos.frombytes(secciones[0][:n * largos.itemsize])
+    salidas = array('H')
+    salidas.frombytes(secciones[0][n * largos.itemsize:])
+    if len(largos) != n or len(salidas) != n:
+        raise ValueError("Cantidad de líneas distinta")
+    estados = [None] + [tuple(estado) for estado in json.loads(secciones[2].decode('utf-8'))]
+    blob = secciones[1]
+    registros = []
+    pos = 0
+    for largo in largos:
+        registros.append(blob[pos:pos + largo])
+        pos += largo
+    documento.lineas = lineas
+    documento.registros = registros
+    documento.salidas = [estados[i] for i in salidas]
+    documento.entradas = [None] + documento.salidas[:-1]
+    return documento
@@ -0,0 +1,128 @@
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+from array import array
+
+# Corpus de ejemplos en el formato de rust_examples.txt: cada ejemplo empieza
+# con una línea "# Ejemplo ..." que le da título y sigue hasta el próximo
+# encabezado. Los corpus de regresión tienen miles de ejemplos, así que no se
+# cargan: un índice con el desplazamiento en bytes de cada encabezado y de su
+# cuerpo se arma una vez recorriendo el archivo proyectado en memoria y se
+# guarda junto a él (<archivo>.indice); cada ejemplo se lee al pedirlo,
+# con seek. El índice se rehace cuando cambian la fecha de modificación o el
+# tamaño del archivo.
+
+ARCHIVO_EJEMPLOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rust_examples.txt')
+SUFIJO_INDICE = '.indice'
+
+_ENCABEZADO = re.compile(rb'^# (Ejemplo[^\n]*)\n?', re.MULTILINE)
+
+_MAGICO = b'ANEJ'
+_VERSION_FORMATO = 1
+_ORDEN = b'<' if sys.byteorder == 'little' else b'>'
+_CABECERA = struct.Struct('<4sBcqQI')
+
+
+class CorpusEjemplos:
+    def __init__(self, ruta=ARCHIVO_EJEMPLOS):
+        self.ruta = ruta
+        self.ruta_indice = ruta + SUFIJO_INDICE
+        estado = os.stat(ruta)
+        self._firma = (estado.st_mtime_ns, estado.st_size)
+        # Desplazamientos de cada encabezado y del cuerpo que le sigue; el
+        # último encabezado termina en el tamaño del archivo
+        self.inicios = array('Q')
+        self.cuerpos = array('Q')
+        self._titulos = None
+        self._bloque_titulos = b''
+        if not self._cargar_indice():
+            self._construir_indice()
+            self._guardar_indice()
+
+    def __len__(self):
+        return len(self.inicios)
+
+    def __getitem__(self, indice):
+        # Texto del ejemplo, sin su encabezado ni espacios en los bordes
+        if indice < 0:
+            indice += len(self.inicios)
+        if not 0 <= indice < len(self.inicios):
+            raise IndexError(indice)
+        fin = self.inicios[indice + 1] if indice + 1 < len(self.inicios) else self._firma[1]
+        with open(self.ruta, 'rb') as archivo:
+            archivo.seek(self.cuerpos[indice])
+            datos = archivo.read(fin - self.cuerpos[indice])
+        return datos.decode('utf-8', errors='replace').strip()
+
+    def titulos(self):
+        # Se decodifican la primera vez que se piden
+        if self._titulos is None:
+            self._titulos = self._bloque_titulos.decode('utf-8', errors='replace').split('\n') if self.inicios else []
+        return self._titulos
+
+    def titulo(self, indice):
+        return self.titulos()[indice]
+
+    def buscar(self, texto, desde=0):
+        # Índice del primer ejemplo a partir de desde (dando la vuelta) cuyo
+        # título contiene texto, sin distinguir mayúsculas; None si no hay
+        texto = texto.casefold()
+        titulos = self.titulos()
+        total = len(titulos)
+        for paso in range(total):
+            indice = (desde + paso) % total
+            if texto in titulos[indice].casefold():
+                return indice
+        return None
+
+    def _construir_indice(self):
+        titulos = []
+        with open(self.ruta, 'rb') as archivo:
+            if self._firma[1]:
+                with mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+                    for m in _ENCABEZADO.finditer(mapa):
+                        self.inicios.append(m.start())
+                        self.cuerpos.append(m.end())
+                        titulos.append(m.group(1).rstrip(b'\r'))
+        self._bloque_titulos = b'\n'.join(titulos)
+
+    def _cargar_indice(self):
+        try:
+            with open(self.ruta_indice, 'rb') as archivo:
+                datos = archivo.read()
+            magico, version, orden, mtime, tamano, cantidad = _CABECERA.unpack_from(datos)
+        except (OSError, struct.error):
+            return False
+        if (magico != _MAGICO or version != _VERSION_FORMATO or orden != _ORDEN
+                or (mtime, tamano) != self._firma):
+            return False
+        pos = _CABECERA.size
+        largo = cantidad * self.inicios.itemsize
+        if len(datos) < pos + 2 * largo:
+            return False
+        self.inicios.frombytes(datos[pos:pos + largo])
+        self.cuerpos.frombytes(datos[pos + largo:pos + 2 * largo])
+        self._bloque_titulos = datos[pos + 2 * largo:]
+        return True
+
+    def _guardar_indice(self):
+        # Si la carpeta no admite escritura el índice queda solo en memoria
+        carpeta = os.path.dirname(self.ruta_indice) or '.'
+        try:
+            descriptor, temporal = tempfile.mkstemp(dir=carpeta, suffix='.tmp')
+            try:
+                with os.fdopen(descriptor, 'wb') as archivo:
+                    archivo.write(_CABECERA.pack(_MAGICO, _VERSION_FORMATO, _ORDEN,
+                                                 *self._firma, len(self.inicios)))
+                    archivo.write(self.inicios.tobytes())
+                    archivo.write(self.cuerpos.tobytes())
+                    archivo.write(self._bloque_titulos)
+                os.replace(temporal, self.ruta_indice)
+            except BaseException:
+                os.remove(temporal)
+                raise
+        except OSError:
+            pass
@@ -0,0 +1,177 @@
+import argparse
+import random
+import sys
+
+# Generador determinista de código con forma de Rust para medir el
+# analizador. La misma forma, tamaño y semilla producen siempre el mismo
+# texto, de modo que los tiempos se pueden comparar entre commits.
+#
+#   python corpus_sintetico.py funciones 50000 --semilla 1 > grande.rs
+#
+# Formas:
+#   funciones        muchas funciones cortas como las de rust_examples.txt
+#   anidado          bloques if/while/for/loop anidados a gran profundidad
+#   lineas_largas    expresiones de cientos de tokens en una sola línea
+#   identificadores  nombres largos, campos, métodos y rutas con ::
+#   errores          código con errores de sintaxis frecuentes
+
+
+_NOMBRES = ('x', 'y', 'z', 'f', 'total', 'contador', 'indice', 'valor', 'suma', 'limite')
+_TIPOS = ('i32', 'i64', 'u32', 'usize', 'f64', 'bool')
+_OPERADORES = ('+', '-', '*', '/', '%')
+_PALABRAS = ('alfa', 'beta', 'gamma', 'delta', 'registro', 'nodo', 'buffer', 'estado',
+             'cliente', 'servidor', 'tabla', 'indice', 'cache', 'entrada', 'salida')
+
+
+def _expresion(rnd, variables, terminos):
+    partes = [rnd.choice(variables)]
+    for _ in range(terminos - 1):
+        operando = rnd.choice(variables) if rnd.random() < 0.6 else str(rnd.randint(1, 999))
+        partes.append(rnd.choice(_OPERADORES))
+        partes.append(operando)
+    return ' '.join(partes)
+
+
+def _funcion(rnd, numero, salida):
+    salida.append(f"fn funcion_{numero}() {{")
+    variables = rnd.sample(_NOMBRES, 4)
+    for nombre in variables:
+        salida.append(f"    let mut {nombre}: i32 = {rnd.randint(0, 99)};")
+    salida.append("    ")
+    for _ in range(rnd.randint(2, 5)):
+        salida.append(f"    {rnd.choice(variables)} = {_expresion(rnd, variables, rnd.randint(2, 4))};")
+    if rnd.random() < 0.5:
+        salida.append(f"    if {variables[0]} > {variables[1]} {{")
+        salida.append(f"        {variables[2]} += 1;")
+        salida.append("    } else {")
+        salida.append(f"        {variables[2]} -= 1;")
+        salida.append("    }")
+    if rnd.random() < 0.3:
+        salida.append(f"    for i in 0..{rnd.randint(2, 50)} {{")
+        salida.append(f"        {variables[3]} = {variables[3]} + i; // acumulado")
+        salida.append("    }")
+    for nombre in variables[:2]:
+        salida.append(f"    println!({nombre});")
+    salida.append("}")
+    salida.append("")
+
+
+def _anidado(rnd, numero, salida):
+    profundidad = rnd.randint(8, 40)
+    salida.append(f"fn anidado_{numero}() {{")
+    salida.append("    let mut n: i32 = 0;")
+    sangria = "    "
+    for nivel in range(profundidad):
+        cabecera = rnd.choice((
+            f"if n < {nivel * 7} {{",
+            f"while n > {nivel} {{",
+            f"for k{nivel} in 0..{nivel + 2} {{",
+            "loop {",
+        ))
+        salida.append(sangria + cabecera)
+        sangria += "    "
+        salida.append(f"{sangria}n = n + {nivel};")
+        if cabecera == "loop {":
+            salida.append(f"{sangria}break;")
+    for _ in range(profundidad):
+        sangria = sangria[:-4]
+        salida.append(sangria + "}")
+    salida.append("}")
+    salida.append("")
+
+
+def _lineas_largas(rnd, numero, salida):
+    variables = rnd.sample(_NOMBRES, 5)
+    salida.append(f"fn larga_{numero}() {{")
+    for nombre in variables:
+        salida.append(f"    let {nombre}: i64 = {rnd.randint(1, 99)};")
+    for _ in range(rnd.randint(2, 4)):
+        terminos = rnd.randint(100, 400)
+        salida.append(f"    let r_{numero}_{rnd.randint(0, 1 << 30)} = {_expresion(rnd, variables, terminos)};")
+    salida.append("}")
+    salida.append("")
+
+
+def _identificador(rnd):
+    return '_'.join(rnd.choice(_PALABRAS) for _ in range(rnd.randint(2, 5)))
+
+
+def _identificadores(rnd, numero, salida):
+    estructura = 'Estructura' + ''.join(p.capitalize() for p in rnd.sample(_PALABRAS, 3)) + str(numero)
+    campos = [_identificador(rnd) for _ in range(rnd.randint(3, 8))]
+    salida.append(f"struct {estructura} {{")
+    for campo in campos:
+        salida.append(f"    {campo}: {rnd.choice(_TIPOS)},")
+    salida.append("}")
+    salida.append("")
+    salida.append(f"impl {estructura} {{")
+    salida.append(f"    fn procesar_{numero}(&mut self, {campos[0]}_entrada: i32) -> i32 {{")
+    for _ in range(rnd.randint(3, 8)):
+        izquierda = _identificador(rnd)
+        salida.append(
+            f"        let {izquierda} = self.{rnd.choice(campos)}.{_identificador(rnd)}"
+            f"(modulo_{rnd.choice(_PALABRAS)}::{_identificador(rnd)}, {campos[0]}_entrada);")
+    salida.append(f"        self.{campos[0]}.len() as i32")
+    salida.append("    }")
+    salida.append("}")
+    salida.append("")
+
+
+def _errores(rnd, numero, salida):
+    # Una función válida con uno o varios errores inyectados
+    lineas = []
+    _funcion(rnd, numero, lineas)
+    for _ in range(rnd.randint(1, 3)):
+        indice = rnd.randrange(1, len(lineas) - 2)
+        linea = lineas[indice]
+        defecto = rnd.randrange(5)
+        if defecto == 0 and linea.endswith(';'):
+            lineas[indice] = linea[:-1]
+        elif defecto == 1:
+            lineas[indice] = linea + ' {'
+        elif defecto == 2:
+            lineas[indice] = linea + ' )'
+        elif defecto == 3:
+            lineas[indice] = '    let texto = "cadena sin cerrar;'
+        else:
+            lineas[indice] = '    if x > y'
+    salida.extend(lineas)
+
+
+FORMAS = {
+    'funciones': _funcion,
+    'anidado': _anidado,
+    'lineas_largas': _lineas_largas,
+    'identificadores': _identificadores,
+    'errores': _errores,
+}
+
+
+def generar_corpus(forma, lineas, semilla=0):
+    # Devuelve al menos `lineas` líneas de código de la forma pedida; solo
+    # se agregan unidades completas (funciones, estructuras...)
+    if forma not in FORMAS:
+        raise ValueError(f"Forma desconocida: {forma} (opciones: {', '.join(FORMAS)})")
+    generar = FORMAS[forma]
+    rnd = random.Random(f"{forma}:{semilla}")
+    salida = []
+    numero = 0
+    while len(salida) < lineas:
+        generar(rnd, numero, salida)
+        numero += 1
+    return '\n'.join(salida)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera código Rust sintético para medir el analizador")
+    parser.add_argument('forma', choices=sorted(FORMAS))
+    parser.add_argument('lineas', type=int)
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args(argv)
+    sys.stdout.write(generar_corpus(args.forma, args.lineas, args.semilla))
+    sys.stdout.write('\n')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+import mmap
+import os
+import re
+
+from motor_lexico import (
+    RUST_KEYWORDS, PATRON_TOKEN, ESPACIO, COMENTARIO, COMENTARIO_ABIERTO,
+    CADENA, CADENA_ABIERTA, TIPOS_MULTILINEA, describir, _estado_abierto,
+)
+from analizador_sintactico import verificador_sintactico, terminar_verificador, unir_errores
+from analizador_semantico import VerificadorSemantico, VerificadorArbol
+from arbol_sintactico import Parser
+from instrumentacion import etapa, contar
+
+# Análisis en flujo para archivos que no conviene cargar enteros (registros o
+# código generado de varios gigabytes). El archivo se proyecta en memoria con
+# mmap y se decodifica por bloques; cada bloque se recorre con la misma
+# expresión maestra de motor_lexico y los tokens pasan, de uno en uno, al
+# verificador sintáctico, al semántico y al parser. Solo se conservan el
+# bloque actual, las pilas de los verificadores, el elemento en curso (los
+# elementos de un módulo de a uno) y los errores, de modo que la memoria
+# residente no crece con el tamaño del archivo.
+#
+# Los bloques se cortan justo después de un salto de línea seguido de un
+# carácter que no es espacio ni ( [ {: así ningún token de una sola línea
+# queda partido, el corte nunca cae en medio de una secuencia UTF-8 y la
+# anticipación de las macros (nombre! seguido de su delimitador) no cruza el
+# corte. Solo los comentarios de bloque y las cadenas pueden continuar en el
+# bloque siguiente; se siguen con el mismo estado de cierre que usa
+# tokenizar_linea.
+
+TAMANO_BLOQUE = 4 << 20
+
+_CORTE = re.compile(rb'\n(?=[^\s(\[{])')
+# Como motor_lexico._FIN_CADENA, pero el escape puede ser un salto de línea
+_FIN_CADENA = re.compile(r'(?:[^"\\]|\\[\s\S])*"')
+
+
+def bloques_archivo(ruta, tamano_bloque=TAMANO_BLOQUE):
+    # Genera el texto del archivo en bloques de unos tamano_bloque bytes,
+    # con los saltos de línea normalizados a \n como al leer en modo texto
+    # (los cortes caen después de un \n, así que un \r\n nunca se parte)
+    with open(ruta, 'rb') as archivo:
+        total = os.fstat(archivo.fileno()).st_size
+        if not total:
+            return
+        with mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            liberar = getattr(mapa, 'madvise', None) if hasattr(mmap, 'MADV_DONTNEED') else None
+            pos = 0
+            while pos < total:
+                fin = pos + tamano_bloque
+                if fin >= total:
+                    fin = total
+                else:
+                    m = _CORTE.search(mapa, fin)
+                    fin = m.end() if m else total
+                bloque = mapa[pos:fin].decode('utf-8', errors='replace')
+                if '\r' in bloque:
+                    bloque = bloque.replace('\r\n', '\n').replace('\r', '\n')
+                yield bloque
+                if liberar is not None:
+                    # Las páginas ya leídas se devuelven al sistema
+                    inicio = pos - pos % mmap.PAGESIZE
+                    liberar(mmap.MADV_DONTNEED, inicio, fin - inicio)
+                pos = fin
+
+
+def _cierre(bloque, cierre):
+    # Fin (exclusivo) de la construcción abierta dentro del bloque, o -1
+    if cierre is None:
+        m = _FIN_CADENA.match(bloque)
+        return m.end() if m else -1
+    fin = bloque.find(cierre)
+    return fin + len(cierre) if fin >= 0 else -1
+
+
+def tokenizar_flujo(bloques, patron=PATRON_TOKEN, incluir_comentarios=True):
+    # Mismas tuplas (tipo, texto, línea, columna, desplazamiento) que
+    # motor_lexico.tokenizar sobre la concatenación de los bloques; los
+    # desplazamientos son en caracteres desde el inicio del archivo.
+    linea = 1
+    inicio_linea = 0
+    base = 0
+    abierto = None
+    for bloque in bloques:
+        pos = 0
+        if abierto is not None:
+            # Continúa el comentario o la cadena que quedó abierta
+            tipo, cierre, fragmentos, linea_token, columna, inicio = abierto
+            fin = _cierre(bloque, cierre)
+            fragmento = bloque if fin < 0 else bloque[:fin]
+            fragmentos.append(fragmento)
+            saltos = fragmento.count('\n')
+            if saltos:
+                linea += saltos
+                inicio_linea = base + fragmento.rfind('\n') + 1
+            if fin < 0:
+                base += len(bloque)
+                continue
+            abierto = None
+            tipo = COMENTARIO if tipo == COMENTARIO_ABIERTO else CADENA
+            if tipo != COMENTARIO or incluir_comentarios:
+                yield (tipo, ''.join(fragmentos), linea_token, columna, inicio)
+            pos = fin
+
+        for m in patron.finditer(bloque, pos):
+            tipo = m.lastgroup
+            if tipo == ESPACIO:
+                inicio, fin = m.span(tipo)
+                saltos = bloque.count('\n', inicio, fin)
+                if saltos:
+                    linea += saltos
+                    inicio_linea = base + bloque.rfind('\n', inicio, fin) + 1
+                continue
+            texto = m.group(tipo)
+            inicio = base + m.start(tipo)
+            if tipo == COMENTARIO_ABIERTO or tipo == CADENA_ABIERTA:
+                # Llega hasta el final del bloque; el token se emite cuando se
+                # cierra o al terminar el archivo. Solo este token se acumula
+                # entre bloques.
+                estado_tipo, cierre = _estado_abierto(tipo, texto)
+                abierto = (estado_tipo, cierre, [texto], linea, inicio - inicio_linea, inicio)
+                saltos = texto.count('\n')
+                if saltos:
+                    linea += saltos
+                    inicio_linea = inicio + texto.rfind('\n') + 1
+                break
+            if tipo in TIPOS_MULTILINEA:
+                if tipo != COMENTARIO or incluir_comentarios:
+                    yield (tipo, texto, linea, inicio - inicio_linea, inicio)
+                saltos = texto.count('\n')
+                if saltos:
+                    linea += saltos
+                    inicio_linea = inicio + texto.rfind('\n') + 1
+                continue
+            yield (tipo, texto, linea, inicio - inicio_linea, inicio)
+        base += len(bloque)
+
+    if abierto is not None:
+        # Sin cerrar hasta el final del archivo, como en tokenizar
+        tipo, _, fragmentos, linea_token, columna, inicio = abierto
+        yield (tipo, ''.join(fragmentos), linea_token, columna, inicio)
+
+
+@etapa('flujo', 'flujo')
+def analizar_flujo(bloques, palabras_clave=RUST_KEYWORDS, al_token=None):
+    # Una sola pasada: el parser tira del generador de tokens y cada token,
+    # al salir del léxico, va al verificador semántico, al sintáctico (una
+    # corrutina) y a al_token (si se da). Ningún token espera en una cola;
+    # solo los nodos del elemento en curso pasan por las verificaciones del
+    # árbol, y los módulos se entregan por partes. Devuelve los errores
+    # sintácticos (los del parser sin repetir) seguidos de los semánticos.
+    semantico = VerificadorSemantico(palabras_clave)
+    estructura = VerificadorArbol()
+    procesar = semantico.procesar
+    sintactico = verificador_sintactico()
+    next(sintactico)
+    enviar = sintactico.send
+
+    def tokens():
+        cantidad = 0
+        for token in tokenizar_flujo(bloques, incluir_comentarios=False):
+            procesar(token)
+            enviar(token)
+            if al_token is not None:
+                al_token(token)
+            cantidad += 1
+            yield token
+        contar('tokens', cantidad)
+
+    parser = Parser(tokens())
+    for nodo in parser.elementos(abrir_modulos=True):
+        estructura.elemento(nodo)
+    errores = unir_errores(terminar_verificador(sintactico), parser.errores)
+    semantico.errores.extend(estructura.terminar())
+    return errores + semantico.terminar()
+
+
+def analizar_archivo_flujo(ruta, palabras_clave=RUST_KEYWORDS, al_fila=None,
+                           tamano_bloque=TAMANO_BLOQUE):
+    # Como analisis_lotes.analizar_archivo, pero las filas de los tokens se
+    # entregan a al_fila a medida que se reconocen en lugar de guardarse
+    al_token = None
+    if al_fila is not None:
+        def al_token(token):
+            tipo, texto, linea, _, _ = token
+            nombre, descripcion = describir(tipo, texto, palabras_clave)
+            al_fila((linea, texto, nombre, descripcion))
+    return analizar_flujo(bloques_archivo(ruta, tamano_bloque), palabras_clave, al_token)
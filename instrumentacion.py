@@ -0,0 +1,206 @@
+import cProfile
+import contextvars
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+
+# Instrumentación de las ejecuciones del análisis. Cada pasada se registra con
+# etapa(nombre), como decorador o como bloque with; mientras hay unas
+# Metricas activas se acumulan su tiempo y sus llamadas, y contar() suma
+# contadores (tokens, líneas, evaluaciones de expresiones regulares,
+# inserciones en widgets). Sin métricas activas el costo es una comparación.
+# Las métricas activas son las del contexto actual (contextvars), no del
+# proceso: cada hilo empieza sin ellas y una ejecución las liga con
+# en_curso(), así que un trabajador cancelado sigue sumando a las suyas y no
+# a las de la ejecución siguiente.
+#
+# La captura con cProfile y tracemalloc es opcional; se activa desde la
+# interfaz o con la variable de entorno ANALIZADOR_PERFIL=cprofile,tracemalloc.
+
+VARIABLE_PERFIL = 'ANALIZADOR_PERFIL'
+
+# Etapas registradas: nombre -> etiqueta para el resumen, en orden de registro
+ETAPAS = {}
+
+_activa = contextvars.ContextVar('metricas_activas', default=None)
+
+
+def perfil_desde_entorno():
+    # (cprofile, tracemalloc) pedidos en la variable de entorno
+    opciones = {parte.strip().lower() for parte in os.environ.get(VARIABLE_PERFIL, '').split(',')}
+    return 'cprofile' in opciones, 'tracemalloc' in opciones
+
+
+@contextmanager
+def en_curso(metricas):
+    # Liga las métricas (o ninguna, con None) al contexto actual mientras
+    # dura el bloque
+    ficha = _activa.set(metricas)
+    try:
+        yield metricas
+    finally:
+        _activa.reset(ficha)
+
+
+def contar(nombre, cantidad=1):
+    metricas = _activa.get()
+    if metricas is not None:
+        metricas.contar(nombre, cantidad)
+
+
+class etapa:
+    # Registra una etapa y mide sus ejecuciones en las métricas activas.
+    # Las etapas anidadas se cuentan también dentro de la exterior.
+    def __init__(self, nombre, etiqueta=None):
+        self.nombre = nombre
+        ETAPAS.setdefault(nombre, etiqueta or nombre)
+
+    def __call__(self, funcion):
+        nombre = self.nombre
+
+        @wraps(funcion)
+        def medida(*args, **kwargs):
+            metricas = _activa.get()
+            if metricas is None:
+                return funcion(*args, **kwargs)
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                metricas.registrar(nombre, time.perf_counter() - inicio)
+        return medida
+
+    def __enter__(self):
+        self._metricas = _activa.get()
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self._metricas is not None:
+            self._metricas.registrar(self.nombre, time.perf_counter() - self._inicio)
+        return False
+
+
+class Metricas:
+    LINEAS_PERFIL = 30
+    SITIOS_MEMORIA = 15
+
+    def __init__(self, capturar_cpu=False, capturar_memoria=False):
+        self.capturar_cpu = capturar_cpu
+        self.capturar_memoria = capturar_memoria
+        self.etapas = {}
+        self.contadores = {}
+        self.segundos = None
+        self.perfil = None
+        self.memoria = None
+        self._inicio = None
+        self._perfilador = None
+        self._traza_propia = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def desde_entorno(cls, capturar_cpu=False, capturar_memoria=False):
+        cpu, memoria = perfil_desde_entorno()
+        return cls(capturar_cpu or cpu, capturar_memoria or memoria)
+
+    def iniciar(self):
+        # Activas en el contexto actual hasta terminar()
+        _activa.set(self)
+        if self.capturar_memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._traza_propia = True
+        self._inicio = time.perf_counter()
+        return self
+
+    def marcar_fin(self):
+        # Fin del tiempo total; lo que se registre después (diálogos, vistas)
+        # sigue sumando a sus etapas
+        if self._inicio is not None and self.segundos is None:
+            self.segundos = time.perf_counter() - self._inicio
+
+    def terminar(self):
+        if _activa.get() is self:
+            _activa.set(None)
+        self.marcar_fin()
+        if self._traza_propia:
+            actual, pico = tracemalloc.get_traced_memory()
+            sitios = tracemalloc.take_snapshot().statistics('lineno')[:self.SITIOS_MEMORIA]
+            tracemalloc.stop()
+            self._traza_propia = False
+            self.memoria = {
+                'actual_bytes': actual,
+                'pico_bytes': pico,
+                'sitios': [
+                    {'lugar': str(sitio.traceback[0]), 'bytes': sitio.size, 'bloques': sitio.count}
+                    for sitio in sitios
+                ],
+            }
+        return self
+
+    # cProfile mide un solo hilo: se enciende en el que ejecuta las pasadas
+
+    def iniciar_perfil(self):
+        if self.capturar_cpu and self._perfilador is None:
+            perfilador = cProfile.Profile()
+            try:
+                perfilador.enable()
+            except ValueError:
+                # Otro perfilador ya está activo en el proceso
+                return
+            self._perfilador = perfilador
+
+    def detener_perfil(self):
+        perfilador, self._perfilador = self._perfilador, None
+        if perfilador is None:
+            return
+        perfilador.disable()
+        texto = io.StringIO()
+        pstats.Stats(perfilador, stream=texto).sort_stats('cumulative').print_stats(self.LINEAS_PERFIL)
+        self.perfil = texto.getvalue()
+
+    def registrar(self, nombre, segundos):
+        with self._lock:
+            datos = self.etapas.get(nombre)
+            if datos is None:
+                datos = self.etapas[nombre] = {'segundos': 0.0, 'llamadas': 0}
+            datos['segundos'] += segundos
+            datos['llamadas'] += 1
+
+    def contar(self, nombre, cantidad=1):
+        with self._lock:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + cantidad
+
+    def resumen(self):
+        # Una línea para la barra de estado
+        partes = [
+            f"{ETAPAS.get(nombre, nombre)} {datos['segundos'] * 1000:,.0f} ms"
+            for nombre, datos in sorted(self.etapas.items(), key=lambda par: -par[1]['segundos'])
+        ]
+        tokens = self.contadores.get('tokens')
+        if tokens and self.segundos:
+            partes.append(f"{tokens:,} tokens · {tokens / self.segundos:,.0f} tokens/s")
+        return " · ".join(partes)
+
+    def a_dict(self):
+        with self._lock:
+            return {
+                'segundos_totales': self.segundos,
+                'etapas': {
+                    nombre: dict(datos, etiqueta=ETAPAS.get(nombre, nombre))
+                    for nombre, datos in self.etapas.items()
+                },
+                'contadores': dict(self.contadores),
+                'perfil': self.perfil,
+                'memoria': self.memoria,
+            }
+
+    def exportar_json(self, ruta):
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            json.dump(self.a_dict(), archivo, ensure_ascii=False, indent=2)
+            archivo.write('\n')
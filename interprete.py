@@ -0,0 +1,1113 @@
+import math
+import operator
+import re
+
+from motor_lexico import tokenizar
+from arbol_sintactico import (
+    construir_arbol, MACROS_IMPRESION, FUNCION, TIPO, BLOQUE, DECLARACION, SI, MIENTRAS,
+    BUCLE, PARA, BREAK, CONTINUE, RETORNO, ASIGNACION, BINARIA, UNARIA, CONVERSION, RANGO,
+    INVOCACION_MACRO, ARGUMENTO, LITERAL_NUMERO, LITERAL_CADENA, LITERAL_BOOLEANO, VARIABLE,
+    LIGADURA, VACIO, MATCH, CLAUSURA, TUPLA, ARREGLO, REPETICION, CONDICION_LET,
+)
+
+# Intérprete del subconjunto de Rust que ejecutan los ejemplos: let,
+# asignaciones (también compuestas), if/else, while, loop, for sobre rangos,
+# break/continue/return y println!/print!. El árbol de arbol_sintactico se
+# traduce a tuplas y se compila a clausuras de Python que trabajan sobre un
+# marco de variables indexado por posición (las variables se resuelven a su
+# casilla al compilar). Las expresiones constantes se pliegan al compilar y
+# la aritmética entera envuelve al ancho de su tipo. Una variable declarada
+# con un literal sin sufijo toma el tipo con el que se unifica después (i32
+# o f64 si nada lo fija): se compila una vez para inferirlo y otra con los
+# tipos ya conocidos. La salida de println! se acumula y se entrega de una
+# vez.
+
+LIMITE_ITERACIONES = 10_000_000
+# Los bucles corren en tramos de tantas vueltas; entre uno y otro se llama a
+# la comprobación que recibe Programa.ejecutar (la cancelación del
+# trabajador de la interfaz)
+TRAMO_VUELTAS = 1 << 16
+
+# Tipo -> (bits, con signo)
+ENTEROS = {
+    'i8': (8, True), 'i16': (16, True), 'i32': (32, True), 'i64': (64, True),
+    'i128': (128, True), 'isize': (64, True),
+    'u8': (8, False), 'u16': (16, False), 'u32': (32, False), 'u64': (64, False),
+    'u128': (128, False), 'usize': (64, False),
+}
+FLOTANTES = frozenset(('f32', 'f64'))
+BOOL = 'bool'
+# Literales sin sufijo: toman el tipo del otro operando o el predeterminado
+ENTERO_LIBRE = '{entero}'
+FLOTANTE_LIBRE = '{flotante}'
+
+COMPARACIONES = frozenset(('==', '!=', '<', '>', '<=', '>='))
+
+_SUFIJO_NUMERO = re.compile(r'([iu](?:8|16|32|64|128|size)|f32|f64)$')
+_SUFIJO_HEXADECIMAL = re.compile(r'([iu](?:8|16|32|64|128|size))$')
+_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', '0': '\0', '\\': '\\', '"': '"', "'": "'"}
+
+# Señales que devuelven las sentencias para romper el flujo
+_BREAK = 'break'
+_CONTINUE = 'continue'
+_RETORNO = 'return'
+
+
+class ErrorEvaluacion(Exception):
+    def __init__(self, linea, mensaje):
+        super().__init__(mensaje)
+        self.linea = linea
+        # Salida producida antes del error
+        self.salida = ''
+
+
+class ErrorCompilacion(ErrorEvaluacion):
+    pass
+
+
+class ErrorEjecucion(ErrorEvaluacion):
+    pass
+
+
+# --- Traducción -----------------------------------------------------------
+# El árbol de arbol_sintactico se traduce a tuplas: ('num', valor, tipo),
+# ('bool', valor), ('var', nombre, línea), ('un', op, e, línea),
+# ('bin', op, a, b, línea) y ('as', e, tipo, línea) para las expresiones, y
+# una tupla por sentencia con el nombre del método del compilador que la
+# compila ('bloque', 'let', 'asig', 'if', 'while', 'loop', 'for', 'break',
+# 'continue', 'return', 'expr', 'imprimir').
+
+class ErrorSintaxis(ErrorCompilacion):
+    # Errores del parser; el primero da la línea y el mensaje
+    def __init__(self, errores):
+        linea, _, descripcion = errores[0]
+        super().__init__(linea, descripcion)
+        self.errores = errores
+
+
+# Texto de los mensajes para las construcciones sin nombre
+_INICIALES = {
+    SI: 'if', MATCH: 'match', MIENTRAS: 'while', BUCLE: 'loop', PARA: 'for', BLOQUE: '{',
+    CLAUSURA: '|', TUPLA: '(', ARREGLO: '[', REPETICION: '[', CONDICION_LET: 'let',
+}
+
+
+def _no_soportada(nodo):
+    texto = nodo.valor
+    if texto is None:
+        texto = _INICIALES.get(nodo.tipo)
+    if texto is None:
+        texto = nodo.hijos[0].valor if nodo.hijos and nodo.hijos[0].valor is not None else nodo.tipo
+    return ErrorCompilacion(nodo.linea, f"Expresión no soportada: '{texto}'")
+
+
+def _traducir_expresion(nodo):
+    tipo = nodo.tipo
+    if tipo == LITERAL_NUMERO:
+        return _literal_numero(nodo.valor, nodo.linea)
+    if tipo == VARIABLE:
+        return ('var', nodo.valor, nodo.linea)
+    if tipo == BINARIA:
+        a, b = nodo.hijos
+        return ('bin', nodo.valor, _traducir_expresion(a), _traducir_expresion(b), nodo.linea)
+    if tipo == LITERAL_BOOLEANO:
+        return ('bool', nodo.valor == 'true')
+    if tipo == UNARIA and nodo.valor in ('-', '!'):
+        return ('un', nodo.valor, _traducir_expresion(nodo.hijos[0]), nodo.linea)
+    if tipo == CONVERSION:
+        return ('as', _traducir_expresion(nodo.hijos[0]), nodo.valor, nodo.linea)
+    raise _no_soportada(nodo)
+
+
+def _traducir_programa(raiz):
+    # El cuerpo de fn main y las sentencias sueltas de nivel superior, en
+    # orden; el resto de funciones y elementos se omiten
+    sentencias = []
+    for nodo in raiz.hijos:
+        if nodo.tipo == FUNCION:
+            if nodo.valor == 'main' and nodo.hijos and nodo.hijos[-1].tipo == BLOQUE:
+                sentencias.append(_traducir_bloque(nodo.hijos[-1]))
+            continue
+        sentencia = _traducir_sentencia(nodo)
+        if sentencia is not None:
+            sentencias.append(sentencia)
+    return ('bloque', sentencias)
+
+
+def _traducir_sentencia(nodo):
+    traducir = _SENTENCIAS.get(nodo.tipo)
+    if traducir is not None:
+        return traducir(nodo)
+    # Los elementos y las demás sentencias (llamadas, métodos...) quedan
+    # fuera del subconjunto y se omiten
+    try:
+        return ('expr', _traducir_expresion(nodo))
+    except ErrorCompilacion:
+        return None
+
+
+def _traducir_bloque(nodo):
+    if nodo.valor is not None:
+        raise _no_soportada(nodo)
+    sentencias = []
+    for hijo in nodo.hijos:
+        sentencia = _traducir_sentencia(hijo)
+        if sentencia is not None:
+            sentencias.append(sentencia)
+    return ('bloque', sentencias)
+
+
+def _traducir_let(nodo):
+    patron, hijos = nodo.hijos[0], nodo.hijos[1:]
+    if patron.tipo != LIGADURA:
+        raise ErrorCompilacion(nodo.linea, f"Patrón no soportado en let: '{patron.valor}'")
+    anotacion = None
+    if hijos and hijos[0].tipo == TIPO:
+        anotacion = hijos[0].valor
+        hijos = hijos[1:]
+    if len(hijos) > 1:
+        raise ErrorCompilacion(nodo.linea, "let-else no soportado")
+    valor = _traducir_expresion(hijos[0]) if hijos else None
+    return ('let', patron.valor, anotacion, valor, nodo.linea)
+
+
+def _traducir_asignacion(nodo):
+    destino, valor = nodo.hijos
+    if destino.tipo != VARIABLE:
+        # Campos, índices...: fuera del subconjunto
+        return None
+    return ('asig', destino.valor, nodo.valor, _traducir_expresion(valor), destino.linea)
+
+
+def _traducir_si(nodo):
+    condicion = _traducir_expresion(nodo.hijos[0])
+    entonces = _traducir_bloque(nodo.hijos[1])
+    sino = None
+    if len(nodo.hijos) > 2:
+        otro = nodo.hijos[2]
+        sino = _traducir_si(otro) if otro.tipo == SI else _traducir_bloque(otro)
+    return ('if', condicion, entonces, sino, nodo.linea)
+
+
+def _sin_etiqueta(nodo):
+    if nodo.valor is not None:
+        raise ErrorCompilacion(nodo.linea, f"Etiqueta de bucle no soportada: {nodo.valor}")
+
+
+def _traducir_mientras(nodo):
+    _sin_etiqueta(nodo)
+    condicion, cuerpo = nodo.hijos
+    return ('while', _traducir_expresion(condicion), _traducir_bloque(cuerpo), nodo.linea)
+
+
+def _traducir_bucle(nodo):
+    _sin_etiqueta(nodo)
+    return ('loop', _traducir_bloque(nodo.hijos[0]), nodo.linea)
+
+
+def _traducir_para(nodo):
+    _sin_etiqueta(nodo)
+    patron, rango, cuerpo = nodo.hijos
+    if patron.tipo != LIGADURA and patron.valor != '_':
+        raise ErrorCompilacion(nodo.linea, f"Patrón no soportado en for: '{patron.valor}'")
+    if rango.tipo != RANGO or any(extremo.tipo == VACIO for extremo in rango.hijos):
+        raise ErrorCompilacion(nodo.linea, "Solo se soportan bucles for sobre rangos a..b")
+    desde, hasta = rango.hijos
+    return ('for', patron.valor, _traducir_expresion(desde), _traducir_expresion(hasta),
+            rango.valor == '..=', _traducir_bloque(cuerpo), nodo.linea)
+
+
+def _traducir_salto(nodo):
+    if nodo.valor is not None or nodo.hijos:
+        raise ErrorCompilacion(nodo.linea, f"{nodo.tipo} con etiqueta o valor no soportado")
+    return ('break',) if nodo.tipo == BREAK else ('continue',)
+
+
+def _traducir_impresion(nodo):
+    if nodo.valor not in MACROS_IMPRESION:
+        return None
+    argumentos = nodo.hijos
+    formato = ''
+    if argumentos and argumentos[0].tipo == LITERAL_CADENA:
+        formato = _valor_cadena(argumentos[0].valor)
+        argumentos = argumentos[1:]
+    elif argumentos and argumentos[0].tipo == ARGUMENTO:
+        # Forma de los ejemplos: println!(x) muestra "Valor de x: ..."
+        formato = 'Valor de ' + argumentos[0].valor.replace('{', '{{').replace('}', '}}') + ': {}'
+        argumentos = [argumentos[0].hijos[0]] + argumentos[1:]
+    return ('imprimir', formato, [_traducir_expresion(argumento) for argumento in argumentos],
+            nodo.valor == 'println!', nodo.linea)
+
+
+# Sentencias del subconjunto; sus errores se informan
+_SENTENCIAS = {
+    DECLARACION: _traducir_let,
+    ASIGNACION: _traducir_asignacion,
+    SI: _traducir_si,
+    MIENTRAS: _traducir_mientras,
+    BUCLE: _traducir_bucle,
+    PARA: _traducir_para,
+    BLOQUE: _traducir_bloque,
+    BREAK: _traducir_salto,
+    CONTINUE: _traducir_salto,
+    RETORNO: lambda nodo: ('return',),
+    INVOCACION_MACRO: _traducir_impresion,
+}
+
+
+def _literal_numero(texto, linea):
+    texto = texto.replace('_', '')
+    hexadecimal = texto[:2] in ('0x', '0o', '0b')
+    m = (_SUFIJO_HEXADECIMAL if hexadecimal else _SUFIJO_NUMERO).search(texto)
+    tipo = None
+    if m:
+        tipo = m.group(1)
+        texto = texto[:m.start()]
+    if hexadecimal:
+        valor = int(texto, 0)
+    elif tipo in FLOTANTES or '.' in texto or 'e' in texto or 'E' in texto:
+        if tipo is not None and tipo not in FLOTANTES:
+            raise ErrorCompilacion(linea, f"Sufijo entero en un literal decimal: {texto}{tipo}")
+        return ('num', float(texto), tipo or FLOTANTE_LIBRE)
+    else:
+        valor = int(texto)
+    return ('num', valor, tipo or ENTERO_LIBRE)
+
+
+def _valor_cadena(texto):
+    # Contenido de un literal de cadena (normal o crudo) con los escapes resueltos
+    if texto.startswith('b'):
+        texto = texto[1:]
+    if texto.startswith('r'):
+        hashes = len(texto) - len(texto.lstrip('r#')) - 1
+        return texto[2 + hashes:len(texto) - 1 - hashes]
+    contenido = texto[1:-1]
+    if '\\' not in contenido:
+        return contenido
+    partes = []
+    i = 0
+    while i < len(contenido):
+        c = contenido[i]
+        if c != '\\':
+            partes.append(c)
+            i += 1
+            continue
+        siguiente = contenido[i + 1]
+        if siguiente == '\n':
+            # Continuación de línea: se omiten el salto y la sangría
+            i += 2
+            while i < len(contenido) and contenido[i] in ' \t\n\r':
+                i += 1
+        elif siguiente == 'u':
+            fin = contenido.index('}', i)
+            partes.append(chr(int(contenido[i + 3:fin], 16)))
+            i = fin + 1
+        elif siguiente == 'x':
+            partes.append(chr(int(contenido[i + 2:i + 4], 16)))
+            i += 4
+        else:
+            partes.append(_ESCAPES.get(siguiente, siguiente))
+            i += 2
+    return ''.join(partes)
+
+
+# --- Compilación ----------------------------------------------------------
+
+class _Incognita:
+    # Tipo todavía desconocido de una variable declarada con un literal sin
+    # sufijo (libre es ENTERO_LIBRE o FLOTANTE_LIBRE). Al unificarse queda
+    # ligada a un tipo concreto o a otra incógnita.
+    __slots__ = ('libre', 'tipo')
+
+    def __init__(self, libre):
+        self.libre = libre
+        self.tipo = None
+
+
+def _raiz(tipo):
+    while isinstance(tipo, _Incognita) and tipo.tipo is not None:
+        tipo = tipo.tipo
+    return tipo
+
+
+def _ajuste(tipo):
+    # (desplazamiento, máscara) para reducir un entero al ancho de su tipo:
+    # ((x + desplazamiento) & máscara) - desplazamiento
+    bits, con_signo = ENTEROS[_concretar(tipo)]
+    return (1 << (bits - 1) if con_signo else 0), (1 << bits) - 1
+
+
+def _es_entero(tipo):
+    tipo = _raiz(tipo)
+    if isinstance(tipo, _Incognita):
+        return tipo.libre == ENTERO_LIBRE
+    return tipo == ENTERO_LIBRE or tipo in ENTEROS
+
+
+def _es_flotante(tipo):
+    tipo = _raiz(tipo)
+    if isinstance(tipo, _Incognita):
+        return tipo.libre == FLOTANTE_LIBRE
+    return tipo == FLOTANTE_LIBRE or tipo in FLOTANTES
+
+
+def _concretar(tipo):
+    tipo = _raiz(tipo)
+    if isinstance(tipo, _Incognita):
+        tipo = tipo.libre
+    if tipo == ENTERO_LIBRE:
+        return 'i32'
+    if tipo == FLOTANTE_LIBRE:
+        return 'f64'
+    return tipo
+
+
+def _constante(valor, tipo):
+    # Reduce una constante entera al ancho del tipo con el que se guarda
+    if valor[0] == 'k' and _es_entero(tipo):
+        d, mascara = _ajuste(tipo)
+        return ('k', ((valor[1] + d) & mascara) - d, tipo)
+    return valor
+
+
+def _libre(tipo):
+    # Clase de literal que admite el tipo, o None si ya es concreto
+    if isinstance(tipo, _Incognita):
+        return tipo.libre
+    return tipo if tipo in (ENTERO_LIBRE, FLOTANTE_LIBRE) else None
+
+
+def _unificar(a, b, linea):
+    a, b = _raiz(a), _raiz(b)
+    if a is b or a == b:
+        return a
+    libre_a, libre_b = _libre(a), _libre(b)
+    if isinstance(a, _Incognita) and libre_a == libre_b:
+        # Incógnita con un literal libre o con otra incógnita de su clase
+        if isinstance(b, _Incognita):
+            a.tipo = b
+            return b
+        return a
+    if isinstance(b, _Incognita) and libre_a == libre_b:
+        return b
+    if libre_a == ENTERO_LIBRE and b in ENTEROS or libre_a == FLOTANTE_LIBRE and b in FLOTANTES:
+        if isinstance(a, _Incognita):
+            a.tipo = b
+        return b
+    if libre_b == ENTERO_LIBRE and a in ENTEROS or libre_b == FLOTANTE_LIBRE and a in FLOTANTES:
+        if isinstance(b, _Incognita):
+            b.tipo = a
+        return a
+    raise ErrorCompilacion(linea, f"Tipos incompatibles: {_concretar(a)} y {_concretar(b)}")
+
+
+def _division_entera(linea):
+    def dividir(a, b):
+        if not b:
+            raise ErrorEjecucion(linea, "Intento de dividir por cero")
+        # Rust trunca hacia cero
+        cociente = abs(a) // abs(b)
+        return cociente if (a < 0) == (b < 0) else -cociente
+    return dividir
+
+
+def _resto_entero(linea):
+    def resto(a, b):
+        if not b:
+            raise ErrorEjecucion(linea, "Intento de calcular el resto con divisor cero")
+        r = abs(a) % abs(b)
+        return -r if a < 0 else r
+    return resto
+
+
+def _division_flotante(a, b):
+    try:
+        return a / b
+    except ZeroDivisionError:
+        if a == 0 or a != a:
+            return math.nan
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+
+
+def _resto_flotante(a, b):
+    try:
+        return math.fmod(a, b)
+    except ValueError:
+        return math.nan
+
+
+def _desplazamiento(op, bits):
+    # Como wrapping_shl/wrapping_shr: la cantidad se reduce al ancho del tipo
+    mascara = bits - 1
+    return lambda a, b: op(a, b & mascara)
+
+
+def _funcion(compilada):
+    clase, valor = compilada[0], compilada[1]
+    if clase == 'k':
+        return lambda m: valor
+    if clase == 'v':
+        return lambda m: m[valor]
+    return valor
+
+
+def _binaria(op, a, b, ajuste=None):
+    # Clausura especializada según los operandos sean constante ('k'),
+    # casilla del marco ('v') o clausura general ('f')
+    ca, va = a[0], a[1]
+    cb, vb = b[0], b[1]
+    if ajuste is None:
+        if ca == 'v' and cb == 'k':
+            return lambda m: op(m[va], vb)
+        if ca == 'v' and cb == 'v':
+            return lambda m: op(m[va], m[vb])
+        if ca == 'k' and cb == 'v':
+            return lambda m: op(va, m[vb])
+        fa, fb = _funcion(a), _funcion(b)
+        return lambda m: op(fa(m), fb(m))
+    d, mascara = ajuste
+    if ca == 'v' and cb == 'k':
+        return lambda m: ((op(m[va], vb) + d) & mascara) - d
+    if ca == 'v' and cb == 'v':
+        return lambda m: ((op(m[va], m[vb]) + d) & mascara) - d
+    if ca == 'k' and cb == 'v':
+        return lambda m: ((op(va, m[vb]) + d) & mascara) - d
+    fa, fb = _funcion(a), _funcion(b)
+    return lambda m: ((op(fa(m), fb(m)) + d) & mascara) - d
+
+
+def _mostrar(valor):
+    # Formato de {} en Rust
+    if valor is True:
+        return 'true'
+    if valor is False:
+        return 'false'
+    if isinstance(valor, float):
+        if valor != valor:
+            return 'NaN'
+        if valor in (math.inf, -math.inf):
+            return 'inf' if valor > 0 else '-inf'
+        if valor.is_integer():
+            return str(int(valor)) if valor or math.copysign(1.0, valor) > 0 else '-0'
+    return str(valor)
+
+
+def _partes_formato(formato, linea):
+    # Divide la cadena de formato en texto literal y huecos {}; devuelve
+    # (textos, huecos, especificaciones) con un texto más que huecos. Cada
+    # hueco es None (siguiente argumento), un índice o un nombre de
+    # variable, y su especificación lo que sigue a ':' ('' si no hay).
+    textos = []
+    huecos = []
+    especificaciones = []
+    actual = []
+    i = 0
+    while i < len(formato):
+        c = formato[i]
+        if c in '{}' and formato[i + 1:i + 2] == c:
+            actual.append(c)
+            i += 2
+        elif c == '{':
+            fin = formato.find('}', i)
+            if fin < 0:
+                raise ErrorCompilacion(linea, "Llave sin cerrar en la cadena de formato")
+            nombre, _, especificacion = formato[i + 1:fin].partition(':')
+            nombre = nombre.strip()
+            textos.append(''.join(actual))
+            actual = []
+            huecos.append(int(nombre) if nombre.isdigit() else (nombre or None))
+            especificaciones.append(especificacion)
+            i = fin + 1
+        elif c == '}':
+            raise ErrorCompilacion(linea, "Llave de cierre sin pareja en la cadena de formato")
+        else:
+            actual.append(c)
+            i += 1
+    textos.append(''.join(actual))
+    return textos, huecos, especificaciones
+
+
+# Especificación de un hueco: [[relleno]alineación][+][#][0][ancho][.precisión][tipo]
+# con tipo ? o una base (x, X, b, o). Los anchos y precisiones tomados de
+# argumentos ($, .*) y la notación e no se implementan: se informan al
+# compilar en lugar de ignorarse
+_ESPECIFICACION = re.compile(
+    r'(?:(?P<relleno>.)?(?P<alineacion>[<^>]))?(?P<signo>\+)?(?P<alternativo>#)?(?P<ceros>0)?'
+    r'(?P<ancho>\d+)?(?:\.(?P<precision>\d+))?(?P<tipo>[?xXbo])?', re.S)
+_BASES = {'x': ('x', '0x'), 'X': ('X', '0x'), 'b': ('b', '0b'), 'o': ('o', '0o')}
+
+
+def _formateador(especificacion, tipo, linea):
+    # Función valor -> texto de un hueco {:especificacion} para un valor del
+    # tipo dado (None: un texto ya armado)
+    if not especificacion:
+        return _mostrar
+    m = _ESPECIFICACION.fullmatch(especificacion)
+    if m is None:
+        raise ErrorCompilacion(linea, f"Formato no soportado: {{:{especificacion}}}")
+    entero = _es_entero(tipo)
+    flotante = _es_flotante(tipo)
+    base = _BASES.get(m['tipo'])
+    if base is not None and not entero:
+        raise ErrorCompilacion(linea, f"El formato {{:{especificacion}}} requiere un entero")
+    precision = int(m['precision']) if m['precision'] is not None else None
+    depuracion = m['tipo'] == '?'
+    signo_positivo = '+' if m['signo'] else ''
+
+    # Cada forma devuelve (signo y prefijo, cifras o texto)
+    if base is not None:
+        letra, prefijo = base
+        prefijo = prefijo if m['alternativo'] else ''
+        # Los negativos se muestran en complemento a dos del ancho del tipo
+        mascara = (1 << ENTEROS[_concretar(tipo)][0]) - 1
+
+        def partes(valor):
+            return prefijo, format(valor & mascara, letra)
+    elif entero:
+        def partes(valor):
+            return ('-' if valor < 0 else signo_positivo), str(abs(valor))
+    elif flotante:
+        def partes(valor):
+            negativo = math.copysign(1.0, valor) < 0 and valor == valor
+            absoluto = abs(valor)
+            if precision is not None and absoluto < math.inf:
+                texto = f'{absoluto:.{precision}f}'
+            else:
+                texto = _mostrar(absoluto)
+                if depuracion and absoluto < 1e16 and absoluto.is_integer():
+                    texto += '.0'
+            return ('-' if negativo else signo_positivo), texto
+    else:
+        def partes(valor):
+            texto = _mostrar(valor)
+            if depuracion and tipo is None:
+                texto = '"' + texto.replace('\\', '\\\\').replace('"', '\\"') + '"'
+            if precision is not None:
+                texto = texto[:precision]
+            return '', texto
+
+    ancho = int(m['ancho'] or 0)
+    if m['ceros'] and (entero or flotante):
+        # Ceros entre el signo (o el prefijo) y las cifras; la alineación
+        # no se usa
+        def formatear(valor):
+            signo, texto = partes(valor)
+            return signo + texto.rjust(ancho - len(signo), '0')
+        return formatear
+    if not ancho:
+        def formatear(valor):
+            signo, texto = partes(valor)
+            return signo + texto
+        return formatear
+    relleno = m['relleno'] or ' '
+    alineacion = m['alineacion'] or ('>' if entero or flotante else '<')
+
+    def formatear(valor):
+        signo, texto = partes(valor)
+        texto = signo + texto
+        falta = ancho - len(texto)
+        if falta <= 0:
+            return texto
+        if alineacion == '<':
+            return texto + relleno * falta
+        if alineacion == '>':
+            return relleno * falta + texto
+        return relleno * (falta // 2) + texto + relleno * (falta - falta // 2)
+    return formatear
+
+
+class _Compilador:
+    def __init__(self, escribir, limite_iteraciones, vigilar, inferidos=None):
+        self.escribir = escribir
+        self.limite = limite_iteraciones
+        # Tramos de vueltas que suman el límite, con vigilar() entre tramos
+        completos, resto = divmod(limite_iteraciones, TRAMO_VUELTAS)
+        self.tramos = [range(TRAMO_VUELTAS)] * completos + ([range(resto)] if resto else [])
+        self.vigilar = vigilar
+        self.ambitos = [{}]
+        self.casillas = 0
+        # Casilla -> tipo concreto inferido en la primera compilación; sin
+        # él, las variables de literales libres se declaran con incógnitas
+        self.inferidos = inferidos
+        self.incognitas = {}
+
+    def tipos_inferidos(self):
+        # Tipos de las variables con incógnita, o None si ninguna quedó
+        # ligada y lo compilado ya usa los tipos predeterminados
+        if not any(isinstance(_raiz(i), str) for i in self.incognitas.values()):
+            return None
+        return {casilla: _concretar(i) for casilla, i in self.incognitas.items()}
+
+    def _buscar(self, nombre):
+        for ambito in reversed(self.ambitos):
+            if nombre in ambito:
+                return ambito[nombre]
+        return None
+
+    def _tipo_variable(self, tipo):
+        # Tipo con el que se declara una variable cuyo valor es de tipo tipo
+        tipo = _raiz(tipo)
+        if tipo not in (ENTERO_LIBRE, FLOTANTE_LIBRE):
+            return tipo
+        if self.inferidos is not None:
+            return self.inferidos[self.casillas]
+        incognita = self.incognitas[self.casillas] = _Incognita(tipo)
+        return incognita
+
+    def _declarar(self, nombre, tipo):
+        casilla = self.casillas
+        self.casillas += 1
+        self.ambitos[-1][nombre] = (casilla, tipo)
+        return casilla
+
+    # Expresiones: devuelven (clase, valor, tipo) con clase 'k' (constante
+    # plegada), 'v' (casilla del marco) o 'f' (clausura)
+
+    def expresion(self, nodo):
+        clase = nodo[0]
+        if clase == 'num':
+            _, valor, tipo = nodo
+            # Un literal libre se reduce cuando se conoce su tipo
+            if tipo in ENTEROS:
+                d, mascara = _ajuste(tipo)
+                valor = ((valor + d) & mascara) - d
+            return ('k', valor, tipo)
+        if clase == 'bool':
+            return ('k', nodo[1], BOOL)
+        if clase == 'var':
+            _, nombre, linea = nodo
+            variable = self._buscar(nombre)
+            if variable is None:
+                raise ErrorCompilacion(linea, f"Variable no definida: {nombre}")
+            return ('v', variable[0], variable[1])
+        if clase == 'un':
+            return self._unaria(*nodo[1:])
+        if clase == 'as':
+            return self._conversion(*nodo[1:])
+        return self._binaria(*nodo[1:])
+
+    def _unaria(self, operador, nodo, linea):
+        operando = self.expresion(nodo)
+        tipo = operando[2]
+        if operador == '!':
+            if tipo == BOOL:
+                op = operator.not_
+            elif _es_entero(tipo):
+                d, mascara = _ajuste(tipo)
+                op = lambda x: ((~x + d) & mascara) - d
+            else:
+                raise ErrorCompilacion(linea, f"No se puede aplicar '!' a {_concretar(tipo)}")
+        elif _es_entero(tipo):
+            if not ENTEROS[_concretar(tipo)][1]:
+                raise ErrorCompilacion(linea, f"No se puede negar un entero sin signo ({_concretar(tipo)})")
+            d, mascara = _ajuste(tipo)
+            op = lambda x: ((-x + d) & mascara) - d
+        elif _es_flotante(tipo):
+            op = operator.neg
+        else:
+            raise ErrorCompilacion(linea, f"No se puede negar un valor {_concretar(tipo)}")
+        if operando[0] == 'k':
+            if tipo == ENTERO_LIBRE:
+                return ('k', ~operando[1] if operador == '!' else -operando[1], tipo)
+            return ('k', op(operando[1]), tipo)
+        f = _funcion(operando)
+        return ('f', lambda m: op(f(m)), tipo)
+
+    def _conversion(self, nodo, destino, linea):
+        operando = self.expresion(nodo)
+        origen = operando[2]
+        if destino in ENTEROS:
+            d, mascara = _ajuste(destino)
+            if _es_flotante(origen):
+                bits, con_signo = ENTEROS[destino]
+                minimo = -(1 << (bits - 1)) if con_signo else 0
+                maximo = (1 << (bits - 1)) - 1 if con_signo else (1 << bits) - 1
+
+                def op(x):
+                    # Como en Rust: trunca y satura; NaN pasa a 0
+                    if x != x:
+                        return 0
+                    if x >= maximo:
+                        return maximo
+                    if x <= minimo:
+                        return minimo
+                    return int(x)
+            elif _es_entero(origen) or origen == BOOL:
+                op = lambda x: ((int(x) + d) & mascara) - d
+            else:
+                raise ErrorCompilacion(linea, f"Conversión no soportada: {origen} as {destino}")
+        elif destino in FLOTANTES and (_es_entero(origen) or _es_flotante(origen)):
+            op = float
+        else:
+            raise ErrorCompilacion(linea, f"Conversión no soportada: {_concretar(origen)} as {destino}")
+        if operando[0] == 'k':
+            return ('k', op(operando[1]), destino)
+        f = _funcion(operando)
+        return ('f', lambda m: op(f(m)), destino)
+
+    def _binaria(self, operador, nodo_a, nodo_b, linea):
+        a = self.expresion(nodo_a)
+        b = self.expresion(nodo_b)
+        if operador in ('&&', '||'):
+            if a[2] != BOOL or b[2] != BOOL:
+                raise ErrorCompilacion(linea, f"'{operador}' requiere operandos bool")
+            if a[0] == 'k':
+                # Cortocircuito resuelto al compilar
+                if a[1] == (operador == '||'):
+                    return a
+                return b
+            fa, fb = _funcion(a), _funcion(b)
+            if operador == '&&':
+                return ('f', lambda m: fa(m) and fb(m), BOOL)
+            return ('f', lambda m: fa(m) or fb(m), BOOL)
+        if operador in ('<<', '>>'):
+            # La cantidad desplazada puede ser de otro tipo entero
+            tipo = a[2]
+            if not (_es_entero(tipo) and _es_entero(b[2])):
+                raise ErrorCompilacion(linea, f"'{operador}' requiere operandos enteros")
+        else:
+            tipo = _unificar(a[2], b[2], linea)
+        ajuste = None
+        if operador in COMPARACIONES:
+            op = {'==': operator.eq, '!=': operator.ne, '<': operator.lt,
+                  '>': operator.gt, '<=': operator.le, '>=': operator.ge}[operador]
+            resultado = BOOL
+        elif _es_entero(tipo):
+            bits = ENTEROS[_concretar(tipo)][0]
+            op = {
+                '+': operator.add, '-': operator.sub, '*': operator.mul,
+                '/': _division_entera(linea), '%': _resto_entero(linea),
+                '&': operator.and_, '|': operator.or_, '^': operator.xor,
+                '<<': _desplazamiento(operator.lshift, bits),
+                '>>': _desplazamiento(operator.rshift, bits),
+            }[operador]
+            # & | ^ >> no salen del rango del tipo
+            if operador in ('+', '-', '*', '/', '<<'):
+                ajuste = _ajuste(tipo)
+            resultado = tipo
+        elif _es_flotante(tipo) and operador in ('+', '-', '*', '/', '%'):
+            op = {'+': operator.add, '-': operator.sub, '*': operator.mul,
+                  '/': _division_flotante, '%': _resto_flotante}[operador]
+            resultado = tipo
+        elif tipo == BOOL and operador in ('&', '|', '^'):
+            op = {'&': operator.and_, '|': operator.or_, '^': operator.ne}[operador]
+            resultado = BOOL
+        else:
+            raise ErrorCompilacion(linea, f"Operador '{operador}' no soportado para {_concretar(tipo)}")
+        if a[0] == 'k' and b[0] == 'k':
+            valor = op(a[1], b[1])
+            if ajuste is not None and tipo != ENTERO_LIBRE:
+                d, mascara = ajuste
+                valor = ((valor + d) & mascara) - d
+            return ('k', valor, resultado)
+        return ('f', _binaria(op, a, b, ajuste), resultado)
+
+    # Sentencias: devuelven (clausura o None, señales que pueden escapar)
+
+    def sentencia(self, nodo):
+        return getattr(self, '_' + nodo[0])(*nodo[1:])
+
+    def _bloque(self, sentencias, nuevo_ambito=True):
+        if nuevo_ambito:
+            self.ambitos.append({})
+        funciones = []
+        senales = set()
+        for nodo in sentencias:
+            funcion, escapan = self.sentencia(nodo)
+            if funcion is not None:
+                funciones.append(funcion)
+                senales |= escapan
+        if nuevo_ambito:
+            self.ambitos.pop()
+        senales = frozenset(senales)
+        if not funciones:
+            return None, senales
+        if len(funciones) == 1:
+            return funciones[0], senales
+        if senales:
+            def bloque(m):
+                for funcion in funciones:
+                    r = funcion(m)
+                    if r is not None:
+                        return r
+            return bloque, senales
+        # Sin saltos posibles no hace falta mirar lo que devuelve cada sentencia
+        if len(funciones) == 2:
+            f1, f2 = funciones
+
+            def bloque(m):
+                f1(m)
+                f2(m)
+        elif len(funciones) == 3:
+            f1, f2, f3 = funciones
+
+            def bloque(m):
+                f1(m)
+                f2(m)
+                f3(m)
+        else:
+            def bloque(m):
+                for funcion in funciones:
+                    funcion(m)
+        return bloque, senales
+
+    def _almacenar(self, casilla, valor):
+        clase, dato = valor[0], valor[1]
+        if clase == 'k':
+            def almacenar(m):
+                m[casilla] = dato
+        elif clase == 'v':
+            def almacenar(m):
+                m[casilla] = m[dato]
+        else:
+            def almacenar(m):
+                m[casilla] = dato(m)
+        return almacenar
+
+    def _let(self, nombre, anotacion, nodo, linea):
+        tipo = None
+        if anotacion in ENTEROS or anotacion in FLOTANTES or anotacion == BOOL:
+            tipo = anotacion
+        if nodo is None:
+            # Sin inicializar: la casilla empieza en cero como antes
+            self._declarar(nombre, tipo or 'i32')
+            return None, frozenset()
+        # El inicializador se compila antes de declarar: let x = x + 1
+        valor = self.expresion(nodo)
+        if tipo is None:
+            tipo = self._tipo_variable(valor[2])
+        else:
+            _unificar(tipo, valor[2], linea)
+        valor = _constante(valor, tipo)
+        return self._almacenar(self._declarar(nombre, tipo), valor), frozenset()
+
+    def _asig(self, nombre, operador, nodo, linea):
+        variable = self._buscar(nombre)
+        if variable is None:
+            raise ErrorCompilacion(linea, f"Variable no definida: {nombre}")
+        casilla, tipo = variable
+        if operador != '=':
+            nodo = ('bin', operador[:-1], ('var', nombre, linea), nodo, linea)
+        valor = self.expresion(nodo)
+        _unificar(tipo, valor[2], linea)
+        return self._almacenar(casilla, _constante(valor, tipo)), frozenset()
+
+    def _expr(self, nodo):
+        # Solo se evalúa por sus posibles errores de ejecución
+        valor = self.expresion(nodo)
+        if valor[0] != 'f':
+            return None, frozenset()
+        return valor[1], frozenset()
+
+    def _condicion(self, nodo, linea):
+        condicion = self.expresion(nodo)
+        if condicion[2] != BOOL:
+            raise ErrorCompilacion(linea, f"La condición debe ser bool, no {_concretar(condicion[2])}")
+        return condicion
+
+    def _if(self, nodo_condicion, entonces, sino, linea):
+        condicion = self._condicion(nodo_condicion, linea)
+        f_entonces, s_entonces = self.sentencia(entonces)
+        f_sino, s_sino = self.sentencia(sino) if sino is not None else (None, frozenset())
+        senales = s_entonces | s_sino
+        if condicion[0] == 'k':
+            return (f_entonces, s_entonces) if condicion[1] else (f_sino, s_sino)
+        f_condicion = _funcion(condicion)
+        f_entonces = f_entonces or (lambda m: None)
+        if f_sino is None:
+            def si(m):
+                if f_condicion(m):
+                    return f_entonces(m)
+        else:
+            def si(m):
+                if f_condicion(m):
+                    return f_entonces(m)
+                return f_sino(m)
+        return si, senales
+
+    def _limite_superado(self, linea):
+        raise ErrorEjecucion(linea, f"El bucle superó el límite de {self.limite} iteraciones")
+
+    def _while(self, nodo_condicion, cuerpo, linea):
+        condicion = _funcion(self._condicion(nodo_condicion, linea))
+        f_cuerpo, senales = self.sentencia(cuerpo)
+        f_cuerpo = f_cuerpo or (lambda m: None)
+        tramos = self.tramos
+        vigilar = self.vigilar
+        limite_superado = self._limite_superado
+        if not senales:
+            def mientras(m):
+                for tramo in tramos:
+                    for _ in tramo:
+                        if not condicion(m):
+                            return
+                        f_cuerpo(m)
+                    vigilar()
+                limite_superado(linea)
+            return mientras, senales
+
+        def mientras(m):
+            for tramo in tramos:
+                for _ in tramo:
+                    if not condicion(m):
+                        return
+                    r = f_cuerpo(m)
+                    if r is not None and r is not _CONTINUE:
+                        return None if r is _BREAK else r
+                vigilar()
+            limite_superado(linea)
+        return mientras, senales - {_BREAK, _CONTINUE}
+
+    def _loop(self, cuerpo, linea):
+        f_cuerpo, senales = self.sentencia(cuerpo)
+        f_cuerpo = f_cuerpo or (lambda m: None)
+        tramos = self.tramos
+        vigilar = self.vigilar
+        limite_superado = self._limite_superado
+
+        def bucle(m):
+            for tramo in tramos:
+                for _ in tramo:
+                    r = f_cuerpo(m)
+                    if r is not None and r is not _CONTINUE:
+                        return None if r is _BREAK else r
+                vigilar()
+            limite_superado(linea)
+        return bucle, senales - {_BREAK, _CONTINUE}
+
+    def _for(self, nombre, nodo_desde, nodo_hasta, inclusivo, cuerpo, linea):
+        desde = self.expresion(nodo_desde)
+        hasta = self.expresion(nodo_hasta)
+        tipo = _unificar(desde[2], hasta[2], linea)
+        if not _es_entero(tipo):
+            raise ErrorCompilacion(linea, "El rango del bucle for debe ser entero")
+        self.ambitos.append({})
+        tipo = self._tipo_variable(tipo)
+        f_desde, f_hasta = _funcion(_constante(desde, tipo)), _funcion(_constante(hasta, tipo))
+        extra = 1 if inclusivo else 0
+        casilla = self._declarar(nombre, tipo)
+        f_cuerpo, senales = self.sentencia(cuerpo)
+        self.ambitos.pop()
+        f_cuerpo = f_cuerpo or (lambda m: None)
+        limite = self.limite
+        vigilar = self.vigilar
+        limite_superado = self._limite_superado
+
+        def para(m):
+            inicio = f_desde(m)
+            fin = f_hasta(m) + extra
+            if fin - inicio > limite:
+                limite_superado(linea)
+            for desde in range(inicio, fin, TRAMO_VUELTAS):
+                for valor in range(desde, min(desde + TRAMO_VUELTAS, fin)):
+                    m[casilla] = valor
+                    r = f_cuerpo(m)
+                    if r is not None and r is not _CONTINUE:
+                        return None if r is _BREAK else r
+                vigilar()
+        return para, senales - {_BREAK, _CONTINUE}
+
+    def _break(self):
+        return (lambda m: _BREAK), frozenset((_BREAK,))
+
+    def _continue(self):
+        return (lambda m: _CONTINUE), frozenset((_CONTINUE,))
+
+    def _return(self):
+        return (lambda m: _RETORNO), frozenset((_RETORNO,))
+
+    def _imprimir(self, formato, nodos, salto, linea):
+        textos, huecos, especificaciones = _partes_formato(formato, linea)
+        # Como antes, println!(x) con x sin definir muestra el aviso en la salida
+        argumentos = [
+            None if nodo[0] == 'var' and self._buscar(nodo[1]) is None else self.expresion(nodo)
+            for nodo in nodos
+        ]
+        siguiente = 0
+        piezas = []
+        for texto, hueco, especificacion in zip(textos, huecos, especificaciones):
+            if hueco is None:
+                if siguiente >= len(argumentos):
+                    raise ErrorCompilacion(linea, "Faltan argumentos para la cadena de formato")
+                valor = argumentos[siguiente]
+                siguiente += 1
+            elif isinstance(hueco, int):
+                if hueco >= len(argumentos):
+                    raise ErrorCompilacion(linea, f"No existe el argumento {hueco}")
+                valor = argumentos[hueco]
+            else:
+                valor = self.expresion(('var', hueco, linea))
+            if valor is None:
+                valor = ('k', 'Variable no definida', None)
+            elif valor[2] == ENTERO_LIBRE:
+                valor = _constante(valor, valor[2])
+            mostrar = _formateador(especificacion, valor[2], linea)
+            piezas.append(texto)
+            piezas.append(mostrar(valor[1]) if valor[0] == 'k' else (_funcion(valor), mostrar))
+        piezas.append(textos[-1] + ('\n' if salto else ''))
+        if huecos and siguiente < len(argumentos) and not any(isinstance(h, int) for h in huecos):
+            raise ErrorCompilacion(linea, "Sobran argumentos para la cadena de formato")
+        escribir = self.escribir
+        # Las piezas constantes contiguas se unen al compilar
+        unidas = []
+        for pieza in piezas:
+            if isinstance(pieza, str) and unidas and isinstance(unidas[-1], str):
+                unidas[-1] += pieza
+            elif pieza != '':
+                unidas.append(pieza)
+        if all(isinstance(pieza, str) for pieza in unidas):
+            texto = ''.join(unidas)
+            return (lambda m: escribir(texto)), frozenset()
+        piezas = tuple((pieza, None, None) if isinstance(pieza, str) else (None,) + pieza for pieza in unidas)
+
+        def imprimir(m):
+            escribir(''.join([texto if f is None else mostrar(f(m)) for texto, f, mostrar in piezas]))
+        return imprimir, frozenset()
+
+
+class Programa:
+    def __init__(self, code, limite_iteraciones=LIMITE_ITERACIONES):
+        self._salida = []
+        self._comprobar = None
+        raiz, errores = construir_arbol(tokenizar(code, incluir_comentarios=False))
+        if errores:
+            raise ErrorSintaxis(errores)
+        programa = _traducir_programa(raiz)
+        try:
+            compilador = _Compilador(self._salida.append, limite_iteraciones, self._vigilar)
+            self._funcion, _ = compilador.sentencia(programa)
+            inferidos = compilador.tipos_inferidos()
+            if inferidos is not None:
+                # Algún literal libre tomó el tipo de un uso posterior: lo
+                # compilado antes de saberlo usaba el predeterminado
+                compilador = _Compilador(self._salida.append, limite_iteraciones, self._vigilar, inferidos)
+                self._funcion, _ = compilador.sentencia(programa)
+        except RecursionError:
+            raise ErrorCompilacion(0, "Expresión demasiado anidada") from None
+        self.casillas = compilador.casillas
+
+    def _vigilar(self):
+        if self._comprobar is not None:
+            self._comprobar()
+
+    def ejecutar(self, comprobar=None):
+        # Devuelve el texto impreso; un error de ejecución lleva en .salida
+        # lo impreso hasta ese momento. comprobar() se llama entre tramos de
+        # vueltas de los bucles y puede cortar la ejecución con una excepción
+        self._salida.clear()
+        self._comprobar = comprobar
+        try:
+            if self._funcion is not None:
+                self._funcion([0] * self.casillas)
+        except ErrorEjecucion as e:
+            e.salida = ''.join(self._salida)
+            raise
+        finally:
+            texto = ''.join(self._salida)
+            self._salida.clear()
+            self._comprobar = None
+        return texto
+
+
+def ejecutar_programa(code, limite_iteraciones=LIMITE_ITERACIONES):
+    return Programa(code, limite_iteraciones).ejecutar()
@@ -0,0 +1,188 @@
+import re
+
+# Motor léxico sin interfaz gráfica: una sola expresión regular maestra con
+# grupos con nombre que clasifica cada token en el mismo momento en que se
+# reconoce, recorriendo todo el búfer de una vez (no línea por línea).
+
+RUST_KEYWORDS = {
+    'fn': 'Función',
+    'let': 'Declaración de variable',
+    'mut': 'Mutable',
+    'struct': 'Estructura',
+    'impl': 'Implementación',
+    'for': 'Bucle for',
+    'if': 'Condicional if',
+    'else': 'Condicional else',
+    'return': 'Retorno',
+    'self': 'Referencia al objeto actual',
+    'Vec': 'Vector',
+    'new': 'Crear nueva instancia',
+    'push': 'Agregar elemento'
+}
+
+# Tipos de token (nombre del grupo en la expresión maestra) -> (Tipo, Descripción)
+ESPACIO = 'espacio'
+COMENTARIO = 'comentario'
+COMENTARIO_ABIERTO = 'comentario_abierto'
+CADENA = 'cadena'
+CADENA_ABIERTA = 'cadena_abierta'
+CARACTER = 'caracter'
+TIEMPO_VIDA = 'tiempo_vida'
+MACRO = 'macro'
+PALABRA_CLAVE = 'palabra_clave'
+IDENTIFICADOR = 'identificador'
+NUMERO = 'numero'
+OPERADOR = 'operador'
+DELIMITADOR = 'delimitador'
+OTRO = 'otro'
+
+TIPOS_TOKEN = {
+    COMENTARIO: ("Comentario", "Comentario de código"),
+    COMENTARIO_ABIERTO: ("Comentario", "Comentario de bloque sin cerrar"),
+    CADENA: ("Cadena", "Literal de cadena"),
+    CADENA_ABIERTA: ("Cadena", "Literal de cadena sin cerrar"),
+    CARACTER: ("Carácter", "Literal de carácter"),
+    TIEMPO_VIDA: ("Tiempo de vida", "Anotación de tiempo de vida"),
+    MACRO: ("Macro", "Invocación de macro"),
+    PALABRA_CLAVE: ("Palabra clave", None),
+    IDENTIFICADOR: ("Identificador", "Nombre de variable o función"),
+    NUMERO: ("Número", "Valor numérico literal"),
+    OPERADOR: ("Operador", "Operador aritmético o lógico"),
+    DELIMITADOR: ("Delimitador", "Símbolo de agrupación o separación"),
+    OTRO: ("Otro", "Símbolo del lenguaje"),
+}
+
+# Identificador numérico de cada tipo para los almacenes compactos
+TIPOS = (ESPACIO,) + tuple(TIPOS_TOKEN)
+ID_TIPO = {tipo: i for i, tipo in enumerate(TIPOS)}
+
+# Tokens que pueden abarcar varias líneas
+TIPOS_MULTILINEA = frozenset((ESPACIO, COMENTARIO, COMENTARIO_ABIERTO, CADENA, CADENA_ABIERTA))
+
+_OPERADORES = (
+    '::', '->', '=>', '..=', '...', '..', '<<=', '>>=', '==', '!=', '<=', '>=',
+    '&&', '||', '+=', '-=', '*=', '/=', '%=', '^=', '&=', '|=', '<<', '>>',
+)
+
+
+def _patron_palabras_clave(palabras):
+    # Las más largas primero para que la alternancia no corte prefijos
+    ordenadas = sorted(palabras, key=len, reverse=True)
+    return r'\b(?:' + '|'.join(map(re.escape, ordenadas)) + r')\b'
+
+
+def compilar_patron(palabras_clave=RUST_KEYWORDS):
+    operadores = '|'.join(map(re.escape, sorted(_OPERADORES, key=len, reverse=True)))
+    # Los espacios y tabuladores se consumen como prefijo de cada token; solo
+    # los saltos de línea producen una coincidencia propia.
+    patron = r'[ \t\r\f\v]*(?:' + '|'.join((
+        rf'(?P<{ESPACIO}>\s+|\Z)',
+        rf'(?P<{COMENTARIO}>//[^\n]*|/\*[\s\S]*?\*/)',
+        rf'(?P<{COMENTARIO_ABIERTO}>/\*[\s\S]*)',
+        rf'(?P<{CADENA}>b?r(?P<hashes>#*)"[\s\S]*?"(?P=hashes)|b?"(?:[^"\\]|\\[\s\S])*")',
+        rf'(?P<{CADENA_ABIERTA}>b?r#*"[\s\S]*|b?"[\s\S]*)',
+        rf"(?P<{CARACTER}>b?'(?:[^'\\\n]|\\(?:u\{{[0-9a-fA-F]{{1,6}}\}}|x[0-9a-fA-F]{{2}}|.))')",
+        rf"(?P<{TIEMPO_VIDA}>'[A-Za-z_]\w*)",
+        rf'(?P<{MACRO}>[A-Za-z_]\w*!(?=\s*[(\[{{]))',
+        rf'(?P<{PALABRA_CLAVE}>{_patron_palabras_clave(palabras_clave)})',
+        rf'(?P<{IDENTIFICADOR}>[A-Za-z_]\w*)',
+        rf'(?P<{NUMERO}>(?:0x[0-9a-fA-F_]+|0o[0-7_]+|0b[01_]+|\d[\d_]*(?:\.\d[\d_]*)?(?:[eE][+-]?\d+)?)'
+        r'(?:[iu](?:8|16|32|64|128|size)|f32|f64)?)',
+        rf'(?P<{OPERADOR}>{operadores}|[+\-*/=<>!&|^~%?@])',
+        rf'(?P<{DELIMITADOR}>[{{}}()\[\];,.:#])',
+        rf'(?P<{OTRO}>.)',
+    )) + ')'
+    return re.compile(patron)
+
+
+PATRON_TOKEN = compilar_patron()
+
+
+def tokenizar(code, patron=PATRON_TOKEN, incluir_comentarios=True):
+    # Genera (tipo, texto, línea, columna, desplazamiento) para cada token.
+    # Las líneas empiezan en 1 y las columnas en 0, como en el widget Text.
+    # Un comentario o una cadena sin cerrar se extiende hasta el final.
+    linea = 1
+    inicio_linea = 0
+    for m in patron.finditer(code):
+        tipo = m.lastgroup
+        if tipo == ESPACIO:
+            inicio, fin = m.span(tipo)
+            saltos = code.count('\n', inicio, fin)
+            if saltos:
+                linea += saltos
+                inicio_linea = code.rfind('\n', inicio, fin) + 1
+            continue
+        texto = m.group(tipo)
+        inicio = m.start(tipo)
+        if tipo in TIPOS_MULTILINEA:
+            if tipo != COMENTARIO or incluir_comentarios:
+                yield (tipo, texto, linea, inicio - inicio_linea, inicio)
+            saltos = texto.count('\n')
+            if saltos:
+                linea += saltos
+                inicio_linea = inicio + texto.rfind('\n') + 1
+            continue
+        yield (tipo, texto, linea, inicio - inicio_linea, inicio)
+
+def describir(tipo, texto, palabras_clave=RUST_KEYWORDS):
+    nombre, descripcion = TIPOS_TOKEN[tipo]
+    if descripcion is None:
+        descripcion = palabras_clave[texto]
+    return nombre, descripcion
+
+
+def clasificar(texto, patron=PATRON_TOKEN, palabras_clave=RUST_KEYWORDS):
+    # Clasifica un token suelto con la misma expresión maestra
+    m = patron.match(texto)
+    if m is None or m.lastgroup == ESPACIO or m.span(m.lastgroup) != (0, len(texto)):
+        return TIPOS_TOKEN[OTRO]
+    return describir(m.lastgroup, texto, palabras_clave)
+
+
+# Lexer por línea para el análisis incremental. El estado de entrada de una
+# línea es None o (tipo, cierre) de la construcción multilínea que viene
+# abierta de la línea anterior: cierre es '*/', '"' seguido de las almohadillas
+# de una cadena cruda, o None para una cadena normal (con escapes).
+_FIN_CADENA = re.compile(r'(?:[^"\\]|\\.)*"')
+
+
+def _estado_abierto(tipo, texto):
+    if tipo == COMENTARIO_ABIERTO:
+        return (COMENTARIO_ABIERTO, '*/')
+    comilla = texto.index('"')
+    if 'r' in texto[:comilla]:
+        return (CADENA_ABIERTA, '"' + texto[texto.index('r') + 1:comilla])
+    return (CADENA_ABIERTA, None)
+
+
+def tokenizar_linea(linea, estado=None, patron=PATRON_TOKEN):
+    # Devuelve ([(tipo, texto, columna)], estado_salida) para una sola línea
+    # sin su salto final. Si la línea continúa una construcción abierta, el
+    # primer token es el fragmento que la continúa o la cierra; su tipo
+    # indica si sigue abierta.
+    tokens = []
+    pos = 0
+    if estado is not None:
+        tipo, cierre = estado
+        if cierre is None:
+            m = _FIN_CADENA.match(linea)
+            fin = m.end() if m else -1
+        else:
+            fin = linea.find(cierre)
+            if fin >= 0:
+                fin += len(cierre)
+        if fin < 0:
+            return [(tipo, linea, 0)], estado
+        # El fragmento que cierra la construcción lleva el tipo cerrado
+        tokens.append((COMENTARIO if tipo == COMENTARIO_ABIERTO else CADENA, linea[:fin], 0))
+        pos = fin
+    for m in patron.finditer(linea, pos):
+        tipo = m.lastgroup
+        if tipo == ESPACIO:
+            continue
+        texto = m.group(tipo)
+        tokens.append((tipo, texto, m.start(tipo)))
+        if tipo == COMENTARIO_ABIERTO or tipo == CADENA_ABIERTA:
+            return tokens, _estado_abierto(tipo, texto)
+    return tokens, None
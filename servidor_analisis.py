@@ -0,0 +1,364 @@
+import argparse
+import json
+import queue
+import sys
+import threading
+
+from motor_lexico import RUST_KEYWORDS
+from analisis_segmentado import DocumentoSegmentado
+from analisis_incremental import componer_cambios
+from analizador_sintactico import AVISO_LIMITE
+from instrumentacion import Metricas, etapa
+
+# Servidor de análisis persistente para integraciones de editor y hooks: un
+# proceso de larga vida que habla JSON-RPC 2.0 por la entrada y la salida
+# estándar con el encuadre de LSP (cabecera Content-Length). Mantiene en
+# memoria la expresión maestra compilada, las palabras clave y, por cada
+# documento abierto, su documento segmentado; la caché de líneas del lexer
+# se comparte entre documentos. No importa tkinter.
+#
+# Métodos:
+#   initialize, shutdown, exit                 ciclo de vida de LSP
+#   textDocument/didOpen, didChange, didClose  documentos abiertos; los
+#       cambios pueden ser el texto completo o rangos (sincronización
+#       incremental)
+#   analizador/analizar   {uri} o {text}: diagnósticos como respuesta
+#   analizador/metricas   métricas del mensaje atendido antes que este
+#       (cada mensaje, con la publicación que provoca, se mide aparte)
+#
+# Después de abrir o cambiar un documento se publican sus diagnósticos con
+# textDocument/publishDiagnostics, solo cuando no quedan mensajes por leer
+# (una ráfaga de cambios se verifica una vez) y solo si cambiaron. Las
+# posiciones son en unidades UTF-16, como pide LSP.
+
+VERSION_JSONRPC = '2.0'
+
+ERROR_ANALISIS_JSON = -32700
+SOLICITUD_INVALIDA = -32600
+METODO_INEXISTENTE = -32601
+PARAMETROS_INVALIDOS = -32602
+ERROR_INTERNO = -32603
+
+SINCRONIZACION_INCREMENTAL = 2
+SEVERIDAD_ERROR = 1
+SEVERIDAD_AVISO = 2
+
+
+def leer_mensajes(entrada):
+    # Cuerpos (bytes) de los mensajes encuadrados de un flujo binario
+    while True:
+        longitud = None
+        while True:
+            linea = entrada.readline()
+            if not linea:
+                return
+            linea = linea.strip()
+            if not linea:
+                break
+            nombre, _, valor = linea.partition(b':')
+            if nombre.strip().lower() == b'content-length':
+                longitud = int(valor)
+        if longitud is None:
+            continue
+        cuerpo = entrada.read(longitud)
+        if len(cuerpo) < longitud:
+            return
+        yield cuerpo
+
+
+def escribir_mensaje(salida, mensaje):
+    cuerpo = json.dumps(mensaje, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    salida.write(b'Content-Length: %d\r\n\r\n' % len(cuerpo) + cuerpo)
+    salida.flush()
+
+
+def _indice(linea, caracter):
+    # Columna en unidades UTF-16 -> índice en la cadena
+    if linea.isascii():
+        return min(caracter, len(linea))
+    unidades = 0
+    for indice, letra in enumerate(linea):
+        if unidades >= caracter:
+            return indice
+        unidades += 2 if ord(letra) > 0xFFFF else 1
+    return len(linea)
+
+
+def normalizar_saltos(texto):
+    # \r\n y \r pasan a \n, como al leer un archivo (flujo_lexico)
+    if '\r' in texto:
+        texto = texto.replace('\r\n', '\n').replace('\r', '\n')
+    return texto
+
+
+def _unidades(linea):
+    if linea.isascii():
+        return len(linea)
+    return len(linea) + sum(1 for letra in linea if ord(letra) > 0xFFFF)
+
+
+class ErrorSolicitud(Exception):
+    def __init__(self, codigo, mensaje):
+        super().__init__(mensaje)
+        self.codigo = codigo
+
+
+class DocumentoAbierto:
+    __slots__ = ('uri', 'version', 'segmentado', 'publicados')
+
+    def __init__(self, uri, version, segmentado):
+        self.uri = uri
+        self.version = version
+        self.segmentado = segmentado
+        self.publicados = None
+
+    @property
+    def lineas(self):
+        return self.segmentado.documento.lineas
+
+    def aplicar_cambios(self, cambios):
+        # Cada rango reemplaza solo sus líneas en el documento, sin unir ni
+        # comparar el texto completo; los segmentos se verifican una vez con
+        # el cambio compuesto de todos
+        documento = self.segmentado.documento
+        total = None
+        for cambio in cambios:
+            texto = normalizar_saltos(cambio['text'])
+            rango = cambio.get('range')
+            if rango is None:
+                paso = documento.actualizar(texto)
+            else:
+                lineas = documento.lineas
+                inicio, fin = rango['start'], rango['end']
+                l1 = min(inicio['line'], len(lineas) - 1)
+                l2 = min(fin['line'], len(lineas) - 1)
+                prefijo = lineas[l1][:_indice(lineas[l1], inicio['character'])] if inicio['line'] == l1 else lineas[l1]
+                sufijo = lineas[l2][_indice(lineas[l2], fin['character']):] if fin['line'] == l2 else ''
+                paso = documento.reemplazar(l1, l2 + 1, (prefijo + texto + sufijo).split('\n'))
+            total = paso if total is None else componer_cambios(total, paso)
+        if total is not None:
+            self.segmentado.verificar_cambio(total)
+
+
+class ServidorAnalisis:
+    def __init__(self, salida, palabras_clave=RUST_KEYWORDS, medir=True):
+        self.salida = salida
+        self.palabras_clave = palabras_clave
+        self.medir = medir
+        # Métricas del último mensaje atendido
+        self.metricas = None
+        self.documentos = {}
+        # Caché de líneas del lexer compartida por todos los documentos
+        self.cache_lineas = {}
+        # uri -> None, en el orden en que se editaron
+        self.por_publicar = {}
+        self.apagado = False
+        self.terminado = False
+
+    def _nuevo_documento(self):
+        return DocumentoSegmentado(self.palabras_clave, cache=self.cache_lineas)
+
+    # --- Bucle ---------------------------------------------------------------
+
+    def ejecutar(self, entrada):
+        # Un hilo lee los mensajes; este los atiende y publica los
+        # diagnósticos pendientes cuando la cola queda vacía
+        mensajes = queue.Queue()
+
+        def leer():
+            for cuerpo in leer_mensajes(entrada):
+                mensajes.put(cuerpo)
+            mensajes.put(None)
+
+        threading.Thread(target=leer, daemon=True).start()
+        while not self.terminado:
+            cuerpo = mensajes.get()
+            if cuerpo is None:
+                break
+            # Métricas nuevas para cada mensaje: el servidor vive mucho y no
+            # deben acumularse de una solicitud a otra
+            metricas = Metricas.desde_entorno().iniciar() if self.medir else None
+            try:
+                self.atender(cuerpo)
+                if self.por_publicar and mensajes.empty():
+                    self.publicar_pendientes()
+            finally:
+                if metricas is not None:
+                    self.metricas = metricas.terminar()
+        return 0 if self.apagado else 1
+
+    def atender(self, cuerpo):
+        try:
+            mensaje = json.loads(cuerpo)
+        except ValueError as error:
+            self._responder_error(None, ERROR_ANALISIS_JSON, f"JSON inválido: {error}")
+            return
+        if not isinstance(mensaje, dict):
+            self._responder_error(None, SOLICITUD_INVALIDA, "Se esperaba un objeto")
+            return
+        metodo = mensaje.get('method')
+        identificador = mensaje.get('id')
+        es_solicitud = 'id' in mensaje
+        if metodo is None:
+            # Respuesta del cliente a una solicitud del servidor: no hay
+            return
+        manejador = self._METODOS.get(metodo)
+        if manejador is None:
+            # Las notificaciones desconocidas ($/cancelRequest...) se ignoran
+            if es_solicitud:
+                self._responder_error(identificador, METODO_INEXISTENTE, f"Método desconocido: {metodo}")
+            return
+        if self.apagado and metodo != 'exit':
+            if es_solicitud:
+                self._responder_error(identificador, SOLICITUD_INVALIDA, "El servidor ya recibió shutdown")
+            return
+        try:
+            resultado = manejador(self, mensaje.get('params') or {})
+        except ErrorSolicitud as error:
+            if es_solicitud:
+                self._responder_error(identificador, error.codigo, str(error))
+            return
+        except (KeyError, TypeError, ValueError, IndexError) as error:
+            if es_solicitud:
+                self._responder_error(identificador, PARAMETROS_INVALIDOS, f"Parámetros inválidos: {error!r}")
+            return
+        except Exception as error:
+            if es_solicitud:
+                self._responder_error(identificador, ERROR_INTERNO, f"{type(error).__name__}: {error}")
+            return
+        if es_solicitud:
+            escribir_mensaje(self.salida, {'jsonrpc': VERSION_JSONRPC, 'id': identificador, 'result': resultado})
+
+    def _responder_error(self, identificador, codigo, mensaje):
+        escribir_mensaje(self.salida, {
+            'jsonrpc': VERSION_JSONRPC, 'id': identificador,
+            'error': {'code': codigo, 'message': mensaje},
+        })
+
+    def _notificar(self, metodo, parametros):
+        escribir_mensaje(self.salida, {'jsonrpc': VERSION_JSONRPC, 'method': metodo, 'params': parametros})
+
+    # --- Diagnósticos --------------------------------------------------------
+
+    @etapa('diagnosticos', 'diagnósticos')
+    def diagnosticos(self, segmentado):
+        errores, semanticos = segmentado.errores()
+        lineas = segmentado.documento.lineas
+        resultado = []
+        for linea, tipo, descripcion in errores + semanticos:
+            fila = min(max(linea, 1), len(lineas)) - 1
+            resultado.append({
+                'range': {
+                    'start': {'line': fila, 'character': 0},
+                    'end': {'line': fila, 'character': _unidades(lineas[fila])},
+                },
+                'severity': SEVERIDAD_AVISO if tipo == AVISO_LIMITE else SEVERIDAD_ERROR,
+                'source': tipo,
+                'message': descripcion,
+            })
+        return resultado
+
+    def publicar_pendientes(self):
+        por_publicar, self.por_publicar = self.por_publicar, {}
+        for uri in por_publicar:
+            documento = self.documentos.get(uri)
+            if documento is None:
+                continue
+            diagnosticos = self.diagnosticos(documento.segmentado)
+            if diagnosticos == documento.publicados:
+                continue
+            documento.publicados = diagnosticos
+            parametros = {'uri': uri, 'diagnostics': diagnosticos}
+            if documento.version is not None:
+                parametros['version'] = documento.version
+            self._notificar('textDocument/publishDiagnostics', parametros)
+
+    # --- Métodos -------------------------------------------------------------
+
+    def _initialize(self, parametros):
+        return {
+            'capabilities': {
+                'textDocumentSync': {'openClose': True, 'change': SINCRONIZACION_INCREMENTAL},
+            },
+            'serverInfo': {'name': 'analizador-rust'},
+        }
+
+    def _initialized(self, parametros):
+        return None
+
+    def _shutdown(self, parametros):
+        self.apagado = True
+        return None
+
+    def _exit(self, parametros):
+        self.terminado = True
+        return None
+
+    def _did_open(self, parametros):
+        datos = parametros['textDocument']
+        segmentado = self._nuevo_documento()
+        segmentado.actualizar(normalizar_saltos(datos['text']))
+        self.documentos[datos['uri']] = DocumentoAbierto(datos['uri'], datos.get('version'), segmentado)
+        self.por_publicar[datos['uri']] = None
+
+    def _did_change(self, parametros):
+        datos = parametros['textDocument']
+        documento = self.documentos.get(datos['uri'])
+        if documento is None:
+            raise ErrorSolicitud(PARAMETROS_INVALIDOS, f"Documento no abierto: {datos['uri']}")
+        documento.aplicar_cambios(parametros['contentChanges'])
+        documento.version = datos.get('version', documento.version)
+        self.por_publicar[datos['uri']] = None
+
+    def _did_close(self, parametros):
+        uri = parametros['textDocument']['uri']
+        if self.documentos.pop(uri, None) is not None:
+            self.por_publicar.pop(uri, None)
+            # Se limpian los diagnósticos que el editor estaba mostrando
+            self._notificar('textDocument/publishDiagnostics', {'uri': uri, 'diagnostics': []})
+
+    def _analizar(self, parametros):
+        # Con text se analiza ese texto sin abrirlo (hooks); con uri, el
+        # documento abierto
+        if 'text' in parametros:
+            segmentado = self._nuevo_documento()
+            segmentado.actualizar(normalizar_saltos(parametros['text']))
+            return {'uri': parametros.get('uri'), 'diagnostics': self.diagnosticos(segmentado)}
+        documento = self.documentos.get(parametros['uri'])
+        if documento is None:
+            raise ErrorSolicitud(PARAMETROS_INVALIDOS, f"Documento no abierto: {parametros['uri']}")
+        self.por_publicar.pop(documento.uri, None)
+        diagnosticos = self.diagnosticos(documento.segmentado)
+        documento.publicados = diagnosticos
+        return {'uri': documento.uri, 'version': documento.version, 'diagnostics': diagnosticos}
+
+    def _metricas(self, parametros):
+        return self.metricas.a_dict() if self.metricas is not None else None
+
+    _METODOS = {
+        'initialize': _initialize,
+        'initialized': _initialized,
+        'shutdown': _shutdown,
+        'exit': _exit,
+        'textDocument/didOpen': _did_open,
+        'textDocument/didChange': _did_change,
+        'textDocument/didClose': _did_close,
+        'analizador/analizar': _analizar,
+        'analizador/metricas': _metricas,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Servidor de análisis persistente (JSON-RPC sobre la entrada y salida estándar)")
+    parser.add_argument('--sin-metricas', action='store_true', help="No medir las etapas de cada mensaje")
+    args = parser.parse_args(argv)
+    servidor = ServidorAnalisis(sys.stdout.buffer, medir=not args.sin_metricas)
+    # El hilo lector usa su propio objeto de archivo (que no se cierra): si
+    # usara sys.stdin, el intérprete no podría terminar mientras lee
+    entrada = open(sys.stdin.fileno(), 'rb', closefd=False)
+    return servidor.ejecutar(entrada)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+from array import array
+
+from motor_lexico import RUST_KEYWORDS, TIPOS, ID_TIPO, describir
+
+# Almacenes compactos de tokens. El texto de cada token no se guarda: se
+# recupera cortando el texto fuente con su desplazamiento y longitud, y las
+# descripciones se comparten por tipo (TIPOS_TOKEN) o por palabra clave.
+
+
+class TablaTokens:
+    # Tabla columnar de un documento completo: columnas paralelas de tipo de
+    # array para el id de tipo, línea, columna, desplazamiento y longitud
+    __slots__ = ('fuente', 'tipos', 'lineas', 'columnas', 'desplazamientos', 'longitudes')
+
+    def __init__(self, fuente=''):
+        self.fuente = fuente
+        self.tipos = array('B')
+        self.lineas = array('I')
+        self.columnas = array('I')
+        self.desplazamientos = array('Q')
+        self.longitudes = array('I')
+
+    @classmethod
+    def desde_tokens(cls, fuente, tokens, linea_base=0, desplazamiento_base=0):
+        # Las bases se suman a las líneas y desplazamientos de los tokens (un
+        # fragmento que empieza más adelante en el documento)
+        tabla = cls(fuente)
+        agregar_tipo = tabla.tipos.append
+        agregar_linea = tabla.lineas.append
+        agregar_columna = tabla.columnas.append
+        agregar_desplazamiento = tabla.desplazamientos.append
+        agregar_longitud = tabla.longitudes.append
+        if linea_base or desplazamiento_base:
+            tokens = ((tipo, texto, linea + linea_base, columna, desplazamiento + desplazamiento_base)
+                      for tipo, texto, linea, columna, desplazamiento in tokens)
+        for tipo, texto, linea, columna, desplazamiento in tokens:
+            agregar_tipo(ID_TIPO[tipo])
+            agregar_linea(linea)
+            agregar_columna(columna)
+            agregar_desplazamiento(desplazamiento)
+            agregar_longitud(len(texto))
+        return tabla
+
+    def extender(self, otra):
+        # Agrega las filas de otra tabla del mismo texto fuente
+        self.tipos.extend(otra.tipos)
+        self.lineas.extend(otra.lineas)
+        self.columnas.extend(otra.columnas)
+        self.desplazamientos.extend(otra.desplazamientos)
+        self.longitudes.extend(otra.longitudes)
+
+    def __len__(self):
+        return len(self.tipos)
+
+    def texto(self, i):
+        inicio = self.desplazamientos[i]
+        return self.fuente[inicio:inicio + self.longitudes[i]]
+
+    def __getitem__(self, i):
+        return (TIPOS[self.tipos[i]], self.texto(i), self.lineas[i], self.columnas[i], self.desplazamientos[i])
+
+    def __iter__(self):
+        # Mismas tuplas que motor_lexico.tokenizar
+        fuente = self.fuente
+        for id_tipo, linea, columna, inicio, longitud in zip(
+                self.tipos, self.lineas, self.columnas, self.desplazamientos, self.longitudes):
+            yield (TIPOS[id_tipo], fuente[inicio:inicio + longitud], linea, columna, inicio)
+
+    def filas(self, palabras_clave=RUST_KEYWORDS):
+        # Filas (Línea, Token, Tipo, Descripción) de la tabla de resultados
+        for tipo, texto, linea, _, _ in self:
+            nombre, descripcion = describir(tipo, texto, palabras_clave)
+            yield (linea, texto, nombre, descripcion)
+
+
+# Registro compacto de los tokens de una línea: un único objeto bytes con los
+# n ids de tipo seguidos de n pares (columna, longitud) sin signo.
+REGISTRO_VACIO = b''
+_TAMANO_TOKEN = 1 + 2 * array('I').itemsize
+
+
+def compactar_linea(tokens):
+    if not tokens:
+        return REGISTRO_VACIO
+    tipos = bytes(ID_TIPO[tipo] for tipo, _, _ in tokens)
+    posiciones = array('I')
+    for _, texto, columna in tokens:
+        posiciones.append(columna)
+        posiciones.append(len(texto))
+    return tipos + posiciones.tobytes()
+
+
+def expandir_linea(registro, linea):
+    # Devuelve [(tipo, texto, columna)] recortando el texto de la línea
+    if not registro:
+        return []
+    n = len(registro) // _TAMANO_TOKEN
+    posiciones = array('I', registro[n:])
+    return [
+        (TIPOS[registro[j]], linea[posiciones[2 * j]:posiciones[2 * j] + posiciones[2 * j + 1]], posiciones[2 * j])
+        for j in range(n)
+    ]
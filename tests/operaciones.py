@@ -0,0 +1,24 @@
+import sys
+
+# Las pruebas no comparan tiempos de reloj (dependen de la carga de la
+# máquina; las comparaciones de tiempo con las referencias están en
+# benchmark.py): cuentan las llamadas a funciones de Python y de C que hace
+# una pasada, que para la misma entrada son siempre las mismas.
+
+
+def contar_llamadas(funcion):
+    # Devuelve (resultado de funcion(), llamadas hechas durante ella)
+    llamadas = 0
+
+    def perfil(marco, evento, argumento):
+        nonlocal llamadas
+        if evento == 'call' or evento == 'c_call':
+            llamadas += 1
+
+    anterior = sys.getprofile()
+    sys.setprofile(perfil)
+    try:
+        resultado = funcion()
+    finally:
+        sys.setprofile(anterior)
+    return resultado, llamadas
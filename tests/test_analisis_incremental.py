@@ -0,0 +1,71 @@
+import random
+import unittest
+
+from motor_lexico import tokenizar
+from analisis_incremental import DocumentoIncremental
+from corpus_sintetico import generar_corpus
+
+# Después de cada edición, los tokens del documento incremental deben ser los
+# mismos que los de lexear el texto completo desde cero. Las ediciones
+# insertan y borran también comillas y delimitadores de comentario, que
+# cambian el estado de las líneas siguientes.
+
+_FRAGMENTOS = ('x', ' ', '\n', '"', '/*', '*/', '//', '{', '}', ';', 'let y = 1;', "'a'", '\\', 'r#"', '"#')
+
+
+def editar(rnd, code):
+    pos = rnd.randint(0, len(code))
+    if code and rnd.random() < 0.4:
+        return code[:pos] + code[pos + rnd.randint(1, 8):]
+    return code[:pos] + rnd.choice(_FRAGMENTOS) + code[pos:]
+
+
+class PruebasDocumentoIncremental(unittest.TestCase):
+    def test_ediciones_aleatorias(self):
+        rnd = random.Random(3)
+        code = generar_corpus('funciones', 200)
+        documento = DocumentoIncremental()
+        documento.actualizar(code)
+        for paso in range(400):
+            code = editar(rnd, code)
+            documento.actualizar(code)
+            with self.subTest(paso=paso):
+                self.assertEqual(list(documento.iterar_tokens()), list(tokenizar(code)))
+
+    def test_reemplazar_tramos(self):
+        # El resaltador pasa el tramo de líneas que cambió en lugar del texto
+        rnd = random.Random(8)
+        documento = DocumentoIncremental()
+        documento.actualizar(generar_corpus('funciones', 200))
+        for paso in range(300):
+            lineas = documento.lineas
+            inicio = rnd.randint(0, len(lineas) - 1)
+            fin = min(len(lineas), inicio + rnd.randint(0, 3))
+            tramo = editar(rnd, '\n'.join(lineas[inicio:fin])).split('\n')
+            documento.reemplazar(inicio, fin, tramo)
+            code = '\n'.join(lineas[:inicio] + tramo + lineas[fin:])
+            with self.subTest(paso=paso):
+                self.assertEqual(documento.lineas, code.split('\n'))
+                self.assertEqual(list(documento.iterar_tokens()), list(tokenizar(code)))
+
+    def test_solo_se_lexea_la_linea_editada(self):
+        code = '\n'.join(f'let x{i} = {i};' for i in range(1000))
+        documento = DocumentoIncremental()
+        documento.actualizar(code)
+        lexeadas = documento.lineas_lexeadas
+        cambio = documento.actualizar(code.replace('let x500 = 500;', 'let x500 = 5000;'))
+        self.assertEqual(cambio, (500, 501, 501))
+        self.assertEqual(documento.lineas_lexeadas - lexeadas, 1)
+
+    def test_comentario_abierto_se_propaga(self):
+        code = 'let a = 1;\nlet b = 2;\nlet c = 3;'
+        documento = DocumentoIncremental()
+        documento.actualizar(code)
+        code = '/*' + code
+        inicio, _, fin_nuevo = documento.actualizar(code)
+        self.assertEqual((inicio, fin_nuevo), (0, 3))
+        self.assertEqual(list(documento.iterar_tokens()), list(tokenizar(code)))
+
+
+if __name__ == '__main__':
+    unittest.main()
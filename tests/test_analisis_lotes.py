@@ -0,0 +1,134 @@
+import contextlib
+import csv
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import analisis_lotes
+from analisis_lotes import main, COLUMNAS
+from analizador_sintactico import ERROR_SINTAXIS
+
+# La línea de órdenes de extremo a extremo sobre una carpeta temporal: código
+# de salida, filas en NDJSON y CSV, --solo-errores, la fila de un archivo que
+# no se puede leer y el camino que toma cada archivo con --flujo y --paralelo
+# (que deben dar las mismas filas que el análisis en el proceso).
+
+_VALIDO = 'fn main() {\n    let x = 1;\n    println!("{}", x);\n}\n'
+_CON_ERROR = 'fn main() {\n    let y = 2\n    let s = "añejo";\n}\n'
+
+
+class PruebasAnalisisLotes(unittest.TestCase):
+    def setUp(self):
+        self.temporal = tempfile.TemporaryDirectory()
+        self.carpeta = os.path.join(self.temporal.name, 'src')
+        os.mkdir(self.carpeta)
+        self.escribir('a_valido.rs', _VALIDO)
+
+    def tearDown(self):
+        self.temporal.cleanup()
+
+    def escribir(self, nombre, code):
+        with open(os.path.join(self.carpeta, nombre), 'w', encoding='utf-8') as archivo:
+            archivo.write(code)
+
+    def ejecutar(self, *opciones, formato='ndjson', rutas=None):
+        # Devuelve (código de salida, texto escrito en --salida)
+        salida = os.path.join(self.temporal.name, 'salida.' + formato)
+        argv = list(rutas or [self.carpeta]) + ['--formato', formato, '--salida', salida, '--sin-cache']
+        with contextlib.redirect_stderr(io.StringIO()):
+            codigo = main(argv + list(opciones))
+        with open(salida, encoding='utf-8', newline='') as archivo:
+            return codigo, archivo.read()
+
+    def filas_ndjson(self, *opciones, rutas=None):
+        codigo, texto = self.ejecutar(*opciones, rutas=rutas)
+        return codigo, [json.loads(linea) for linea in texto.splitlines()]
+
+    def test_codigo_de_salida(self):
+        codigo, filas = self.filas_ndjson('--procesos', '1')
+        self.assertEqual(codigo, 0)
+        self.assertTrue(filas)
+        self.escribir('b_con_error.rs', _CON_ERROR)
+        codigo, _ = self.filas_ndjson('--procesos', '1')
+        self.assertEqual(codigo, 1)
+
+    def test_ndjson(self):
+        self.escribir('b_con_error.rs', _CON_ERROR)
+        codigo, filas = self.filas_ndjson('--procesos', '1')
+        self.assertEqual(codigo, 1)
+        self.assertTrue(all(tuple(fila) == COLUMNAS for fila in filas))
+        valido = os.path.join(self.carpeta, 'a_valido.rs')
+        con_error = os.path.join(self.carpeta, 'b_con_error.rs')
+        # Los archivos salen en orden, primero los tokens y luego los errores
+        self.assertEqual([fila['Archivo'] for fila in filas], sorted(fila['Archivo'] for fila in filas))
+        self.assertEqual(filas[0], {'Archivo': valido, 'Línea': 1, 'Token': 'fn',
+                                    'Tipo': 'Palabra clave', 'Descripción': 'Función'})
+        self.assertIn({'Archivo': con_error, 'Línea': 3, 'Token': '"añejo"',
+                       'Tipo': 'Cadena', 'Descripción': 'Literal de cadena'}, filas)
+        errores = [fila for fila in filas if fila['Token'] == '']
+        self.assertEqual([(fila['Archivo'], fila['Línea'], fila['Tipo']) for fila in errores],
+                         [(con_error, 2, ERROR_SINTAXIS)])
+
+    def test_csv(self):
+        self.escribir('b_con_error.rs', _CON_ERROR)
+        _, ndjson = self.filas_ndjson('--procesos', '1')
+        codigo, texto = self.ejecutar('--procesos', '1', formato='csv')
+        self.assertEqual(codigo, 1)
+        filas = list(csv.reader(io.StringIO(texto, newline='')))
+        self.assertEqual(tuple(filas[0]), COLUMNAS)
+        # Las mismas filas que en NDJSON, con la línea como texto
+        self.assertEqual(filas[1:], [[str(valor) for valor in fila.values()] for fila in ndjson])
+
+    def test_solo_errores(self):
+        self.escribir('b_con_error.rs', _CON_ERROR)
+        _, todas = self.filas_ndjson('--procesos', '1')
+        codigo, filas = self.filas_ndjson('--procesos', '1', '--solo-errores')
+        self.assertEqual(codigo, 1)
+        self.assertEqual(filas, [fila for fila in todas if fila['Token'] == ''])
+        self.assertEqual(len(filas), 1)
+
+    def test_error_de_lectura(self):
+        falta = os.path.join(self.temporal.name, 'no_existe.rs')
+        codigo, filas = self.filas_ndjson('--procesos', '1', rutas=[falta, self.carpeta])
+        self.assertEqual(codigo, 1)
+        self.assertEqual(filas[0]['Archivo'], falta)
+        self.assertEqual((filas[0]['Línea'], filas[0]['Token'], filas[0]['Tipo']), (0, '', 'Error de lectura'))
+        self.assertIn('no_existe.rs', filas[0]['Descripción'])
+        self.assertEqual(len([fila for fila in filas if fila['Archivo'] == falta]), 1)
+        # El resto de los archivos se analiza igual
+        self.assertEqual(filas[1:], self.filas_ndjson('--procesos', '1')[1])
+
+    def test_flujo(self):
+        self.escribir('b_con_error.rs', _CON_ERROR)
+        _, en_proceso = self.filas_ndjson('--procesos', '1')
+        with mock.patch.object(analisis_lotes, 'analizar_en_flujo',
+                               wraps=analisis_lotes.analizar_en_flujo) as en_flujo:
+            codigo, filas = self.filas_ndjson('--procesos', '1', '--flujo')
+        self.assertEqual(codigo, 1)
+        self.assertEqual(en_flujo.call_count, 2)
+        self.assertEqual(filas, en_proceso)
+
+    def test_paralelo(self):
+        self.escribir('b_con_error.rs', _CON_ERROR)
+        _, en_proceso = self.filas_ndjson('--procesos', '1')
+        # Sin --paralelo, archivos tan pequeños no se reparten
+        with mock.patch.object(analisis_lotes, 'analizar_paralelo',
+                               wraps=analisis_lotes.analizar_paralelo) as paralelo:
+            _, filas = self.filas_ndjson('--procesos', '2')
+        self.assertEqual(paralelo.call_count, 0)
+        self.assertEqual(filas, en_proceso)
+        # Con --paralelo cada archivo se reparte (en dos partes aunque sea pequeño)
+        with mock.patch.object(analisis_lotes, 'partes_archivo', return_value=2), \
+                mock.patch.object(analisis_lotes, 'analizar_paralelo',
+                                  wraps=analisis_lotes.analizar_paralelo) as paralelo:
+            codigo, filas = self.filas_ndjson('--procesos', '2', '--paralelo')
+        self.assertEqual(codigo, 1)
+        self.assertEqual(paralelo.call_count, 2)
+        self.assertEqual(filas, en_proceso)
+
+
+if __name__ == '__main__':
+    unittest.main()
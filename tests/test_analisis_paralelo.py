@@ -0,0 +1,59 @@
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+from analisis_lotes import analizar_codigo
+from analisis_paralelo import analizar_paralelo, partes_archivo
+from corpus_sintetico import generar_corpus
+from instrumentacion import Metricas, en_curso
+
+# El archivo repartido en fragmentos debe dar las mismas filas y los mismos
+# errores que la pasada completa, también cuando un corte cae en medio de una
+# sentencia y los fragmentos se vuelven a verificar juntos.
+
+_CODIGO = generar_corpus('funciones', 1500) + '\n' + generar_corpus('errores', 300)
+
+
+def desequilibrado():
+    # Constantes partidas en dos líneas entre las funciones: el recorrido de
+    # llaves acepta un corte antes de la segunda línea, donde la sentencia
+    # sigue abierta (la primera es larga para que los cortes caigan ahí).
+    # Al final, una función sin cerrar
+    suma = ' + '.join(['VALOR'] * 30)
+    elementos = [f'const C{i}: i32 = {suma} +\nVALOR;\nfn f{i}(a: i32) -> i32 {{\n    a + {i}\n}}\n'
+                 for i in range(400)]
+    return 'const VALOR: i32 = 1;\n' + ''.join(elementos) + _CODIGO + '\nfn abierta() {\n    let a = 1;\n'
+
+
+class PruebasAnalisisParalelo(unittest.TestCase):
+    def comparar(self, code, ejecutor, partes):
+        tabla, errores = analizar_paralelo(code, ejecutor, partes)
+        completa, esperados = analizar_codigo(code)
+        self.assertEqual(list(tabla.filas()), list(completa.filas()))
+        self.assertEqual(errores, esperados)
+        return errores
+
+    def test_sin_procesos(self):
+        for partes in (1, 3, 8):
+            with self.subTest(partes=partes):
+                self.comparar(_CODIGO, None, partes)
+
+    def test_fragmentos_que_no_terminan_en_reposo(self):
+        code = desequilibrado()
+        metricas = Metricas()
+        with en_curso(metricas):
+            errores = self.comparar(code, None, 8)
+        self.assertTrue(metricas.contadores.get('fragmentos_repetidos'))
+        self.assertTrue(any('sin llave de cierre' in descripcion for _, _, descripcion in errores))
+
+    def test_con_procesos(self):
+        with ProcessPoolExecutor(max_workers=2) as ejecutor:
+            self.comparar(_CODIGO, ejecutor, 4)
+            self.comparar(desequilibrado(), ejecutor, 8)
+
+    def test_el_corpus_del_benchmark_se_reparte(self):
+        tamano = len(generar_corpus('funciones', 20000).encode('utf-8'))
+        self.assertGreater(partes_archivo(tamano, 2), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import random
+import unittest
+
+from motor_lexico import tokenizar
+from analizador_sintactico import detectar_errores, unir_errores
+from analizador_semantico import detectar_errores_semanticos
+from arbol_sintactico import Parser
+from analisis_incremental import componer_cambios
+from analisis_segmentado import DocumentoSegmentado
+from corpus_sintetico import generar_corpus
+
+# Después de cada edición, los errores combinados de los segmentos deben ser
+# los de la pasada completa. Las ediciones abren y cierran llaves, cadenas y
+# comentarios y agregan elementos, de modo que los cortes se mueven, se
+# invalidan y se recuperan.
+
+_FRAGMENTOS = ('x', ' ', '\n', '"', '/*', '*/', '{', '}', '(', ')', ';', 'fn f(a: i32) {\n',
+               'let y = 1;', 'break;', 'g(1, 2);', 'struct S {', '\nfn ', 'mod m {\n', 'else ')
+
+
+def editar(rnd, code):
+    pos = rnd.randint(0, len(code))
+    if code and rnd.random() < 0.4:
+        return code[:pos] + code[pos + rnd.randint(1, 12):]
+    return code[:pos] + rnd.choice(_FRAGMENTOS) + code[pos:]
+
+
+def analisis_completo(code):
+    tokens = list(tokenizar(code, incluir_comentarios=False))
+    parser = Parser(tokens)
+    semanticos = detectar_errores_semanticos(code, tokens=tokens, elementos=parser.elementos())
+    return unir_errores(detectar_errores(tokens), parser.errores), semanticos
+
+
+class PruebasDocumentoSegmentado(unittest.TestCase):
+    def test_ediciones_aleatorias(self):
+        for semilla in range(2):
+            rnd = random.Random(semilla)
+            code = generar_corpus('funciones', 60) + '\n' + generar_corpus('errores', 40)
+            segmentado = DocumentoSegmentado()
+            segmentado.actualizar(code)
+            self.assertGreater(len(segmentado.inicios), 3)
+            for paso in range(150):
+                code = editar(rnd, code)
+                segmentado.actualizar(code)
+                with self.subTest(semilla=semilla, paso=paso):
+                    self.assertEqual(segmentado.errores(), analisis_completo(code))
+
+    def test_rangos_compuestos(self):
+        # Varios reemplazos de líneas seguidos, aplicados al documento sin
+        # verificar y verificados una vez con el cambio compuesto
+        rnd = random.Random(7)
+        code = generar_corpus('funciones', 60) + '\n' + generar_corpus('errores', 40)
+        segmentado = DocumentoSegmentado()
+        segmentado.actualizar(code)
+        documento = segmentado.documento
+        for paso in range(100):
+            total = None
+            for _ in range(rnd.randint(1, 3)):
+                lineas = documento.lineas
+                inicio = rnd.randint(0, len(lineas) - 1)
+                fin = min(inicio + rnd.randint(0, 3), len(lineas))
+                texto = editar(rnd, '\n'.join(lineas[inicio:fin]))
+                cambio = documento.reemplazar(inicio, fin, texto.split('\n'))
+                total = cambio if total is None else componer_cambios(total, cambio)
+            segmentado.verificar_cambio(total)
+            with self.subTest(paso=paso):
+                self.assertEqual(segmentado.errores(), analisis_completo('\n'.join(documento.lineas)))
+
+    def test_solo_se_verifica_el_segmento_editado(self):
+        code = generar_corpus('funciones', 2000)
+        segmentado = DocumentoSegmentado()
+        segmentado.actualizar(code)
+        verificados = segmentado.segmentos_verificados
+        lineas = code.split('\n')
+        medio = len(lineas) // 2
+        lineas[medio] += ' let z = sin_declarar;'
+        code = '\n'.join(lineas)
+        segmentado.actualizar(code)
+        self.assertLessEqual(segmentado.segmentos_verificados - verificados, 3)
+        self.assertEqual(segmentado.errores(), analisis_completo(code))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+
+from motor_lexico import tokenizar
+from analizador_semantico import detectar_errores_semanticos
+from arbol_sintactico import Parser, construir_arbol
+from benchmark import detectar_errores_semanticos_regex
+from corpus_sintetico import generar_corpus
+from tests.operaciones import contar_llamadas
+
+_ARIDAD = '''fn sumar(a: i32, b: i32) -> i32 {
+    a + b
+}
+
+fn main() {
+    let total = sumar(1);
+    break;
+}
+'''
+
+# Código válido con campos de struct, nombres de tipo, métodos de impl y
+# ligaduras de bucles for; la única variable sin declarar es la de la
+# última línea de main
+_VALIDO = '''struct Punto {
+    x: i32,
+    y: i32,
+}
+
+enum Forma {
+    Circulo,
+    Cuadrado,
+}
+
+impl Punto {
+    fn nuevo(x: i32, y: i32) -> Punto {
+        Punto { x: x, y: y }
+    }
+
+    fn norma(&self) -> i32 {
+        self.x * self.x + self.y * self.y
+    }
+}
+
+fn main() {
+    let p = Punto::nuevo(1, 2);
+    let n = p.norma();
+    let forma = Forma::Circulo;
+    let mut total = 0;
+    for i in 0..n {
+        total += i + p.x;
+    }
+    for (indice, valor) in [1, 2, 3].iter().enumerate() {
+        total += indice as i32 * valor;
+    }
+    println!("{} {}", total, desconocida);
+}
+'''
+
+# Nombres que la referencia confunde con variables, por categoría
+_FALSOS_POSITIVOS = {
+    'campos': {'x', 'y'},
+    'tipos': {'Punto', 'Forma', 'Circulo', 'Cuadrado'},
+    'métodos': {'nuevo', 'norma', 'iter', 'enumerate'},
+    'ligaduras de for': {'i', 'indice', 'valor'},
+}
+
+
+def _no_declaradas(errores):
+    return [descripcion.split("'")[1] for _, _, descripcion in errores]
+
+
+class PruebasDetectarErroresSemanticos(unittest.TestCase):
+    def test_arbol_solo_con_elementos(self):
+        tokens = list(tokenizar(_ARIDAD, incluir_comentarios=False))
+        sin_arbol = detectar_errores_semanticos(_ARIDAD, tokens=tokens)
+        raiz, _ = construir_arbol(tokens)
+        con_arbol = detectar_errores_semanticos(_ARIDAD, tokens=tokens, elementos=raiz.hijos)
+        en_flujo = detectar_errores_semanticos(_ARIDAD, tokens=tokens, elementos=Parser(tokens).elementos())
+        self.assertEqual(sin_arbol, [])
+        self.assertEqual(con_arbol, en_flujo)
+        self.assertEqual([linea for linea, _, _ in con_arbol], [6, 7])
+
+    def test_menos_falsos_positivos_que_la_referencia(self):
+        anterior = _no_declaradas(detectar_errores_semanticos_regex(_VALIDO))
+        nuevo = _no_declaradas(detectar_errores_semanticos(_VALIDO))
+        for categoria, nombres in _FALSOS_POSITIVOS.items():
+            with self.subTest(categoria=categoria):
+                self.assertTrue(nombres & set(anterior))
+                self.assertFalse(nombres & set(nuevo))
+        falsos_anterior = sum(nombre != 'desconocida' for nombre in anterior)
+        falsos_nuevo = sum(nombre != 'desconocida' for nombre in nuevo)
+        self.assertGreaterEqual(falsos_anterior, 30)
+        self.assertEqual(falsos_nuevo, 0)
+        # El error verdadero se sigue informando
+        self.assertEqual(nuevo, ['desconocida'])
+
+    def test_llamadas_lineales_y_menos_que_la_referencia(self):
+        # Solo la pasada sobre los tokens, como la referencia; incluye
+        # tokenizar, que la referencia hace por su cuenta
+        def llamadas(lineas):
+            code = generar_corpus('funciones', lineas)
+            _, nuevo = contar_llamadas(lambda: detectar_errores_semanticos(code))
+            _, anterior = contar_llamadas(lambda: detectar_errores_semanticos_regex(code))
+            return nuevo, anterior
+
+        llamadas(100)
+        nuevo, anterior = llamadas(4000)
+        nuevo_doble, anterior_doble = llamadas(8000)
+        self.assertLess(nuevo, anterior)
+        self.assertLess(nuevo_doble, anterior_doble)
+        # El corpus no crece exactamente al doble: la cota deja un margen
+        self.assertLessEqual(nuevo_doble, 2.1 * nuevo)
+
+
+if __name__ == '__main__':
+    unittest.main()
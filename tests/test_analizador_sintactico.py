@@ -0,0 +1,163 @@
+import sys
+import unittest
+
+from motor_lexico import tokenizar
+from analizador_sintactico import detectar_errores, unir_errores, ERROR_SINTAXIS, AVISO_LIMITE
+from arbol_sintactico import Parser, limite_anidamiento
+from benchmark import detectar_errores_regex
+from tests.operaciones import contar_llamadas
+
+# detectar_errores frente a la cascada de expresiones por línea que reemplazó
+# (benchmark.detectar_errores_regex, que se conserva como referencia). La
+# cascada da falsos positivos en construcciones válidas (expresión final de
+# un bloque, for de varias líneas), así que la entrada se limita a lo que
+# ambas deben informar igual: código válido con llaves y paréntesis de
+# cierre sueltos.
+
+_BLOQUE = '''fn funcion_{i}(a: i32, b: i32) -> i32 {{
+    let mut x = a * {i};
+    let y = b + x;
+    if x > y {{
+        x = x - y;
+    }} else {{
+        x = y - x;
+    }}
+    for k in 0..{i} {{ x += k; }}
+    while x > 100 {{
+        x = x / 2;
+    }}
+    println!("{{}} {{}}", x, y);
+    return x + y;
+}}
+}}
+);
+'''
+
+
+def generar(funciones):
+    return ''.join(_BLOQUE.format(i=i) for i in range(funciones))
+
+
+class PruebasDetectarErrores(unittest.TestCase):
+    def test_mismos_errores_que_la_cascada(self):
+        code = generar(2000)
+        nuevos = detectar_errores(tokenizar(code, incluir_comentarios=False))
+        # La cascada informa primero las reglas por línea y después el balance
+        self.assertEqual(nuevos, sorted(detectar_errores_regex(code)))
+        self.assertEqual(len(nuevos), 2 * 2000)
+
+    def test_errores_sin_duplicados(self):
+        code = 'fn main() {\n    let x = 1\n}\n}\n'
+        errores = detectar_errores(tokenizar(code, incluir_comentarios=False))
+        self.assertEqual(len(errores), len(set(errores)))
+
+    def test_cabeceras_con_igual(self):
+        # El '=' de if let / while let (o de un genérico por defecto) es de
+        # la cabecera: la llave de cierre del cuerpo termina la sentencia
+        casos = [
+            'fn main() {\n    let o = Some(1);\n    if let Some(v) = o {\n        f(v);\n    }\n    let x = 2;\n}\n',
+            'fn main() {\n    if let Some(v) = o {\n        f(v);\n    } else {\n        g();\n    }\n    h();\n}\n',
+            'fn main() {\n    if let Some(v) = o {\n        f(v);\n    }\n    if v > 1 {\n        g();\n    }\n}\n',
+            'fn main() {\n    while let Some(v) = p.pop() {\n        f(v);\n    }\n    let y = 1;\n}\n',
+            'struct S<T = i32> {\n    a: T,\n}\nfn main() {}\n',
+        ]
+        for code in casos:
+            with self.subTest(code=code):
+                self.assertEqual(detectar_errores(tokenizar(code, incluir_comentarios=False)), [])
+        # El valor de un let sigue abierto hasta su ';'
+        code = 'fn main() {\n    let z = match x { _ => 1 }\n    let w = 1;\n}\n'
+        self.assertEqual(detectar_errores(tokenizar(code, incluir_comentarios=False)),
+                         [(2, ERROR_SINTAXIS, "Falta el punto y coma al final de la declaración de la variable")])
+        code = 'fn main() {\n    if let Some(v) = o\n    let w = 1;\n}\n'
+        self.assertEqual(detectar_errores(tokenizar(code, incluir_comentarios=False)),
+                         [(3, ERROR_SINTAXIS, "Falta la llave de apertura en la declaración del condicional if")])
+
+    def test_macros_con_cuerpo_entre_llaves(self):
+        casos = [
+            'macro_rules! doble {\n    ($x:expr) => { $x * 2 };\n}\nfn main() {\n    let a = doble!(2);\n}\n',
+            'thread_local! {\n    static X: i32 = 1;\n}\nfn main() {}\n',
+            'fn main() {\n    lazy! {\n        a\n    }\n    let b = 1;\n}\n',
+            'fn main() {\n    let v = if c { m! { a } } else { 1 };\n    g();\n}\n',
+        ]
+        for code in casos:
+            with self.subTest(code=code):
+                self.assertEqual(detectar_errores(tokenizar(code, incluir_comentarios=False)), [])
+        # Con paréntesis la macro es una expresión y necesita su ';'
+        code = 'fn main() {\n    println!("a")\n    let w = 1;\n}\n'
+        self.assertEqual(detectar_errores(tokenizar(code, incluir_comentarios=False)),
+                         [(2, ERROR_SINTAXIS, "Falta el punto y coma al final de la línea")])
+
+    def test_llamadas_lineales_y_menos_que_la_cascada(self):
+        # Las llamadas del nuevo incluyen tokenizar; el doble de código no
+        # puede costar más del doble (más una constante)
+        def llamadas(funciones):
+            code = generar(funciones)
+            _, nuevo = contar_llamadas(lambda: detectar_errores(tokenizar(code, incluir_comentarios=False)))
+            _, viejo = contar_llamadas(lambda: detectar_errores_regex(code))
+            return nuevo, viejo
+
+        llamadas(10)
+        nuevo, viejo = llamadas(500)
+        nuevo_doble, viejo_doble = llamadas(1000)
+        self.assertLess(nuevo, viejo)
+        self.assertLess(nuevo_doble, viejo_doble)
+        self.assertLessEqual(nuevo_doble, 2 * nuevo + 100)
+
+    def test_union_con_los_errores_del_parser(self):
+        # La falta de ';' de la línea 2 la informan los dos; el valor que
+        # falta después de '=' solo lo ve el parser
+        code = 'fn main() {\n    let x = 1\n    let y = 2;\n}\nfn otra() {\n    let a: i32 = ;\n}\n'
+        tokens = list(tokenizar(code, incluir_comentarios=False))
+        parser = Parser(tokens)
+        list(parser.elementos())
+        errores = detectar_errores(tokens)
+        unidos = unir_errores(errores, parser.errores)
+        self.assertEqual([linea for linea, _, _ in errores], [2])
+        self.assertEqual([linea for linea, _, _ in parser.errores], [2, 6])
+        self.assertEqual(unidos, errores + [(6, ERROR_SINTAXIS, "Se esperaba una expresión y se encontró ';'")])
+        self.assertEqual(unir_errores(errores, []), errores)
+
+    def test_union_de_errores_en_lineas_contiguas(self):
+        # Un error distinto en la línea siguiente no se da por repetido; la
+        # llave sin cerrar se informa una vez aunque el parser la anote al
+        # final del código
+        code = 'fn main() {\n    let x = 1\n    let a: i32 = ;\n    f(1;\n'
+        tokens = list(tokenizar(code, incluir_comentarios=False))
+        parser = Parser(tokens)
+        list(parser.elementos())
+        unidos = unir_errores(detectar_errores(tokens), parser.errores)
+        self.assertEqual([(linea, descripcion.split(' (')[0]) for linea, _, descripcion in unidos], [
+            (1, "Llave de apertura sin llave de cierre"),
+            (2, "Falta el punto y coma al final de la declaración de la variable"),
+            (3, "Se esperaba una expresión y se encontró ';'"),
+            (4, "Paréntesis de apertura sin paréntesis de cierre"),
+        ])
+
+    def test_anidamiento_segun_el_limite_de_recursion(self):
+        def anidado(niveles):
+            # Literales de estructura anidados: lo que más pila usa por nivel
+            return 'fn main() {\n    let x = ' + 'S { a: ' * niveles + '1' + ' }' * niveles + ';\n}\n'
+
+        def errores_del_parser(code):
+            parser = Parser(tokenizar(code, incluir_comentarios=False))
+            list(parser.elementos())
+            return parser.errores
+
+        anterior = sys.getrecursionlimit()
+        try:
+            for limite in (anterior, 3000):
+                sys.setrecursionlimit(limite)
+                with self.subTest(limite=limite):
+                    self.assertEqual(errores_del_parser(anidado(limite_anidamiento() - 5)), [])
+            self.assertGreater(limite_anidamiento(), 300)
+        finally:
+            sys.setrecursionlimit(anterior)
+        self.assertGreater(limite_anidamiento(), 100)
+        # Más allá del límite es un aviso, no un error de sintaxis
+        errores = errores_del_parser(anidado(10 * limite_anidamiento()))
+        self.assertTrue(errores)
+        self.assertEqual({tipo for _, tipo, _ in errores}, {AVISO_LIMITE})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import cache_analisis
+from cache_analisis import CacheAnalisis, clave_analisis, VISTA_TABLA
+from analisis_incremental import DocumentoIncremental
+from analisis_lotes import analizar_codigo
+from corpus_sintetico import generar_corpus
+
+# Caché en disco en una carpeta temporal: aciertos y fallos de cada vista,
+# desalojo de las entradas usadas hace más tiempo y claves que cambian con la
+# versión de las reglas.
+
+_CODIGO = generar_corpus('errores', 200)
+
+
+class PruebasCacheAnalisis(unittest.TestCase):
+    def setUp(self):
+        self.temporal = tempfile.TemporaryDirectory()
+        self.carpeta = self.temporal.name
+
+    def tearDown(self):
+        self.temporal.cleanup()
+
+    def test_tabla_fallo_y_acierto(self):
+        cache = CacheAnalisis(self.carpeta)
+        self.assertIsNone(cache.leer_tabla(_CODIGO))
+        tabla, errores = analizar_codigo(_CODIGO)
+        self.assertTrue(errores)
+        self.assertTrue(cache.guardar_tabla(_CODIGO, tabla, errores))
+        guardada, errores_guardados = cache.leer_tabla(_CODIGO)
+        self.assertEqual(list(guardada.filas()), list(tabla.filas()))
+        self.assertEqual(errores_guardados, errores)
+        # Otro texto es otra clave
+        self.assertIsNone(cache.leer_tabla(_CODIGO + '\n'))
+
+    def test_documento_fallo_y_acierto(self):
+        cache = CacheAnalisis(self.carpeta)
+        self.assertIsNone(cache.leer_documento(_CODIGO))
+        documento = DocumentoIncremental()
+        documento.actualizar(_CODIGO)
+        conteos = [len(documento.tokens_visibles(i)) for i in range(len(documento.lineas))]
+        errores = [(3, 'Error de sintaxis', 'a')]
+        semanticos = [(5, 'Error semántico', 'b')]
+        cache.guardar_documento(_CODIGO, documento, conteos, errores, semanticos)
+        guardado, conteos_guardados, errores_guardados, semanticos_guardados = cache.leer_documento(_CODIGO)
+        self.assertEqual(list(guardado.iterar_tokens()), list(documento.iterar_tokens()))
+        self.assertEqual(guardado.salidas, documento.salidas)
+        self.assertEqual((conteos_guardados, errores_guardados, semanticos_guardados),
+                         (conteos, errores, semanticos))
+
+    def test_cambio_de_version_invalida(self):
+        cache = CacheAnalisis(self.carpeta)
+        tabla, errores = analizar_codigo(_CODIGO)
+        cache.guardar_tabla(_CODIGO, tabla, errores)
+        self.assertIsNotNone(cache.leer_tabla(_CODIGO))
+        with mock.patch.object(cache_analisis, 'VERSION_REGLAS', cache_analisis.VERSION_REGLAS + 1):
+            self.assertIsNone(cache.leer_tabla(_CODIGO))
+
+    def test_entrada_danada_se_descarta(self):
+        cache = CacheAnalisis(self.carpeta)
+        clave = clave_analisis(_CODIGO, VISTA_TABLA)
+        with open(os.path.join(self.carpeta, clave + '.bin'), 'wb') as archivo:
+            archivo.write(b'no es una entrada')
+        self.assertIsNone(cache.leer_tabla(_CODIGO))
+        self.assertEqual(os.listdir(self.carpeta), [])
+
+    def test_desalojo_de_la_menos_usada(self):
+        # Entradas incompresibles de unos 4 KB; caben dos y media
+        secciones = {nombre: [os.urandom(4096)] for nombre in ('a', 'b', 'c')}
+        cache = CacheAnalisis(self.carpeta, limite_bytes=10_500)
+        cache.guardar('a', secciones['a'])
+        cache.guardar('b', secciones['b'])
+        os.utime(cache._ruta('a'), (1000, 1000))
+        os.utime(cache._ruta('b'), (2000, 2000))
+        # El acierto renueva la fecha de a: la más antigua pasa a ser b
+        self.assertEqual(cache.leer('a'), secciones['a'])
+        cache.guardar('c', secciones['c'])
+        self.assertIsNone(cache.leer('b'))
+        self.assertEqual(cache.leer('a'), secciones['a'])
+        self.assertEqual(cache.leer('c'), secciones['c'])
+        total = sum(os.path.getsize(os.path.join(self.carpeta, nombre)) for nombre in os.listdir(self.carpeta))
+        self.assertLessEqual(total, cache.limite_bytes)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from corpus_ejemplos import CorpusEjemplos, SUFIJO_INDICE
+
+# El índice de ejemplos se guarda junto al archivo, se reutiliza mientras el
+# archivo no cambie y se rehace cuando cambian su fecha o su tamaño.
+
+_EJEMPLOS = '''# Ejemplo 1: Función básica
+fn main() {
+    let x = 1;
+}
+
+# Ejemplo 2: Bucle while
+fn main() {
+    while true {}
+}
+
+# Ejemplo 3: Funciones anidadas
+fn uno() {}
+'''
+
+
+class PruebasCorpusEjemplos(unittest.TestCase):
+    def setUp(self):
+        self.temporal = tempfile.TemporaryDirectory()
+        self.ruta = os.path.join(self.temporal.name, 'ejemplos.txt')
+        self.escribir(_EJEMPLOS)
+
+    def tearDown(self):
+        self.temporal.cleanup()
+
+    def escribir(self, texto, mtime_ns=None):
+        with open(self.ruta, 'w', encoding='utf-8', newline='') as archivo:
+            archivo.write(texto)
+        if mtime_ns is not None:
+            os.utime(self.ruta, ns=(mtime_ns, mtime_ns))
+
+    def test_titulos_y_textos(self):
+        corpus = CorpusEjemplos(self.ruta)
+        self.assertEqual(len(corpus), 3)
+        self.assertEqual(corpus.titulo(1), 'Ejemplo 2: Bucle while')
+        self.assertEqual(corpus[0], 'fn main() {\n    let x = 1;\n}')
+        self.assertEqual(corpus[-1], 'fn uno() {}')
+        self.assertTrue(os.path.exists(self.ruta + SUFIJO_INDICE))
+
+    def test_buscar_por_titulo(self):
+        corpus = CorpusEjemplos(self.ruta)
+        self.assertEqual(corpus.buscar('FUNCI'), 0)
+        # Desde el segundo se sigue y se da la vuelta
+        self.assertEqual(corpus.buscar('funci', 1), 2)
+        self.assertEqual(corpus.buscar('básica', 1), 0)
+        self.assertIsNone(corpus.buscar('match'))
+
+    def test_reutiliza_el_indice(self):
+        CorpusEjemplos(self.ruta)
+        with mock.patch.object(CorpusEjemplos, '_construir_indice', side_effect=AssertionError):
+            corpus = CorpusEjemplos(self.ruta)
+        self.assertEqual(corpus.titulos(), ['Ejemplo 1: Función básica', 'Ejemplo 2: Bucle while',
+                                            'Ejemplo 3: Funciones anidadas'])
+
+    def test_rehace_el_indice_si_cambia_el_archivo(self):
+        mtime_ns = os.stat(self.ruta).st_mtime_ns
+        CorpusEjemplos(self.ruta)
+        # Otro tamaño
+        self.escribir(_EJEMPLOS + '\n# Ejemplo 4: Match\nfn main() {}\n', mtime_ns)
+        corpus = CorpusEjemplos(self.ruta)
+        self.assertEqual(corpus.buscar('match'), 3)
+        self.assertEqual(corpus[3], 'fn main() {}')
+        # Mismo tamaño, otra fecha
+        self.escribir(_EJEMPLOS.replace('Bucle while', 'Bucle whilf') + '\n# Ejemplo 4: Match\nfn main() {}\n',
+                      mtime_ns + 1_000_000_000)
+        corpus = CorpusEjemplos(self.ruta)
+        self.assertEqual(corpus.titulo(1), 'Ejemplo 2: Bucle whilf')
+
+    def test_saltos_crlf(self):
+        self.escribir(_EJEMPLOS.replace('\n', '\r\n'))
+        corpus = CorpusEjemplos(self.ruta)
+        self.assertEqual(corpus.titulo(0), 'Ejemplo 1: Función básica')
+        self.assertEqual(corpus.buscar('anidadas'), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import os
+import tempfile
+import tracemalloc
+import unittest
+
+from corpus_sintetico import FORMAS, generar_corpus
+from analisis_lotes import analizar_codigo, analizar_archivo
+from flujo_lexico import analizar_archivo_flujo
+
+# El análisis en flujo debe informar los mismos errores que la pasada en
+# memoria, incluidos los que salen del árbol sintáctico (cantidad de
+# argumentos, break y continue fuera de un bucle). Los bloques son pequeños
+# para que los elementos y las construcciones abiertas crucen los cortes.
+# Un archivo envuelto en un módulo se entrega por partes: su pico de memoria
+# es el del mismo código sin envolver.
+
+_DEL_ARBOL = '''fn sumar(a: i32, b: i32) -> i32 {
+    a + b
+}
+
+fn main() {
+    let total = sumar(1);
+    break;
+    let s = "cadena
+de varias líneas";
+    /* comentario
+       de bloque */
+    println!("{}", sumar(total, 2, 3));
+}
+
+fn usar() {
+    let n = restar(4);
+    continue;
+}
+
+fn restar(a: i32) -> i32 {
+    a - 1
+}
+'''
+
+
+def analizar_texto(code, tamano_bloque):
+    with tempfile.NamedTemporaryFile('w', suffix='.rs', encoding='utf-8', delete=False) as archivo:
+        archivo.write(code)
+    try:
+        return analizar_archivo_flujo(archivo.name, tamano_bloque=tamano_bloque)
+    finally:
+        os.unlink(archivo.name)
+
+
+def pico_memoria(code):
+    tracemalloc.start()
+    try:
+        analizar_texto(code, 1 << 16)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+class PruebasFlujo(unittest.TestCase):
+    def comparar(self, code, tamano_bloque=256):
+        en_flujo = analizar_texto(code, tamano_bloque)
+        _, en_memoria = analizar_codigo(code, incluir_tokens=False)
+        self.assertEqual(en_flujo, en_memoria)
+        return en_flujo
+
+    def test_errores_del_arbol(self):
+        errores = self.comparar(_DEL_ARBOL * 3)
+        descripciones = {descripcion for _, _, descripcion in errores}
+        self.assertIn("'break' fuera de un bucle", descripciones)
+        self.assertIn("'continue' fuera de un bucle", descripciones)
+        self.assertTrue(any('argumento' in descripcion for descripcion in descripciones))
+
+    def test_formas_del_corpus(self):
+        for forma in FORMAS:
+            with self.subTest(forma=forma):
+                self.comparar(generar_corpus(forma, 400) + '\n' + _DEL_ARBOL)
+
+    def test_modulo_envolvente(self):
+        # Las funciones de un módulo solo se ven dentro de él, también en
+        # uno anidado; la llave sin cerrar se informa al final
+        code = 'mod generado {\n' + _DEL_ARBOL + 'pub mod interno {\n' + _DEL_ARBOL + '}\n}\n' + _DEL_ARBOL
+        errores = self.comparar(code)
+        self.assertEqual(sum('argumento' in descripcion for _, _, descripcion in errores), 6)
+        errores = self.comparar('mod generado {\n' + generar_corpus('errores', 200) + '\n' + _DEL_ARBOL)
+        self.assertIn("Llave de apertura sin llave de cierre (abierta en la línea 1, columna 14)",
+                      {descripcion for _, _, descripcion in errores})
+
+    def test_memoria_con_modulo_envolvente(self):
+        code = generar_corpus('funciones', 5000)
+        plano = pico_memoria(code)
+        envuelto = pico_memoria('mod generado {\n' + code + '\n}\n')
+        self.assertLess(envuelto, 1.5 * plano)
+
+    def test_saltos_crlf(self):
+        # Mismas filas y errores que la lectura en modo texto de analisis_lotes
+        code = _DEL_ARBOL.replace('\n', '\r\n') * 3 + 'let viejo = 1;\rlet mac = 2;\r'
+        with tempfile.NamedTemporaryFile('wb', suffix='.rs', delete=False) as archivo:
+            archivo.write(code.encode('utf-8'))
+        try:
+            filas = []
+            en_flujo = analizar_archivo_flujo(archivo.name, al_fila=filas.append, tamano_bloque=128)
+            _, tabla, en_lotes = analizar_archivo(archivo.name)
+        finally:
+            os.unlink(archivo.name)
+        self.assertEqual(en_flujo, en_lotes)
+        self.assertEqual(filas, list(tabla.filas()))
+        self.assertFalse(any('\r' in texto for _, texto, _, _ in filas))
+
+    def test_archivo_vacio(self):
+        self.assertEqual(self.comparar(''), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
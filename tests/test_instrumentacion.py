@@ -0,0 +1,50 @@
+import threading
+import unittest
+
+from instrumentacion import Metricas, contar, en_curso, etapa
+
+# Las métricas activas son del contexto, no del proceso: un hilo que sigue
+# trabajando con las métricas de una ejecución cancelada no suma a las de la
+# ejecución siguiente.
+
+
+@etapa('prueba_instrumentacion')
+def _pasada():
+    contar('tokens', 5)
+
+
+class PruebasMetricas(unittest.TestCase):
+    def test_hilo_suma_a_sus_metricas(self):
+        anteriores = Metricas()
+
+        def trabajador():
+            with en_curso(anteriores):
+                _pasada()
+
+        actuales = Metricas().iniciar()
+        try:
+            hilo = threading.Thread(target=trabajador)
+            hilo.start()
+            hilo.join()
+            _pasada()
+        finally:
+            actuales.terminar()
+        self.assertEqual(anteriores.contadores, {'tokens': 5})
+        self.assertEqual(actuales.contadores, {'tokens': 5})
+        self.assertEqual(actuales.etapas['prueba_instrumentacion']['llamadas'], 1)
+
+    def test_sin_metricas_en_un_hilo_nuevo(self):
+        metricas = Metricas().iniciar()
+        try:
+            hilo = threading.Thread(target=_pasada)
+            hilo.start()
+            hilo.join()
+        finally:
+            metricas.terminar()
+        self.assertEqual(metricas.contadores, {})
+        _pasada()
+        self.assertEqual(metricas.contadores, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
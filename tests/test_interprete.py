@@ -0,0 +1,96 @@
+import os
+import unittest
+
+from interprete import ejecutar_programa, ErrorCompilacion, ErrorEjecucion
+
+# Programas pequeños con su salida esperada, como la daría rustc (salvo el
+# desbordamiento, que aquí envuelve al ancho del tipo en lugar de entrar en
+# pánico).
+
+_EJEMPLOS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'rust_examples.txt')
+
+
+def ejecutar(cuerpo):
+    return ejecutar_programa('fn main() {\n' + cuerpo + '\n}')
+
+
+class PruebasInterprete(unittest.TestCase):
+    def test_primer_ejemplo_incluido(self):
+        with open(_EJEMPLOS, encoding='utf-8') as archivo:
+            ejemplo = archivo.read().split('# Ejemplo')[1].split('\n', 1)[1]
+        self.assertEqual(ejecutar_programa(ejemplo), 'Valor de z: 5\nValor de x: 20\n')
+
+    def test_i32_envuelve(self):
+        self.assertEqual(ejecutar('let mut x: i32 = 2147483647;\nx = x + 1;\nprintln!("{}", x);'),
+                         '-2147483648\n')
+        self.assertEqual(ejecutar('let x = 2147483647;\nlet y = x * 2;\nprintln!("{}", y);'), '-2\n')
+
+    def test_igualdad_y_asignacion(self):
+        salida = ejecutar('let mut a = 3;\nlet b = a == 4;\na = 4;\nlet c = a == 4;\n'
+                          'println!("{} {} {}", a, b, c);')
+        self.assertEqual(salida, '4 false true\n')
+
+    def test_anotaciones_de_tipo(self):
+        self.assertEqual(ejecutar('let x: u8 = 255;\nlet y = x + 1;\nprintln!("{}", y);'), '0\n')
+        self.assertEqual(ejecutar('let x: i64 = 3_000_000_000;\nprintln!("{}", x);'), '3000000000\n')
+        self.assertEqual(ejecutar('let x: f64 = 7.0;\nprintln!("{}", x / 2.0);'), '3.5\n')
+        with self.assertRaises(ErrorCompilacion) as error:
+            ejecutar('let x: i64 = 1;\nlet y: i32 = 2;\nlet z = x + y;')
+        self.assertEqual(str(error.exception), 'Tipos incompatibles: i64 y i32')
+
+    def test_literal_sin_sufijo_toma_el_tipo_de_su_uso(self):
+        salida = ejecutar('let mut s: i64 = 0;\nlet mut i = 0;\nwhile i < 100000 {\n'
+                          '    s = s + i * i;\n    i += 1;\n}\nprintln!("{}", s);')
+        self.assertEqual(salida, '333328333350000\n')
+        salida = ejecutar('let mut s: u64 = 0;\nfor i in 0..4 {\n    s += i;\n}\nprintln!("{}", s);')
+        self.assertEqual(salida, '6\n')
+        with self.assertRaises(ErrorCompilacion):
+            ejecutar('let a = 1;\nlet b: u8 = a;\nlet c: i64 = a;')
+
+    def test_sombreado(self):
+        salida = ejecutar('let x = 5;\nlet x = x + 1;\n{\n    let x = x * 2;\n    println!("{}", x);\n}\n'
+                          'println!("{}", x);\nlet x = true;\nprintln!("{}", x);')
+        self.assertEqual(salida, '12\n6\ntrue\n')
+
+    def test_bucles_y_continue(self):
+        salida = ejecutar('let mut n = 0;\nlet mut impares = 0;\nloop {\n    n += 1;\n'
+                          '    if n > 10 {\n        break;\n    }\n    if n % 2 == 0 {\n        continue;\n    }\n'
+                          '    impares += n;\n}\nprintln!("{}", impares);')
+        self.assertEqual(salida, '25\n')
+        salida = ejecutar('for i in 0..=5 {\n    if i == 3 {\n        continue;\n    }\n    print!("{} ", i);\n}')
+        self.assertEqual(salida, '0 1 2 4 5 ')
+
+    def test_especificaciones_de_formato(self):
+        salida = ejecutar('let x = 3.14159;\nprintln!("{:.2}|{:>8.3}|{:+}|{:08.2}", x, x, x, -x);')
+        self.assertEqual(salida, '3.14|   3.142|+3.14159|-0003.14\n')
+        salida = ejecutar('let n = 42;\nprintln!("{:>5}|{:<5}|{:^5}|{:05}|{:*^9}|{:x}|{:#X}|{:#b}|{:o}", '
+                          'n, n, n, n, n, n, n, n, n);')
+        self.assertEqual(salida, '   42|42   | 42  |00042|***42****|2a|0x2A|0b101010|52\n')
+        # Las bases muestran el complemento a dos del ancho del tipo
+        self.assertEqual(ejecutar('let n: i8 = -1;\nprintln!("{:x} {:#010b} {:05}", n, n, n);'),
+                         'ff 0b11111111 -0001\n')
+        self.assertEqual(ejecutar('let f = 2.0;\nlet b = true;\nprintln!("{:?} {} {:.0} {:>6}|{:.2}", f, f, 2.5, b, b);'),
+                         '2.0 2 2   true|tr\n')
+        # En un bucle el formato se aplica al valor de cada vuelta
+        salida = ejecutar('for i in 0..3 {\n    println!("{:>3}:{:.1}", i * 5, 1.25);\n}')
+        self.assertEqual(salida, '  0:1.2\n  5:1.2\n 10:1.2\n')
+
+    def test_especificaciones_no_soportadas(self):
+        with self.assertRaises(ErrorCompilacion) as error:
+            ejecutar('let x = 1;\nprintln!("{:width$}", x);')
+        self.assertEqual(str(error.exception), 'Formato no soportado: {:width$}')
+        self.assertEqual(error.exception.linea, 3)
+        with self.assertRaises(ErrorCompilacion) as error:
+            ejecutar('let x = 1.5;\nprintln!("{:x}", x);')
+        self.assertEqual(str(error.exception), 'El formato {:x} requiere un entero')
+
+    def test_division_por_cero(self):
+        with self.assertRaises(ErrorEjecucion) as error:
+            ejecutar('let a = 7;\nprintln!("{}", a / 2);\nlet b = a - 7;\nprintln!("{}", a / b);')
+        self.assertEqual(str(error.exception), 'Intento de dividir por cero')
+        self.assertEqual(error.exception.linea, 5)
+        self.assertEqual(error.exception.salida, '3\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
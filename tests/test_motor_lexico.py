@@ -0,0 +1,84 @@
+import unittest
+
+from motor_lexico import (
+    tokenizar, describir, RUST_KEYWORDS, TIPOS_TOKEN, PALABRA_CLAVE, IDENTIFICADOR, OPERADOR,
+    DELIMITADOR, CADENA, CADENA_ABIERTA, CARACTER, TIEMPO_VIDA, COMENTARIO, COMENTARIO_ABIERTO,
+    OTRO,
+)
+from corpus_sintetico import FORMAS, generar_corpus
+
+# Tokens del motor léxico: construcciones de varias líneas, cadenas crudas,
+# tiempos de vida frente a literales de carácter y la omisión de
+# comentarios, con su línea, columna y desplazamiento.
+
+
+def tipos_y_textos(code, **opciones):
+    return [(tipo, texto) for tipo, texto, _, _, _ in tokenizar(code, **opciones)]
+
+
+class PruebasTokenizar(unittest.TestCase):
+    def test_cadena_de_varias_lineas(self):
+        self.assertEqual(list(tokenizar('let s = "a\nb";\nx')), [
+            (PALABRA_CLAVE, 'let', 1, 0, 0), (IDENTIFICADOR, 's', 1, 4, 4), (OPERADOR, '=', 1, 6, 6),
+            (CADENA, '"a\nb"', 1, 8, 8), (DELIMITADOR, ';', 2, 2, 13), (IDENTIFICADOR, 'x', 3, 0, 15),
+        ])
+
+    def test_comentarios(self):
+        code = '/* a\n b */ y // c\nz'
+        self.assertEqual(list(tokenizar(code)), [
+            (COMENTARIO, '/* a\n b */', 1, 0, 0), (IDENTIFICADOR, 'y', 2, 6, 11),
+            (COMENTARIO, '// c', 2, 8, 13), (IDENTIFICADOR, 'z', 3, 0, 18),
+        ])
+        # Sin comentarios las posiciones de los demás no cambian
+        self.assertEqual(list(tokenizar(code, incluir_comentarios=False)),
+                         [(IDENTIFICADOR, 'y', 2, 6, 11), (IDENTIFICADOR, 'z', 3, 0, 18)])
+
+    def test_cadenas_crudas(self):
+        self.assertEqual(list(tokenizar('let r = r#"a "q" \n b"#; w'))[3:], [
+            (CADENA, 'r#"a "q" \n b"#', 1, 8, 8), (DELIMITADOR, ';', 2, 4, 22), (IDENTIFICADOR, 'w', 2, 6, 24),
+        ])
+        self.assertEqual(tipos_y_textos('b"x" br"y" r"\\"'), [(CADENA, 'b"x"'), (CADENA, 'br"y"'), (CADENA, 'r"\\"')])
+
+    def test_tiempos_de_vida_y_caracteres(self):
+        code = "fn f<'a>(x: &'a str) -> char { 'c' }\nlet c = '\\n'; let u = '\\u{1F600}'; 'externo: while b {}"
+        seleccion = [(tipo, texto) for tipo, texto in tipos_y_textos(code) if tipo in (TIEMPO_VIDA, CARACTER)]
+        self.assertEqual(seleccion, [
+            (TIEMPO_VIDA, "'a"), (TIEMPO_VIDA, "'a"), (CARACTER, "'c'"),
+            (CARACTER, "'\\n'"), (CARACTER, "'\\u{1F600}'"), (TIEMPO_VIDA, "'externo"),
+        ])
+
+    def test_construcciones_sin_cerrar(self):
+        self.assertEqual(list(tokenizar('let s = "abierta\nsigue'))[-1], (CADENA_ABIERTA, '"abierta\nsigue', 1, 8, 8))
+        self.assertEqual(list(tokenizar('x /* sin cerrar\n y')),
+                         [(IDENTIFICADOR, 'x', 1, 0, 0), (COMENTARIO_ABIERTO, '/* sin cerrar\n y', 1, 2, 2)])
+        # Un comentario abierto tampoco se emite sin comentarios
+        self.assertEqual(tipos_y_textos('x /* a', incluir_comentarios=False),
+                         [(IDENTIFICADOR, 'x'), (COMENTARIO_ABIERTO, '/* a')])
+
+    def test_posiciones_en_el_corpus(self):
+        # El desplazamiento apunta al texto del token y la columna se cuenta
+        # desde el último salto de línea anterior
+        for forma in FORMAS:
+            code = generar_corpus(forma, 40) + '\nlet é = "ñandú"; // ü\n'
+            with self.subTest(forma=forma):
+                for tipo, texto, linea, columna, desplazamiento in tokenizar(code):
+                    self.assertEqual(code[desplazamiento:desplazamiento + len(texto)], texto)
+                    self.assertEqual(code.count('\n', 0, desplazamiento) + 1, linea)
+                    self.assertEqual(desplazamiento - (code.rfind('\n', 0, desplazamiento) + 1), columna)
+
+
+class PruebasDescribir(unittest.TestCase):
+    def test_tipos_y_descripciones(self):
+        self.assertEqual(describir(PALABRA_CLAVE, 'fn'), ('Palabra clave', 'Función'))
+        self.assertEqual(describir(IDENTIFICADOR, 'x'), ('Identificador', 'Nombre de variable o función'))
+        self.assertEqual(describir(CADENA_ABIERTA, '"a'), ('Cadena', 'Literal de cadena sin cerrar'))
+        self.assertEqual(describir(OTRO, 'é'), TIPOS_TOKEN[OTRO])
+        # La descripción de una palabra clave sale de la tabla que se pase
+        self.assertEqual(describir(PALABRA_CLAVE, 'fn', {'fn': 'Definición'}), ('Palabra clave', 'Definición'))
+        for tipo, texto in tipos_y_textos('fn main() { let x = 1; }'):
+            if tipo == PALABRA_CLAVE:
+                self.assertEqual(describir(tipo, texto)[1], RUST_KEYWORDS[texto])
+
+
+if __name__ == '__main__':
+    unittest.main()
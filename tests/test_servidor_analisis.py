@@ -0,0 +1,116 @@
+import io
+import json
+import unittest
+
+from servidor_analisis import ServidorAnalisis, leer_mensajes, escribir_mensaje
+
+# Sesión completa contra el servidor con flujos en memoria: initialize,
+# didOpen, un didChange incremental (con columnas UTF-16 después de un
+# emoji), analizar, shutdown y exit.
+
+_URI = 'file:///prueba.rs'
+
+_TEXTO = 'fn main() {\n    let x = 1;\n    println!("😀{}", x);\n}\n'
+
+
+def encuadrar(mensajes):
+    salida = io.BytesIO()
+    for mensaje in mensajes:
+        escribir_mensaje(salida, dict(mensaje, jsonrpc='2.0'))
+    return io.BytesIO(salida.getvalue())
+
+
+def leer(salida):
+    return [json.loads(cuerpo) for cuerpo in leer_mensajes(io.BytesIO(salida.getvalue()))]
+
+
+class PruebasServidor(unittest.TestCase):
+    def test_sesion_completa(self):
+        # En la línea 2 la x de println! está en la columna 21 en UTF-16
+        # (el emoji ocupa dos unidades) y en el índice 20 del texto
+        cambio = {'range': {'start': {'line': 2, 'character': 21}, 'end': {'line': 2, 'character': 22}},
+                  'text': 'y'}
+        entrada = encuadrar([
+            {'id': 1, 'method': 'initialize', 'params': {}},
+            {'method': 'initialized', 'params': {}},
+            {'method': 'textDocument/didOpen',
+             'params': {'textDocument': {'uri': _URI, 'version': 1, 'text': _TEXTO}}},
+            {'method': 'textDocument/didChange',
+             'params': {'textDocument': {'uri': _URI, 'version': 2}, 'contentChanges': [cambio]}},
+            {'id': 2, 'method': 'analizador/analizar', 'params': {'uri': _URI}},
+            {'id': 3, 'method': 'analizador/analizar', 'params': {'text': 'fn main() {\n    let a = (1;\n}'}},
+            {'id': 4, 'method': 'shutdown'},
+            {'id': 5, 'method': 'analizador/analizar', 'params': {'uri': _URI}},
+            {'method': 'exit'},
+        ])
+        salida = io.BytesIO()
+        servidor = ServidorAnalisis(salida)
+        self.assertEqual(servidor.ejecutar(entrada), 0)
+        respuestas = {mensaje['id']: mensaje for mensaje in leer(salida) if 'id' in mensaje}
+
+        capacidades = respuestas[1]['result']['capabilities']
+        self.assertEqual(capacidades['textDocumentSync']['change'], 2)
+
+        resultado = respuestas[2]['result']
+        self.assertEqual((resultado['uri'], resultado['version']), (_URI, 2))
+        self.assertEqual(servidor.documentos[_URI].lineas[2], '    println!("😀{}", y);')
+        [diagnostico] = resultado['diagnostics']
+        self.assertEqual(diagnostico['message'], "Variable 'y' no declarada")
+        self.assertEqual(diagnostico['range'], {'start': {'line': 2, 'character': 0},
+                                                'end': {'line': 2, 'character': 24}})
+
+        lineas = [d['range']['start']['line'] for d in respuestas[3]['result']['diagnostics']]
+        self.assertIn(1, lineas)
+        self.assertIsNone(respuestas[4]['result'])
+        # Después de shutdown solo se acepta exit
+        self.assertEqual(respuestas[5]['error']['code'], -32600)
+
+    def test_publica_al_vaciarse_la_cola(self):
+        salida = io.BytesIO()
+        servidor = ServidorAnalisis(salida, medir=False)
+        abrir = {'jsonrpc': '2.0', 'method': 'textDocument/didOpen',
+                 'params': {'textDocument': {'uri': _URI, 'version': 1, 'text': 'fn main() {\n    z;\n}'}}}
+        servidor.atender(json.dumps(abrir).encode('utf-8'))
+        servidor.publicar_pendientes()
+        # Sin cambios no se vuelve a publicar
+        servidor.por_publicar[_URI] = None
+        servidor.publicar_pendientes()
+        [notificacion] = leer(salida)
+        self.assertEqual(notificacion['method'], 'textDocument/publishDiagnostics')
+        self.assertEqual(notificacion['params']['version'], 1)
+        self.assertEqual([d['message'] for d in notificacion['params']['diagnostics']],
+                         ["Variable 'z' no declarada"])
+
+
+    def test_cambios_con_rangos_y_saltos_de_windows(self):
+        # Varios rangos en un didChange (el segundo en líneas del texto que
+        # deja el primero) y saltos \r\n: el documento y los diagnósticos son
+        # los del texto final abierto de una vez
+        salida = io.BytesIO()
+        servidor = ServidorAnalisis(salida, medir=False)
+
+        def enviar(metodo, parametros):
+            servidor.atender(json.dumps({'jsonrpc': '2.0', 'method': metodo, 'params': parametros}).encode('utf-8'))
+
+        enviar('textDocument/didOpen', {'textDocument': {'uri': _URI, 'version': 1,
+                                                         'text': _TEXTO.replace('\n', '\r\n')}})
+        cambios = [
+            {'range': {'start': {'line': 1, 'character': 14}, 'end': {'line': 1, 'character': 14}},
+             'text': '\r\n    let z = w;\r\n    let v = 2;'},
+            {'range': {'start': {'line': 4, 'character': 21}, 'end': {'line': 4, 'character': 22}},
+             'text': 'v'},
+        ]
+        enviar('textDocument/didChange', {'textDocument': {'uri': _URI, 'version': 2}, 'contentChanges': cambios})
+        final = 'fn main() {\n    let x = 1;\n    let z = w;\n    let v = 2;\n    println!("😀{}", v);\n}\n'
+        documento = servidor.documentos[_URI]
+        self.assertEqual('\n'.join(documento.lineas), final)
+
+        otro = ServidorAnalisis(io.BytesIO(), medir=False)
+        segmentado = otro._nuevo_documento()
+        segmentado.actualizar(final)
+        esperados = otro.diagnosticos(segmentado)
+        self.assertEqual(servidor.diagnosticos(documento.segmentado), esperados)
+        self.assertEqual([d['message'] for d in esperados], ["Variable 'w' no declarada"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+
+from motor_lexico import tokenizar, describir
+from tabla_tokens import TablaTokens, compactar_linea, expandir_linea, REGISTRO_VACIO
+from corpus_sintetico import generar_corpus
+
+# La tabla columnar no guarda el texto de los tokens: lo recorta de la fuente
+# con el desplazamiento y la longitud. Las filas y las tuplas que devuelve
+# deben ser las mismas que las de tokenizar + describir, también con texto
+# que no es ASCII (cadenas, comentarios, caracteres sueltos) antes de cada
+# token, donde un desplazamiento en bytes en lugar de caracteres se notaría.
+
+_NO_ASCII = '''// Comentario con acentos: año, niño, ¿qué?
+fn main() {
+    let saludo = "¡Hola, señor Müller! 日本語 🦀";
+    /* bloque con ñ
+       y 🦀 en dos líneas */
+    let c = 'é';
+    let ñ = 1;
+    println!("{} {}", saludo, c);
+    let cadena = "varias
+líneas con ü";
+}
+'''
+
+
+def filas_esperadas(code, incluir_comentarios=False):
+    filas = []
+    for tipo, texto, linea, _, _ in tokenizar(code, incluir_comentarios=incluir_comentarios):
+        nombre, descripcion = describir(tipo, texto)
+        filas.append((linea, texto, nombre, descripcion))
+    return filas
+
+
+class PruebasTablaTokens(unittest.TestCase):
+    def test_filas_como_tokenizar_y_describir(self):
+        casos = {'no ascii': _NO_ASCII, 'corpus': generar_corpus('errores', 100), 'vacío': ''}
+        for nombre, code in casos.items():
+            for incluir_comentarios in (False, True):
+                with self.subTest(caso=nombre, incluir_comentarios=incluir_comentarios):
+                    tokens = list(tokenizar(code, incluir_comentarios=incluir_comentarios))
+                    tabla = TablaTokens.desde_tokens(code, tokens)
+                    self.assertEqual(len(tabla), len(tokens))
+                    self.assertEqual(list(tabla.filas()), filas_esperadas(code, incluir_comentarios))
+                    # Las tuplas conservan línea, columna y desplazamiento
+                    self.assertEqual(list(tabla), tokens)
+                    self.assertEqual([tabla[i] for i in range(len(tabla))], tokens)
+
+    def test_desplazamientos_de_texto_no_ascii(self):
+        tabla = TablaTokens.desde_tokens(_NO_ASCII, tokenizar(_NO_ASCII, incluir_comentarios=True))
+        textos = [tabla.texto(i) for i in range(len(tabla))]
+        self.assertIn('"¡Hola, señor Müller! 日本語 🦀"', textos)
+        self.assertIn("'é'", textos)
+        self.assertIn('"varias\nlíneas con ü"', textos)
+        for i, texto in enumerate(textos):
+            inicio = tabla.desplazamientos[i]
+            self.assertEqual(_NO_ASCII[inicio:inicio + len(texto)], texto)
+            self.assertEqual(tabla.longitudes[i], len(texto))
+
+    def test_fragmentos_con_bases(self):
+        # Un fragmento que empieza más adelante, extendido sobre la primera
+        # parte, da la misma tabla que el documento entero (el corte cae
+        # después del comentario de bloque, como los de analisis_paralelo)
+        lineas = _NO_ASCII.splitlines(keepends=True)
+        corte = 5
+        primera, segunda = ''.join(lineas[:corte]), ''.join(lineas[corte:])
+        tabla = TablaTokens.desde_tokens(_NO_ASCII, tokenizar(primera, incluir_comentarios=False))
+        tabla.extender(TablaTokens.desde_tokens(_NO_ASCII, tokenizar(segunda, incluir_comentarios=False),
+                                                linea_base=corte, desplazamiento_base=len(primera)))
+        self.assertEqual(list(tabla), list(tokenizar(_NO_ASCII, incluir_comentarios=False)))
+        self.assertEqual(list(tabla.filas()), filas_esperadas(_NO_ASCII))
+
+    def test_registro_de_una_linea(self):
+        self.assertEqual(compactar_linea([]), REGISTRO_VACIO)
+        self.assertEqual(expandir_linea(REGISTRO_VACIO, 'x'), [])
+        for linea in _NO_ASCII.splitlines():
+            with self.subTest(linea=linea):
+                tokens = [(tipo, texto, columna) for tipo, texto, _, columna, _ in tokenizar(linea)]
+                self.assertEqual(expandir_linea(compactar_linea(tokens), linea), tokens)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import random
+import unittest
+
+from motor_lexico import RUST_KEYWORDS, describir
+from analisis_incremental import DocumentoIncremental
+from analizador_lexico import TablaVirtual
+from corpus_sintetico import generar_corpus
+
+# Las filas de la tabla virtual, con las sumas prefijas que se cortan en cada
+# reemplazo y se extienden solo hasta la fila pedida, deben ser las de
+# recorrer el documento entero. El Treeview se reemplaza por un doble mínimo.
+
+
+class _Arbol:
+    def __init__(self):
+        self.siguiente = 0
+
+    def cget(self, opcion):
+        return 20
+
+    def bind(self, *args):
+        pass
+
+    def insert(self, *args):
+        self.siguiente += 1
+        return self.siguiente
+
+    def item(self, *args, **opciones):
+        pass
+
+    def move(self, *args):
+        pass
+
+    def detach(self, *args):
+        pass
+
+    def delete(self, *args):
+        pass
+
+    def yview_moveto(self, *args):
+        pass
+
+
+class _Barra:
+    def configure(self, **opciones):
+        pass
+
+    def set(self, *args):
+        pass
+
+
+def filas_esperadas(documento):
+    for indice in range(len(documento.lineas)):
+        for kind, token, _ in documento.tokens_visibles(indice):
+            yield (indice + 1, token) + describir(kind, token, RUST_KEYWORDS)
+
+
+class PruebasTablaVirtual(unittest.TestCase):
+    def test_reemplazos_y_desplazamientos(self):
+        rnd = random.Random(3)
+        documento = DocumentoIncremental()
+        tabla = TablaVirtual(_Arbol(), _Barra(), RUST_KEYWORDS)
+        tabla.TRAMO_PREFIJO = 64
+        code = generar_corpus('funciones', 300)
+        documento.actualizar(code)
+        conteos = [len(documento.tokens_visibles(i)) for i in range(len(documento.lineas))]
+        # Por lotes, como las entrega el trabajador
+        for desde in range(0, len(conteos), 500):
+            tabla.agregar_lineas(documento, conteos[desde:desde + 500])
+        for paso in range(60):
+            lineas = documento.lineas
+            inicio = rnd.randint(0, len(lineas) - 1)
+            fin = min(inicio + rnd.randint(0, 2), len(lineas))
+            nuevas = [rnd.choice(('', 'let x = 1;', 'fn f() {', '}', 'g(a, b);'))
+                      for _ in range(rnd.randint(0, 2))]
+            inicio, fin_viejo, fin_nuevo = documento.reemplazar(inicio, fin, nuevas)
+            tabla.reemplazar_lineas(inicio, fin_viejo,
+                                    [len(documento.tokens_visibles(i)) for i in range(inicio, fin_nuevo)])
+            esperadas = list(filas_esperadas(documento))
+            self.assertEqual(len(tabla), len(esperadas))
+            desde = rnd.randint(0, len(esperadas) - 1)
+            with self.subTest(paso=paso):
+                obtenidas = [valores for valores, _ in tabla.filas(desde, 30)]
+                self.assertEqual(obtenidas, esperadas[desde:desde + 30])
+        # Con la vista arriba, un reemplazo en la primera línea no recalcula
+        # las sumas del resto del documento
+        tabla.primera = 0
+        tabla.reemplazar_lineas(0, 1, [len(documento.tokens_visibles(0))])
+        self.assertEqual(len(tabla._acumulado), 64)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+
+from interprete import ErrorCompilacion
+from trabajador_analisis import TrabajadorAnalisis
+
+# El programa del código se ejecuta en el hilo trabajador: la salida vuelve
+# por la cola, el programa compilado se puede reutilizar y un bucle largo se
+# corta con la cancelación.
+
+
+class PruebasEjecucionPrograma(unittest.TestCase):
+    def setUp(self):
+        self.trabajador = TrabajadorAnalisis()
+        self.addCleanup(self.trabajador.cerrar)
+
+    def test_salida_y_programa_compilado(self):
+        code = 'fn main() {\n    let x = 2.5;\n    println!("{:>6.2}", x);\n}\n'
+        ejecucion = self.trabajador.ejecutar_programa(code)
+        tipo, programa, salida, error = ejecucion.cola.get(timeout=10)
+        self.assertEqual((tipo, salida, error), ('fin', '  2.50\n', None))
+        ejecucion = self.trabajador.ejecutar_programa(code, programa)
+        self.assertEqual(ejecucion.cola.get(timeout=10), ('fin', programa, '  2.50\n', None))
+
+    def test_error_de_compilacion(self):
+        ejecucion = self.trabajador.ejecutar_programa('fn main() {\n    println!("{:e}", 1.5);\n}\n')
+        tipo, programa, salida, error = ejecucion.cola.get(timeout=10)
+        self.assertEqual((tipo, programa, salida), ('fin', None, ''))
+        self.assertIsInstance(error, ErrorCompilacion)
+
+    def test_cancelar_un_bucle(self):
+        ejecucion = self.trabajador.ejecutar_programa('fn main() {\n    let mut i = 0;\n    loop {\n        i += 1;\n    }\n}\n')
+        self.assertTrue(self.trabajador.ejecutando_programa)
+        self.trabajador.cancelar_programa()
+        self.assertEqual(ejecucion.cola.get(timeout=10), ('cancelado',))
+        self.assertFalse(self.trabajador.ejecutando_programa)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,244 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from analisis_incremental import DocumentoIncremental
+from analizador_sintactico import detectar_errores, unir_errores
+from arbol_sintactico import construir_arbol
+from interprete import Programa, ErrorEvaluacion
+from instrumentacion import etapa, contar, en_curso
+
+# Análisis en segundo plano: el léxico, la verificación sintáctica y la
+# semántica corren en un hilo trabajador que envía los resultados por lotes a
+# una cola; la interfaz la vacía con root.after sin bloquear el bucle de Tk.
+# Los diagnósticos después de cada edición también se calculan en ese hilo
+# (EjecucionRefresco), sobre un documento segmentado que solo vuelve a
+# verificar los segmentos que tocó la edición. El programa del código
+# analizado también se ejecuta ahí (EjecucionPrograma), con la misma
+# cancelación.
+
+
+class AnalisisCancelado(Exception):
+    pass
+
+
+class Ejecucion:
+    # Base de las ejecuciones: la cola de mensajes y la cancelación
+    def __init__(self):
+        self.cola = queue.Queue()
+        self.cancelado = threading.Event()
+        self.terminado = False
+
+    def cancelar(self):
+        self.cancelado.set()
+
+    def _comprobar(self):
+        if self.cancelado.is_set():
+            raise AnalisisCancelado()
+
+
+class EjecucionAnalisis(Ejecucion):
+    # Mensajes de la cola:
+    #   ('progreso', porcentaje, tokens, segundos)
+    #   ('lineas', documento, conteos, porcentaje, tokens, segundos)
+    #   ('fin', documento, elementos, errores_sintacticos, errores_semanticos, tokens, segundos)
+    #   ('cancelado',) o ('error', excepcion)
+    def __init__(self, code, documento, poblar_linea, detectar_semanticos, metricas=None,
+                 cache_disco=None, tamano_lote=2000):
+        super().__init__()
+        self.code = code
+        self.metricas = metricas
+        # CacheAnalisis donde se guarda el resultado completo, o None
+        self.cache_disco = cache_disco
+        self.documento = documento
+        self.poblar_linea = poblar_linea
+        self.detectar_semanticos = detectar_semanticos
+        self.tamano_lote = tamano_lote
+
+    def ejecutar(self):
+        # Las etapas del hilo trabajador se suman a las métricas de esta
+        # ejecución, aunque la interfaz ya haya empezado otra
+        with en_curso(self.metricas):
+            self._ejecutar()
+
+    def _ejecutar(self):
+        inicio = time.perf_counter()
+
+        def progreso_lexico(linea, total):
+            self._comprobar()
+            self.cola.put(('progreso', 40 * linea / total, 0, time.perf_counter() - inicio))
+
+        if self.metricas is not None:
+            self.metricas.iniciar_perfil()
+        try:
+            # Léxico: 0-40 %, filas: 40-80 %, verificaciones y árbol: 80-100 %
+            self.documento.actualizar(self.code, progreso=progreso_lexico)
+            total_lineas = len(self.documento.lineas)
+            tokens = 0
+            todos_conteos = []
+            for desde in range(0, total_lineas, self.tamano_lote):
+                self._comprobar()
+                with etapa('nodos', 'filas'):
+                    conteos = [self.poblar_linea(indice, self.documento)
+                               for indice in range(desde, min(desde + self.tamano_lote, total_lineas))]
+                    tokens += sum(conteos)
+                todos_conteos.extend(conteos)
+                progreso = 40 + 40 * min(desde + self.tamano_lote, total_lineas) / total_lineas
+                self.cola.put(('lineas', self.documento, conteos, progreso, tokens,
+                               time.perf_counter() - inicio))
+            contar('tokens', tokens)
+            self._comprobar()
+            self.cola.put(('progreso', 80, tokens, time.perf_counter() - inicio))
+            errores = detectar_errores(self.documento.iterar_tokens(incluir_comentarios=False))
+            self._comprobar()
+            self.cola.put(('progreso', 90, tokens, time.perf_counter() - inicio))
+            # El árbol sintáctico se arma una vez: lo verifica la pasada
+            # semántica y lo muestra la interfaz
+            raiz, del_parser = construir_arbol(self.documento.iterar_tokens(incluir_comentarios=False))
+            elementos = raiz.hijos
+            errores = unir_errores(errores, del_parser)
+            self._comprobar()
+            semanticos = self.detectar_semanticos(
+                self.code, self.documento.iterar_tokens(incluir_comentarios=False), elementos)
+            self._comprobar()
+            if self.cache_disco is not None:
+                self.cache_disco.guardar_documento(self.code, self.documento, todos_conteos, errores, semanticos)
+            self.cola.put(('fin', self.documento, elementos, errores, semanticos, tokens, time.perf_counter() - inicio))
+        except AnalisisCancelado:
+            self.cola.put(('cancelado',))
+        except Exception as e:
+            self.cola.put(('error', e))
+        finally:
+            if self.metricas is not None:
+                self.metricas.detener_perfil()
+            self.terminado = True
+
+
+class EjecucionRefresco(Ejecucion):
+    # Diagnósticos del texto editado. El documento segmentado es de la
+    # interfaz pero solo se toca en el hilo trabajador; entre ejecuciones
+    # queda sincronizado con el último texto. Con armar_arbol también se
+    # arma el árbol sintáctico para la vista.
+    # Mensajes: ('fin', errores_sintacticos, errores_semanticos, elementos o
+    # None), ('cancelado',) o ('error', excepcion)
+    def __init__(self, code, segmentado, armar_arbol=False):
+        super().__init__()
+        self.code = code
+        self.segmentado = segmentado
+        self.armar_arbol = armar_arbol
+
+    def ejecutar(self):
+        try:
+            # Una edición posterior ya la reemplazó antes de empezar
+            self._comprobar()
+            self.segmentado.actualizar(self.code)
+            errores, semanticos = self.segmentado.errores()
+            elementos = None
+            if self.armar_arbol:
+                self._comprobar()
+                raiz, _ = construir_arbol(self.segmentado.documento.iterar_tokens(incluir_comentarios=False))
+                elementos = raiz.hijos
+            self._comprobar()
+            self.cola.put(('fin', errores, semanticos, elementos))
+        except AnalisisCancelado:
+            self.cola.put(('cancelado',))
+        except Exception as e:
+            self.cola.put(('error', e))
+        finally:
+            self.terminado = True
+
+
+class EjecucionPrograma(Ejecucion):
+    # Compila (si hace falta) y ejecuta el programa del código. programa es
+    # el Programa ya compilado de ese mismo código, o None.
+    # Mensajes: ('fin', programa o None, salida, error o None),
+    # ('cancelado',) o ('error', excepcion)
+    def __init__(self, code, programa=None, metricas=None):
+        super().__init__()
+        self.code = code
+        self.programa = programa
+        self.metricas = metricas
+
+    def ejecutar(self):
+        with en_curso(self.metricas):
+            self._ejecutar()
+
+    @etapa('interprete', 'intérprete')
+    def _ejecutar(self):
+        try:
+            self._comprobar()
+            programa = self.programa
+            try:
+                if programa is None:
+                    programa = Programa(self.code)
+                # Los bucles llaman a _comprobar entre tramos de vueltas
+                salida = programa.ejecutar(self._comprobar)
+                error = None
+            except ErrorEvaluacion as e:
+                salida, error = e.salida, e
+            self.cola.put(('fin', programa, salida, error))
+        except AnalisisCancelado:
+            self.cola.put(('cancelado',))
+        except Exception as e:
+            self.cola.put(('error', e))
+        finally:
+            self.terminado = True
+
+
+class TrabajadorAnalisis:
+    def __init__(self):
+        # Un solo hilo: las ejecuciones se serializan y comparten la caché
+        self.ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='analisis')
+        self.actual = None
+        self.refresco = None
+        self.programa = None
+
+    def iniciar(self, code, cache, poblar_linea, detectar_semanticos, metricas=None, cache_disco=None):
+        self.cancelar()
+        documento = DocumentoIncremental(cache=cache)
+        self.actual = EjecucionAnalisis(code, documento, poblar_linea, detectar_semanticos, metricas, cache_disco)
+        self.ejecutor.submit(self.actual.ejecutar)
+        return self.actual
+
+    def cancelar(self):
+        if self.actual is not None and not self.actual.terminado:
+            self.actual.cancelar()
+        self.actual = None
+
+    def refrescar(self, code, segmentado, armar_arbol=False):
+        # Reemplaza el refresco anterior, que ya no corresponde al texto
+        self.cancelar_refresco()
+        self.refresco = EjecucionRefresco(code, segmentado, armar_arbol)
+        self.ejecutor.submit(self.refresco.ejecutar)
+        return self.refresco
+
+    def cancelar_refresco(self):
+        if self.refresco is not None and not self.refresco.terminado:
+            self.refresco.cancelar()
+        self.refresco = None
+
+    def ejecutar_programa(self, code, programa=None, metricas=None):
+        self.cancelar_programa()
+        self.programa = EjecucionPrograma(code, programa, metricas)
+        self.ejecutor.submit(self.programa.ejecutar)
+        return self.programa
+
+    def cancelar_programa(self):
+        if self.programa is not None and not self.programa.terminado:
+            self.programa.cancelar()
+        self.programa = None
+
+    @property
+    def ejecutando_programa(self):
+        return self.programa is not None and not self.programa.terminado
+
+    @property
+    def activo(self):
+        return self.actual is not None and not self.actual.terminado
+
+    def cerrar(self):
+        self.cancelar()
+        self.cancelar_refresco()
+        self.cancelar_programa()
+        self.ejecutor.shutdown(wait=False)